@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Memo for per-item trading analysis.
+
+Most books are unchanged between rescans, so analysis results are kept in
+an LRU keyed by a digest of the order fields the analysis reads plus the
+scan parameters. Each entry also carries the time it stops being valid:
+an opportunity is only reported while the best WTB order is younger than
+max_order_age, so a memoized result expires when that order crosses the
+threshold. The same memo type caches parsed order-book responses by a
+digest of the raw body, so identical responses skip JSON parsing too.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+from backend import metrics
+
+MAX_ENTRIES = 20000
+
+
+def orders_digest(orders: List[Dict[str, Any]]) -> int:
+    """Digest of the fields analysis depends on (type, price, WTB age) plus order identity"""
+    return hash(tuple((o.get('id'), o.get('order_type'), o.get('platinum'), o.get('creation_date')) for o in orders))
+
+
+def body_digest(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class AnalysisMemo:
+    """
+    :param max_entries: Least recently used entries are evicted beyond this size
+    :param name: Cache label for the hit/miss metrics
+    """
+    def __init__(self, max_entries: int = MAX_ENTRIES, name: str = 'analysis'):
+        self.max_entries = max_entries
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Optional[Any]:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        metrics.record_cache_lookup(self.name, entry is not None)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, value: Any, expires_at: float = math.inf):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'expired': self.expired}
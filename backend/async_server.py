@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+asyncio HTTP server for the proxy's BaseHTTPRequestHandler routes.
+
+ThreadingHTTPServer spends one OS thread per connection for the
+connection's whole life: while the client sends its request, while the
+handler waits on upstream, and while a slow client reads the response.
+AsyncHTTPServer keeps every connection on one event loop instead. Reading
+and parsing the request head and body cost no thread, so thousands of
+idle, slow or keep-alive connections cost a coroutine each. Only a request
+that is complete and ready to be handled borrows a thread to run the
+unchanged handler (do_GET, do_POST, ...), whose blocking upstream calls and
+locks behave exactly as they do under ThreadingHTTPServer.
+
+That thread still blocks for as long as the handler waits on upstream, so
+handlers are split across two bounded pools. If the handler class defines
+a static waits_on_upstream(method, path), requests it flags (proxied calls,
+order writes, login) run on a pool of upstream_workers threads. Everything
+else (progress polls, metrics, static files, job starts) runs on a pool of
+max_workers threads that upstream stalls cannot fill. The split is by
+route only: a proxied GET answered from the response cache still runs on
+the upstream pool.
+
+Responses are streamed: whatever the handler writes is passed to the
+event loop as it is written, with the transport's flow control applied.
+A long response therefore goes out while it is produced rather than
+being buffered whole.
+
+The class mirrors the parts of the socketserver API the proxy and its
+tests use: construct with (address, handler_class), then serve_forever(),
+shutdown() from another thread, server_close() and server_address.
+"""
+import asyncio
+import io
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+MAX_WORKERS = int(os.environ.get('PROXY_ASYNC_WORKERS', 64))  # local requests handled at once
+UPSTREAM_WORKERS = int(os.environ.get('PROXY_ASYNC_UPSTREAM_WORKERS', 32))  # upstream-bound requests handled at once
+HEADER_TIMEOUT = 120.0  # seconds a connection may take to send a request head (or sit idle between requests)
+MAX_HEADER_BYTES = 65536
+BACKLOG = 1024
+
+
+class _LoopWriter(io.RawIOBase):
+    """File-like wfile for handler threads; every write is sent on the event loop and waits for drain"""
+    def __init__(self, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._writer = writer
+        self._loop = loop
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        if data:
+            asyncio.run_coroutine_threadsafe(self._send(data), self._loop).result()
+        return len(data)
+
+    async def _send(self, data: bytes):
+        self._writer.write(data)
+        await self._writer.drain()
+
+
+def _content_length(head: bytes) -> int:
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            try:
+                return max(0, int(value.strip()))
+            except ValueError:
+                return 0
+    return 0
+
+
+def _request_line(head: bytes) -> Tuple[str, str]:
+    """(method, path) of a request head; empty strings if it is malformed"""
+    parts = head.split(b'\r\n', 1)[0].split()
+    if len(parts) < 2:
+        return '', ''
+    return parts[0].decode('latin-1'), parts[1].decode('latin-1')
+
+
+def _expects_continue(head: bytes) -> bool:
+    return any(line.partition(b':')[0].strip().lower() == b'expect'
+               and line.partition(b':')[2].strip().lower() == b'100-continue'
+               for line in head.split(b'\r\n')[1:])
+
+
+class AsyncHTTPServer:
+    """
+    :param server_address: (host, port) to bind; port 0 picks a free one
+    :param handler_class: A BaseHTTPRequestHandler subclass (e.g. ProxyHandler)
+    :param max_workers: Local requests handled at once; further complete requests wait on the event loop
+    :param reuse_port: Set SO_REUSEPORT, so several processes can serve the port (see prefork)
+    :param upstream_workers: Requests handler_class.waits_on_upstream() flags, handled at once on their own pool
+    """
+    def __init__(self, server_address: Tuple[str, int], handler_class, max_workers: int = MAX_WORKERS,
+                 reuse_port: bool = False, upstream_workers: int = UPSTREAM_WORKERS):
+        self.handler_class = handler_class
+        self.max_workers = max(1, max_workers)
+        self.upstream_workers = max(1, upstream_workers)
+        self.socket = socket.create_server(server_address, backlog=BACKLOG, reuse_port=reuse_port)
+        self.server_address = self.socket.getsockname()[:2]
+        self._waits_on_upstream = getattr(handler_class, 'waits_on_upstream', None)
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='async-handler')
+        self._upstream_executor = ThreadPoolExecutor(self.upstream_workers, thread_name_prefix='async-upstream')
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._started = threading.Event()
+        self._stopped = threading.Event()
+        self.connections = 0
+
+    def serve_forever(self):
+        """Run the event loop in this thread until shutdown() is called"""
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._stopped.set()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket, limit=MAX_HEADER_BYTES)
+        self._started.set()
+        async with server:
+            await self._stopping.wait()
+        self._executor.shutdown(wait=False)
+        self._upstream_executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop serve_forever() and wait for it to return (call from another thread)"""
+        self._started.wait(5)
+        if self._loop is not None and not self._stopped.is_set():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._stopped.wait(10)
+
+    def server_close(self):
+        self.socket.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        peer = writer.get_extra_info('peername') or ('', 0)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HEADER_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                        ConnectionError):
+                    return
+                if _expects_continue(head):
+                    writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+                length = _content_length(head)
+                try:
+                    body = await reader.readexactly(length) if length else b''
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                keep_alive = await self._loop.run_in_executor(
+                    self._executor_for(head), self._run_handler, head + body, peer, writer)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def _executor_for(self, head: bytes) -> ThreadPoolExecutor:
+        if self._waits_on_upstream is not None and self._waits_on_upstream(*_request_line(head)):
+            return self._upstream_executor
+        return self._executor
+
+    def _run_handler(self, request: bytes, peer, writer: asyncio.StreamWriter) -> bool:
+        """Handle one complete request in a worker thread; returns whether the connection stays open"""
+        handler = self.handler_class.__new__(self.handler_class)
+        handler.server = self
+        handler.request = None
+        handler.client_address = peer
+        handler.rfile = io.BytesIO(request)
+        handler.wfile = io.BufferedWriter(_LoopWriter(writer, self._loop), buffer_size=65536)
+        handler.close_connection = True
+        try:
+            handler.handle_one_request()
+            handler.wfile.flush()
+        except Exception as e:
+            print(f'[ASYNC] Error handling request from {peer[0]}: {e}')
+            return False
+        return not handler.close_connection
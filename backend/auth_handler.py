@@ -12,10 +12,12 @@ import threading
 import time
 import urllib.error
 from typing import Optional, Dict, Any
+from backend.metrics import timed_urlopen
+from backend.market_client import API_BASE_URL
 
 class WarframeMarketAuth:
     def __init__(self):
-        self.base_url = "https://api.warframe.market/v1"
+        self.base_url = API_BASE_URL
         self.csrf_token = None
         self.session_cookies = None
         self.auth_lock = threading.Lock()
@@ -59,7 +61,7 @@ class WarframeMarketAuth:
                     }
                 )
                 
-                with urllib.request.urlopen(csrf_req, context=context) as csrf_response:
+                with timed_urlopen(csrf_req, context=context) as csrf_response:
                     print(f"[DEBUG] JWT request status: {csrf_response.status}")
                     # Extract JWT token from Set-Cookie header
                     set_cookie = csrf_response.headers.get_all('Set-Cookie')
@@ -115,7 +117,7 @@ class WarframeMarketAuth:
             
             print("[DEBUG] About to make network request")
             # Make request using urlopen with context
-            with urllib.request.urlopen(req, context=context) as response:
+            with timed_urlopen(req, context=context) as response:
                 print(f"[DEBUG] Got response: status={response.status}")
                 response_data = response.read()
                 print(f"[DEBUG] Response data: {response_data[:200]}")
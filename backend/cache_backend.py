@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Pluggable cache backend shared by proxy nodes.
+
+Several proxies behind a load balancer would each fetch (and rate-limit)
+the same order books on their own. PROXY_CACHE_URL points them at one
+backend instead:
+
+- memory:// (the default): MemoryBackend, an LRU dict in this process.
+- redis://[:password@]host[:port][/db]: RedisBackend, a small client for
+  the Redis protocol (RESP) with a connection pool. Anything that speaks
+  RESP works (Redis, Valkey, KeyDB; benchmarks/redis_stub.py in tests).
+
+Every backend stores bytes under string keys with an optional TTL and an
+atomic add-if-absent. The caches are adapters over that interface, each
+with a compact serialized form:
+
+- BackendBookStore: order books as snapshot_store records (columnar
+  arrays, see encode_orders). OrderBookCache.attach_store() uses it like
+  a SnapshotStore, and fetched_at reads only the record header.
+- CatalogueStore: the /items catalogue as zlib-compressed JSON.
+- ResponseCache: proxied GET responses (status 200, no Authorization) as
+  a small header and a zlib-compressed body.
+- RateLimitTokens: the upstream rate limit as `limit` token keys that
+  each expire `period` seconds after they were taken. At most `limit`
+  requests per `period`, across every node using the backend.
+
+Failures of a shared backend degrade to cache misses. The proxy then
+fetches upstream, and its rate limit falls back to the local window.
+"""
+import json
+import math
+import os
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from backend import metrics
+from backend.snapshot_store import RECORD_HEADER, decode_orders, encode_orders
+
+CACHE_URL = os.environ.get('PROXY_CACHE_URL', 'memory://')
+KEY_PREFIX = os.environ.get('PROXY_CACHE_PREFIX', 'wfm:')
+RESPONSE_CACHE_TTL = float(os.environ.get('PROXY_RESPONSE_CACHE_TTL', 0))  # seconds; 0 disables it
+BOOK_TTL = 24 * 3600.0  # seconds a shared order book is kept (the cache's own TTL decides freshness)
+MEMORY_MAX_ENTRIES = 10000
+SOCKET_TIMEOUT = 5.0
+MAX_IDLE_CONNECTIONS = 16
+
+_CATALOGUE_HEADER = struct.Struct('<d')  # fetched_at
+_RESPONSE_HEADER = struct.Struct('<dHH')  # stored_at, status, content-type length
+
+
+class CacheBackendError(Exception):
+    """The backend is unreachable or rejected a command"""
+
+
+class CacheBackend:
+    """Bytes under string keys, with optional expiry (seconds)"""
+    shared = False  # True when other processes or nodes see the same entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self.get(key) for key in keys]
+
+    def get_range(self, key: str, start: int, end: int) -> Optional[bytes]:
+        """Bytes start..end (inclusive) of the value, or None if the key is missing"""
+        value = self.get(key)
+        return value[start:end + 1] if value is not None else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Set key only if it is absent (atomically); returns whether it was set"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {'backend': type(self).__name__, 'shared': self.shared}
+
+    def close(self):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process backend.
+    :param max_entries: Least recently used entries are evicted beyond this size
+    """
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (expires_at, value)
+
+    def _live(self, key: str, now: float) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._live(key, time.time())
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else math.inf
+        with self._lock:
+            self._entries[key] = (expires_at, bytes(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._entries[key] = (now + ttl if ttl is not None else math.inf, bytes(value))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(super().stats(), entries=len(self._entries))
+
+
+def _encode_command(args) -> bytes:
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = b'%d' % arg
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+class _Connection:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+
+    def command(self, *args):
+        self.sock.sendall(_encode_command(args))
+        return self.read_reply()
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('connection closed by the cache server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise CacheBackendError(rest.decode(errors='replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError('connection closed by the cache server')
+            return data[:-2]
+        if kind == b'*':
+            count = int(rest)
+            return None if count < 0 else [self.read_reply() for _ in range(count)]
+        raise CacheBackendError(f'unexpected reply {line[:32]!r}')
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """
+    Client for a server speaking the Redis protocol (RESP2).
+    :param host: Server host
+    :param port: Server port
+    :param db: Database number (SELECT)
+    :param password: Sent with AUTH when set
+    """
+    shared = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 timeout: float = SOCKET_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.errors = 0
+
+    def _connect(self) -> _Connection:
+        conn = _Connection(self.host, self.port, self.timeout)
+        try:
+            if self.password:
+                conn.command('AUTH', self.password)
+            if self.db:
+                conn.command('SELECT', self.db)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def execute(self, *args):
+        """Run one command on a pooled connection and return its decoded reply"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked (see prefork): the inherited sockets belong to the parent
+                self._idle, self._pid = [], os.getpid()
+            conn = self._idle.pop() if self._idle else None
+        try:
+            if conn is None:
+                conn = self._connect()
+            reply = conn.command(*args)
+        except CacheBackendError:
+            self._release(conn)
+            self.errors += 1
+            raise
+        except (OSError, ValueError) as e:
+            if conn is not None:
+                conn.close()
+            self.errors += 1
+            raise CacheBackendError(f'{self.host}:{self.port}: {e}') from e
+        self._release(conn)
+        return reply
+
+    def _release(self, conn: Optional[_Connection]):
+        if conn is None:
+            return
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute('GET', key)
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return self.execute('MGET', *keys) if keys else []
+
+    def get_range(self, key: str, start: int, end: int) -> Optional[bytes]:
+        # GETRANGE answers "" for a missing key; every value this module stores is non-empty
+        return self.execute('GETRANGE', key, start, end) or None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        if ttl is None:
+            self.execute('SET', key, value)
+        else:
+            self.execute('SET', key, value, 'PX', _milliseconds(ttl))
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        args = ('SET', key, value, 'NX') + (('PX', _milliseconds(ttl)) if ttl is not None else ())
+        return self.execute(*args) == 'OK'
+
+    def delete(self, key: str):
+        self.execute('DEL', key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            idle = len(self._idle)
+        return dict(super().stats(), server=f'{self.host}:{self.port}/{self.db}', idle_connections=idle,
+                    errors=self.errors)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _milliseconds(seconds: float) -> int:
+    # Rounded up: an entry never expires (and a rate-limit token is never returned) early
+    return max(1, math.ceil(seconds * 1000))
+
+
+def from_url(url: str = CACHE_URL) -> CacheBackend:
+    """memory:// or redis://[:password@]host[:port][/db]"""
+    parsed = urlparse(url or 'memory://')
+    if parsed.scheme == 'memory':
+        return MemoryBackend()
+    if parsed.scheme == 'redis':
+        db = parsed.path.strip('/')
+        return RedisBackend(parsed.hostname or '127.0.0.1', parsed.port or 6379, int(db) if db else 0,
+                            unquote(parsed.password) if parsed.password else None)
+    raise ValueError(f'Unsupported cache URL {url!r} (expected memory:// or redis://)')
+
+
+class BackendBookStore:
+    """SnapshotStore-compatible order-book store over a backend, for OrderBookCache.attach_store"""
+    def __init__(self, backend: CacheBackend, prefix: str = KEY_PREFIX, ttl: float = BOOK_TTL):
+        self.backend = backend
+        self.prefix = f'{prefix}book:'
+        self.ttl = ttl
+        self.errors = 0
+
+    def put(self, url_name: str, orders, fetched_at: float):
+        self.put_record(url_name, encode_orders(url_name, orders, fetched_at), fetched_at)
+
+    def put_record(self, url_name: str, record: bytes, fetched_at: float):
+        """Store a record already built by encode_orders"""
+        self.backend.set(self.prefix + url_name, record, self.ttl)
+
+    def get(self, url_name: str) -> Optional[Tuple[float, List[Dict]]]:
+        try:
+            record = self.backend.get(self.prefix + url_name)
+        except CacheBackendError as e:
+            return self._failed(url_name, e)
+        if not record:
+            return None
+        _, fetched_at, orders = decode_orders(record, 0)
+        return fetched_at, orders
+
+    def fetched_at(self, url_name: str) -> Optional[float]:
+        try:
+            header = self.backend.get_range(self.prefix + url_name, 0, RECORD_HEADER.size - 1)
+        except CacheBackendError as e:
+            return self._failed(url_name, e)
+        if not header or len(header) < RECORD_HEADER.size:
+            return None
+        return RECORD_HEADER.unpack_from(header)[2]
+
+    def _failed(self, url_name: str, error: Exception):
+        self.errors += 1
+        print(f'[CACHE] Shared order book {url_name} unavailable: {error}')
+        return None
+
+    def stats(self) -> Dict:
+        return dict(self.backend.stats(), errors=self.errors)
+
+    def close(self):
+        pass  # the backend outlives the store
+
+
+class CatalogueStore:
+    """Shared /items catalogue for ItemCatalogue.attach_store"""
+    def __init__(self, backend: CacheBackend, prefix: str = KEY_PREFIX):
+        self.backend = backend
+        self.key = f'{prefix}catalogue'
+
+    def put(self, items: List[Dict], fetched_at: float, ttl: Optional[float] = None):
+        body = zlib.compress(json.dumps(items, separators=(',', ':')).encode())
+        try:
+            self.backend.set(self.key, _CATALOGUE_HEADER.pack(fetched_at) + body, ttl)
+        except CacheBackendError as e:
+            print(f'[CACHE] Could not share the item catalogue: {e}')
+
+    def get(self) -> Optional[Tuple[float, List[Dict]]]:
+        try:
+            value = self.backend.get(self.key)
+        except CacheBackendError as e:
+            print(f'[CACHE] Shared item catalogue unavailable: {e}')
+            return None
+        if not value:
+            return None
+        (fetched_at,) = _CATALOGUE_HEADER.unpack_from(value)
+        return fetched_at, json.loads(zlib.decompress(value[_CATALOGUE_HEADER.size:]))
+
+
+class ResponseCache:
+    """
+    Proxied GET responses, shared through the backend.
+    :param ttl: Seconds a response is served from the cache; 0 disables the cache
+    """
+    def __init__(self, backend: CacheBackend, ttl: float = RESPONSE_CACHE_TTL, prefix: str = KEY_PREFIX):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = f'{prefix}response:'
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _key(self, path: str) -> str:
+        return self.prefix + blake2b(path.encode(), digest_size=16).hexdigest()
+
+    def get(self, path: str) -> Optional[Tuple[int, str, bytes]]:
+        """(status, content_type, body) of a cached response, or None"""
+        try:
+            value = self.backend.get(self._key(path))
+        except CacheBackendError as e:
+            print(f'[CACHE] Response cache unavailable: {e}')
+            value = None
+        metrics.record_cache_lookup('response', bool(value))
+        if not value:
+            return None
+        _, status, type_length = _RESPONSE_HEADER.unpack_from(value)
+        start = _RESPONSE_HEADER.size
+        content_type = value[start:start + type_length].decode()
+        return status, content_type, zlib.decompress(value[start + type_length:])
+
+    def put(self, path: str, status: int, content_type: str, body: bytes):
+        encoded_type = content_type.encode()
+        value = _RESPONSE_HEADER.pack(time.time(), status, len(encoded_type)) + encoded_type + zlib.compress(body)
+        try:
+            self.backend.set(self._key(path), value, self.ttl)
+        except CacheBackendError as e:
+            print(f'[CACHE] Could not cache the response for {path}: {e}')
+
+
+class RateLimitTokens:
+    """
+    Sliding-window rate limit kept in a backend: `limit` token keys, each taken with add() and expiring
+    `period` seconds later. No more than `limit` tokens exist at once, so no `period`-long window
+    holds more than `limit` requests, however many processes or nodes take them.
+    Same interface as prefork.RateWindow.
+    """
+    def __init__(self, backend: CacheBackend, limit: int, period: float = 1.0, prefix: str = KEY_PREFIX):
+        self.backend = backend
+        self.limit = limit
+        self.period = period
+        self.keys = [f'{prefix}rate:{i}' for i in range(limit)]
+        self._token = f'{os.getpid()}'.encode()
+
+    def free_slots(self) -> int:
+        return sum(value is None for value in self.backend.get_many(self.keys))
+
+    def take_slot(self) -> bool:
+        # Start at a random token so concurrent takers rarely race for the same key
+        start = random.randrange(self.limit)
+        for i in range(self.limit):
+            if self.backend.add(self.keys[(start + i) % self.limit], self._token, self.period):
+                return True
+        return False
+
+    def try_take(self, headroom: int = 0) -> bool:
+        """Take a token if more than `headroom` are free"""
+        return self.free_slots() > headroom and self.take_slot()
+
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Record-and-replay archive ("cassette") for upstream Warframe Market traffic.
+
+A cassette is a single file of zlib-compressed response records followed
+by an index of key -> record offsets, so a replay reads only the records
+it needs. Records keep the original connect/TTFB/read timings and replay
+sleeps for them, which makes offline scans both repeatable and realistic.
+
+File layout:
+    MAGIC
+    record*   (RECORD_HEADER, key, compressed headers JSON, compressed body)
+    index     (compressed JSON {key: [offset, ...]})
+    footer    (index offset, index length, FOOTER_MAGIC)
+"""
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+MAGIC = b'WFMCAS01'
+FOOTER_MAGIC = b'WFMIDX01'
+# key length, status, connect, ttfb, body_read, headers length, body length
+RECORD_HEADER = struct.Struct('<HHfffII')
+FOOTER = struct.Struct('<QI8s')
+TIMING_PHASES = ('connect', 'ttfb', 'body_read')
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded"""
+
+
+class CassetteEntry:
+    __slots__ = ('status', 'headers', 'body', 'timings')
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, timings: Dict[str, float]):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.timings = timings
+
+
+class Cassette:
+    """
+    :param path: Archive file
+    :param mode: 'record' (append new responses) or 'replay' (serve recorded ones)
+    :param speed: Replay timing multiplier; 1.0 replays original timing, 0 disables sleeping
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, speed: float = 1.0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f'Unknown cassette mode: {mode}')
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[int]] = {}
+        self._replay_positions: Dict[str, int] = {}
+        self._file = None
+        if mode == REPLAY:
+            self._file = open(path, 'rb')
+            self._check_magic()
+            self._index, _ = self._load_index()
+        else:
+            exists = os.path.exists(path) and os.path.getsize(path) > 0
+            self._file = open(path, 'r+b' if exists else 'w+b')
+            if exists:
+                self._check_magic()
+                self._index, data_end = self._load_index()
+                # Drop the old index; it is rewritten on close
+                self._file.truncate(data_end)
+                self._file.seek(data_end)
+            else:
+                self._file.write(MAGIC)
+
+    @staticmethod
+    def key_for(method: str, target: str) -> str:
+        """Key requests by method and path+query so cassettes are independent of the host"""
+        return f'{method.upper()} {target}'
+
+    def _check_magic(self):
+        self._file.seek(0)
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{self.path} is not a cassette file')
+
+    def _load_index(self) -> Tuple[Dict[str, List[int]], int]:
+        """Return (index, end of record data); rebuilds the index if the footer is missing"""
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        if size >= len(MAGIC) + FOOTER.size:
+            self._file.seek(size - FOOTER.size)
+            index_offset, index_length, footer_magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if footer_magic == FOOTER_MAGIC and index_offset + index_length + FOOTER.size == size:
+                self._file.seek(index_offset)
+                index = json.loads(zlib.decompress(self._file.read(index_length)))
+                return index, index_offset
+        return self._scan_records(size)
+
+    def _scan_records(self, size: int) -> Tuple[Dict[str, List[int]], int]:
+        """Walk records sequentially (used when a recording was not closed cleanly)"""
+        index: Dict[str, List[int]] = {}
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= size:
+            self._file.seek(offset)
+            key_len, _, _, _, _, headers_len, body_len = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+            end = offset + RECORD_HEADER.size + key_len + headers_len + body_len
+            if end > size:
+                break
+            key = self._file.read(key_len).decode('utf-8')
+            index.setdefault(key, []).append(offset)
+            offset = end
+        return index, offset
+
+    def _read_record(self, offset: int) -> CassetteEntry:
+        self._file.seek(offset)
+        key_len, status, connect, ttfb, body_read, headers_len, body_len = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+        self._file.seek(key_len, os.SEEK_CUR)
+        headers = json.loads(zlib.decompress(self._file.read(headers_len)))
+        body = zlib.decompress(self._file.read(body_len))
+        return CassetteEntry(status, headers, body, {'connect': connect, 'ttfb': ttfb, 'body_read': body_read})
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return sum(len(offsets) for offsets in self._index.values())
+
+    def keys(self) -> List[str]:
+        return list(self._index)
+
+    def record(self, key: str, status: int, headers: Dict[str, str], body: bytes, timings: Dict[str, float]):
+        """Append one response to the archive"""
+        key_bytes = key.encode('utf-8')
+        headers_blob = zlib.compress(json.dumps(headers).encode('utf-8'))
+        body_blob = zlib.compress(body, 6)
+        header = RECORD_HEADER.pack(len(key_bytes), status,
+                                    *(float(timings.get(phase, 0.0)) for phase in TIMING_PHASES),
+                                    len(headers_blob), len(body_blob))
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(header + key_bytes + headers_blob + body_blob)
+            self._file.flush()
+            self._index.setdefault(key, []).append(offset)
+
+    def replay(self, key: str, timings: Optional[Dict[str, float]] = None) -> CassetteEntry:
+        """
+        Return the next recorded response for key. Responses recorded several times are
+        served in recording order; after the last one, the last response is repeated.
+        """
+        with self._lock:
+            offsets = self._index.get(key)
+            if not offsets:
+                raise CassetteMiss(key)
+            position = self._replay_positions.get(key, 0)
+            self._replay_positions[key] = position + 1
+            entry = self._read_record(offsets[min(position, len(offsets) - 1)])
+        if self.speed > 0:
+            time.sleep(sum(entry.timings.values()) * self.speed)
+        if timings is not None:
+            timings.update(entry.timings)
+        return entry
+
+    def rewind(self):
+        """Restart replay from the first recorded response of every key"""
+        with self._lock:
+            self._replay_positions.clear()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            if self.mode == RECORD:
+                self._file.seek(0, os.SEEK_END)
+                index_offset = self._file.tell()
+                index_blob = zlib.compress(json.dumps(self._index).encode('utf-8'))
+                self._file.write(index_blob)
+                self._file.write(FOOTER.pack(index_offset, len(index_blob), FOOTER_MAGIC))
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    """
+    Build a cassette from MARKET_CASSETTE (path), MARKET_CASSETTE_MODE ('record' or
+    'replay', default 'replay') and MARKET_CASSETTE_SPEED (default 1.0).
+    """
+    path = os.environ.get('MARKET_CASSETTE')
+    if not path:
+        return None
+    mode = os.environ.get('MARKET_CASSETTE_MODE', REPLAY)
+    speed = float(os.environ.get('MARKET_CASSETTE_SPEED', '1.0'))
+    print(f'[CASSETTE] {mode} mode using {path}')
+    cassette = Cassette(path, mode, speed)
+    atexit.register(cassette.close)
+    return cassette
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Timeouts, deadlines and cooperative cancellation for upstream calls.
+
+Every upstream socket gets a connect and a read timeout, so a stalled
+connection can never hold a server or scan thread forever. On top of that
+each proxied request and each trading job carries a Deadline: upstream
+calls cap their timeouts at its remaining time, rate-limit waits give up
+when it passes, and cancelling it (/api/cancel-analysis) shuts down the
+sockets of fetches still in flight, so their threads are freed at once
+rather than after the read timeout.
+
+Request handlers install their deadline for the current thread (use() or
+set_current()); code that spawns its own threads (trading jobs) passes it
+explicitly. MarketClient applies all of this to pooled GETs; urlopen() does
+the same for one-off urllib requests (order writes, auth, profile calls).
+"""
+import contextlib
+import http.client
+import math
+import os
+import socket
+import threading
+import time
+import urllib.request
+from typing import Callable, Optional
+
+CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 5))  # seconds
+READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 20))  # seconds, per socket read
+
+
+class Cancelled(Exception):
+    """The operation's Deadline was cancelled"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The operation's Deadline passed"""
+
+
+class Deadline:
+    """
+    :param seconds: Time budget from now (None = no deadline, only cancellation)
+    """
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else math.inf
+        self._cancelled = threading.Event()
+        self._aborts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def restart(self, seconds: float):
+        """Give the deadline a fresh budget of seconds from now (e.g. when queued work starts)"""
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self):
+        """:raises Cancelled: / DeadlineExceeded: if the operation must stop"""
+        if self._cancelled.is_set():
+            raise Cancelled()
+        if self.expired():
+            raise DeadlineExceeded('deadline exceeded')
+
+    def timeout(self, limit: float) -> float:
+        """limit capped at the remaining time (for socket timeouts); raises like check()"""
+        self.check()
+        return min(limit, self.remaining())
+
+    def sleep(self, seconds: float):
+        """Sleep, waking early on cancellation; raises like check() afterwards"""
+        self._cancelled.wait(max(0.0, min(seconds, self.remaining())))
+        self.check()
+
+    def cancel(self):
+        """Cancel and run every registered abort (e.g. shut down in-flight sockets)"""
+        with self._lock:
+            self._cancelled.set()
+            aborts = list(self._aborts.values())
+        for abort in aborts:
+            with contextlib.suppress(Exception):
+                abort()
+
+    @contextlib.contextmanager
+    def abort_with(self, abort: Callable[[], None]):
+        """Run abort if the deadline is cancelled while the block executes"""
+        token = object()
+        with self._lock:
+            self._aborts[token] = abort
+            cancelled = self._cancelled.is_set()
+        try:
+            if cancelled:
+                abort()
+            yield
+        finally:
+            with self._lock:
+                self._aborts.pop(token, None)
+
+
+def shutdown_socket(sock):
+    """Unblock any thread reading from sock (close() alone does not on every platform)"""
+    if sock is not None:
+        with contextlib.suppress(OSError):
+            sock.shutdown(socket.SHUT_RDWR)
+
+
+UNBOUNDED = Deadline()  # for work outside any request or job; never cancel it
+_local = threading.local()
+
+
+def current() -> Deadline:
+    """The deadline installed for this thread by use(), else UNBOUNDED"""
+    return getattr(_local, 'deadline', None) or UNBOUNDED
+
+
+def set_current(deadline: Optional[Deadline]):
+    """Make deadline current() for the calling thread (None restores UNBOUNDED)"""
+    _local.deadline = deadline
+
+
+@contextlib.contextmanager
+def use(deadline: Deadline):
+    """Install deadline as current() for the calling thread within the block"""
+    previous = getattr(_local, 'deadline', None)
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+
+def is_timeout(error: BaseException) -> bool:
+    """True for socket/deadline timeouts, including urllib's URLError wrapping of a connect timeout"""
+    return isinstance(error, TimeoutError) or isinstance(getattr(error, 'reason', None), TimeoutError)
+
+
+class _ConnectTimeout:
+    """http.client connection mixin: connect within connect_timeout, then read with the connection's own timeout"""
+    def __init__(self, *args, connect_timeout: float, on_connect: Callable[[socket.socket], None], **kwargs):
+        super().__init__(*args, **kwargs)
+        self._connect_timeout = connect_timeout
+        self._on_connect = on_connect
+
+    def connect(self):
+        read_timeout = self.timeout
+        self.timeout = self._connect_timeout
+        try:
+            super().connect()
+        finally:
+            self.timeout = read_timeout
+        self.sock.settimeout(read_timeout)
+        self._on_connect(self.sock)
+
+
+class _HTTPConnection(_ConnectTimeout, http.client.HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_ConnectTimeout, http.client.HTTPSConnection):
+    pass
+
+
+class _HTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, **connection_args):
+        super().__init__()
+        self._connection_args = connection_args
+
+    def http_open(self, req):
+        return self.do_open(_HTTPConnection, req, **self._connection_args)
+
+
+class _HTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, context=None, **connection_args):
+        super().__init__(context=context)
+        self._connection_args = connection_args
+
+    def https_open(self, req):
+        return self.do_open(_HTTPSConnection, req, context=self._context, **self._connection_args)
+
+
+@contextlib.contextmanager
+def urlopen(req, timeout: Optional[float] = None, context=None, deadline: Optional[Deadline] = None):
+    """
+    urllib.request.urlopen for one upstream call: connects within CONNECT_TIMEOUT, reads within timeout
+    (default READ_TIMEOUT), both capped at deadline (default current()). Cancelling the deadline shuts the
+    socket down until the block exits.
+    :raises Cancelled: if the deadline is cancelled, even mid-request
+    """
+    deadline = deadline or current()
+    read_timeout = deadline.timeout(READ_TIMEOUT if timeout is None else timeout)
+    sockets = []
+
+    def on_connect(sock):
+        sockets.append(sock)
+        if deadline.cancelled:  # cancelled while connecting
+            shutdown_socket(sock)
+
+    args = {'connect_timeout': min(CONNECT_TIMEOUT, read_timeout), 'on_connect': on_connect}
+    opener = urllib.request.build_opener(_HTTPHandler(**args), _HTTPSHandler(context, **args))
+    with deadline.abort_with(lambda: [shutdown_socket(sock) for sock in sockets]):
+        try:
+            with opener.open(req, timeout=read_timeout) as response:
+                yield response
+        except Exception as e:
+            if deadline.cancelled and not isinstance(e, Cancelled):
+                raise Cancelled() from e
+            raise
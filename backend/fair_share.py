@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Fair-share scheduling of upstream rate-limit slots.
+
+Trading scans, proxied UI requests and order writes all draw on one
+upstream budget (the proxy's sliding-window rate limiter). Served first
+come first served, a scan keeps hundreds of fetches waiting and every page
+click queues behind them. The FairShareScheduler decides who gets the next
+free slot:
+
+- writes (order create/delete) go first, and RESERVED_SLOTS slots per
+  window are held back from scans for them and for interactive requests,
+  so a big scan can never starve either;
+- interactive requests and scans share the rest by smooth weighted
+  round-robin, INTERACTIVE_WEIGHT to 1;
+- concurrent scans (flows of the job lane) take turns round-robin, each
+  flow in FIFO order.
+
+Background refreshers keep using spare slots only (see the proxy's
+try_acquire_rate_limit_slot), which are never taken while anyone waits.
+
+Work that reaches upstream through shared helpers (e.g. a syndicate scan
+loading books via the order-book cache) installs its lane and flow for the
+calling thread with use(); callers that do not pass a lane get current().
+"""
+import contextlib
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional, Tuple
+
+from backend import deadline as deadlines
+from backend.deadline import Deadline
+
+WRITE, INTERACTIVE, JOB = 'write', 'interactive', 'job'
+LANES = (WRITE, INTERACTIVE, JOB)
+INTERACTIVE_WEIGHT = int(os.environ.get('UPSTREAM_INTERACTIVE_WEIGHT', 4))  # interactive slots per scan slot
+RESERVED_SLOTS = int(os.environ.get('UPSTREAM_RESERVED_SLOTS', 1))  # per window, never used by scans
+POLL_INTERVAL = 0.05  # seconds; slots free up as the window slides, which nobody signals
+
+
+_local = threading.local()
+
+
+def current() -> Tuple[str, object]:
+    """(lane, flow) installed for this thread by use(), else (INTERACTIVE, None)"""
+    return getattr(_local, 'lane', None) or (INTERACTIVE, None)
+
+
+@contextlib.contextmanager
+def use(lane: str, flow=None):
+    """Make lane (and flow) current() for the calling thread within the block"""
+    if lane not in LANES:
+        raise ValueError(f'unknown lane {lane!r}')
+    previous = getattr(_local, 'lane', None)
+    _local.lane = (lane, flow)
+    try:
+        yield
+    finally:
+        _local.lane = previous
+
+
+class _Waiter:
+    __slots__ = ('lane', 'flow')
+
+    def __init__(self, lane, flow):
+        self.lane = lane
+        self.flow = flow
+
+
+class FairShareScheduler:
+    """
+    :param free_slots: Returns how many slots the rate limiter has free right now
+    :param take_slot: Takes one slot; returns False if none was free after all
+    :param interactive_weight: Interactive slots granted per scan slot while both wait
+    :param reserved: Slots per window scans leave free for writes and interactive requests
+    """
+    def __init__(self, free_slots: Callable[[], int], take_slot: Callable[[], bool],
+                 interactive_weight: int = INTERACTIVE_WEIGHT, reserved: int = RESERVED_SLOTS):
+        self.free_slots = free_slots
+        self.take_slot = take_slot
+        self.weights = {INTERACTIVE: max(1, interactive_weight), JOB: 1}
+        self.reserved = max(0, reserved)
+        self._writes = deque()
+        self._interactive = deque()
+        self._flows: 'OrderedDict[object, deque]' = OrderedDict()  # job flow -> its waiters
+        self._credit = {INTERACTIVE: 0, JOB: 0}
+        self._granted = {lane: 0 for lane in LANES}
+        self._cond = threading.Condition()
+
+    def acquire(self, lane: str = INTERACTIVE, flow=None, deadline: Optional[Deadline] = None):
+        """
+        Block until this request's turn comes and a slot is free, then take it.
+        :param lane: WRITE, INTERACTIVE or JOB
+        :param flow: For JOB, the job the request belongs to (jobs take turns)
+        :param deadline: Gives up (Cancelled / DeadlineExceeded) when it is cancelled or passes;
+                         defaults to the thread's current deadline
+        """
+        if lane not in LANES:
+            raise ValueError(f'unknown lane {lane!r}')
+        deadline = deadline or deadlines.current()
+        waiter = _Waiter(lane, flow)
+        with self._cond:
+            self._queue_for(waiter, create=True).append(waiter)
+            try:
+                while True:
+                    deadline.check()
+                    if self._try_grant(waiter):
+                        return
+                    self._cond.wait(max(0.0, min(POLL_INTERVAL, deadline.remaining())))
+            finally:
+                self._remove(waiter)
+                self._cond.notify_all()
+
+    def waiting(self) -> Dict[str, int]:
+        with self._cond:
+            return {WRITE: len(self._writes), INTERACTIVE: len(self._interactive),
+                    JOB: sum(len(queue) for queue in self._flows.values())}
+
+    def status(self) -> Dict:
+        waiting = self.waiting()
+        with self._cond:
+            return {
+                'waiting': waiting,
+                'job_flows': len(self._flows),
+                'granted': dict(self._granted),
+                'interactive_weight': self.weights[INTERACTIVE],
+                'reserved_slots': self.reserved,
+            }
+
+    # Everything below runs under self._cond
+
+    def _queue_for(self, waiter: _Waiter, create: bool = False) -> Optional[deque]:
+        if waiter.lane == WRITE:
+            return self._writes
+        if waiter.lane == INTERACTIVE:
+            return self._interactive
+        queue = self._flows.get(waiter.flow)
+        if queue is None and create:
+            queue = self._flows[waiter.flow] = deque()
+        return queue
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queue_for(waiter)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+        if waiter.lane == JOB and not self._flows.get(waiter.flow, True):
+            del self._flows[waiter.flow]
+
+    def _candidates(self):
+        """Queue heads in the order they are entitled to the next slot"""
+        heads = []
+        if self._writes:
+            heads.append(self._writes[0])
+        shared = [lane for lane in (INTERACTIVE, JOB) if self._lane_waiting(lane)]
+        # Smooth weighted round-robin: the lane with the most credit after this round's top-up goes first
+        shared.sort(key=lambda lane: self._credit[lane] + self.weights[lane], reverse=True)
+        for lane in shared:
+            heads.append(self._interactive[0] if lane == INTERACTIVE else next(iter(self._flows.values()))[0])
+        return heads
+
+    def _lane_waiting(self, lane: str) -> bool:
+        return bool(self._interactive) if lane == INTERACTIVE else bool(self._flows)
+
+    def _try_grant(self, waiter: _Waiter) -> bool:
+        free = self.free_slots()
+        for head in self._candidates():
+            # Scans only take a slot while RESERVED_SLOTS more stay free
+            if free <= (self.reserved if head.lane == JOB else 0):
+                continue  # let a lane that may still use the reserve go ahead
+            if head is not waiter or not self.take_slot():
+                return False
+            self._account(waiter)
+            return True
+        return False
+
+    def _account(self, waiter: _Waiter):
+        self._granted[waiter.lane] += 1
+        if waiter.lane == WRITE:
+            return
+        shared = [lane for lane in (INTERACTIVE, JOB) if self._lane_waiting(lane)]
+        for lane in (INTERACTIVE, JOB):
+            if lane in shared:
+                self._credit[lane] += self.weights[lane]
+            else:
+                self._credit[lane] = 0  # idle lanes don't bank credit
+        self._credit[waiter.lane] -= sum(self.weights[lane] for lane in shared)
+        if waiter.lane == JOB:
+            self._flows.move_to_end(waiter.flow)  # next scan's turn
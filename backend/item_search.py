@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+In-memory search over the Warframe Market item catalogue (/items).
+
+Prefix lookups use a flattened trie (sorted keys, bisected to the prefix's
+range) over item names, url_names and every word suffix of the name, so
+"vauban p" and "prime" both autocomplete. Typos fall back to trigram
+postings ranked by Dice similarity.
+"""
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+MIN_FUZZY_SCORE = 0.35
+RESULT_FIELDS = ('id', 'item_name', 'url_name', 'thumb')
+
+# Ranking of prefix matches (lower is better)
+EXACT, NAME_PREFIX, WORD_PREFIX = 0, 1, 2
+
+
+def normalize(text: str) -> str:
+    return ' '.join(str(text).lower().replace('_', ' ').split())
+
+
+def trigrams(text: str) -> set:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ItemSearchIndex:
+    """Immutable index over one catalogue snapshot"""
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.items = [{field: item.get(field) for field in RESULT_FIELDS} for item in items if item.get('item_name')]
+        self.built_at = time.time()
+        self._by_id = {item['id']: i for i, item in enumerate(self.items) if item.get('id')}
+        self._by_url_name = {item['url_name']: i for i, item in enumerate(self.items) if item.get('url_name')}
+        self._names = [normalize(item['item_name']) for item in self.items]
+        entries = []
+        postings: Dict[str, List[int]] = {}
+        self._trigram_counts = []
+        for i, name in enumerate(self._names):
+            words = name.split(' ')
+            entries.append((name, NAME_PREFIX, i))
+            url_name = normalize(self.items[i].get('url_name') or '')
+            if url_name and url_name != name:
+                entries.append((url_name, NAME_PREFIX, i))
+            for start in range(1, len(words)):
+                entries.append((' '.join(words[start:]), WORD_PREFIX, i))
+            grams = trigrams(name)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._entries = [(kind, i) for _, kind, i in entries]
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Exact lookup by item id or url_name"""
+        i = self._by_id.get(key)
+        if i is None:
+            i = self._by_url_name.get(key)
+        return self.items[i] if i is not None else None
+
+    def prefix(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        q = normalize(query)
+        if not q:
+            return []
+        lo = bisect.bisect_left(self._keys, q)
+        hi = bisect.bisect_left(self._keys, q + '￿', lo)
+        best: Dict[int, int] = {}
+        for pos in range(lo, hi):
+            kind, i = self._entries[pos]
+            if self._keys[pos] == q and kind == NAME_PREFIX:
+                kind = EXACT
+            if kind < best.get(i, WORD_PREFIX + 1):
+                best[i] = kind
+        ranked = sorted(best, key=lambda i: (best[i], len(self._names[i]), self._names[i]))
+        return [dict(self.items[i], score=1.0, match=('exact', 'prefix', 'word')[best[i]]) for i in ranked[:limit]]
+
+    def fuzzy(self, query: str, limit: int = 10, min_score: float = MIN_FUZZY_SCORE) -> List[Dict[str, Any]]:
+        """Typo-tolerant match: Dice coefficient over shared trigrams"""
+        q = normalize(query)
+        grams = trigrams(q) if q else set()
+        if not grams:
+            return []
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for i in self._postings.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        scored = []
+        for i, count in shared.items():
+            score = 2.0 * count / (len(grams) + self._trigram_counts[i])
+            if score >= min_score:
+                scored.append((-score, len(self._names[i]), self._names[i], i))
+        scored.sort()
+        return [dict(self.items[i], score=round(-neg, 3), match='fuzzy') for neg, _, _, i in scored[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Prefix matches first, topped up with fuzzy matches"""
+        results = self.prefix(query, limit)
+        if len(results) < limit:
+            seen = {r['id'] for r in results}
+            results.extend(r for r in self.fuzzy(query, limit) if r['id'] not in seen)
+        return results[:limit]
+
+
+class ItemCatalogue:
+    """
+    Lazily loaded, periodically refreshed ItemSearchIndex.
+    :param fetch: Callable() -> list of catalogue items, or None if the fetch failed
+    :param ttl: Seconds before the catalogue is refetched; stale data is served while one thread refreshes
+    """
+    def __init__(self, fetch: Callable[[], Optional[List[Dict[str, Any]]]], ttl: float = 3600.0):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.store = None
+        self._index: Optional[ItemSearchIndex] = None
+        self._refresh_lock = threading.Lock()
+
+    def attach_store(self, store):
+        """Share the catalogue through a store (cache_backend.CatalogueStore): reuse one another node fetched"""
+        self.store = store
+
+    def peek(self) -> Optional[ItemSearchIndex]:
+        """The loaded index, without triggering a fetch"""
+        return self._index
+
+    def load(self, items: List[Dict[str, Any]], fetched_at: Optional[float] = None) -> ItemSearchIndex:
+        index = ItemSearchIndex(items)
+        if fetched_at is not None:
+            index.built_at = fetched_at
+        self._index = index
+        return index
+
+    def get(self) -> Optional[ItemSearchIndex]:
+        index = self._index
+        if index is not None and time.time() - index.built_at < self.ttl:
+            return index
+        # Only the first caller waits for a cold load; others keep using the stale index
+        if not self._refresh_lock.acquire(blocking=index is None):
+            return index
+        try:
+            index = self._index
+            if index is None or time.time() - index.built_at >= self.ttl:
+                stored = self.store.get() if self.store is not None else None
+                if stored is not None and time.time() - stored[0] < self.ttl:
+                    index = self.load(stored[1], stored[0])
+                    print(f'[SEARCH] Indexed {len(index)} shared catalogue items')
+                    return index
+                items = self.fetch()
+                if items is not None:
+                    index = self.load(items)
+                    print(f'[SEARCH] Indexed {len(index)} catalogue items')
+                    if self.store is not None:
+                        self.store.put(items, index.built_at, self.ttl)
+            return index
+        finally:
+            self._refresh_lock.release()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Long-lived cache of /items/{url_name}/statistics summaries.
+
+Closed-trade statistics change slowly, so each item is fetched at most once
+per TTL, and only by a background refresher that uses spare rate-limit
+budget (scans never fetch statistics inline, which would double their
+request count). Summaries are stored as one array.array('d') column per
+field with a slot per item, which keeps them compact; the cross-item
+figures (daily volume, volume percentile) are recomputed in plain Python
+loops over those columns whenever new summaries arrive. That is cheap at a
+few thousand items and needs no numpy.
+"""
+import bisect
+import statistics
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional
+
+STATISTICS_TTL = 6 * 3600.0
+IDLE_SLEEP = 0.5
+RETRY_AFTER = 300.0  # seconds before a failed item is tried again
+# Summary columns kept per item
+COLUMNS = ('fetched_at', 'volume_48h', 'median_48h', 'volume_90d', 'median_90d', 'active_days')
+
+
+def weighted_median(values: List[float], weights: List[float]) -> Optional[float]:
+    pairs = sorted((v, w) for v, w in zip(values, weights) if w > 0)
+    if not pairs:
+        return statistics.median(values) if values else None
+    half = sum(w for _, w in pairs) / 2.0
+    running = 0.0
+    for value, weight in pairs:
+        running += weight
+        if running >= half:
+            return float(value)
+    return float(pairs[-1][0])
+
+
+def summarize_statistics(payload: Dict) -> Dict[str, float]:
+    """
+    Reduce a /statistics payload to volumes and volume-weighted median prices.
+    Mods report one row per rank; only unranked (rank 0) rows are used for them.
+    """
+    closed = (payload or {}).get('statistics_closed') or {}
+    summary = {}
+    for key, suffix in (('48hours', '48h'), ('90days', '90d')):
+        rows = [r for r in closed.get(key) or [] if not r.get('mod_rank')]
+        volumes = array('d', (float(r.get('volume') or 0) for r in rows))
+        medians = [float(r.get('median') if r.get('median') is not None else r.get('avg_price') or 0) for r in rows]
+        summary[f'volume_{suffix}'] = sum(volumes)
+        median = weighted_median(medians, volumes)
+        summary[f'median_{suffix}'] = median if median is not None else float('nan')
+        if suffix == '90d':
+            summary['active_days'] = float(sum(1 for v in volumes if v > 0))
+    return summary
+
+
+class ItemStatistics:
+    """
+    :param fetch: Callable(url_name) -> /statistics payload dict, or None if the fetch failed
+    :param items_provider: Callable() -> url_names to keep fresh (e.g. the watched Prime set), or None
+    :param try_acquire: Callable() -> True if a spare rate-limit slot was taken
+    :param ttl: Seconds a summary stays fresh
+    """
+    def __init__(self, fetch: Callable[[str], Optional[Dict]], items_provider: Callable[[], Optional[List[str]]],
+                 try_acquire: Callable[[], bool], ttl: float = STATISTICS_TTL):
+        self.fetch = fetch
+        self.items_provider = items_provider
+        self.try_acquire = try_acquire
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self._columns = {name: array('d') for name in COLUMNS}
+        self._daily_volume = array('d')
+        self._volume_percentile = array('d')
+        self._dirty = False
+        self._wanted: Dict[str, None] = {}  # url_names scans asked for, in request order
+        self._retry_at: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.fetches = 0
+        self.failures = 0
+
+    def put(self, url_name: str, summary: Dict[str, float], fetched_at: Optional[float] = None):
+        values = dict(summary, fetched_at=fetched_at if fetched_at is not None else time.time())
+        with self._lock:
+            slot = self._slots.get(url_name)
+            if slot is None:
+                slot = self._slots[url_name] = len(self._columns['fetched_at'])
+                for name in COLUMNS:
+                    self._columns[name].append(0.0)
+            for name in COLUMNS:
+                self._columns[name][slot] = float(values.get(name, 0.0))
+            self._wanted.pop(url_name, None)
+            self._retry_at.pop(url_name, None)
+            self._dirty = True
+
+    def _recompute(self):
+        """Daily volume and volume percentile for every item, one loop per column (caller holds the lock)"""
+        volume_48h = self._columns['volume_48h']
+        volume_90d = self._columns['volume_90d']
+        # Average of the last two days and the 90-day rate: reacts to demand shifts without trusting one spike
+        daily = array('d', (v48 / 4.0 + v90 / 180.0 for v48, v90 in zip(volume_48h, volume_90d)))
+        ordered = sorted(daily)
+        count = len(ordered)
+        self._daily_volume = daily
+        self._volume_percentile = array('d', (bisect.bisect_right(ordered, v) / count for v in daily)) if count else array('d')
+        self._dirty = False
+
+    def get(self, url_name: str, max_age: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Summary plus daily_volume and volume_percentile, or None if missing or older than max_age"""
+        with self._lock:
+            slot = self._slots.get(url_name)
+            if slot is None:
+                return None
+            if max_age is not None and time.time() - self._columns['fetched_at'][slot] > max_age:
+                return None
+            if self._dirty:
+                self._recompute()
+            result = {name: self._columns[name][slot] for name in COLUMNS}
+            result['daily_volume'] = self._daily_volume[slot]
+            result['volume_percentile'] = self._volume_percentile[slot]
+        return result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def want(self, url_names: Iterable[str]):
+        """Ask the refresher to fetch these items before the regular set (no-op for fresh ones)"""
+        now = time.time()
+        with self._lock:
+            for url_name in url_names:
+                slot = self._slots.get(url_name)
+                if url_name and (slot is None or now - self._columns['fetched_at'][slot] > self.ttl):
+                    self._wanted[url_name] = None
+
+    def due(self, limit: int = 50, tracked: Optional[List[str]] = None) -> List[str]:
+        """
+        Items to refresh next: requested ones first, then missing or stale tracked items
+        :param tracked: url_names to keep fresh (default: items_provider())
+        """
+        now = time.time()
+        with self._lock:
+            result = list(self._wanted)[:limit]
+        if len(result) < limit:
+            tracked = (self.items_provider() if tracked is None else tracked) or []
+            with self._lock:
+                fetched_at = self._columns['fetched_at']
+                stale = [(fetched_at[self._slots[u]] if u in self._slots else 0.0, u) for u in tracked
+                         if u not in self._wanted and self._retry_at.get(u, 0.0) <= now
+                         and (u not in self._slots or now - fetched_at[self._slots[u]] > self.ttl)]
+            result.extend(u for _, u in sorted(stale)[:limit - len(result)])
+        return result
+
+    def refresh(self, url_names: List[str]) -> int:
+        """Fetch as many of url_names as spare budget allows; returns the number fetched"""
+        fetched = 0
+        for url_name in url_names:
+            if self._stop.is_set() or not self.try_acquire():
+                break
+            try:
+                payload = self.fetch(url_name)
+            except Exception as e:
+                print(f'[STATISTICS] Error fetching {url_name}: {e}')
+                payload = None
+            self.fetches += 1
+            fetched += 1
+            if payload is None:
+                self.failures += 1
+                self.mark_failed(url_name)
+                continue
+            self.put(url_name, summarize_statistics(payload))
+        return fetched
+
+    def mark_failed(self, url_name: str):
+        """Drop a failed item from the requests and leave it alone for RETRY_AFTER seconds"""
+        with self._lock:
+            self._wanted.pop(url_name, None)
+            self._retry_at[url_name] = time.time() + RETRY_AFTER
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='item-statistics', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        print('[STATISTICS] Statistics refresher started')
+        while not self._stop.is_set():
+            try:
+                batch = self.due()
+                if not batch or not self.refresh(batch):
+                    self._stop.wait(IDLE_SLEEP if batch else 30.0)
+            except Exception as e:
+                print(f'[STATISTICS] Error: {e}')
+                self._stop.wait(1.0)
+        print('[STATISTICS] Statistics refresher stopped')
+
+    def status(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            ages = [now - t for t in self._columns['fetched_at']]
+            wanted = len(self._wanted)
+        return {
+            'running': self.running,
+            'items': len(ages),
+            'fresh': sum(1 for age in ages if age <= self.ttl),
+            'pending_requests': wanted,
+            'fetches': self.fetches,
+            'failures': self.failures,
+        }
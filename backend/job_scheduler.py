@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Admission control for trading jobs.
+
+Each running trading job has its own worker and fetch threads and draws on
+the shared upstream budget, so running many at once only makes all of them
+slower. The JobScheduler runs at most max_running jobs, queues up to
+max_queued more in FIFO order, and rejects the rest with QueueFull (the
+proxy answers 503 with Retry-After). Queued jobs report their position and
+an ETA, estimated from the items ahead of them and the seconds per item
+recent jobs took. Only jobs that ran to completion and fetched upstream
+feed that estimate; failed, cancelled and fully cached runs would skew it.
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+DEFAULT_SECONDS_PER_ITEM = 0.25  # until a job has finished; roughly the upstream rate limit
+EWMA_WEIGHT = 0.3
+
+
+class QueueFull(Exception):
+    """The scheduler is at capacity; retry after retry_after seconds"""
+    def __init__(self, retry_after: float):
+        super().__init__(f'trading job queue is full (retry in {retry_after:.0f}s)')
+        self.retry_after = retry_after
+
+
+class _Entry:
+    __slots__ = ('job_id', 'run', 'items', 'progress', 'on_error', 'submitted_at', 'started_at')
+
+    def __init__(self, job_id, run, items, progress, on_error):
+        self.job_id = job_id
+        self.run = run
+        self.items = items
+        self.progress = progress
+        self.on_error = on_error
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+
+
+class JobScheduler:
+    """
+    :param max_running: Jobs running at once
+    :param max_queued: Jobs waiting for a slot; further submissions raise QueueFull
+    """
+    def __init__(self, max_running: int = 2, max_queued: int = 8):
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self.seconds_per_item = DEFAULT_SECONDS_PER_ITEM
+        self._running: Dict[str, _Entry] = {}
+        self._queue: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: str, run: Callable[[], Optional[int]], items: int,
+               progress: Optional[Callable[[], int]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None) -> int:
+        """
+        Run run() on its own thread now or once a slot frees up.
+        :param run: Returns the number of items it fetched upstream if it completed, None if it stopped early
+        :param items: Size of the job, for ETAs
+        :param progress: Optional callable returning items done so far, for ETAs of running jobs
+        :param on_error: Called with the exception if run() raises
+        :return: Queue position (0 = started immediately)
+        :raises QueueFull: if max_running jobs run and max_queued wait
+        """
+        entry = _Entry(job_id, run, items, progress, on_error)
+        with self._lock:
+            if len(self._running) < self.max_running:
+                self._start(entry)
+                return 0
+            if len(self._queue) >= self.max_queued:
+                raise QueueFull(self._retry_after())
+            self._queue[job_id] = entry
+            return len(self._queue)
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a queued job; returns False if it is not queued (running jobs stop via their own flag)"""
+        with self._lock:
+            return self._queue.pop(job_id, None) is not None
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based queue position, or None if the job is not queued"""
+        with self._lock:
+            for index, queued in enumerate(self._queue):
+                if queued == job_id:
+                    return index + 1
+        return None
+
+    def eta(self, job_id: str) -> Optional[float]:
+        """Estimated seconds until a queued job starts, or until a running job finishes"""
+        with self._lock:
+            if job_id in self._running:
+                return round(self._remaining(self._running[job_id]), 1)
+            if job_id not in self._queue:
+                return None
+            slots = self._slot_free_times()
+            for queued_id, entry in self._queue.items():
+                free_at = heapq.heappop(slots)
+                if queued_id == job_id:
+                    return round(free_at, 1)
+                heapq.heappush(slots, free_at + entry.items * self.seconds_per_item)
+        return None
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'running': len(self._running),
+                'queued': len(self._queue),
+                'max_running': self.max_running,
+                'max_queued': self.max_queued,
+                'seconds_per_item': round(self.seconds_per_item, 4),
+            }
+
+    def _start(self, entry: _Entry):
+        # Caller holds the lock
+        entry.started_at = time.monotonic()
+        self._running[entry.job_id] = entry
+        threading.Thread(target=self._run, args=(entry,), daemon=True).start()
+
+    def _run(self, entry: _Entry):
+        fetched = None
+        try:
+            fetched = entry.run()
+        except Exception as e:
+            print(f'[SCHEDULER] Job {entry.job_id} failed: {e}')
+            if entry.on_error is not None:
+                try:
+                    entry.on_error(e)
+                except Exception as handler_error:
+                    print(f'[SCHEDULER] Error handler of job {entry.job_id} failed: {handler_error}')
+        finally:
+            self._finished(entry, fetched)
+
+    def _finished(self, entry: _Entry, fetched: Optional[int]):
+        elapsed = time.monotonic() - entry.started_at
+        with self._lock:
+            self._running.pop(entry.job_id, None)
+            done = entry.progress() if entry.progress is not None else entry.items
+            if fetched and done > 0:
+                self.seconds_per_item += EWMA_WEIGHT * (elapsed / done - self.seconds_per_item)
+            while self._queue and len(self._running) < self.max_running:
+                _, queued = self._queue.popitem(last=False)
+                self._start(queued)
+
+    def _remaining(self, entry: _Entry) -> float:
+        done = entry.progress() if entry.progress is not None else 0
+        return max(0.0, (entry.items - done) * self.seconds_per_item)
+
+    def _slot_free_times(self):
+        # Caller holds the lock; seconds from now until each running slot frees up
+        slots = [self._remaining(entry) for entry in self._running.values()]
+        slots += [0.0] * (self.max_running - len(slots))
+        heapq.heapify(slots)
+        return slots
+
+    def _retry_after(self) -> float:
+        # Caller holds the lock; when the queue head starts, a place in the queue frees up
+        return max(1.0, min(self._slot_free_times()))
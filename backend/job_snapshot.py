@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Fetched inputs of a trading job, kept so the job can be re-analyzed.
+
+Changing min_profit, max_investment or max_order_age does not need new
+order books, so each job keeps the in-game orders it fetched as compact
+OrderRecords. Re-analysis (one parameter set or a sweep of many) then runs
+over this snapshot without touching the upstream API.
+"""
+import itertools
+import threading
+from typing import Any, Dict, List
+
+from backend.order_record import OrderRecord
+
+PARAMS = ('min_profit', 'max_investment', 'max_order_age')
+MAX_SWEEP = 200
+ITEM_FIELDS = ('id', 'item_name', 'url_name')
+
+
+def parse_params(data: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analysis parameters from a request, falling back to defaults.
+    :raises ValueError: if a parameter is not a non-negative number
+    """
+    params = {}
+    for name in PARAMS:
+        value = data.get(name, defaults.get(name))
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f'{name} must be a non-negative number')
+        params[name] = value
+    return params
+
+
+def expand_sweep(sweep) -> List[Dict[str, Any]]:
+    """
+    A list of parameter dicts, or a grid ({"min_profit": [5, 10], "max_order_age": [7, 30]})
+    expanded to every combination.
+    :raises ValueError: for other shapes or more than MAX_SWEEP sets
+    """
+    if isinstance(sweep, dict):
+        grid = {name: values if isinstance(values, list) else [values] for name, values in sweep.items()}
+        unknown = set(grid) - set(PARAMS)
+        if unknown:
+            raise ValueError(f'Unknown sweep parameters: {sorted(unknown)}')
+        names = list(grid)
+        sets = [dict(zip(names, combination)) for combination in itertools.product(*(grid[n] for n in names))]
+    elif isinstance(sweep, list) and all(isinstance(entry, dict) for entry in sweep):
+        sets = sweep
+    else:
+        raise ValueError('sweep must be a list of parameter objects or an object of parameter lists')
+    if not sets or len(sets) > MAX_SWEEP:
+        raise ValueError(f'sweep must contain between 1 and {MAX_SWEEP} parameter sets')
+    return sets
+
+
+class JobSnapshot:
+    """Items of a trading job and the order records fetched for them so far"""
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.items = [{field: item.get(field) for field in ITEM_FIELDS} for item in items]
+        self.orders: Dict[str, List[OrderRecord]] = {}  # item id -> in-game order records
+        self._lock = threading.Lock()
+
+    def add(self, item_id: str, orders: List) -> List[OrderRecord]:
+        """Store orders (dicts or records) for item_id as records and return them"""
+        compact = [OrderRecord.from_order(o) for o in orders]
+        with self._lock:
+            self.orders[item_id] = compact
+        return compact
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.orders)
+
+    def analyze(self, calc, max_order_age) -> List[Dict[str, Any]]:
+        """Run calc over every item fetched so far"""
+        with self._lock:
+            orders = dict(self.orders)
+        fetched = [item for item in self.items if str(item.get('id') or '') in orders]
+        return calc.analyze_prime_items(fetched, orders, max_order_age=max_order_age)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Upstream HTTP client for the Warframe Market API used by trading scans.
+
+Keeps a small pool of keep-alive connections and reports how long each
+request spent connecting (TCP + TLS), waiting for the first byte and
+reading the body, so scan profiles can tell network time apart from
+rate limiting and CPU work. Connects and reads are bounded by timeouts and
+by the caller's Deadline, whose cancellation aborts the request mid-flight.
+"""
+import http.client
+import os
+import ssl
+import threading
+import time
+from urllib.parse import urlparse
+from typing import Dict, Optional, List
+
+from backend import deadline as deadlines
+from backend import metrics
+from backend.cassette import Cassette, RECORD, REPLAY
+from backend.deadline import Cancelled, Deadline, DeadlineExceeded, shutdown_socket
+
+# Point at a local stub (see benchmarks/market_stub.py) by setting WARFRAME_MARKET_API_URL
+API_BASE_URL = os.environ.get('WARFRAME_MARKET_API_URL', 'https://api.warframe.market/v1').rstrip('/')
+DEFAULT_HEADERS = {
+    'User-Agent': 'Warframe-Market-Proxy/1.0',
+    'Platform': 'pc',
+    'accept': 'application/json',
+}
+MAX_IDLE_CONNECTIONS = 10
+
+
+class MarketResponse:
+    """Status, headers and body of a completed upstream request"""
+    __slots__ = ('status', 'headers', 'body', 'url')
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, url: str):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.url = url
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Case-insensitive response header lookup"""
+        lowered = name.lower()
+        for key, value in self.headers.items():
+            if key.lower() == lowered:
+                return value
+        return default
+
+
+class MarketClient:
+    """
+    :param base_url: API root, e.g. https://api.warframe.market/v1
+    :param timeout: Socket timeout in seconds for both connects and reads (overrides the two below)
+    :param cassette: Optional Cassette; in record mode every response is archived,
+                     in replay mode responses come from the archive and no request is sent
+    :param connect_timeout: Seconds to establish a connection (TCP + TLS)
+    :param read_timeout: Seconds any single socket read may block
+    """
+    def __init__(self, base_url: str = API_BASE_URL, timeout: Optional[float] = None, cassette: Optional[Cassette] = None,
+                 connect_timeout: float = deadlines.CONNECT_TIMEOUT, read_timeout: float = deadlines.READ_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = timeout if timeout is not None else connect_timeout
+        self.read_timeout = timeout if timeout is not None else read_timeout
+        self.cassette = cassette
+        parsed = urlparse(self.base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self._idle: List[http.client.HTTPConnection] = []
+        self._idle_lock = threading.Lock()
+        # Same relaxed verification the rest of the proxy uses
+        self._ssl_context = ssl.create_default_context()
+        self._ssl_context.check_hostname = False
+        self._ssl_context.verify_mode = ssl.CERT_NONE
+
+    def url_for(self, path: str) -> str:
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return self.base_url + (path if path.startswith('/') else '/' + path)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        # The timeout set here applies to connect(); get() switches the socket to the read timeout afterwards
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.connect_timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._new_connection()
+
+    def _release(self, conn: http.client.HTTPConnection, reusable: bool):
+        if reusable:
+            with self._idle_lock:
+                if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                    self._idle.append(conn)
+                    return
+        conn.close()
+
+    def close(self):
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def get(self, path: str, headers: Optional[Dict[str, str]] = None, timings: Optional[Dict[str, float]] = None,
+            deadline: Optional[Deadline] = None) -> MarketResponse:
+        """
+        Perform a GET request against the API.
+        :param path: Path relative to the API base (e.g. '/items') or an absolute URL
+        :param headers: Extra request headers
+        :param timings: Optional dict filled with 'connect', 'ttfb' and 'body_read' seconds
+        :param deadline: Bounds the whole request (default: the thread's deadline.current())
+        :return: MarketResponse (non-2xx statuses are returned, not raised)
+        :raises Cancelled: if the deadline is cancelled, even mid-request
+        :raises DeadlineExceeded: if the deadline passes; socket.timeout (TimeoutError) on a connect/read timeout
+        """
+        url = self.url_for(path)
+        parsed = urlparse(url)
+        target = parsed.path + ('?' + parsed.query if parsed.query else '')
+        request_headers = dict(DEFAULT_HEADERS)
+        if headers:
+            request_headers.update(headers)
+        timings = timings if timings is not None else {}
+        # Cassette keys are relative to the API root so recordings work against any host
+        base_path = urlparse(self.base_url).path
+        key = Cassette.key_for('GET', target[len(base_path):] if target.startswith(base_path) else target)
+        if self.cassette is not None and self.cassette.mode == REPLAY:
+            entry = self.cassette.replay(key, timings)
+            return MarketResponse(entry.status, entry.headers, entry.body, url)
+        deadline = deadline or deadlines.current()
+        deadline.check()
+        start = time.perf_counter()
+        status = 'error'
+        conn = self._acquire()
+        try:
+            # Cancelling the deadline shuts the socket down, which unblocks connect/read in this thread
+            with deadline.abort_with(lambda: shutdown_socket(conn.sock)):
+                for attempt in range(2):
+                    connect_start = time.perf_counter()
+                    fresh = conn.sock is None
+                    if fresh:
+                        conn.timeout = deadline.timeout(self.connect_timeout)
+                        conn.connect()
+                    conn.sock.settimeout(deadline.timeout(self.read_timeout))
+                    timings['connect'] = time.perf_counter() - connect_start if fresh else 0.0
+                    sent = time.perf_counter()
+                    try:
+                        conn.request('GET', target, headers=request_headers)
+                        response = conn.getresponse()
+                        break
+                    except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                        # A pooled keep-alive connection was closed by the server; retry once on a new one
+                        conn.close()
+                        if fresh or attempt or deadline.cancelled:
+                            raise
+                        conn = self._new_connection()
+                timings['ttfb'] = time.perf_counter() - sent
+                read_start = time.perf_counter()
+                body = response.read()
+                timings['body_read'] = time.perf_counter() - read_start
+            deadline.check()  # a cancelled read can end early instead of raising
+            status = response.status
+            self._release(conn, not response.will_close)
+            response_headers = dict(response.getheaders())
+            if self.cassette is not None and self.cassette.mode == RECORD:
+                self.cassette.record(key, response.status, response_headers, body, timings)
+            return MarketResponse(response.status, response_headers, body, url)
+        except Exception as e:
+            conn.close()
+            if deadline.cancelled:
+                status = 'cancelled'
+                if isinstance(e, Cancelled):
+                    raise
+                raise Cancelled() from e
+            if isinstance(e, TimeoutError):
+                status = 'timeout'
+                if deadline.expired() and not isinstance(e, DeadlineExceeded):
+                    raise DeadlineExceeded('deadline exceeded') from e
+            raise
+        finally:
+            metrics.observe_upstream(url, status, time.perf_counter() - start)
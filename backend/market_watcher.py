@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Background market watcher.
+
+Cycles through the Prime item set and keeps the shared order-book cache
+warm, so trading jobs can be answered from a recent snapshot instead of
+hundreds of upstream calls. It only fetches when the rate limiter has
+spare budget, and each item's refresh interval adapts: books that keep
+changing (or carry many orders) are revisited sooner, quiet ones back off.
+"""
+import heapq
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.order_book_cache import OrderBookCache
+
+MIN_INTERVAL = 60.0
+MAX_INTERVAL = 1800.0
+HIGH_VOLUME_ORDERS = 100
+ITEM_SET_REFRESH = 3600.0
+IDLE_SLEEP = 0.1
+
+
+def book_signature(orders: List[Dict]) -> tuple:
+    """Best ask, best bid and order count: what makes a book 'changed' for scheduling"""
+    sells = [o.get('platinum') for o in orders if o.get('order_type') == 'sell' and o.get('platinum') is not None]
+    buys = [o.get('platinum') for o in orders if o.get('order_type') == 'buy' and o.get('platinum') is not None]
+    return (min(sells) if sells else None, max(buys) if buys else None, len(orders))
+
+
+class _WatchState:
+    __slots__ = ('url_name', 'interval', 'next_due', 'signature', 'fetches', 'changes')
+
+    def __init__(self, url_name: str, interval: float, next_due: float):
+        self.url_name = url_name
+        self.interval = interval
+        self.next_due = next_due
+        self.signature = None
+        self.fetches = 0
+        self.changes = 0
+
+
+class MarketWatcher:
+    """
+    :param cache: Shared OrderBookCache the watcher writes into
+    :param fetch: Callable(url_name) -> orders or None; must not wait on the rate limiter itself
+    :param items_provider: Callable() -> url_names to watch (re-read every ITEM_SET_REFRESH seconds)
+    :param try_acquire: Callable() -> True if a spare rate-limit slot was taken
+    """
+    def __init__(self, cache: OrderBookCache, fetch: Callable[[str], Optional[List[Dict]]],
+                 items_provider: Callable[[], Optional[List[str]]], try_acquire: Callable[[], bool],
+                 min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL):
+        self.cache = cache
+        self.fetch = fetch
+        self.items_provider = items_provider
+        self.try_acquire = try_acquire
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._states: Dict[str, _WatchState] = {}
+        self._heap: List[tuple] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._items_loaded_at = 0.0
+        self.fetches = 0
+        self.failures = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='market-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_items(self, url_names: List[str]):
+        """Track exactly these items; new ones are due immediately"""
+        now = time.time()
+        with self._lock:
+            wanted = set(url_names)
+            for url_name in list(self._states):
+                if url_name not in wanted:
+                    del self._states[url_name]
+            for url_name in url_names:
+                if url_name not in self._states:
+                    # Items already in the cache (e.g. from a scan) are due when they go stale
+                    age = self.cache.age(url_name)
+                    due = now if age is None else now + max(0.0, self.min_interval - age)
+                    self._states[url_name] = _WatchState(url_name, self.min_interval, due)
+            self._heap = [(state.next_due, url_name) for url_name, state in self._states.items()]
+            heapq.heapify(self._heap)
+        self._items_loaded_at = now
+
+    def _next_due(self) -> Optional[_WatchState]:
+        """Pop the most overdue item if it is due now"""
+        with self._lock:
+            while self._heap:
+                due, url_name = self._heap[0]
+                state = self._states.get(url_name)
+                if state is None or state.next_due != due:
+                    heapq.heappop(self._heap)  # removed or rescheduled
+                    continue
+                if due > time.time():
+                    return None
+                heapq.heappop(self._heap)
+                return state
+        return None
+
+    def _reschedule(self, state: _WatchState, orders: Optional[List[Dict]]):
+        if orders is None:
+            interval = state.interval  # retry on the current cadence
+        else:
+            signature = book_signature(orders)
+            changed = state.signature is not None and signature != state.signature
+            state.changes += changed
+            state.signature = signature
+            interval = state.interval * (0.5 if changed else 1.5)
+            if signature[2] >= HIGH_VOLUME_ORDERS:
+                interval = min(interval, self.max_interval / 4)
+            state.interval = min(self.max_interval, max(self.min_interval, interval))
+        state.next_due = time.time() + state.interval
+        with self._lock:
+            if state.url_name in self._states:
+                heapq.heappush(self._heap, (state.next_due, state.url_name))
+
+    def refresh_one(self) -> bool:
+        """Fetch the most overdue item if budget allows; returns True if a fetch was made"""
+        state = self._next_due()
+        if state is None:
+            return False
+        if not self.try_acquire():
+            with self._lock:
+                heapq.heappush(self._heap, (state.next_due, state.url_name))
+            return False
+        try:
+            orders = self.fetch(state.url_name)
+        except Exception as e:
+            print(f'[WATCHER] Error fetching {state.url_name}: {e}')
+            orders = None
+        self.fetches += 1
+        state.fetches += 1
+        if orders is None:
+            self.failures += 1
+        else:
+            self.cache.put(state.url_name, orders)
+        self._reschedule(state, orders)
+        return True
+
+    def _run(self):
+        print('[WATCHER] Market watcher started')
+        while not self._stop.is_set():
+            try:
+                if time.time() - self._items_loaded_at >= ITEM_SET_REFRESH or not self._states:
+                    url_names = self.items_provider()
+                    if url_names:
+                        self.set_items(url_names)
+                    elif not self._states:
+                        self._stop.wait(5.0)
+                        continue
+                if not self.refresh_one():
+                    self._stop.wait(IDLE_SLEEP)
+            except Exception as e:
+                print(f'[WATCHER] Error: {e}')
+                self._stop.wait(1.0)
+        print('[WATCHER] Market watcher stopped')
+
+    def status(self) -> Dict:
+        with self._lock:
+            states = list(self._states.values())
+        ages = [age for age in (self.cache.age(s.url_name) for s in states) if age is not None]
+        intervals = [s.interval for s in states]
+        return {
+            'running': self.running,
+            'tracked': len(states),
+            'cached': len(ages),
+            'fresh': sum(1 for age in ages if age <= self.cache.ttl),
+            'median_age_seconds': round(statistics.median(ages), 1) if ages else None,
+            'max_age_seconds': round(max(ages), 1) if ages else None,
+            'median_interval_seconds': round(statistics.median(intervals), 1) if intervals else None,
+            'fetches': self.fetches,
+            'failures': self.failures,
+        }
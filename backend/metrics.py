@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Metrics registry for the proxy server, exposed in Prometheus text format.
+
+Recording is cheap: every metric child keeps its values in a small set of
+stripes, each with its own lock, and a thread only ever touches the stripe
+picked by its thread id. Reads (scrapes) sum the stripes.
+"""
+import bisect
+import contextlib
+import threading
+import time
+import urllib.error
+from urllib.parse import urlparse
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend import deadline
+
+STRIPES = 16
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+JOB_DURATION_BUCKETS = (5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0)
+
+
+def _stripe_index() -> int:
+    return threading.get_ident() % STRIPES
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape_label_value(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ('_values', '_locks')
+
+    def __init__(self):
+        self._values = [0.0] * STRIPES
+        self._locks = [threading.Lock() for _ in range(STRIPES)]
+
+    def inc(self, amount: float = 1.0):
+        i = _stripe_index()
+        with self._locks[i]:
+            self._values[i] += amount
+
+    def get(self) -> float:
+        return sum(self._values)
+
+
+class _GaugeChild:
+    __slots__ = ('_value', '_lock', '_function')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function = None
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the gauge value at scrape time instead of storing it"""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return float('nan')
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ('_upper_bounds', '_counts', '_sums', '_locks')
+
+    def __init__(self, buckets: Sequence[float]):
+        self._upper_bounds = list(buckets)
+        self._counts = [[0] * (len(buckets) + 1) for _ in range(STRIPES)]
+        self._sums = [0.0] * STRIPES
+        self._locks = [threading.Lock() for _ in range(STRIPES)]
+
+    def observe(self, value: float):
+        bucket = bisect.bisect_left(self._upper_bounds, value)
+        i = _stripe_index()
+        with self._locks[i]:
+            self._counts[i][bucket] += 1
+            self._sums[i] += value
+
+    def get(self) -> Tuple[List[int], float, int]:
+        """Return (cumulative bucket counts, sum, count)"""
+        totals = [0] * (len(self._upper_bounds) + 1)
+        for stripe in self._counts:
+            for idx, count in enumerate(stripe):
+                totals[idx] += count
+        cumulative = []
+        running = 0
+        for count in totals:
+            running += count
+            cumulative.append(running)
+        return cumulative, sum(self._sums), running
+
+
+class _Metric:
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._get_child(())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _get_child(self, key: Tuple[str, ...]):
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def labels(self, *values):
+        """Return the child metric for the given label values"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {values}')
+        return self._get_child(tuple(str(v) for v in values))
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def get(self) -> float:
+        return self._default.get()
+
+    def _samples(self):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}'
+                for key, child in sorted(self._children.items())]
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+    def get(self) -> float:
+        return self._default.get()
+
+    def _samples(self):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}'
+                for key, child in sorted(self._children.items())]
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def get(self):
+        return self._default.get()
+
+    def _samples(self):
+        lines = []
+        bounds = [_format_value(b) for b in self.buckets] + ['+Inf']
+        for key, child in sorted(self._children.items()):
+            cumulative, total, count = child.get()
+            for bound, bucket_count in zip(bounds, cumulative):
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", bound))} {bucket_count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every registered metric and renders them for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(m.render() for m in metrics) + '\n'
+
+
+# Global registry used by the proxy server
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'proxy_http_requests_total', 'HTTP requests handled by the proxy', ('method', 'route', 'status'))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'proxy_http_request_duration_seconds', 'Time spent handling proxy HTTP requests', ('method', 'route'))
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'proxy_upstream_requests_total', 'Requests sent to the Warframe Market API', ('family', 'status'))
+UPSTREAM_DURATION = REGISTRY.histogram(
+    'proxy_upstream_request_duration_seconds', 'Warframe Market API response latency', ('family',))
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    'proxy_rate_limiter_wait_seconds', 'Time spent waiting for a rate limiter slot')
+RATE_LIMIT_LANE_WAIT = REGISTRY.histogram(
+    'proxy_rate_limiter_lane_wait_seconds', 'Time spent waiting for a rate limiter slot per fair-share lane',
+    ('lane',))
+RATE_LIMIT_QUEUE_DEPTH = REGISTRY.gauge(
+    'proxy_rate_limiter_queue_depth', 'Requests currently waiting for a rate limiter slot')
+RATE_LIMITED = REGISTRY.counter(
+    'proxy_rate_limited_total', 'Times the upstream API reported rate limiting (HTTP 429)')
+TRADING_JOB_DURATION = REGISTRY.histogram(
+    'proxy_trading_job_duration_seconds', 'Wall time of trading analysis jobs', ('status',), JOB_DURATION_BUCKETS)
+TRADING_JOB_ITEMS = REGISTRY.counter(
+    'proxy_trading_job_items_total', 'Items processed by trading analysis jobs')
+TRADING_JOB_ITEMS_PER_SECOND = REGISTRY.gauge(
+    'proxy_trading_job_items_per_second', 'Throughput of the most recently finished trading job')
+ACTIVE_THREADS = REGISTRY.gauge(
+    'proxy_active_threads', 'Threads alive in the proxy process')
+ACTIVE_THREADS.set_function(threading.active_count)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    'proxy_upstream_retries_total', 'Upstream requests retried after a transient failure', ('family',))
+CIRCUIT_STATE = REGISTRY.gauge(
+    'proxy_upstream_circuit_state', 'Circuit breaker state per endpoint family (0 closed, 1 half-open, 2 open)',
+    ('family',))
+CIRCUIT_REJECTED = REGISTRY.counter(
+    'proxy_upstream_circuit_rejected_total', 'Upstream calls failed fast by an open circuit', ('family',))
+CACHE_LOOKUPS = REGISTRY.counter(
+    'proxy_cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result'))
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    'proxy_cache_hit_ratio', 'Fraction of cache lookups that were hits', ('cache',))
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache lookup; the hit ratio gauge for the cache is derived at scrape time"""
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+    ratio = CACHE_HIT_RATIO.labels(cache)
+    if ratio._function is None:
+        hits = CACHE_LOOKUPS.labels(cache, 'hit')
+        misses = CACHE_LOOKUPS.labels(cache, 'miss')
+
+        def compute():
+            total = hits.get() + misses.get()
+            return hits.get() / total if total else 0.0
+        ratio.set_function(compute)
+
+
+def upstream_family(url) -> str:
+    """Collapse an upstream URL into a low-cardinality endpoint family label"""
+    path = urlparse(str(url)).path
+    if path.startswith('/v1'):
+        path = path[3:]
+    parts = [p for p in path.split('/') if p]
+    if not parts:
+        return 'other'
+    if parts[0] == 'items':
+        if len(parts) == 1:
+            return 'items'
+        if parts[1] == 'search':
+            return 'item_search'
+        if len(parts) >= 3 and parts[2] in ('orders', 'statistics'):
+            return f'item_{parts[2]}'
+        return 'item'
+    if parts[0] == 'profile':
+        return 'profile_orders' if 'orders' in parts else 'profile'
+    if parts[0] == 'auth':
+        return 'auth'
+    return 'other'
+
+
+def observe_upstream(url, status, seconds: float):
+    """Record one upstream call's latency and status"""
+    family = upstream_family(url)
+    UPSTREAM_REQUESTS.labels(family, status).inc()
+    UPSTREAM_DURATION.labels(family).observe(seconds)
+
+
+@contextlib.contextmanager
+def timed_urlopen(req, **kwargs):
+    """
+    deadline.urlopen wrapper that records upstream latency and status: the call connects within
+    CONNECT_TIMEOUT and reads within READ_TIMEOUT (or timeout=), capped at the thread's deadline,
+    and is aborted if that deadline is cancelled.
+    """
+    url = getattr(req, 'full_url', req)
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        with deadline.urlopen(req, **kwargs) as response:
+            status = getattr(response, 'status', 'error')
+            yield response
+    except urllib.error.HTTPError as e:
+        status = e.code
+        raise
+    except deadline.Cancelled:
+        status = 'cancelled'
+        raise
+    except TimeoutError:
+        status = 'timeout'
+        raise
+    finally:
+        observe_upstream(url, status, time.perf_counter() - start)
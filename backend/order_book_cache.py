@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Shared order-book cache for scans.
+
+Order books are cached per item url_name for a short TTL. Concurrent
+requests for the same book are coalesced: the first caller fetches, the
+others wait for its result, so overlapping scans never send duplicate
+upstream requests. With a SnapshotStore attached, every book put into the
+cache is persisted and books missing from memory are read back from disk.
+Listeners (e.g. PriceHistory.record_book) see every freshly fetched book.
+Books that arrive already encoded (put_record) stay encoded until read.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from backend import metrics
+from backend.snapshot_store import decode_orders
+
+
+class _InFlight:
+    __slots__ = ('event', 'orders')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.orders = None
+
+
+class OrderBookCache:
+    """
+    :param fetch: Callable(url_name) -> list of orders, or None if the fetch failed
+    :param ttl: Seconds a fetched book stays fresh
+    :param max_entries: Least recently fetched books are evicted beyond this size
+    """
+    def __init__(self, fetch: Callable[[str], Optional[List[Dict]]], ttl: float = 120.0, max_entries: int = 5000,
+                 store=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store = store
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # url_name -> (fetched_at, orders or record)
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._listeners: List[Callable[[str, List[Dict], float], None]] = []
+
+    def add_listener(self, listener: Callable[[str, List[Dict], float], None]):
+        """Call listener(url_name, orders, fetched_at) for every new book (not for ones reloaded from the store)"""
+        self._listeners.append(listener)
+
+    def attach_store(self, store):
+        """Persist books to (and warm-start from) a SnapshotStore"""
+        self.store = store
+
+    def _decoded(self, url_name: str, entry: Optional[tuple]) -> Optional[tuple]:
+        """entry with a put_record book decoded, replacing the cached record if it is still current"""
+        if entry is None or not isinstance(entry[1], bytes):
+            return entry
+        decoded = entry[0], decode_orders(entry[1], 0)[2]
+        with self._lock:
+            if self._entries.get(url_name) is entry:
+                self._entries[url_name] = decoded
+        return decoded
+
+    def _entry(self, url_name: str, max_age: Optional[float] = None) -> Optional[tuple]:
+        """
+        (fetched_at, orders) from memory, falling back to the snapshot store when the book is missing
+        or older than max_age (a store shared between processes may hold a newer one)
+        """
+        with self._lock:
+            entry = self._entries.get(url_name)
+        entry = self._decoded(url_name, entry)
+        stale = entry is None or (max_age is not None and time.time() - entry[0] > max_age)
+        if stale and self.store is not None:
+            stored_at = self.store.fetched_at(url_name)
+            if stored_at is not None and (entry is None or stored_at > entry[0]):
+                stored = self.store.get(url_name)
+                if stored is not None:
+                    entry = stored
+                    self.put(url_name, stored[1], stored[0], persist=False)
+        return entry
+
+    def peek(self, url_name: str, max_age: Optional[float] = None) -> Optional[List[Dict]]:
+        """Return a cached book no older than max_age (default: the TTL) without fetching"""
+        max_age = self.ttl if max_age is None else max_age
+        entry = self._entry(url_name, max_age)
+        if entry and time.time() - entry[0] <= max_age:
+            return entry[1]
+        return None
+
+    def get(self, url_name: str, max_age: Optional[float] = None) -> Optional[List[Dict]]:
+        """Return a fresh book for url_name, fetching it (once, across threads) if needed"""
+        max_age = self.ttl if max_age is None else max_age
+        entry = self._entry(url_name, max_age)
+        with self._lock:
+            if entry and time.time() - entry[0] <= max_age:
+                metrics.record_cache_lookup('order_book', True)
+                return entry[1]
+            metrics.record_cache_lookup('order_book', False)
+            flight = self._in_flight.get(url_name)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[url_name] = _InFlight()
+        if not leader:
+            flight.event.wait()
+            return flight.orders
+        try:
+            flight.orders = self.fetch(url_name)
+            if flight.orders is not None:
+                self.put(url_name, flight.orders)
+        finally:
+            with self._lock:
+                self._in_flight.pop(url_name, None)
+            flight.event.set()
+        return flight.orders
+
+    def put(self, url_name: str, orders: List[Dict], fetched_at: Optional[float] = None, persist: bool = True):
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        with self._lock:
+            self._entries[url_name] = (fetched_at, orders)
+            self._entries.move_to_end(url_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if not persist:
+            return
+        if self.store is not None:
+            try:
+                self.store.put(url_name, orders, fetched_at)
+            except Exception as e:
+                print(f'[SNAPSHOT] Failed to persist {url_name}: {e}')
+        for listener in self._listeners:
+            try:
+                listener(url_name, orders, fetched_at)
+            except Exception as e:
+                print(f'[CACHE] Listener failed for {url_name}: {e}')
+
+    def put_record(self, url_name: str, record: bytes, fetched_at: float):
+        """
+        Cache and persist a book already built by snapshot_store.encode_orders without decoding it;
+        it is decoded on first read. Listeners are not called: the caller records what they would
+        have derived from the orders (e.g. a PriceHistory sample computed where the book was parsed).
+        """
+        with self._lock:
+            self._entries[url_name] = (fetched_at, record)
+            self._entries.move_to_end(url_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.store is not None:
+            try:
+                self.store.put_record(url_name, record, fetched_at)
+            except Exception as e:
+                print(f'[SNAPSHOT] Failed to persist {url_name}: {e}')
+
+    def renew(self, url_name: str, fetched_at: float) -> Optional[tuple]:
+        """
+        Re-put the book cached at fetched_at as fetched now (upstream returned it unchanged).
+        Returns the new (fetched_at, orders), or None if the book has since been replaced or evicted.
+        """
+        with self._lock:
+            entry = self._entries.get(url_name)
+        if entry is None or entry[0] != fetched_at:
+            return None
+        entry = self._decoded(url_name, entry)
+        now = time.time()
+        self.put(url_name, entry[1], now)
+        return now, entry[1]
+
+    def age(self, url_name: str) -> Optional[float]:
+        """Seconds since url_name was fetched, or None if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(url_name)
+        fetched_at = entry[0] if entry else (self.store.fetched_at(url_name) if self.store is not None else None)
+        return time.time() - fetched_at if fetched_at is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
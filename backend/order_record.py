@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compact order record for the trading pipeline.
+
+Upstream orders are dicts with a nested user dict and a dozen fields the
+pipeline never reads. Scans convert the in-game orders they keep into
+OrderRecords at ingest: a slotted object holding only what analysis,
+re-analysis and the opportunity table use, with order type and status
+shared as interned constants. creation_date is also parsed once, here,
+into created_at (epoch seconds) for the analysis age filter. Records answer
+.get() and [] like the dicts they replace, so TradingCalculator works on
+either.
+"""
+from typing import Any, Dict, Optional
+
+from backend.timestamps import parse_epoch
+
+ORDER_TYPES = {'sell': 'sell', 'buy': 'buy'}
+STATUSES = {'ingame': 'ingame', 'online': 'online', 'offline': 'offline'}
+
+
+class OrderRecord:
+    __slots__ = ('id', 'order_type', 'platinum', 'quantity', 'creation_date', 'ingame_name', 'status', 'created_at')
+
+    def __init__(self, id: Optional[str], order_type: Optional[str], platinum, quantity, creation_date: Optional[str],
+                 ingame_name: Optional[str] = None, status: Optional[str] = None, created_at: Optional[int] = None):
+        self.id = id
+        self.order_type = ORDER_TYPES.get(order_type, order_type)
+        self.platinum = platinum
+        self.quantity = quantity
+        self.creation_date = creation_date
+        self.ingame_name = ingame_name
+        self.status = STATUSES.get(status, status)
+        self.created_at = parse_epoch(creation_date) if created_at is None else created_at
+
+    @classmethod
+    def from_order(cls, order) -> 'OrderRecord':
+        """Record for an upstream order dict (records are returned unchanged)"""
+        if isinstance(order, OrderRecord):
+            return order
+        user = order.get('user') or {}
+        return cls(order.get('id'), order.get('order_type'), order.get('platinum'), order.get('quantity'),
+                   order.get('creation_date'), user.get('ingame_name'), user.get('status'))
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """dict-style access to the upstream field names ('user' yields a small dict)"""
+        if field == 'user':
+            return {'ingame_name': self.ingame_name, 'status': self.status}
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, field: str) -> Any:
+        if field != 'user' and field not in self.__slots__:
+            raise KeyError(field)
+        return self.get(field)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form, shaped like the upstream order"""
+        return {
+            'id': self.id,
+            'order_type': self.order_type,
+            'platinum': self.platinum,
+            'quantity': self.quantity,
+            'creation_date': self.creation_date,
+            'user': {'ingame_name': self.ingame_name, 'status': self.status},
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, OrderRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f'OrderRecord({self.order_type} {self.platinum}p x{self.quantity} by {self.ingame_name})'
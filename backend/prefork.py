@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Pre-fork multi-process server mode.
+
+Handlers run Python code (JSON, analysis, ranking) that one process can
+only run on one core. serve() forks N worker processes that each bind the
+same port with SO_REUSEPORT, so the kernel spreads connections across
+them. Workers are full proxies and keep their own in-process caches, but
+everything that must be global lives in, or goes through, a coordinator
+process (a multiprocessing manager on a local socket):
+
+- RateWindow: the upstream sliding-window rate limit. Every worker takes
+  its slots here, so all workers together stay within
+  PROXY_REQUESTS_PER_SECOND.
+- BookRecords: order books, kept as compact snapshot records (see
+  snapshot_store.encode_orders) and persisted to the snapshot directory
+  by the coordinator alone. Any worker reuses a book another worker
+  fetched.
+- Directory: each worker's private control port. A trading job runs in
+  the worker that accepted it, and its id names that worker (w<index>-).
+  Progress polls and re-analysis requests that reach another worker are
+  forwarded to the owner over its control port. /api/cancel-analysis is
+  broadcast to every worker.
+- PriceHistory: every worker records a sample of each book it fetches
+  here, so /api/price-history and scan trends agree on every worker.
+- ItemStatistics: the 48h/90d volume summaries and the items scans asked
+  for. Any worker's scan can request statistics and reads them from here.
+  The refresher that fetches them runs in worker 0 only (see
+  SharedItemStatistics).
+
+Worker 0 alone runs the background market watcher, the statistics
+refresher and the price-history saver.
+"""
+import http.client
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+from typing import Callable, Dict, Optional
+
+from backend.item_statistics import STATISTICS_TTL, ItemStatistics
+from backend.price_history import PriceHistory
+from backend.snapshot_store import SnapshotStore, decode_orders, encode_orders
+
+WORKERS = int(os.environ.get('PROXY_WORKERS', 1))
+FORWARDED_HEADER = 'X-Proxy-Forwarded'  # set on requests one worker forwards to another
+WORKER_HEADER = 'X-Proxy-Worker'  # index of the worker that answered
+MAX_BOOKS = 5000
+FORWARD_TIMEOUT = 30.0
+
+
+class RateWindow:
+    """Sliding-window rate limit shared by all workers (lives in the coordinator)"""
+    def __init__(self, limit: int, period: float = 1.0):
+        self.limit = limit
+        self.period = period
+        self._stamps = []
+        self._lock = threading.Lock()
+
+    def _prune(self) -> float:
+        now = time.time()
+        while self._stamps and now - self._stamps[0] > self.period:
+            self._stamps.pop(0)
+        return now
+
+    def free_slots(self) -> int:
+        with self._lock:
+            self._prune()
+            return self.limit - len(self._stamps)
+
+    def try_take(self, headroom: int = 0) -> bool:
+        """Take a slot if more than `headroom` are free"""
+        with self._lock:
+            now = self._prune()
+            if len(self._stamps) + headroom < self.limit:
+                self._stamps.append(now)
+                return True
+            return False
+
+    def take_slot(self) -> bool:
+        return self.try_take(0)
+
+
+class BookRecords:
+    """Latest encoded order book per item (lives in the coordinator), optionally persisted to a SnapshotStore"""
+    def __init__(self, snapshot_dir: Optional[str] = None, max_entries: int = MAX_BOOKS):
+        self.store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+        self.max_entries = max_entries
+        self._records: 'OrderedDict[str, tuple]' = OrderedDict()  # url_name -> (fetched_at, record)
+        self._lock = threading.Lock()
+
+    def put(self, url_name: str, record: bytes, fetched_at: float):
+        with self._lock:
+            current = self._records.get(url_name)
+            if current is not None and current[0] >= fetched_at:
+                return
+            self._records[url_name] = (fetched_at, record)
+            self._records.move_to_end(url_name)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+        if self.store is not None:
+            self.store.put_record(url_name, record, fetched_at)
+
+    def get(self, url_name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._records.get(url_name)
+        if entry is not None:
+            return entry[1]
+        return self.store.get_record(url_name) if self.store is not None else None
+
+    def fetched_at(self, url_name: str) -> Optional[float]:
+        with self._lock:
+            entry = self._records.get(url_name)
+        if entry is not None:
+            return entry[0]
+        return self.store.fetched_at(url_name) if self.store is not None else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {'items': len(self._records), 'bytes': sum(len(r) for _, r in self._records.values())}
+        if self.store is not None:
+            stats['snapshot_store'] = self.store.stats()
+        return stats
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+class Directory:
+    """Worker index -> control port (lives in the coordinator)"""
+    def __init__(self):
+        self._ports = {}
+        self._lock = threading.Lock()
+
+    def register(self, index: int, port: int):
+        with self._lock:
+            self._ports[index] = port
+
+    def ports(self) -> Dict[int, int]:
+        with self._lock:
+            return dict(self._ports)
+
+
+# Singletons of the coordinator process, created by _init_coordinator
+_shared = {}
+
+
+def _init_coordinator(rate_limit: int, rate_period: float, snapshot_dir: Optional[str], statistics_ttl: float):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent shuts the coordinator down
+    _shared['rate_window'] = RateWindow(rate_limit, rate_period)
+    _shared['books'] = BookRecords(snapshot_dir)
+    _shared['directory'] = Directory()
+    _shared['price_history'] = PriceHistory()
+    # Storage only: it is never started here, so it needs no fetcher or rate-limit slots
+    _shared['item_statistics'] = ItemStatistics(None, lambda: None, lambda: False, ttl=statistics_ttl)
+
+
+def _rate_window():
+    return _shared['rate_window']
+
+
+def _books():
+    return _shared['books']
+
+
+def _directory():
+    return _shared['directory']
+
+
+def _price_history():
+    return _shared['price_history']
+
+
+def _item_statistics():
+    return _shared['item_statistics']
+
+
+class Coordinator(BaseManager):
+    pass
+
+
+Coordinator.register('rate_window', callable=_rate_window)
+Coordinator.register('books', callable=_books)
+Coordinator.register('directory', callable=_directory)
+Coordinator.register('price_history', callable=_price_history,
+                     exposed=('record', 'query', 'stats', 'items', 'memory_bytes', 'save', 'load', '__len__'))
+Coordinator.register('item_statistics', callable=_item_statistics,
+                     exposed=('put', 'get', 'want', 'due', 'mark_failed', 'status', '__len__'))
+
+
+def start_coordinator(authkey: bytes, rate_limit: int, rate_period: float = 1.0,
+                      snapshot_dir: Optional[str] = None, statistics_ttl: float = STATISTICS_TTL) -> Coordinator:
+    """Start the coordinator process; workers connect() to coordinator.address with the same authkey"""
+    coordinator = Coordinator(address=('127.0.0.1', 0), authkey=authkey)
+    coordinator.start(_init_coordinator, (rate_limit, rate_period, snapshot_dir, statistics_ttl))
+    return coordinator
+
+
+def connect(address, authkey: bytes) -> Coordinator:
+    coordinator = Coordinator(address=address, authkey=authkey)
+    coordinator.connect()
+    return coordinator
+
+
+class SharedBookStore:
+    """SnapshotStore-compatible view of the coordinator's BookRecords, for OrderBookCache.attach_store"""
+    def __init__(self, books):
+        self.books = books
+
+    def put(self, url_name: str, orders, fetched_at: float):
+        self.put_record(url_name, encode_orders(url_name, orders, fetched_at), fetched_at)
+
+    def put_record(self, url_name: str, record: bytes, fetched_at: float):
+        """Store a record already built by encode_orders"""
+        self.books.put(url_name, record, fetched_at)
+
+    def get(self, url_name: str):
+        record = self.books.get(url_name)
+        if record is None:
+            return None
+        _, fetched_at, orders = decode_orders(record, 0)
+        return fetched_at, orders
+
+    def fetched_at(self, url_name: str) -> Optional[float]:
+        return self.books.fetched_at(url_name)
+
+    def stats(self) -> Dict:
+        return dict(self.books.stats(), shared=True)
+
+    def close(self):
+        pass  # the coordinator owns the records
+
+
+class SharedItemStatistics(ItemStatistics):
+    """
+    ItemStatistics backed by the coordinator's copy: summaries, requested items and retry times are read
+    and written there. The refresher thread, its fetcher and its counters stay in this process.
+    """
+    def __init__(self, shared, fetch, items_provider, try_acquire, ttl: float = STATISTICS_TTL):
+        super().__init__(fetch, items_provider, try_acquire, ttl)
+        self.shared = shared
+
+    def put(self, url_name: str, summary: Dict[str, float], fetched_at: Optional[float] = None):
+        self.shared.put(url_name, summary, fetched_at)
+
+    def get(self, url_name: str, max_age: Optional[float] = None) -> Optional[Dict[str, float]]:
+        return self.shared.get(url_name, max_age)
+
+    def __len__(self) -> int:
+        return len(self.shared)
+
+    def want(self, url_names):
+        self.shared.want(list(url_names))
+
+    def due(self, limit: int = 50, tracked=None):
+        return self.shared.due(limit, self.items_provider() if tracked is None else tracked)
+
+    def mark_failed(self, url_name: str):
+        self.shared.mark_failed(url_name)
+
+    def status(self) -> Dict:
+        status = self.shared.status()
+        status.update(running=self.running, fetches=self.fetches, failures=self.failures)
+        return status
+
+
+class Worker:
+    """
+    One pre-forked worker's view of the cluster.
+    :param index: 0-based worker number
+    :param coordinator: A connected Coordinator
+    """
+    def __init__(self, index: int, coordinator: Coordinator):
+        self.index = index
+        self.coordinator = coordinator
+        self.rate_window = coordinator.rate_window()
+        self.books = SharedBookStore(coordinator.books())
+        self.directory = coordinator.directory()
+        self.price_history = coordinator.price_history()
+        self.item_statistics = coordinator.item_statistics()
+        self.control_port: Optional[int] = None
+
+    def register(self, control_port: int):
+        self.control_port = control_port
+        self.directory.register(self.index, control_port)
+
+    def job_id(self, unique: str) -> str:
+        return f'w{self.index}-{unique}'
+
+    @staticmethod
+    def owner_of(job_id: Optional[str]) -> Optional[int]:
+        """Index of the worker running job_id, or None if the id names none"""
+        if not job_id or not job_id.startswith('w'):
+            return None
+        prefix, _, _ = job_id.partition('-')
+        return int(prefix[1:]) if prefix[1:].isdigit() else None
+
+    def forward(self, index: int, method: str, path: str, body: Optional[bytes] = None, headers=None):
+        """
+        Send a request to another worker's control port.
+        :return: (status, headers, body), or None if that worker is unknown or unreachable
+        """
+        port = self.directory.ports().get(index)
+        if port is None:
+            return None
+        request_headers = dict(headers or {})
+        request_headers[FORWARDED_HEADER] = str(self.index)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=FORWARD_TIMEOUT)
+        try:
+            conn.request(method, path, body=body, headers=request_headers)
+            response = conn.getresponse()
+            return response.status, response.getheaders(), response.read()
+        except OSError as e:
+            print(f'[PREFORK] Forwarding {path} to worker {index} failed: {e}')
+            return None
+        finally:
+            conn.close()
+
+    def broadcast(self, method: str, path: str, body: Optional[bytes] = None):
+        """Send a request to every other worker"""
+        for index in self.directory.ports():
+            if index != self.index:
+                self.forward(index, method, path, body)
+
+
+def serve(workers: int, port: int, worker_main: Callable[[int, Worker, int], None], rate_limit: int,
+          rate_period: float = 1.0, snapshot_dir: Optional[str] = None, statistics_ttl: float = STATISTICS_TTL):
+    """
+    Start the coordinator, fork `workers` processes running worker_main(index, worker, port) and wait.
+    Ctrl+C / SIGTERM stop every worker, then the coordinator.
+    """
+    authkey = os.urandom(16)
+    coordinator = start_coordinator(authkey, rate_limit, rate_period, snapshot_dir, statistics_ttl)
+    address = coordinator.address
+    pids = {}
+
+    def fork(index):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.default_int_handler)
+                worker_main(index, Worker(index, connect(address, authkey)), port)
+            except KeyboardInterrupt:
+                pass
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        pids[pid] = index
+
+    for index in range(workers):
+        fork(index)
+    print(f'[PREFORK] {workers} workers on port {port}')
+    previous = signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while pids:
+            pid, status = os.wait()
+            index = pids.pop(pid, None)
+            if index is not None:
+                print(f'[PREFORK] Worker {index} exited ({os.waitstatus_to_exitcode(status)})')
+    except KeyboardInterrupt:
+        print('\n[PREFORK] Stopping workers...')
+    finally:
+        # A second Ctrl+C must not interrupt the cleanup
+        previous_int = signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(pids):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        _books_close(coordinator)
+        coordinator.shutdown()
+        signal.signal(signal.SIGINT, previous_int)
+        signal.signal(signal.SIGTERM, previous)
+
+
+def _books_close(coordinator: Coordinator):
+    try:
+        coordinator.books().close()
+    except Exception as e:
+        print(f'[PREFORK] Closing the shared order-book store failed: {e}')
+
+
+def reserve_port(port: int) -> socket.socket:
+    """
+    Bind (without listening) a SO_REUSEPORT socket on port, so port 0 resolves to one free port all workers
+    can bind; keep it open while they run.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('', port))
+    return sock
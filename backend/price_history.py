@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Per-item price history built from every fetched order book.
+
+Each book contributes one sample: best ask, best bid and the number of
+sell/buy orders from in-game traders (the orders trading scans act on).
+Samples go to a short raw tier and are averaged into 5 minute, 1 hour and
+1 day tiers as they arrive. Every tier is a set of parallel typed arrays
+(18 bytes per point) with its own retention, capping an item at about
+1,200 points (~20 KB) however long it is watched.
+"""
+import bisect
+import math
+import os
+import statistics
+import struct
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# (name, bucket seconds, retention seconds); bucket 0 keeps every sample
+TIERS = (
+    ('raw', 0, 2 * 3600),
+    ('5m', 300, 86400),
+    ('1h', 3600, 14 * 86400),
+    ('1d', 86400, 365 * 86400),
+)
+# column -> array typecode
+COLUMNS = (('t', 'I'), ('ask', 'f'), ('bid', 'f'), ('sell_orders', 'H'), ('buy_orders', 'H'), ('samples', 'H'))
+MAX_COUNT = 65535
+MAX_POINTS = 1000
+FILE_MAGIC = b'WFMHIS02'
+FILE_MAGIC_V1 = b'WFMHIS01'  # no open buckets; still loaded
+ITEM_HEADER = struct.Struct('<HB')       # url_name length, tier count
+TIER_HEADER = struct.Struct('<BI')       # tier index, point count
+BUCKET = struct.Struct('<BIdIdIddI')     # present, start, ask sum/n, bid sum/n, sells, buys, samples
+
+
+def book_sample(orders: List[Dict]) -> Tuple[float, float, int, int]:
+    """(best ask, best bid, sell orders, buy orders) over in-game orders; missing sides are NaN"""
+    ask = bid = math.nan
+    sells = buys = 0
+    for order in orders:
+        if (order.get('user') or {}).get('status') != 'ingame':
+            continue
+        price = order.get('platinum')
+        if price is None:
+            continue
+        if order.get('order_type') == 'sell':
+            sells += 1
+            if not price >= ask:  # NaN-safe min
+                ask = price
+        elif order.get('order_type') == 'buy':
+            buys += 1
+            if not price <= bid:
+                bid = price
+    return float(ask), float(bid), sells, buys
+
+
+class _Tier:
+    __slots__ = ('columns',)
+
+    def __init__(self):
+        self.columns = {name: array(code) for name, code in COLUMNS}
+
+    def __len__(self):
+        return len(self.columns['t'])
+
+    def append(self, t, ask, bid, sells, buys, samples):
+        c = self.columns
+        c['t'].append(int(t))
+        c['ask'].append(ask)
+        c['bid'].append(bid)
+        c['sell_orders'].append(min(int(round(sells)), MAX_COUNT))
+        c['buy_orders'].append(min(int(round(buys)), MAX_COUNT))
+        c['samples'].append(min(samples, MAX_COUNT))
+
+    def trim(self, cutoff: float):
+        """Drop points older than cutoff (in chunks, so appends stay amortised O(1))"""
+        k = bisect.bisect_left(self.columns['t'], cutoff)
+        if k and (k >= 64 or k * 8 >= len(self)):
+            for column in self.columns.values():
+                del column[:k]
+
+    def range(self, start: float, end: float) -> Tuple[int, int]:
+        ts = self.columns['t']
+        return bisect.bisect_left(ts, start), bisect.bisect_right(ts, end)
+
+
+class _Bucket:
+    """Running averages for the open bucket of one rollup tier"""
+    __slots__ = ('start', 'ask_sum', 'ask_n', 'bid_sum', 'bid_n', 'sells', 'buys', 'samples')
+
+    def __init__(self, start: int):
+        self.start = start
+        self.ask_sum = self.bid_sum = 0.0
+        self.ask_n = self.bid_n = 0
+        self.sells = self.buys = 0
+        self.samples = 0
+
+    def add(self, ask, bid, sells, buys):
+        if not math.isnan(ask):
+            self.ask_sum += ask
+            self.ask_n += 1
+        if not math.isnan(bid):
+            self.bid_sum += bid
+            self.bid_n += 1
+        self.sells += sells
+        self.buys += buys
+        self.samples += 1
+
+    def pack(self) -> bytes:
+        return BUCKET.pack(1, self.start, self.ask_sum, self.ask_n, self.bid_sum, self.bid_n,
+                           self.sells, self.buys, self.samples)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> Optional['_Bucket']:
+        present, start, ask_sum, ask_n, bid_sum, bid_n, sells, buys, samples = BUCKET.unpack(data)
+        if not present:
+            return None
+        bucket = cls(start)
+        bucket.ask_sum, bucket.ask_n, bucket.bid_sum, bucket.bid_n = ask_sum, ask_n, bid_sum, bid_n
+        bucket.sells, bucket.buys, bucket.samples = sells, buys, samples
+        return bucket
+
+    def point(self):
+        return (self.start,
+                self.ask_sum / self.ask_n if self.ask_n else math.nan,
+                self.bid_sum / self.bid_n if self.bid_n else math.nan,
+                self.sells / self.samples, self.buys / self.samples, self.samples)
+
+
+class _Series:
+    __slots__ = ('tiers', 'buckets', 'last_t')
+
+    def __init__(self):
+        self.tiers = [_Tier() for _ in TIERS]
+        self.buckets: List[Optional[_Bucket]] = [None] * len(TIERS)
+        self.last_t = 0.0
+
+
+class PriceHistory:
+    """Thread-safe store of per-item series; feed it through OrderBookCache.add_listener(record_book)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[str, _Series] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def items(self) -> List[str]:
+        with self._lock:
+            return list(self._series)
+
+    def record_book(self, url_name: str, orders: List[Dict], fetched_at: Optional[float] = None):
+        """OrderBookCache listener: add one sample from a freshly fetched book"""
+        ask, bid, sells, buys = book_sample(orders)
+        self.record(url_name, fetched_at if fetched_at is not None else time.time(), ask, bid, sells, buys)
+
+    def record(self, url_name: str, t: float, ask: float, bid: float, sells: int, buys: int):
+        with self._lock:
+            series = self._series.get(url_name)
+            if series is None:
+                series = self._series[url_name] = _Series()
+            if t < series.last_t:
+                return  # out-of-order sample (e.g. a book reloaded from disk)
+            series.last_t = t
+            for i, (_, bucket_seconds, retention) in enumerate(TIERS):
+                tier = series.tiers[i]
+                if bucket_seconds == 0:
+                    tier.append(t, ask, bid, sells, buys, 1)
+                else:
+                    start = int(t // bucket_seconds * bucket_seconds)
+                    bucket = series.buckets[i]
+                    if bucket is not None and bucket.start != start:
+                        tier.append(*bucket.point())
+                        bucket = None
+                    if bucket is None:
+                        bucket = series.buckets[i] = _Bucket(start)
+                    bucket.add(ask, bid, sells, buys)
+                tier.trim(t - retention)
+
+    def _tier_points(self, series: _Series, tier_index: int, start: float, end: float) -> Dict[str, list]:
+        tier = series.tiers[tier_index]
+        lo, hi = tier.range(start, end)
+        points = {name: tier.columns[name][lo:hi].tolist() for name, _ in COLUMNS}
+        bucket = series.buckets[tier_index]
+        if bucket is not None and start <= bucket.start <= end:
+            for name, value in zip((name for name, _ in COLUMNS), bucket.point()):
+                points[name].append(value)
+        return points
+
+    def query(self, url_name: str, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: Optional[str] = None) -> Optional[Dict]:
+        """
+        Points for url_name in [start, end] (epoch seconds; default: last 24h until now).
+        Without a resolution the finest tier that covers the range in at most MAX_POINTS points is used.
+        :raises ValueError: for an unknown resolution
+        """
+        end = time.time() if end is None else end
+        start = end - 86400 if start is None else start
+        names = [name for name, _, _ in TIERS]
+        if resolution is not None and resolution not in names:
+            raise ValueError(f'Unknown resolution {resolution!r}; expected one of {names}')
+        with self._lock:
+            series = self._series.get(url_name)
+            if series is None:
+                return None
+            if resolution is None:
+                tier_index = len(TIERS) - 1
+                for i, (_, bucket_seconds, retention) in enumerate(TIERS):
+                    covers = series.last_t - retention <= start or i == len(TIERS) - 1
+                    lo, hi = series.tiers[i].range(start, end)
+                    if covers and hi - lo <= MAX_POINTS:
+                        tier_index = i
+                        break
+            else:
+                tier_index = names.index(resolution)
+            points = self._tier_points(series, tier_index, start, end)
+        points['spread'] = [a - b for a, b in zip(points['ask'], points['bid'])]
+        for name in ('ask', 'bid', 'spread'):
+            points[name] = [None if math.isnan(v) else round(v, 2) for v in points[name]]
+        return {'item': url_name, 'resolution': names[tier_index], 'start': start, 'end': end, 'points': points}
+
+    def stats(self, url_name: str, window: float = 7 * 86400, now: Optional[float] = None) -> Optional[Dict]:
+        """
+        Trend and volatility of the best ask over the window: least-squares slope in platinum
+        per day, and the standard deviation of relative changes between points.
+        """
+        now = time.time() if now is None else now
+        result = self.query(url_name, now - window, now)
+        if result is None:
+            return None
+        points = result['points']
+        pairs = [(t, a) for t, a in zip(points['t'], points['ask']) if a is not None]
+        spreads = [s for s in points['spread'] if s is not None]
+        stats = {
+            'resolution': result['resolution'],
+            'points': len(pairs),
+            'last_ask': pairs[-1][1] if pairs else None,
+            'mean_ask': round(statistics.fmean(a for _, a in pairs), 2) if pairs else None,
+            'mean_spread': round(statistics.fmean(spreads), 2) if spreads else None,
+            'trend_per_day': None,
+            'volatility': None,
+        }
+        if len(pairs) >= 2:
+            mean_t = statistics.fmean(t for t, _ in pairs)
+            mean_a = statistics.fmean(a for _, a in pairs)
+            var_t = sum((t - mean_t) ** 2 for t, _ in pairs)
+            if var_t:
+                slope = sum((t - mean_t) * (a - mean_a) for t, a in pairs) / var_t
+                stats['trend_per_day'] = round(slope * 86400, 3)
+            changes = [(b - a) / a for (_, a), (_, b) in zip(pairs, pairs[1:]) if a]
+            if len(changes) >= 2:
+                stats['volatility'] = round(statistics.pstdev(changes), 4)
+        return stats
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(column.itemsize * len(column)
+                       for series in self._series.values() for tier in series.tiers for column in tier.columns.values())
+
+    def save(self, path: str):
+        """Write every tier, and the open bucket of each rollup tier, to path"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with self._lock, open(tmp, 'wb') as f:
+            f.write(FILE_MAGIC)
+            for url_name, series in self._series.items():
+                name = url_name.encode('utf-8')
+                f.write(ITEM_HEADER.pack(len(name), len(TIERS)) + name)
+                for i, tier in enumerate(series.tiers):
+                    f.write(TIER_HEADER.pack(i, len(tier)))
+                    for column_name, _ in COLUMNS:
+                        tier.columns[column_name].tofile(f)
+                    bucket = series.buckets[i]
+                    f.write(bucket.pack() if bucket is not None else BUCKET.pack(0, 0, 0.0, 0, 0.0, 0, 0.0, 0.0, 0))
+        os.replace(tmp, path)
+
+    def load(self, path: str):
+        """Replace the in-memory history with the contents of a file written by save()"""
+        series_by_name: Dict[str, _Series] = {}
+        with open(path, 'rb') as f:
+            magic = f.read(len(FILE_MAGIC))
+            if magic not in (FILE_MAGIC, FILE_MAGIC_V1):
+                raise ValueError(f'{path} is not a price history file')
+            while True:
+                header = f.read(ITEM_HEADER.size)
+                if not header:
+                    break
+                name_len, tier_count = ITEM_HEADER.unpack(header)
+                url_name = f.read(name_len).decode('utf-8')
+                series = series_by_name[url_name] = _Series()
+                for _ in range(tier_count):
+                    tier_index, count = TIER_HEADER.unpack(f.read(TIER_HEADER.size))
+                    tier = series.tiers[tier_index]
+                    for column_name, _ in COLUMNS:
+                        tier.columns[column_name].fromfile(f, count)
+                    if count:
+                        series.last_t = max(series.last_t, tier.columns['t'][-1])
+                    if magic == FILE_MAGIC:
+                        series.buckets[tier_index] = _Bucket.unpack(f.read(BUCKET.size))
+        with self._lock:
+            self._series = series_by_name
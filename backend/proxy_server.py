@@ -7,6 +7,7 @@ import urllib.request
 import urllib.error
 from urllib.parse import urlparse, parse_qs
 import json
+import os
 import ssl
 import threading
 import time
@@ -16,9 +17,58 @@ from .trading_calculator import TradingCalculator
 import urllib.request
 import traceback
 from backend.wtb_metadata_store import set_order_metadata, get_all_metadata_for_user, delete_order_metadata, delete_all_metadata_for_user
+from backend import metrics
+from backend.metrics import timed_urlopen
+from backend.market_client import MarketClient, API_BASE_URL
+from backend.cassette import cassette_from_env
+from backend.scan_profile import ScanProfile
+from backend.order_book_cache import OrderBookCache
+from backend import syndicate_scan
+from backend.syndicate_index import ReloadingSyndicateIndex
+from backend.item_search import ItemCatalogue
+from backend.market_watcher import MarketWatcher
+from backend.snapshot_store import RECORD_HEADER, SnapshotStore
+from backend.price_history import PriceHistory, book_sample
+from backend.item_statistics import ItemStatistics
+from backend.analysis_memo import AnalysisMemo, body_digest
+from backend import job_snapshot
+from backend.job_snapshot import JobSnapshot
+from backend.order_record import OrderRecord
+from backend.scan_workers import AnalysisPool, records_from_tuples
+from backend import deadline as deadlines
+from backend.deadline import Cancelled, Deadline, DeadlineExceeded, is_timeout
+from backend.resilience import CircuitOpen, Resilience
+from backend.job_scheduler import JobScheduler, QueueFull
+from backend import fair_share
+from backend.fair_share import FairShareScheduler
+from backend import trading_job
+from backend.trading_job import TradingJob
+from backend.async_server import AsyncHTTPServer
+from backend import prefork
+from backend import cache_backend
+from backend.cache_backend import CacheBackendError, ResponseCache
 
 # ===== CONFIGURATION =====
-REQUESTS_PER_SECOND = 5  # Change from 3 to 5
+REQUESTS_PER_SECOND = int(os.environ.get('PROXY_REQUESTS_PER_SECOND', 5))  # Change from 3 to 5
+ORDER_BOOK_CACHE_TTL = float(os.environ.get('ORDER_BOOK_CACHE_TTL', 120))  # seconds
+ITEM_CATALOGUE_TTL = float(os.environ.get('ITEM_CATALOGUE_TTL', 3600))  # seconds
+ITEM_STATISTICS_TTL = float(os.environ.get('ITEM_STATISTICS_TTL', 6 * 3600))  # seconds
+MARKET_WATCHER_ENABLED = os.environ.get('MARKET_WATCHER', '1') != '0'
+# Order books persist here across restarts; set to an empty string to disable
+SNAPSHOT_DIR = os.environ.get('ORDER_BOOK_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'snapshots'))
+# Worker processes that decode and analyze order books during trading scans (0 = in the fetch threads)
+ANALYSIS_PROCESSES = int(os.environ.get('TRADING_ANALYSIS_PROCESSES', 0))
+# Upstream connect/read timeouts: UPSTREAM_CONNECT_TIMEOUT / UPSTREAM_READ_TIMEOUT (see backend/deadline.py)
+REQUEST_DEADLINE = float(os.environ.get('PROXY_REQUEST_DEADLINE', 60))  # seconds per proxied request
+TRADING_JOB_DEADLINE = float(os.environ.get('TRADING_JOB_DEADLINE', 1800))  # seconds per trading scan
+TRADING_MAX_RUNNING_JOBS = int(os.environ.get('TRADING_MAX_RUNNING_JOBS', 2))  # more are queued
+TRADING_MAX_QUEUED_JOBS = int(os.environ.get('TRADING_MAX_QUEUED_JOBS', 8))  # more are rejected with 503
+# Seconds a finished trading or syndicate job (results, fetched-order snapshot) stays available to polls
+FINISHED_JOB_RETENTION = float(os.environ.get('TRADING_JOB_RETENTION', 3600))
+# 'threading' (a thread per connection) or 'asyncio' (connections on one event loop, see backend/async_server.py)
+SERVER_MODE = os.environ.get('PROXY_SERVER_MODE', 'threading')
+PRICE_HISTORY_SAVE_INTERVAL = float(os.environ.get('PRICE_HISTORY_SAVE_INTERVAL', 300))  # seconds
+WATCHER_HEADROOM = 1  # rate-limit slots per window the watcher always leaves for interactive requests
 # ========================
 
 # Rate limiting detection
@@ -36,9 +86,40 @@ RATE_PERIOD = 1.0  # per second
 # Global cancellation flag for trading analysis
 trading_analysis_cancelled = False
 
-# In-memory job store for batch processing
+# In-memory job store for batch processing: job id -> TradingJob. The lock only guards adding and
+# removing jobs; each job synchronizes its own state.
 trading_jobs = {}
 trading_jobs_lock = threading.Lock()
+# Runs at most TRADING_MAX_RUNNING_JOBS trading jobs at once and queues the rest
+job_scheduler = JobScheduler(TRADING_MAX_RUNNING_JOBS, TRADING_MAX_QUEUED_JOBS)
+
+# Keep-alive client for upstream GETs (trading scans and proxied /api/ requests).
+# Set MARKET_CASSETTE / MARKET_CASSETTE_MODE to record or replay upstream traffic.
+market_client = MarketClient(cassette=cassette_from_env())
+# Retries with jittered backoff and a circuit breaker per endpoint family for upstream GETs
+upstream_resilience = Resilience()
+
+# In-memory job store for syndicate price scans
+syndicate_jobs = {}
+syndicate_jobs_lock = threading.Lock()
+# Deadline of each running syndicate scan (kept out of the job dicts, which are served as JSON)
+syndicate_deadlines = {}
+
+def evict_finished_jobs(now=None):
+    """Drop trading and syndicate jobs that finished more than FINISHED_JOB_RETENTION seconds ago"""
+    cutoff = (time.time() if now is None else now) - FINISHED_JOB_RETENTION
+    with trading_jobs_lock:
+        expired = [job_id for job_id, job in trading_jobs.items() if job.finished_before(cutoff)]
+        for job_id in expired:
+            del trading_jobs[job_id]
+    with syndicate_jobs_lock:
+        expired_scans = [job_id for job_id, job in syndicate_jobs.items()
+                         if job.get('finished_at') is not None and job['finished_at'] < cutoff]
+        for job_id in expired_scans:
+            del syndicate_jobs[job_id]
+    if expired or expired_scans:
+        print(f'[JOBS] Evicted {len(expired)} trading and {len(expired_scans)} syndicate jobs finished over '
+              f'{FINISHED_JOB_RETENTION:g}s ago')
 
 def set_rate_limited():
     """Mark that we've been rate limited"""
@@ -46,6 +127,7 @@ def set_rate_limited():
     with rate_limit_lock:
         rate_limit_detected = True
         rate_limit_start_time = time.time()
+        metrics.RATE_LIMITED.inc()
         print(f"[RATE LIMIT] Rate limiting detected at {time.strftime('%H:%M:%S')}")
 
 def clear_rate_limited():
@@ -55,7 +137,245 @@ def clear_rate_limited():
         if rate_limit_detected:
             print(f"[RATE LIMIT] Rate limiting cleared at {time.strftime('%H:%M:%S')}")
         rate_limit_detected = False
-        
+
+# Set in each pre-forked worker (prefork.Worker)
+prefork_worker = None
+# Rate limit shared with other workers (prefork.RateWindow) or nodes (cache_backend.RateLimitTokens);
+# replaces request_timestamps while set
+shared_rate_window = None
+shared_rate_limit_error_at = 0.0
+
+def shared_rate_limit(method, *args):
+    """Call shared_rate_window.<method>; None when there is none or its backend failed (the local window applies)"""
+    global shared_rate_limit_error_at
+    if shared_rate_window is None:
+        return None
+    try:
+        return getattr(shared_rate_window, method)(*args)
+    except CacheBackendError as e:
+        now = time.time()
+        if now - shared_rate_limit_error_at > 10:
+            shared_rate_limit_error_at = now
+            print(f'[RATE LIMIT] Shared rate limit unavailable, using the local window: {e}')
+        return None
+
+def free_rate_limit_slots():
+    """Slots the sliding-window rate limiter has free right now"""
+    shared = shared_rate_limit('free_slots')
+    if shared is not None:
+        return shared
+    with rate_limit_lock:
+        now = time.time()
+        # Remove timestamps older than RATE_PERIOD
+        while request_timestamps and now - request_timestamps[0] > RATE_PERIOD:
+            request_timestamps.pop(0)
+        return RATE_LIMIT - len(request_timestamps)
+
+def take_rate_limit_slot():
+    """Take a slot if one is free"""
+    taken = shared_rate_limit('take_slot')
+    if taken is not None:
+        return taken
+    with rate_limit_lock:
+        now = time.time()
+        while request_timestamps and now - request_timestamps[0] > RATE_PERIOD:
+            request_timestamps.pop(0)
+        if len(request_timestamps) < RATE_LIMIT:
+            request_timestamps.append(now)
+            return True
+    return False
+
+# Decides whose turn it is when writes, interactive requests and trading scans wait for slots
+upstream_lanes = FairShareScheduler(free_rate_limit_slots, take_rate_limit_slot)
+
+def wait_for_rate_limit_slot(deadline=None, lane=None, flow=None):
+    """
+    Block until the sliding-window rate limiter admits another upstream request
+    :param deadline: Gives up (Cancelled / DeadlineExceeded) when it is cancelled or passes;
+                     defaults to the thread's current deadline
+    :param lane: fair_share.WRITE, INTERACTIVE or JOB; decides the request's share of the budget.
+                 Defaults to the thread's fair_share.current() lane and flow (INTERACTIVE unless set)
+    :param flow: For the JOB lane, the job id (concurrent jobs take turns)
+    """
+    if lane is None:
+        lane, flow = fair_share.current()
+    start = time.perf_counter()
+    metrics.RATE_LIMIT_QUEUE_DEPTH.inc()
+    try:
+        upstream_lanes.acquire(lane, flow, deadline)
+    finally:
+        metrics.RATE_LIMIT_QUEUE_DEPTH.dec()
+        waited = time.perf_counter() - start
+        metrics.RATE_LIMIT_WAIT.observe(waited)
+        metrics.RATE_LIMIT_LANE_WAIT.labels(lane).observe(waited)
+
+def try_acquire_rate_limit_slot(headroom=WATCHER_HEADROOM):
+    """
+    Take a rate-limit slot only if it is spare: nobody is waiting for one, we are not
+    rate limited, and at least `headroom` slots stay free in the current window.
+    Used by background work so it never delays interactive requests.
+    """
+    if metrics.RATE_LIMIT_QUEUE_DEPTH.get() > 0:
+        return False
+    taken = None if rate_limit_detected else shared_rate_limit('try_take', headroom)
+    if taken is not None:
+        return taken
+    with rate_limit_lock:
+        if rate_limit_detected:
+            return False
+        now = time.time()
+        while request_timestamps and now - request_timestamps[0] > RATE_PERIOD:
+            request_timestamps.pop(0)
+        if len(request_timestamps) + headroom < RATE_LIMIT:
+            request_timestamps.append(now)
+            return True
+    return False
+
+def upstream_get(path, headers=None, timings=None, deadline=None, retry=True, wait=None, info=None):
+    """
+    GET through the endpoint family's circuit breaker, retrying transient failures
+    :param retry: False for background callers that already retry on their own schedule
+    :param wait: Called before every attempt (e.g. wait_for_rate_limit_slot), so retries respect the rate limit too
+    :param info: Optional dict filled with 'attempts'
+    :raises CircuitOpen: if upstream for this family is failing
+    """
+    def send():
+        if wait is not None:
+            wait()
+        return market_client.get(path, headers=headers, timings=timings, deadline=deadline)
+    family = metrics.upstream_family(market_client.url_for(path))
+    return upstream_resilience.call(family, send, deadline, retry=retry, info=info)
+
+def fetch_order_book(url_name):
+    """Rate-limited fetch of one item's full order book; returns None if the fetch failed"""
+    return request_order_book(url_name, retry=True, wait=wait_for_rate_limit_slot)
+
+def request_order_book(url_name, retry=False, wait=None):
+    """Fetch one item's order book; without `wait`, the caller must already hold a rate-limit slot"""
+    try:
+        response = upstream_get(f'/items/{url_name}/orders', retry=retry, wait=wait)
+    except CircuitOpen:
+        return None
+    if response.status == 429:
+        set_rate_limited()
+        return None
+    if response.status == 404:
+        # Not tradeable on the market (e.g. some cosmetics); cache it as an empty book
+        return []
+    if response.status != 200:
+        print(f'[DEBUG] HTTP {response.status} fetching order book for {url_name}')
+        return None
+    return json.loads(response.body).get('payload', {}).get('orders', [])
+
+def request_item_statistics(url_name):
+    """Fetch one item's /statistics payload; the caller must already hold a rate-limit slot"""
+    try:
+        response = upstream_get(f'/items/{url_name}/statistics', retry=False)
+    except CircuitOpen:
+        return None
+    if response.status == 429:
+        set_rate_limited()
+        return None
+    if response.status == 404:
+        return {}
+    if response.status != 200:
+        print(f'[DEBUG] HTTP {response.status} fetching statistics for {url_name}')
+        return None
+    return json.loads(response.body).get('payload', {})
+
+# Parsed syndicate_items.json, rebuilt when the file changes
+syndicate_index = ReloadingSyndicateIndex()
+
+def fetch_item_catalogue():
+    """Rate-limited fetch of the /items catalogue; returns None if the fetch failed"""
+    try:
+        response = upstream_get('/items', wait=wait_for_rate_limit_slot)
+    except CircuitOpen:
+        return None
+    if response.status == 429:
+        set_rate_limited()
+        return None
+    if response.status != 200:
+        print(f'[DEBUG] HTTP {response.status} fetching item catalogue')
+        return None
+    return json.loads(response.body).get('payload', {}).get('items', [])
+
+# Search index over the item catalogue, loaded on first use (/api/search)
+item_catalogue = ItemCatalogue(fetch_item_catalogue, ttl=ITEM_CATALOGUE_TTL)
+
+# Shared by scans so concurrent or repeated scans do not refetch the same book
+order_book_cache = OrderBookCache(fetch_order_book, ttl=ORDER_BOOK_CACHE_TTL)
+
+# PROXY_CACHE_URL: in-process by default; a shared (redis://) backend also holds the order books,
+# the catalogue and the rate limit for every node using it (see run_server)
+cache = cache_backend.from_url(cache_backend.CACHE_URL)
+# Proxied GET responses (off unless PROXY_RESPONSE_CACHE_TTL is set)
+response_cache = ResponseCache(cache)
+
+# Best bid/ask and order counts of every fetched book, rolled up for /api/price-history and trading trends
+price_history = PriceHistory()
+
+def record_price_sample(url_name, orders, fetched_at):
+    """order_book_cache listener; a pre-forked worker records into the coordinator's shared price_history"""
+    price_history.record(url_name, fetched_at, *book_sample(orders))
+
+order_book_cache.add_listener(record_price_sample)
+
+def watched_prime_items():
+    """url_names of every Prime item in the catalogue (what trading scans analyse)"""
+    index = item_catalogue.get()
+    if index is None:
+        return None
+    return [item['url_name'] for item in index.items
+            if item.get('url_name') and 'prime' in (item.get('item_name') or '').lower()]
+
+# Keeps order_book_cache warm for the Prime set using spare rate-limit budget (started by run_server)
+market_watcher = MarketWatcher(order_book_cache, request_order_book, watched_prime_items,
+                               try_acquire_rate_limit_slot, min_interval=ORDER_BOOK_CACHE_TTL / 2)
+
+# 48h/90d trade volumes for liquidity-aware ranking, refreshed in the background with spare budget
+item_statistics = ItemStatistics(request_item_statistics, watched_prime_items, try_acquire_rate_limit_slot,
+                                 ttl=ITEM_STATISTICS_TTL)
+
+# Trading analysis results and parsed order-book responses, reused while books are unchanged
+analysis_memo = AnalysisMemo(name='analysis')
+parsed_book_memo = AnalysisMemo(max_entries=1000, name='parsed_book')
+# AnalysisPool when run with --analysis-processes / TRADING_ANALYSIS_PROCESSES (set up by run_server)
+analysis_pool = None
+
+def record_trading_job_metrics(status, started, items_processed):
+    """Record duration and throughput of a finished trading job"""
+    elapsed = time.perf_counter() - started
+    metrics.TRADING_JOB_DURATION.labels(status).observe(elapsed)
+    metrics.TRADING_JOB_ITEMS.inc(items_processed)
+    if elapsed > 0:
+        metrics.TRADING_JOB_ITEMS_PER_SECOND.set(items_processed / elapsed)
+
+def route_label(path):
+    """Map a request path onto a low-cardinality route name for metrics"""
+    route = urlparse(path).path
+    if route in KNOWN_ROUTES:
+        return route
+    if route.startswith('/api/'):
+        return '/api/*'
+    return 'static'
+
+KNOWN_ROUTES = {
+    '/metrics', '/auth/status', '/auth/login', '/auth/logout',
+    '/trading/my-wtb-orders', '/trading/create-wtb', '/trading/create-wts',
+    '/trading/delete-order', '/trading/delete-all-wtb-orders',
+    '/api/trading-calc', '/api/trading-calc-progress', '/api/cancel-analysis', '/api/trading-reanalyze',
+    '/api/syndicate-scan', '/api/syndicate-scan-progress', '/api/syndicate-items', '/api/search',
+    '/api/market-watcher', '/api/price-history',
+}
+
+# /api/* routes answered from local state; every other /api/* route is proxied (or searches the catalogue) upstream
+LOCAL_API_ROUTES = {
+    '/api/trading-calc', '/api/trading-calc-progress', '/api/cancel-analysis', '/api/trading-reanalyze',
+    '/api/syndicate-scan', '/api/syndicate-scan-progress', '/api/syndicate-items',
+    '/api/market-watcher', '/api/price-history',
+}
+
 def handle_auth_login_request(username: str, password: str) -> dict:
     """
     Handle authentication login request
@@ -91,9 +411,71 @@ def handle_auth_login_request(username: str, password: str) -> dict:
         }
 
 class ProxyHandler(BaseHTTPRequestHandler):
+    @staticmethod
+    def waits_on_upstream(method, path):
+        """Whether handling this request may block on warframe.market (AsyncHTTPServer runs these on their own pool)"""
+        route = urlparse(path).path
+        if route.startswith('/api/'):
+            return route not in LOCAL_API_ROUTES
+        return route == '/auth/login' or route.startswith('/trading/')
+
+    def parse_request(self):
+        self._request_start = time.perf_counter()
+        self._response_status = None
+        # Upstream calls made while handling this request share one deadline (cleared in handle_one_request)
+        deadlines.set_current(Deadline(REQUEST_DEADLINE))
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        self._response_status = code
+        super().send_response(code, message)
+        if prefork_worker is not None:
+            self.send_header(prefork.WORKER_HEADER, str(prefork_worker.index))
+
+    def forward_to_job_owner(self, job_id, body=None):
+        """
+        In a pre-forked worker, relay this request to the worker running job_id when that is another one.
+        :return: True if the response was sent
+        """
+        if prefork_worker is None or self.headers.get(prefork.FORWARDED_HEADER):
+            return False
+        owner = prefork.Worker.owner_of(job_id)
+        if owner is None or owner == prefork_worker.index:
+            return False
+        headers = {'Content-Type': self.headers.get('Content-Type', 'application/json')} if body is not None else None
+        response = prefork_worker.forward(owner, self.command, self.path, body, headers)
+        if response is None:
+            return False
+        status, response_headers, response_body = response
+        self.send_response(status)
+        for name, value in response_headers:
+            if name.lower() in ('content-type', 'access-control-allow-origin', 'retry-after'):
+                self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(response_body)
+        return True
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        finally:
+            deadlines.set_current(None)
+        # Record request metrics once a response has been sent
+        status = getattr(self, '_response_status', None)
+        if status is not None and self.command:
+            route = route_label(self.path)
+            metrics.HTTP_REQUESTS.labels(self.command, route, status).inc()
+            metrics.HTTP_REQUEST_DURATION.labels(self.command, route).observe(time.perf_counter() - self._request_start)
+            self._response_status = None
+
     def do_GET(self):
         print(f"Received GET request for path: {self.path}")
         
+        # Prometheus metrics scrape endpoint
+        if self.path == '/metrics':
+            self.handle_metrics_endpoint()
+            return
+        
         # New: Handle fetching user's current WTB orders
         if self.path == '/trading/my-wtb-orders':
             self.handle_my_wtb_orders_endpoint()
@@ -104,6 +486,26 @@ class ProxyHandler(BaseHTTPRequestHandler):
             self.handle_trading_calc_progress()
             return
         
+        if self.path.startswith('/api/syndicate-scan-progress'):
+            self.handle_syndicate_scan_progress()
+            return
+        
+        if urlparse(self.path).path == '/api/syndicate-items':
+            self.handle_syndicate_items_endpoint()
+            return
+        
+        if urlparse(self.path).path == '/api/search':
+            self.handle_search_endpoint()
+            return
+        
+        if self.path == '/api/market-watcher':
+            self.handle_market_watcher_status()
+            return
+        
+        if urlparse(self.path).path == '/api/price-history':
+            self.handle_price_history_endpoint()
+            return
+        
         # Handle authentication endpoints
         if self.path == '/auth/status':
             self.handle_auth_status_endpoint()
@@ -142,70 +544,68 @@ class ProxyHandler(BaseHTTPRequestHandler):
             api_path = self.path[5:]  # Remove '/api/' prefix
             if not api_path.startswith('/'):
                 api_path = '/' + api_path
-            api_url = f'https://api.warframe.market/v1{api_path}'
+            api_url = f'{API_BASE_URL}{api_path}'
             
             print(f"Proxying GET request: {self.path} -> {api_url}")
             
             try:
                 # Acquire concurrency semaphore
                 with concurrent_semaphore:
-                    # Rate limiting
-                    while True:
-                        with rate_limit_lock:
-                            now = time.time()
-                            # Remove timestamps older than RATE_PERIOD
-                            while request_timestamps and now - request_timestamps[0] > RATE_PERIOD:
-                                request_timestamps.pop(0)
-                            if len(request_timestamps) < RATE_LIMIT:
-                                request_timestamps.append(now)
-                                break
-                        time.sleep(0.05)  # Wait a bit before retrying
-                    
-                    # Create context to ignore SSL certificate verification
-                    context = ssl.create_default_context()
-                    context.check_hostname = False
-                    context.verify_mode = ssl.CERT_NONE
-                    
-                    # Make request to Warframe Market API
-                    req = urllib.request.Request(api_url)
-                    req.add_header('User-Agent', 'Warframe-Market-Proxy/1.0')
-                    
-                    # Add Authorization header if present
+                    # Forward Authorization header if present
+                    request_headers = {}
                     auth_header = self.headers.get('Authorization')
                     if auth_header:
-                        req.add_header('Authorization', auth_header)
+                        request_headers['Authorization'] = auth_header
                     else:
                         # Try to get auth headers from our auth handler
                         auth_headers = get_auth_headers()
                         if auth_headers:
-                            for key, value in auth_headers.items():
-                                req.add_header(key, value)
+                            request_headers.update(auth_headers)
                     
-                    with urllib.request.urlopen(req, context=context) as response:
-                        data = response.read()
-                        content_type = response.headers.get('Content-Type', 'application/json')
-                        
+                    # Only anonymous responses are shared between clients (and nodes)
+                    cacheable = response_cache.enabled and not request_headers
+                    cached = response_cache.get(api_path) if cacheable else None
+                    if cached is not None:
+                        status, content_type, data = cached
+                    else:
+                        # Make request to Warframe Market API (recorded/replayed when a cassette is active);
+                        # every attempt, retries included, waits for a rate-limit slot
+                        response = upstream_get(api_url, headers=request_headers, wait=wait_for_rate_limit_slot)
+                        status = response.status
+                        data = response.body
+                        content_type = response.header('Content-Type', 'application/json')
+
                         # Check for rate limiting
-                        if response.status == 429:
+                        if status == 429:
                             set_rate_limited()
                             print(f"[RATE LIMIT] HTTP 429 detected for {api_url}")
-                        elif response.status == 200:
+                        elif status == 200:
                             # Clear rate limiting if we get a successful response
                             clear_rate_limited()
-                        
-                        print(f"API response: status={response.status}, content-type={content_type}, data_length={len(data)}")
-                        print(f"First 100 chars of response: {data[:100]}")
-                        
-                        # Send response with CORS headers and original status code
-                        self.send_response(response.status)
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-                        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-                        self.send_header('Content-Type', content_type)
-                        self.send_header('Content-Length', str(len(data)))
-                        self.end_headers()
-                        self.wfile.write(data)
+                            if cacheable:
+                                response_cache.put(api_path, status, content_type, data)
+                    
+                    print(f"API response: status={status}, content-type={content_type}, data_length={len(data)}")
+                    print(f"First 100 chars of response: {data[:100]}")
+                    
+                    # Send response with CORS headers and original status code
+                    self.send_response(status)
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+                    self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
                     
+            except CircuitOpen as e:
+                print(f"Error proxying request: {e}")
+                self.send_response(503)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Retry-After', str(max(1, round(e.retry_after))))
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': f'Upstream unavailable: {e}'}).encode())
             except Exception as e:
                 print(f"Error proxying request: {e}")
                 
@@ -214,7 +614,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
                     set_rate_limited()
                     print(f"[RATE LIMIT] Rate limiting detected via error: {e}")
                 
-                self.send_response(500)
+                self.send_response(504 if is_timeout(e) else 500)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Content-Type', 'application/json')
                 self.end_headers()
@@ -304,6 +704,14 @@ class ProxyHandler(BaseHTTPRequestHandler):
         elif self.path == '/api/trading-calc':
             self.handle_trading_calc_endpoint(post_data)
             return
+        # Syndicate price scan endpoint
+        elif self.path == '/api/syndicate-scan':
+            self.handle_syndicate_scan_endpoint(post_data)
+            return
+        # Re-run a finished (or running) trading job's analysis with new parameters
+        elif self.path == '/api/trading-reanalyze':
+            self.handle_trading_reanalyze_endpoint(post_data)
+            return
         # Trading analysis cancel endpoint
         elif self.path == '/api/cancel-analysis':
             self.handle_cancel_analysis_endpoint(post_data)
@@ -314,7 +722,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             api_path = self.path[5:]  # Remove '/api/' prefix
             if not api_path.startswith('/'):
                 api_path = '/' + api_path
-            api_url = f'https://api.warframe.market/v1{api_path}'
+            api_url = f'{API_BASE_URL}{api_path}'
             
             print(f"Proxying POST request: {self.path} -> {api_url}")
             self.proxy_post_request(api_url, post_data)
@@ -332,15 +740,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             # Acquire concurrency semaphore
             with concurrent_semaphore:
                 # Rate limiting
-                while True:
-                    with rate_limit_lock:
-                        now = time.time()
-                        while request_timestamps and now - request_timestamps[0] > RATE_PERIOD:
-                            request_timestamps.pop(0)
-                        if len(request_timestamps) < RATE_LIMIT:
-                            request_timestamps.append(now)
-                            break
-                    time.sleep(0.05)
+                wait_for_rate_limit_slot(lane=fair_share.WRITE)
                 
                 context = ssl.create_default_context()
                 context.check_hostname = False
@@ -378,7 +778,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
                     print(f"    {header}: {value}")
                 print(f"[DEBUG] Request payload: {post_data}")
                 
-                with urllib.request.urlopen(req, context=context) as response:
+                with timed_urlopen(req, context=context) as response:
                     data = response.read()
                     content_type = response.headers.get('Content-Type', 'application/json')
                     
@@ -457,7 +857,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
                 set_rate_limited()
                 print(f"[RATE LIMIT] Rate limiting detected via POST error: {e}")
             
-            self.send_response(500)
+            self.send_response(504 if is_timeout(e) else 500)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
@@ -586,7 +986,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             print(f"[DEBUG] Order payload: {order_data}")
             
             # Proxy to Warframe Market API and intercept the response to store metadata
-            api_url = 'https://api.warframe.market/v1/profile/orders'
+            api_url = f'{API_BASE_URL}/profile/orders'
             import ssl
             context = ssl.create_default_context()
             context.check_hostname = False
@@ -611,7 +1011,8 @@ class ProxyHandler(BaseHTTPRequestHandler):
                             jwt_token = value[7:]
                     if jwt_token:
                         req.add_header('Cookie', f'JWT={jwt_token}')
-            with urllib.request.urlopen(req, context=context) as response:
+            wait_for_rate_limit_slot(lane=fair_share.WRITE)
+            with timed_urlopen(req, context=context) as response:
                 data_bytes = response.read()
                 content_type = response.headers.get('Content-Type', 'application/json')
                 api_response = json.loads(data_bytes.decode('utf-8'))
@@ -692,7 +1093,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             }
             
             # Proxy to Warframe Market API
-            api_url = 'https://api.warframe.market/v1/profile/orders'
+            api_url = f'{API_BASE_URL}/profile/orders'
             self.proxy_post_request(api_url, json.dumps(order_data).encode())
             
         except json.JSONDecodeError:
@@ -739,7 +1140,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             username = auth_status.get('username')
             
             # Delete order via Warframe Market API
-            api_url = f'https://api.warframe.market/v1/profile/orders/{order_id}'
+            api_url = f'{API_BASE_URL}/profile/orders/{order_id}'
             print(f"[DEBUG] Deleting order at URL: {api_url}")
             
             # Use DELETE method
@@ -770,7 +1171,8 @@ class ProxyHandler(BaseHTTPRequestHandler):
             else:
                 print("[DEBUG] No auth headers available for DELETE request.")
             
-            with urllib.request.urlopen(req, context=context) as response:
+            wait_for_rate_limit_slot(lane=fair_share.WRITE)
+            with timed_urlopen(req, context=context) as response:
                 data = response.read()
                 content_type = response.headers.get('Content-Type', 'application/json')
                 
@@ -823,31 +1225,47 @@ class ProxyHandler(BaseHTTPRequestHandler):
         min_profit = data.get('min_profit', 10)
         max_investment = data.get('max_investment', 0)
         max_order_age = data.get('max_order_age', 30)
+        # Seconds; when set, books the market watcher (or an earlier scan) fetched within this window are reused
+        max_snapshot_age = data.get('max_snapshot_age')
         batch_size = data.get('batch_size', 3)
-        calc = TradingCalculator(min_profit, max_investment, max_order_age)
+        calc = TradingCalculator(min_profit, max_investment, max_order_age, price_history=price_history,
+                                 item_statistics=item_statistics, memo=analysis_memo)
         prime_items = [item for item in all_items if 'prime' in (item.get('item_name') or '').lower()]
         print(f'[DEBUG] Found {len(prime_items)} Prime items from API. Sample: {[item.get("item_name") for item in prime_items[:5]]}')
-        # Assign a unique job ID
-        job_id = str(uuid.uuid4())
+        # Statistics are never fetched inline; missing ones are queued for the background refresher
+        item_statistics.want(str(item.get('url_name') or '') for item in prime_items)
+        # Assign a unique job ID (naming the worker that runs it, when pre-forked)
+        job_id = prefork_worker.job_id(str(uuid.uuid4())) if prefork_worker else str(uuid.uuid4())
+        evict_finished_jobs()
+        profile = ScanProfile()
+        # Fetched orders stay with the job so /api/trading-reanalyze can rerun it without refetching
+        snapshot = JobSnapshot(prime_items)
+        # Bounds the whole scan (restarted when it leaves the queue); /api/cancel-analysis cancels it,
+        # aborting fetches in flight
+        job_deadline = Deadline(TRADING_JOB_DEADLINE)
+        job = TradingJob(job_id, len(prime_items),
+                         params={'min_profit': min_profit, 'max_investment': max_investment, 'max_order_age': max_order_age},
+                         profile=profile, snapshot=snapshot, deadline=job_deadline)
         with trading_jobs_lock:
-            trading_jobs[job_id] = {
-                'status': 'running',
-                'progress': 0,
-                'total': len(prime_items),
-                'results': [],
-                'cancelled': False,
-            }
+            trading_jobs[job_id] = job
         # Start batch processing in a background thread
         def batch_worker():
             orders_data = {}
+            job_started = time.perf_counter()
+            scan_now = int(time.time())  # every order age in this scan is measured against this
+            job_deadline.restart(TRADING_JOB_DEADLINE)
+            profile.started = time.time()
+            job.set_status(trading_job.RUNNING, only_from=trading_job.QUEUED)
             
             def fetch_item_orders(item, job_id):
-                """Fetch orders for a single item - designed to be run in a thread"""
+                """
+                Fetch orders for a single item - designed to be run in a thread.
+                Returns (item_id, orders); item_id is None if the job was cancelled, orders None if the fetch failed.
+                """
                 # Check for cancellation at the start of each item fetch
-                with trading_jobs_lock:
-                    if trading_jobs[job_id]['cancelled']:
-                        print(f'[DEBUG] [Job {job_id}] Cancelled during item fetch')
-                        return None, []
+                if job.should_stop():
+                    print(f'[DEBUG] [Job {job_id}] Cancelled during item fetch')
+                    return None, []
                 
                 item_name = str(item.get('item_name') or '')
                 item_id = str(item.get('id') or '')
@@ -856,41 +1274,121 @@ class ProxyHandler(BaseHTTPRequestHandler):
                 
                 if not url_name:
                     print(f'[DEBUG] [Job {job_id}] Skipping {item_name}: no url_name')
+                    record_fetch_status(item, {'status': 'skipped'})
                     return item_id, []
                 
-                api_url = f'https://api.warframe.market/v1/items/{url_name}/orders?include=item'
+                item_started = time.perf_counter()
+                if max_snapshot_age is not None:
+                    book = order_book_cache.peek(url_name, max_snapshot_age)
+                    if book is not None:
+                        with profile.phase('ingame_filter'):
+                            ingame_orders = [OrderRecord.from_order(o) for o in book
+                                             if o.get('user', {}).get('status') == 'ingame']
+                        job.add_snapshot_hit()
+                        record_fetch_status(item, {'status': 'snapshot'})
+                        profile.add_item(time.perf_counter() - item_started)
+                        return item_id, ingame_orders
+                
+                def rate_limit_wait():
+                    # Scan fetches share the upstream rate limit with proxied requests
+                    with profile.phase('rate_limit_wait'):
+                        wait_for_rate_limit_slot(job_deadline, lane=fair_share.JOB, flow=job_id)
+                fetch = {'status': 'ok', 'attempts': 0}
                 try:
-                    context = ssl.create_default_context()
-                    context.check_hostname = False
-                    context.verify_mode = ssl.CERT_NONE
-                    req = urllib.request.Request(api_url)
-                    req.add_header('User-Agent', 'Warframe-Market-Proxy/1.0')
-                    req.add_header('Platform', 'pc')
-                    req.add_header('accept', 'application/json')
-                    
-                    with urllib.request.urlopen(req, context=context) as response:
-                        status = response.status
-                        data = response.read()
-                        try:
-                            orders_json = json.loads(data.decode('utf-8'))
-                            all_orders = orders_json.get('payload', {}).get('orders', [])
-                            ingame_orders = [o for o in all_orders if o.get('user', {}).get('status') == 'ingame']
-                            print(f'[DEBUG] [Job {job_id}] {item_name}: {len(all_orders)} total orders, {len(ingame_orders)} ingame orders')
-                            return item_id, ingame_orders
-                        except Exception as je:
-                            print(f'[DEBUG] [Job {job_id}] JSON error for {item_name} (status {status}): {je}\nResponse: {data[:200]!r}')
-                            return item_id, []
+                    timings = {}
+                    response = upstream_get(f'/items/{url_name}/orders?include=item', timings=timings,
+                                            deadline=job_deadline, wait=rate_limit_wait, info=fetch)
+                    profile.add_timings(timings)
+                    status = response.status
+                    data = response.body
+                    if status == 429:
+                        set_rate_limited()
+                        print(f'[RATE LIMIT] HTTP 429 detected for {item_name}')
+                        fetch.update(status='rate_limited', http_status=429)
+                        return item_id, None
+                    if status == 404:
+                        fetch['status'] = 'not_found'
+                        return item_id, []
+                    if status != 200:
+                        print(f'[DEBUG] [Job {job_id}] HTTP {status} fetching orders for {item_name}')
+                        fetch.update(status='http_error', http_status=status)
+                        return item_id, None
+                    try:
+                        # The memo holds (url_name, fetched_at, in-game records) of a body seen before; the
+                        # full book is read back from order_book_cache while it still holds that copy
+                        digest = body_digest(data)
+                        parsed = parsed_book_memo.get(digest)
+                        renewed = parsed and parsed[0] == url_name and order_book_cache.renew(url_name, parsed[1])
+                        if renewed:
+                            fetched_at, all_orders = renewed
+                            total_orders = len(all_orders)
+                            ingame_orders = parsed[2]
+                        elif analysis_pool is not None:
+                            # Decode, filter and analyze in a worker process; the batch analysis below
+                            # then hits the memo. The full book comes back as a compact snapshot record,
+                            # cached as-is (decoded only if something reads it) with its price sample.
+                            with profile.phase('process_pool'):
+                                result = analysis_pool.analyze(data, item_name, item_id, min_profit, max_investment,
+                                                               max_order_age, scan_now, url_name)
+                            ingame_orders = records_from_tuples(result.orders)
+                            calc.remember(ingame_orders, item_name, item_id, max_order_age,
+                                          result.opportunities, result.expires_at)
+                            _, _, fetched_at, total_orders, _ = RECORD_HEADER.unpack_from(result.record)
+                            order_book_cache.put_record(url_name, result.record, fetched_at)
+                            price_history.record(url_name, fetched_at, *result.sample)
+                        else:
+                            with profile.phase('json_parse'):
+                                orders_json = json.loads(data)
+                            with profile.phase('ingame_filter'):
+                                all_orders = orders_json.get('payload', {}).get('orders', [])
+                                ingame_orders = [OrderRecord.from_order(o) for o in all_orders
+                                                 if o.get('user', {}).get('status') == 'ingame']
+                            fetched_at = time.time()
+                            total_orders = len(all_orders)
+                            order_book_cache.put(url_name, all_orders, fetched_at)
+                        parsed_book_memo.put(digest, (url_name, fetched_at, ingame_orders))
+                        print(f'[DEBUG] [Job {job_id}] {item_name}: {total_orders} total orders, {len(ingame_orders)} ingame orders')
+                        return item_id, ingame_orders
+                    except Exception as je:
+                        print(f'[DEBUG] [Job {job_id}] JSON error for {item_name} (status {status}): {je}\nResponse: {data[:200]!r}')
+                        fetch.update(status='invalid_response', error=str(je))
+                        return item_id, None
+                except (Cancelled, DeadlineExceeded) as e:
+                    print(f'[DEBUG] [Job {job_id}] {"Cancelled" if isinstance(e, Cancelled) else "Deadline passed"} '
+                          f'while fetching {item_name}')
+                    fetch = None
+                    return None, []
+                except CircuitOpen as e:
+                    print(f'[DEBUG] [Job {job_id}] Not fetching {item_name}: {e}')
+                    fetch.update(status='circuit_open', error=str(e))
+                    return item_id, None
                 except Exception as e:
                     print(f'[DEBUG] [Job {job_id}] Error fetching orders for {item_name}: {e}')
-                    return item_id, []
+                    fetch.update(status='timeout' if is_timeout(e) else 'error', error=str(e))
+                    return item_id, None
+                finally:
+                    if fetch is not None:
+                        record_fetch_status(item, fetch)
+                    profile.add_item(time.perf_counter() - item_started)
+            
+            def record_fetch_status(item, fetch):
+                job.record_fetch(str(item.get('id') or ''), dict(fetch, itemName=str(item.get('item_name') or '')))
+            
+            def stop_if_cancelled(where):
+                """Mark the job cancelled (or timed out) and return True if it must stop"""
+                if not job.should_stop():
+                    return False
+                error = None if job.cancelled else f'Job deadline of {TRADING_JOB_DEADLINE:g}s exceeded'
+                print(f'[DEBUG] Job {job_id} {"cancelled" if job.cancelled else "timed out"} {where}')
+                job.set_status(trading_job.CANCELLED, error)
+                profile.finish()
+                record_trading_job_metrics('cancelled', job_started, job.progress)
+                return True
             
             for batch_start in range(0, len(prime_items), batch_size):
                 # Check for cancellation before starting each batch
-                with trading_jobs_lock:
-                    if trading_jobs[job_id]['cancelled']:
-                        print(f'[DEBUG] Job {job_id} cancelled during batch processing')
-                        trading_jobs[job_id]['status'] = 'cancelled'
-                        return
+                if stop_if_cancelled('during batch processing'):
+                    return
                 
                 batch = prime_items[batch_start:batch_start+batch_size]
                 batch_start_time = time.time()
@@ -904,11 +1402,8 @@ class ProxyHandler(BaseHTTPRequestHandler):
                 # Start all threads for this batch
                 for item in batch:
                     # Check for cancellation before starting each thread
-                    with trading_jobs_lock:
-                        if trading_jobs[job_id]['cancelled']:
-                            print(f'[DEBUG] Job {job_id} cancelled before starting threads')
-                            trading_jobs[job_id]['status'] = 'cancelled'
-                            return
+                    if stop_if_cancelled('before starting threads'):
+                        return
                     
                     def make_thread_func(item_to_process):
                         def thread_func():
@@ -924,30 +1419,54 @@ class ProxyHandler(BaseHTTPRequestHandler):
                 # Wait for all threads to complete
                 for thread in threads:
                     thread.join()
+                if stop_if_cancelled('while fetching'):
+                    return
                 
                 # Collect results from all threads
                 for item_id, orders in results.items():
-                    if item_id is not None:  # Skip cancelled items
-                        orders_data[item_id] = orders
+                    if item_id is not None and orders is not None:  # Skip cancelled items and failed fetches
+                        orders_data[item_id] = snapshot.add(item_id, orders)
                 
                 # After each batch, analyze and update job results
-                batch_opps = calc.analyze_prime_items(batch, orders_data, max_order_age=max_order_age)
-                with trading_jobs_lock:
-                    trading_jobs[job_id]['results'].extend(batch_opps)
-                    trading_jobs[job_id]['progress'] += len(batch)
+                with profile.phase('analysis'):
+                    batch_opps = calc.analyze_prime_items(batch, orders_data, max_order_age=max_order_age, now=scan_now)
+                job.add_results(batch_opps, len(batch))
                 batch_time = time.time() - batch_start_time
-                print(f'[DEBUG] [Job {job_id}] Batch {batch_start//batch_size+1} complete in {batch_time:.2f}s, {trading_jobs[job_id]["progress"]}/{trading_jobs[job_id]["total"]} items processed')
+                print(f'[DEBUG] [Job {job_id}] Batch {batch_start//batch_size+1} complete in {batch_time:.2f}s, {job.progress}/{job.total} items processed')
             
-            with trading_jobs_lock:
-                trading_jobs[job_id]['status'] = 'done'
+            job.set_status(trading_job.DONE)
+            profile.finish()
+            record_trading_job_metrics('done', job_started, len(prime_items))
             print(f'[DEBUG] [Job {job_id}] Analysis complete!')
-        threading.Thread(target=batch_worker, daemon=True).start()
+            return job.upstream_fetches()
+
+        def batch_failed(error):
+            job.set_status(trading_job.ERROR, f'Trading scan failed: {error}')
+            profile.finish()
+        try:
+            position = job_scheduler.submit(job_id, batch_worker, len(prime_items),
+                                            progress=lambda: job.progress, on_error=batch_failed)
+        except QueueFull as e:
+            with trading_jobs_lock:
+                del trading_jobs[job_id]
+            print(f'[DEBUG] Rejected trading job: {e}')
+            self.send_response(503)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Retry-After', str(round(e.retry_after)))
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': 'Too many trading jobs, try again later',
+                                         'retry_after': round(e.retry_after)}).encode())
+            return
+        if not position:
+            job.set_status(trading_job.RUNNING, only_from=trading_job.QUEUED)
         # Respond with job ID
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Content-Type', 'application/json')
         self.end_headers()
-        self.wfile.write(json.dumps({'job_id': job_id}).encode())
+        self.wfile.write(json.dumps({'job_id': job_id, 'queue_position': position or None,
+                                     'eta_seconds': job_scheduler.eta(job_id) if position else None}).encode())
 
     def handle_trading_calc_progress(self):
         # Parse job_id from query string
@@ -961,44 +1480,351 @@ class ProxyHandler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({'error': 'Missing job_id'}).encode())
             return
+        if prefork_worker is not None and self.forward_to_job_owner(job_id):
+            return
+        evict_finished_jobs()
         with trading_jobs_lock:
             job = trading_jobs.get(job_id)
-            if not job:
-                self.send_response(404)
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Job not found'}).encode())
-                return
-            # Debug log for progress
-            print(f'[DEBUG] POLL job_id={job_id} progress={job["progress"]}/{job["total"]} results={len(job["results"])} status={job["status"]}')
-            # Return current progress and results so far
-            self.send_response(200)
+        if not job:
+            self.send_response(404)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({
-                'status': job['status'],
-                'progress': job['progress'],
-                'total': job['total'],
-                'results': job['results'],
-                'cancelled': job['cancelled'],
-            }).encode())
+            self.wfile.write(json.dumps({'error': 'Job not found'}).encode())
+            return
+        # An immutable snapshot: no lock is held while the response is serialized and written
+        view = job.view()
+        # Debug log for progress
+        print(f'[DEBUG] POLL job_id={job_id} progress={view.progress}/{view.total} results={len(view.results)} status={view.status}')
+        body = view._asdict()
+        body.update(
+            profile=job.profile.snapshot() if job.profile else None,
+            # Queued: place in line and seconds until it starts; running: estimated seconds left
+            queue_position=job_scheduler.position(job_id),
+            eta_seconds=job_scheduler.eta(job_id),
+        )
+        # Return current progress and results so far
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def handle_trading_reanalyze_endpoint(self, post_data):
+        """
+        Rerun a job's analysis over its fetched orders: {"job_id", "min_profit", "max_investment",
+        "max_order_age"} for one parameter set, or {"job_id", "sweep": [...] | {...}} for many.
+        Omitted parameters default to the job's own.
+        """
+        started = time.perf_counter()
+        try:
+            data = json.loads(post_data.decode('utf-8') or '{}')
+            job_id = data.get('job_id')
+            if prefork_worker is not None and self.forward_to_job_owner(job_id, post_data):
+                return
+            evict_finished_jobs()
+            with trading_jobs_lock:
+                job = trading_jobs.get(job_id) if job_id else None
+            if job is None:
+                status, body = (404 if job_id else 400), {'error': 'Job not found' if job_id else 'Missing job_id'}
+            else:
+                sweep = 'sweep' in data
+                param_sets = job_snapshot.expand_sweep(data['sweep']) if sweep else [data]
+                param_sets = [job_snapshot.parse_params(p, job.params) for p in param_sets]
+                runs = []
+                for params in param_sets:
+                    calc = TradingCalculator(params['min_profit'], params['max_investment'], params['max_order_age'],
+                                             price_history=price_history, item_statistics=item_statistics,
+                                             memo=analysis_memo)
+                    results = TradingCalculator.rank_opportunities(job.snapshot.analyze(calc, params['max_order_age']))
+                    runs.append({
+                        'params': params,
+                        'count': len(results),
+                        'total_profit': sum(opp['netProfit'] for opp in results),
+                        'results': results,
+                    })
+                status, body = 200, {
+                    'job_id': job_id,
+                    'items': len(job.snapshot),
+                    'complete': job.status == trading_job.DONE,
+                }
+                if sweep:
+                    body['sweep'] = runs
+                else:
+                    body.update(runs[0])
+                body['took_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        except (ValueError, AttributeError, TypeError) as e:
+            status, body = 400, {'error': str(e)}
+        self.send_response(status)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
 
     def handle_cancel_analysis_endpoint(self, post_data):
         global trading_analysis_cancelled
         trading_analysis_cancelled = True
         print('[DEBUG] trading_analysis_cancelled set to True by cancel endpoint')
-        # Also cancel all running jobs
+        # Also cancel all running jobs; their deadlines abort upstream fetches still in flight
         with trading_jobs_lock:
-            for job in trading_jobs.values():
+            jobs = list(trading_jobs.items())
+        for job_id, job in jobs:
+            job.cancel()
+            if job_scheduler.cancel(job_id):
+                job.set_status(trading_job.CANCELLED)
+        with syndicate_jobs_lock:
+            for job in syndicate_jobs.values():
                 job['cancelled'] = True
+            scan_deadlines = list(syndicate_deadlines.values())
+        for scan_deadline in scan_deadlines:
+            scan_deadline.cancel()
+        # Jobs accepted by the other pre-forked workers
+        if prefork_worker is not None and not self.headers.get(prefork.FORWARDED_HEADER):
+            prefork_worker.broadcast('POST', self.path, post_data)
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Content-Type', 'application/json')
         self.end_headers()
         self.wfile.write(json.dumps({'success': True, 'message': 'Analysis cancelled.'}).encode())
 
+    def handle_syndicate_scan_endpoint(self, post_data):
+        """Start a price scan over a syndicate's offerings (or 'all'); poll /api/syndicate-scan-progress"""
+        try:
+            data = json.loads(post_data.decode('utf-8') or '{}')
+            if not isinstance(data, dict):
+                raise ValueError('Expected a JSON object')
+            syndicate = str(data.get('syndicate') or syndicate_scan.ALL_SYNDICATES).strip().lower()
+            rank = syndicate_scan.MAX_MOD_RANK if data.get('rank3') else int(data.get('rank', 0))
+            online_only = bool(data.get('online_only', True))
+            index = syndicate_index.get()
+            keys = syndicate if syndicate == syndicate_scan.ALL_SYNDICATES else sorted(index.resolve_syndicates(syndicate))
+            if not keys:
+                raise KeyError(syndicate)
+            targets = syndicate_scan.scan_targets(index.data, keys)
+        except (json.JSONDecodeError, ValueError, TypeError, AttributeError):
+            self.send_response(400)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': 'Invalid JSON data'}).encode())
+            return
+        except KeyError:
+            self.send_response(404)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': f'Unknown syndicate: {syndicate}'}).encode())
+            return
+        job_id = prefork_worker.job_id(str(uuid.uuid4())) if prefork_worker else str(uuid.uuid4())
+        evict_finished_jobs()
+        with syndicate_jobs_lock:
+            syndicate_jobs[job_id] = {
+                'status': 'running',
+                'syndicate': syndicate,
+                'rank': rank,
+                'online_only': online_only,
+                'progress': 0,
+                'total': len(targets),
+                'results': [],
+                'cancelled': False,
+            }
+
+        def on_result(result):
+            with syndicate_jobs_lock:
+                syndicate_jobs[job_id]['results'].append(result)
+                syndicate_jobs[job_id]['progress'] += 1
+
+        # Bounds the whole scan like a trading job's deadline; installed in each of the scan's fetch threads,
+        # so rate-limit waits and upstream calls give up when it passes
+        scan_deadline = Deadline(TRADING_JOB_DEADLINE)
+        with syndicate_jobs_lock:
+            syndicate_deadlines[job_id] = scan_deadline
+
+        def cancel_check():
+            return scan_deadline.cancelled or scan_deadline.expired()
+
+        def load_orders(url_name):
+            # Books the cache has to fetch wait in the job lane as this scan's flow, behind interactive requests
+            with deadlines.use(scan_deadline), fair_share.use(fair_share.JOB, job_id):
+                return order_book_cache.get(url_name)
+
+        def scan_worker():
+            status, error = 'error', None
+            try:
+                with deadlines.use(scan_deadline):
+                    completed = syndicate_scan.run_scan(targets, load_orders, on_result, rank, online_only,
+                                                        workers=REQUESTS_PER_SECOND * 2, cancel_check=cancel_check)
+                # Fetches aborted by /api/cancel-analysis end as unpriced items, so check the deadline too
+                completed = completed and not scan_deadline.cancelled
+                status = 'done' if completed else 'cancelled'
+                print(f'[SYNDICATE] [Job {job_id}] Scan of {syndicate} {"complete" if completed else "cancelled"}')
+            except Exception as e:
+                error = f'Syndicate scan failed: {e}'
+                print(f'[SYNDICATE] [Job {job_id}] {error}')
+            finally:
+                # Finished jobs, failed ones included, stop the UI polling and are evicted after the retention period
+                with syndicate_jobs_lock:
+                    syndicate_jobs[job_id]['status'] = status
+                    syndicate_jobs[job_id]['finished_at'] = time.time()
+                    if error is not None:
+                        syndicate_jobs[job_id]['error'] = error
+                    syndicate_deadlines.pop(job_id, None)
+        threading.Thread(target=scan_worker, daemon=True).start()
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({'job_id': job_id, 'total': len(targets)}).encode())
+
+    def handle_syndicate_items_endpoint(self):
+        """
+        Query the syndicate catalogue through the precompiled index, e.g.
+        /api/syndicate-items?syndicate=suda&type=mods&prefix=ene&max_standing=25000&limit=20
+        """
+        started = time.perf_counter()
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        try:
+            index = syndicate_index.get()
+            min_standing = int(params['min_standing']) if params.get('min_standing') else None
+            max_standing = int(params['max_standing']) if params.get('max_standing') else None
+            limit = int(params['limit']) if params.get('limit') else None
+            if limit is not None and limit < 0:
+                raise ValueError(f'limit must not be negative: {limit}')
+        except ValueError as e:
+            self.send_response(400)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            return
+        items = index.query(params.get('syndicate'), params.get('type'), params.get('prefix'),
+                            min_standing, max_standing, limit)
+        syndicates = sorted(index.resolve_syndicates(params['syndicate'])) if params.get('syndicate') else sorted({i['syndicate'] for i in items})
+        body = json.dumps({
+            'syndicates': [index.syndicates[key] for key in syndicates],
+            'count': len(items),
+            'items': items,
+            'took_us': round((time.perf_counter() - started) * 1e6, 1),
+        }).encode()
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_search_endpoint(self):
+        """Autocomplete over the item catalogue: /api/search?q=ash%20pr&limit=10"""
+        started = time.perf_counter()
+        params = parse_qs(urlparse(self.path).query)
+        query = params.get('q', [''])[0]
+        try:
+            limit = max(1, min(int(params.get('limit', ['10'])[0]), 100))
+        except ValueError:
+            limit = 10
+        try:
+            index = item_catalogue.get()
+        except Exception as e:
+            print(f'[SEARCH] Error loading item catalogue: {e}')
+            index = None
+        if index is None:
+            self.send_response(503)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': 'Item catalogue unavailable'}).encode())
+            return
+        body = json.dumps({
+            'query': query,
+            'results': index.search(query, limit),
+            'catalogue_size': len(index),
+            'took_us': round((time.perf_counter() - started) * 1e6, 1),
+        }).encode()
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_syndicate_scan_progress(self):
+        """Progress of a syndicate scan; results so far are ranked by platinum per standing"""
+        params = parse_qs(urlparse(self.path).query)
+        job_id = params.get('job_id', [None])[0]
+        if prefork_worker is not None and self.forward_to_job_owner(job_id):
+            return
+        evict_finished_jobs()
+        with syndicate_jobs_lock:
+            job = syndicate_jobs.get(job_id) if job_id else None
+            snapshot = dict(job, results=list(job['results'])) if job else None
+        if not snapshot:
+            self.send_response(400 if not job_id else 404)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': 'Missing job_id' if not job_id else 'Job not found'}).encode())
+            return
+        snapshot['results'] = syndicate_scan.rank_results(snapshot['results'])
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(snapshot).encode())
+
+    def handle_market_watcher_status(self):
+        """Coverage and freshness of the watcher's order-book snapshot"""
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        status = market_watcher.status()
+        if order_book_cache.store is not None:
+            status['snapshot_store'] = order_book_cache.store.stats()
+        status['statistics'] = item_statistics.status()
+        status['upstream'] = upstream_resilience.status()
+        status['trading_jobs'] = job_scheduler.status()
+        status['rate_limit_lanes'] = upstream_lanes.status()
+        status['cache'] = cache.stats()
+        self.wfile.write(json.dumps(status).encode())
+
+    def handle_price_history_endpoint(self):
+        """Recorded price series: /api/price-history?item=<url_name>&start=<epoch>&end=<epoch>&resolution=1h"""
+        params = parse_qs(urlparse(self.path).query)
+        url_name = params.get('item', [''])[0]
+        try:
+            start = float(params['start'][0]) if 'start' in params else None
+            end = float(params['end'][0]) if 'end' in params else None
+            result = price_history.query(url_name, start, end, params.get('resolution', [None])[0]) if url_name else None
+        except ValueError as e:
+            result, error, status = None, str(e), 400
+        else:
+            error, status = ('Missing item', 400) if not url_name else ('No history for item', 404)
+        if result is None:
+            self.send_response(status)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': error}).encode())
+            return
+        result['stats'] = price_history.stats(url_name)
+        body = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_metrics_endpoint(self):
+        """Expose the metrics registry in Prometheus text format"""
+        body = metrics.REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def handle_my_wtb_orders_endpoint(self):
         """Fetch the logged-in user's current WTB (buy) orders from Warframe Market and return as JSON, merging metadata."""
         # Check authentication
@@ -1022,7 +1848,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             self.wfile.write(error_response.encode())
             return
         try:
-            api_url = f'https://api.warframe.market/v1/profile/{username}/orders'
+            api_url = f'{API_BASE_URL}/profile/{username}/orders'
             context = ssl.create_default_context()
             context.check_hostname = False
             context.verify_mode = ssl.CERT_NONE
@@ -1042,7 +1868,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
                     jwt_token = value[7:]
             if jwt_token:
                 req.add_header('Cookie', f'JWT={jwt_token}')
-            with urllib.request.urlopen(req, context=context) as response:
+            with timed_urlopen(req, context=context) as response:
                 data = response.read()
                 orders_json = json.loads(data.decode('utf-8'))
                 buy_orders = orders_json.get('payload', {}).get('buy_orders', [])
@@ -1110,7 +1936,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
 
             # First, fetch all user's orders to get the WTB order IDs
             print(f"[DEBUG] Fetching orders for user: {username}")
-            fetch_url = f'https://api.warframe.market/v1/profile/{username}/orders'
+            fetch_url = f'{API_BASE_URL}/profile/{username}/orders'
             
             context = ssl.create_default_context()
             context.check_hostname = False
@@ -1136,7 +1962,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
                         jwt_token = value[7:]
                 if jwt_token:
                     fetch_req.add_header('Cookie', f'JWT={jwt_token}')
-            with urllib.request.urlopen(fetch_req, context=context) as response:
+            with timed_urlopen(fetch_req, context=context) as response:
                 data = response.read()
                 orders_json = json.loads(data.decode('utf-8'))
                 buy_orders = orders_json.get('payload', {}).get('buy_orders', [])
@@ -1163,7 +1989,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
                     if not order_id:
                         continue
                         
-                    delete_url = f'https://api.warframe.market/v1/profile/orders/{order_id}'
+                    delete_url = f'{API_BASE_URL}/profile/orders/{order_id}'
                     print(f"[DEBUG] Deleting order {order_id}")
                     
                     delete_req = urllib.request.Request(delete_url, method='DELETE')
@@ -1176,7 +2002,8 @@ class ProxyHandler(BaseHTTPRequestHandler):
                         if jwt_token:
                             delete_req.add_header('Cookie', f'JWT={jwt_token}')
                     try:
-                        with urllib.request.urlopen(delete_req, context=context) as delete_response:
+                        wait_for_rate_limit_slot(lane=fair_share.WRITE)
+                        with timed_urlopen(delete_req, context=context) as delete_response:
                             if delete_response.status == 200:
                                 deleted_count += 1
                                 print(f"[DEBUG] Successfully deleted order {order_id}")
@@ -1231,9 +2058,23 @@ class ProxyHandler(BaseHTTPRequestHandler):
 
     def debug_item_details(self, item_id):
         """Debug helper to fetch item details when order creation fails"""
+        # Resolve locally when the catalogue index is loaded; no upstream calls needed
+        index = item_catalogue.peek()
+        if index is not None:
+            item_info = index.get(item_id)
+            if item_info:
+                print(f"[DEBUG] Item found: {item_info.get('item_name', 'Unknown')} (ID: {item_info.get('id')})")
+                return item_info
+            matches = index.search(item_id, limit=3)
+            for item in matches:
+                print(f"[DEBUG]   - {item.get('item_name', 'Unknown')} (ID: {item.get('id')})")
+            if not matches:
+                print(f"[DEBUG] Could not find any details for item_id: {item_id}")
+            return matches[0] if matches else None
+        
         try:
             # First try to get the item by ID
-            item_url = f'https://api.warframe.market/v1/items/{item_id}'
+            item_url = f'{API_BASE_URL}/items/{item_id}'
             context = ssl.create_default_context()
             context.check_hostname = False
             context.verify_mode = ssl.CERT_NONE
@@ -1242,7 +2083,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             req.add_header('Platform', 'pc')
             req.add_header('accept', 'application/json')
             
-            with urllib.request.urlopen(req, context=context) as response:
+            with timed_urlopen(req, context=context) as response:
                 item_data = response.read()
                 item_json = json.loads(item_data.decode('utf-8'))
                 print(f"[DEBUG] Item details by ID: {item_json}")
@@ -1255,7 +2096,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
         
         # If that fails, try to search for the item
         try:
-            search_url = f'https://api.warframe.market/v1/items/search?q={item_id}'
+            search_url = f'{API_BASE_URL}/items/search?q={item_id}'
             context = ssl.create_default_context()
             context.check_hostname = False
             context.verify_mode = ssl.CERT_NONE
@@ -1264,7 +2105,7 @@ class ProxyHandler(BaseHTTPRequestHandler):
             req.add_header('Platform', 'pc')
             req.add_header('accept', 'application/json')
             
-            with urllib.request.urlopen(req, context=context) as response:
+            with timed_urlopen(req, context=context) as response:
                 search_data = response.read()
                 search_json = json.loads(search_data.decode('utf-8'))
                 print(f"[DEBUG] Search results: {search_json}")
@@ -1281,17 +2122,123 @@ class ProxyHandler(BaseHTTPRequestHandler):
         print(f"[DEBUG] Could not find any details for item_id: {item_id}")
         return None
 
-def run_server(port=8000):
+def save_price_history(path, stop_event, interval=PRICE_HISTORY_SAVE_INTERVAL):
+    """Periodically write price_history to path until stop_event is set (then save once more)"""
+    while True:
+        stopping = stop_event.wait(interval)
+        try:
+            price_history.save(path)
+        except OSError as e:
+            print(f'[HISTORY] Failed to save {path}: {e}')
+        if stopping:
+            return
+
+SERVER_CLASSES = {'threading': ThreadingHTTPServer, 'asyncio': AsyncHTTPServer}
+
+class ReusePortHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that shares its port with the other pre-forked workers"""
+    allow_reuse_port = True
+
+def make_server(server_mode, server_address, reuse_port=False):
+    if not reuse_port:
+        return SERVER_CLASSES[server_mode](server_address, ProxyHandler)
+    if server_mode == 'asyncio':
+        return AsyncHTTPServer(server_address, ProxyHandler, reuse_port=True)
+    return ReusePortHTTPServer(server_address, ProxyHandler)
+
+def run_server(port=8000, watch=MARKET_WATCHER_ENABLED, snapshot_dir=SNAPSHOT_DIR, analysis_processes=ANALYSIS_PROCESSES,
+               server_mode=SERVER_MODE, workers=prefork.WORKERS):
+    if server_mode not in SERVER_CLASSES:
+        raise ValueError(f'Unknown server mode {server_mode!r} (expected one of {", ".join(SERVER_CLASSES)})')
+    if workers > 1:
+        run_workers(workers, port, watch, snapshot_dir, analysis_processes, server_mode)
+        return
+    global analysis_pool, shared_rate_window, price_history, item_statistics
+    if cache.shared:
+        # Every node (and worker) on the backend shares the books, the catalogue and the upstream rate limit
+        order_book_cache.attach_store(cache_backend.BackendBookStore(cache))
+        item_catalogue.attach_store(cache_backend.CatalogueStore(cache))
+        shared_rate_window = cache_backend.RateLimitTokens(cache, RATE_LIMIT, RATE_PERIOD)
+        print(f'[CACHE] Sharing order books, the catalogue and the rate limit via {cache.host}:{cache.port}')
+    elif prefork_worker is not None:
+        # Books any worker fetched, kept (and persisted) by the coordinator
+        order_book_cache.attach_store(prefork_worker.books)
+        shared_rate_window = prefork_worker.rate_window
+    if prefork_worker is not None:
+        # One price history and one set of item statistics for all workers; worker 0 refreshes the statistics
+        price_history = prefork_worker.price_history
+        item_statistics = prefork.SharedItemStatistics(prefork_worker.item_statistics, request_item_statistics,
+                                                       watched_prime_items, try_acquire_rate_limit_slot,
+                                                       ttl=ITEM_STATISTICS_TTL)
+    if analysis_processes > 0:
+        analysis_pool = AnalysisPool(analysis_processes)
+        print(f'[POOL] Analyzing order books in {analysis_pool.processes} worker processes')
+    history_saver = None
+    stop_history_saver = threading.Event()
+    if snapshot_dir and (prefork_worker is None or prefork_worker.index == 0):
+        if order_book_cache.store is None:
+            # Books from the previous run are read from disk on demand; the watcher refreshes stale ones
+            order_book_cache.attach_store(SnapshotStore(snapshot_dir))
+        history_path = os.path.join(snapshot_dir, 'price_history.bin')
+        if os.path.exists(history_path):
+            try:
+                price_history.load(history_path)
+                print(f'[HISTORY] Loaded price history for {len(price_history)} items')
+            except (OSError, ValueError, EOFError) as e:
+                print(f'[HISTORY] Ignoring unreadable {history_path}: {e}')
+        history_saver = threading.Thread(target=save_price_history, args=(history_path, stop_history_saver),
+                                         name='price-history-saver', daemon=True)
+        history_saver.start()
     server_address = ('', port)
-    httpd = ThreadingHTTPServer(server_address, ProxyHandler)
-    print(f"Proxy server running on http://localhost:{port}")
-    print("This server handles CORS and proxies requests to Warframe Market API")
-    print("Press Ctrl+C to stop the server")
+    httpd = make_server(server_mode, server_address, reuse_port=prefork_worker is not None)
+    if prefork_worker is not None:
+        # Other workers forward progress polls for this worker's jobs here
+        control = ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+        threading.Thread(target=control.serve_forever, name='prefork-control', daemon=True).start()
+        prefork_worker.register(control.server_address[1])
+        print(f'[PREFORK] Worker {prefork_worker.index} (pid {os.getpid()}) serving port {port}')
+        watch = watch and prefork_worker.index == 0
+    else:
+        print(f"Proxy server running on http://localhost:{port} ({server_mode} mode)")
+        print("This server handles CORS and proxies requests to Warframe Market API")
+        print("Press Ctrl+C to stop the server")
+    if watch:
+        market_watcher.start()
+        item_statistics.start()
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down server...")
+        market_watcher.stop()
+        item_statistics.stop()
         httpd.shutdown()
+        if order_book_cache.store is not None:
+            order_book_cache.store.close()
+        if history_saver is not None:
+            stop_history_saver.set()
+            history_saver.join()
+        if analysis_pool is not None:
+            analysis_pool.shutdown()
+
+def run_workers(workers, port, watch, snapshot_dir, analysis_processes, server_mode):
+    """Pre-fork `workers` processes serving one port; the rate limit and order books are shared (see prefork)"""
+    reserved = prefork.reserve_port(port)
+    port = reserved.getsockname()[1]
+    print(f"Proxy server running on http://localhost:{port} ({workers} {server_mode} workers)")
+    print("Press Ctrl+C to stop the server")
+
+    def worker_main(index, worker, port):
+        global prefork_worker
+        reserved.close()
+        prefork_worker = worker
+        run_server(port, watch=watch, snapshot_dir=snapshot_dir, analysis_processes=analysis_processes,
+                   server_mode=server_mode, workers=1)
+
+    try:
+        prefork.serve(workers, port, worker_main, RATE_LIMIT, RATE_PERIOD, snapshot_dir or None,
+                      ITEM_STATISTICS_TTL)
+    finally:
+        reserved.close()
 
 def handle_dummy_proxy(self):
     """A dummy proxy endpoint for testing."""
@@ -1303,4 +2250,17 @@ def handle_dummy_proxy(self):
     self.wfile.write(json.dumps(response).encode())
 
 if __name__ == '__main__':
-    run_server() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description='Warframe Market CORS proxy server')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--no-watch', action='store_true', help='Do not start the background market watcher')
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR, help='Order-book snapshot directory ("" to disable)')
+    parser.add_argument('--analysis-processes', type=int, default=ANALYSIS_PROCESSES,
+                        help='Decode and analyze order books in this many worker processes (0 = off)')
+    parser.add_argument('--server-mode', choices=sorted(SERVER_CLASSES), default=SERVER_MODE,
+                        help='Thread per connection, or all connections on one asyncio event loop')
+    parser.add_argument('--workers', type=int, default=prefork.WORKERS,
+                        help='Serve the port from this many pre-forked processes sharing the rate limit and order books')
+    args = parser.parse_args()
+    run_server(args.port, watch=MARKET_WATCHER_ENABLED and not args.no_watch, snapshot_dir=args.snapshot_dir,
+               analysis_processes=args.analysis_processes, server_mode=args.server_mode, workers=args.workers)
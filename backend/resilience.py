@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Retries and circuit breakers for upstream GETs.
+
+Transient failures (connection errors, timeouts, 5xx) are retried a few
+times with full-jitter exponential backoff, as long as the retry budget
+allows: retries may add at most RETRY_RATIO extra requests on top of the
+requests sent, so an outage does not multiply upstream load. Each
+endpoint family (metrics.upstream_family) has its own circuit breaker:
+after FAILURE_THRESHOLD consecutive failures it opens and calls fail fast
+with CircuitOpen; after RESET_TIMEOUT one half-open probe is let through,
+and its outcome closes or reopens the circuit.
+
+429 responses are neither retried nor counted as failures; the proxy's
+rate limiter deals with them.
+"""
+import http.client
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from backend import deadline as deadlines
+from backend import metrics
+from backend.deadline import Cancelled, Deadline, DeadlineExceeded
+
+ATTEMPTS = int(os.environ.get('UPSTREAM_RETRY_ATTEMPTS', 3))  # tries per call, including the first
+BASE_DELAY = 0.25  # seconds; backoff before retry n is uniform(0, min(MAX_DELAY, BASE_DELAY * 2**n))
+MAX_DELAY = 4.0
+RETRY_RATIO = 0.2
+RETRY_BUDGET_CAPACITY = 10
+FAILURE_THRESHOLD = int(os.environ.get('UPSTREAM_BREAKER_THRESHOLD', 5))
+RESET_TIMEOUT = float(os.environ.get('UPSTREAM_BREAKER_RESET', 30))  # seconds
+
+RETRYABLE_STATUSES = frozenset((500, 502, 503, 504))
+RETRYABLE_ERRORS = (OSError, http.client.HTTPException)  # includes socket timeouts and resets
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    """Upstream for this endpoint family is failing; the call was not attempted"""
+    def __init__(self, family: str, retry_after: float):
+        super().__init__(f'circuit open for {family} (retry in {retry_after:.0f}s)')
+        self.family = family
+        self.retry_after = retry_after
+
+
+def backoff_delay(retry: int, base: float = BASE_DELAY, cap: float = MAX_DELAY, rng=random) -> float:
+    """Full-jitter exponential backoff before the given retry (0 = first retry)"""
+    return rng.uniform(0, min(cap, base * 2 ** retry))
+
+
+class RetryBudget:
+    """Token bucket (starting full): every request deposits `ratio` tokens, every retry spends one"""
+    def __init__(self, ratio: float = RETRY_RATIO, capacity: float = RETRY_BUDGET_CAPACITY):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            return self._tokens
+
+
+class CircuitBreaker:
+    def __init__(self, family: str, threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.family = family
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.CIRCUIT_STATE.labels(self.family).set(_STATE_VALUES[state])
+
+    def before_call(self):
+        """:raises CircuitOpen: unless the call may go ahead (closed, or the single half-open probe)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            waited = self.clock() - self.opened_at
+            if self.state == OPEN and waited >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            metrics.CIRCUIT_REJECTED.labels(self.family).inc()
+            raise CircuitOpen(self.family, max(0.0, self.reset_timeout - waited))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                print(f'[CIRCUIT] {self.family} closed')
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state != OPEN:
+                    print(f'[CIRCUIT] {self.family} open after {self.failures} failures')
+                self._probing = False
+                self.opened_at = self.clock()
+                self._set_state(OPEN)
+
+    def release_probe(self):
+        """The half-open probe ended without a verdict (e.g. cancelled); let another one through"""
+        with self._lock:
+            self._probing = False
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+class Resilience:
+    """
+    Retry policy, retry budget and one CircuitBreaker per endpoint family.
+    :param attempts: Tries per call, including the first
+    :param rng: Source of backoff jitter
+    """
+    def __init__(self, attempts: int = ATTEMPTS, threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT,
+                 budget: Optional[RetryBudget] = None, rng=random):
+        self.attempts = max(1, attempts)
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.budget = budget or RetryBudget()
+        self.rng = rng
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, family: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(family)
+            if breaker is None:
+                breaker = self._breakers[family] = CircuitBreaker(family, self.threshold, self.reset_timeout)
+            return breaker
+
+    def call(self, family: str, send: Callable, deadline: Optional[Deadline] = None, retry: bool = True,
+             info: Optional[Dict] = None):
+        """
+        Run send() (one upstream GET returning a MarketResponse) through the family's breaker,
+        retrying transient failures.
+        :param retry: False for callers that retry on their own schedule (background refreshers)
+        :param info: Optional dict filled with 'attempts'
+        :return: The last response; 5xx responses are returned once retries are exhausted
+        :raises CircuitOpen: if the family's circuit is open
+        :raises: the last error if every attempt failed with one
+        """
+        deadline = deadline or deadlines.current()
+        breaker = self.breaker(family)
+        info = info if info is not None else {}
+        attempts = self.attempts if retry else 1
+        for attempt in range(attempts):
+            info['attempts'] = attempt + 1
+            breaker.before_call()
+            self.budget.deposit()
+            try:
+                response = send()
+            except (Cancelled, DeadlineExceeded):
+                breaker.release_probe()
+                raise
+            except RETRYABLE_ERRORS as e:
+                breaker.record_failure()
+                if not self._may_retry(family, attempt, attempts, deadline):
+                    raise
+                print(f'[RETRY] {family} attempt {attempt + 1} failed: {e}')
+                continue
+            except Exception:
+                breaker.release_probe()
+                raise
+            if response.status in RETRYABLE_STATUSES:
+                breaker.record_failure()
+                if not self._may_retry(family, attempt, attempts, deadline):
+                    return response
+                print(f'[RETRY] {family} attempt {attempt + 1} answered HTTP {response.status}')
+                continue
+            if response.status == 429:
+                breaker.release_probe()
+            else:
+                breaker.record_success()
+            return response
+
+    def _may_retry(self, family: str, attempt: int, attempts: int, deadline: Deadline) -> bool:
+        """Sleep the backoff (cut short by cancellation) and return True if another attempt is allowed"""
+        if attempt + 1 >= attempts or not self.budget.try_spend():
+            return False
+        delay = backoff_delay(attempt, rng=self.rng)
+        if delay >= deadline.remaining():
+            return False
+        metrics.UPSTREAM_RETRIES.labels(family).inc()
+        deadline.sleep(delay)
+        return True
+
+    def status(self) -> Dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'retry_tokens': round(self.budget.tokens, 2),
+            'circuits': {family: breaker.status() for family, breaker in sorted(breakers.items())},
+        }
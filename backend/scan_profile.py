@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-job timing profile for trading scans.
+
+Splits where a scan spends its time (rate limiter, network, parsing,
+filtering, analysis) so slow scans can be tuned with the right knob.
+"""
+import contextlib
+import math
+import threading
+import time
+from typing import Dict, List
+
+# Phases in pipeline order
+PHASES = (
+    'rate_limit_wait',
+    'connect',
+    'ttfb',
+    'body_read',
+    'json_parse',
+    'ingame_filter',
+    'process_pool',  # decode + filter + analysis in an AnalysisPool worker (optional)
+    'analysis',
+)
+NETWORK_PHASES = ('connect', 'ttfb', 'body_read')
+CPU_PHASES = ('json_parse', 'ingame_filter', 'process_pool', 'analysis')
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'p50': round(percentile(ordered, 50), 6),
+        'p95': round(percentile(ordered, 95), 6),
+        'p99': round(percentile(ordered, 99), 6),
+        'max': round(ordered[-1], 6) if ordered else 0.0,
+    }
+
+
+class ScanProfile:
+    """Accumulates phase timings for one trading job; safe to update from fetch threads"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+        self._totals = {phase: 0.0 for phase in PHASES}
+        self._samples: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        self._item_times: List[float] = []
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self._totals[phase] += seconds
+            self._samples[phase].append(seconds)
+
+    def add_timings(self, timings: Dict[str, float]):
+        """Record a dict of phase -> seconds (e.g. from MarketClient.get)"""
+        with self._lock:
+            for phase, seconds in timings.items():
+                if phase in self._totals:
+                    self._totals[phase] += seconds
+                    self._samples[phase].append(seconds)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add_item(self, seconds: float):
+        """Record the end-to-end time spent on one item"""
+        with self._lock:
+            self._item_times.append(seconds)
+
+    def finish(self):
+        self.finished = time.time()
+
+    def snapshot(self) -> Dict:
+        """JSON-serialisable view of the profile so far"""
+        with self._lock:
+            totals = dict(self._totals)
+            samples = {phase: list(values) for phase, values in self._samples.items()}
+            item_times = list(self._item_times)
+        wall = (self.finished or time.time()) - self.started
+        accounted = sum(totals.values())
+        phases = {}
+        for phase in PHASES:
+            phases[phase] = {
+                'total_seconds': round(totals[phase], 6),
+                'share': round(totals[phase] / accounted, 4) if accounted else 0.0,
+                'per_call': _summary(samples[phase]),
+            }
+        buckets = {
+            'rate_limiter': totals['rate_limit_wait'],
+            'network': sum(totals[p] for p in NETWORK_PHASES),
+            'cpu': sum(totals[p] for p in CPU_PHASES),
+        }
+        return {
+            'wall_seconds': round(wall, 3),
+            'phases': phases,
+            'items': _summary(item_times),
+            'items_per_second': round(len(item_times) / wall, 3) if wall > 0 else 0.0,
+            'bound_by': max(buckets, key=buckets.get) if accounted else None,
+        }
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Optional process pool for the CPU-bound part of trading scans.
+
+With many fetch threads, JSON decoding, the in-game filter and
+TradingCalculator all contend for one GIL. An AnalysisPool hands each raw
+response body to a worker process, which decodes, filters and analyzes it
+and returns only plain tuples: the in-game orders as OrderRecord fields,
+the opportunities and when that verdict expires. Given the item's url_name
+it also returns the whole book as a compact snapshot record plus its price
+history sample, so the scan caches the record as-is (OrderBookCache.put_record)
+and never decodes the book in the parent. The body crosses the process
+boundary once and no order dicts come back.
+
+Workers are spawned (not forked) because the proxy is multi-threaded.
+"""
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from backend.order_record import OrderRecord
+from backend.price_history import book_sample
+from backend.snapshot_store import encode_orders
+from backend.trading_calculator import TradingCalculator
+
+
+class WorkerResult(NamedTuple):
+    orders: List[tuple]                 # OrderRecord field tuples of the in-game orders
+    opportunities: List[Dict[str, Any]]
+    expires_at: float
+    record: Optional[bytes] = None      # snapshot_store.encode_orders of the whole book, if url_name was given
+    sample: Optional[tuple] = None      # price_history.book_sample of the whole book, if url_name was given
+
+
+def _quiet_worker():
+    # TradingCalculator's debug output would interleave across processes
+    sys.stdout = open(os.devnull, 'w')
+
+
+def analyze_response(body: bytes, item_name: str, item_id: str, min_profit, max_investment, max_order_age,
+                     now=None, url_name: Optional[str] = None) -> WorkerResult:
+    """Decode one /items/{url_name}/orders response, keep in-game orders and analyze them"""
+    orders = json.loads(body).get('payload', {}).get('orders', [])
+    ingame = [OrderRecord.from_order(o) for o in orders if (o.get('user') or {}).get('status') == 'ingame']
+    calc = TradingCalculator(min_profit, max_investment, max_order_age)
+    opportunities, expires_at = calc.analyze_with_expiry(ingame, item_name, item_id, max_order_age, now)
+    fields = OrderRecord.__slots__
+    record = encode_orders(url_name, orders, time.time()) if url_name else None
+    sample = book_sample(orders) if url_name else None
+    return WorkerResult([tuple(getattr(r, f) for f in fields) for r in ingame], opportunities, expires_at,
+                        record, sample)
+
+
+def records_from_tuples(rows: List[tuple]) -> List[OrderRecord]:
+    return [OrderRecord(*row) for row in rows]
+
+
+class AnalysisPool:
+    """
+    :param processes: Worker processes (defaults to the CPU count)
+    """
+    def __init__(self, processes: int = 0):
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_quiet_worker)
+
+    def analyze(self, body: bytes, item_name: str, item_id: str, min_profit, max_investment, max_order_age,
+                now=None, url_name: Optional[str] = None) -> WorkerResult:
+        """Run analyze_response in a worker and wait for it (the calling thread releases the GIL meanwhile)"""
+        return self._executor.submit(analyze_response, body, item_name, item_id,
+                                     min_profit, max_investment, max_order_age, now, url_name).result()
+
+    def map(self, jobs: List[tuple]) -> List[WorkerResult]:
+        """analyze_response over (body, item_name, item_id, min_profit, max_investment, max_order_age[, now[, url_name]]) tuples"""
+        if not jobs:
+            return []
+        chunksize = max(1, len(jobs) // (self.processes * 4))
+        return list(self._executor.map(analyze_response, *zip(*jobs), chunksize=chunksize))
+
+    def shutdown(self):
+        with contextlib.suppress(Exception):
+            self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Persistent order-book snapshot store.
+
+Books are appended to segment files as columnar records: one array per
+order field (price, quantity, type, status, rank, timestamps) plus one
+string blob, so a book decodes with a handful of array copies. The latest
+record per item wins; an item index is rebuilt on open by walking record
+headers through a memory map, without decoding any book. When a segment
+fills up and most of its records are superseded, live books are compacted
+into a fresh segment.
+
+Record layout (little-endian):
+    RECORD_HEADER (record length, name length, fetched_at, order count, strings length)
+    url_name
+    columns: platinum i32, quantity i32, order_type u8, status u8, mod_rank i16,
+             visible u8, creation_date f64, last_update f64 (epoch seconds)
+    strings: order id, user id, ingame name per order, NUL-separated
+
+Only the fields scans and the frontend use are kept (see decode_orders).
+"""
+import datetime
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from backend.timestamps import parse_epoch_ms
+
+MAGIC = b'WFMSEG01'
+RECORD_HEADER = struct.Struct('<IHdII')
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+SEGMENT_PATTERN = re.compile(r'^segment-(\d{6})\.wfs$')
+
+ORDER_TYPES = ('sell', 'buy')
+STATUSES = ('other', 'ingame', 'online', 'offline')
+# (field, array typecode) in on-disk order
+COLUMNS = (
+    ('platinum', 'i'),
+    ('quantity', 'i'),
+    ('order_type', 'B'),
+    ('status', 'B'),
+    ('mod_rank', 'h'),
+    ('visible', 'B'),
+    ('creation_date', 'd'),
+    ('last_update', 'd'),
+)
+_SWAP = sys.byteorder != 'little'
+
+
+def to_epoch(value) -> float:
+    """ISO-8601 timestamp -> epoch seconds (NaN if missing or unparsable)"""
+    millis = parse_epoch_ms(value)
+    return math.nan if millis is None else millis / 1000
+
+
+def to_iso(epoch: float) -> Optional[str]:
+    """Epoch seconds -> the API's timestamp format (2024-01-02T03:04:05.000+00:00)"""
+    if math.isnan(epoch):
+        return None
+    moment = datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f'{moment.microsecond // 1000:03d}+00:00'
+
+
+def encode_orders(url_name: str, orders: List[Dict], fetched_at: float) -> bytes:
+    columns = {name: array(code) for name, code in COLUMNS}
+    strings = []
+    for order in orders:
+        user = order.get('user') or {}
+        rank = order.get('mod_rank')
+        status = user.get('status')
+        columns['platinum'].append(int(order.get('platinum') or 0))
+        columns['quantity'].append(int(order.get('quantity') or 0))
+        columns['order_type'].append(1 if order.get('order_type') == 'buy' else 0)
+        columns['status'].append(STATUSES.index(status) if status in STATUSES else 0)
+        columns['mod_rank'].append(-1 if rank is None else int(rank))
+        columns['visible'].append(0 if order.get('visible') is False else 1)
+        columns['creation_date'].append(to_epoch(order.get('creation_date')))
+        columns['last_update'].append(to_epoch(order.get('last_update')))
+        strings.extend((str(order.get('id') or ''), str(user.get('id') or ''), str(user.get('ingame_name') or '')))
+    name = url_name.encode('utf-8')
+    blob = '\0'.join(strings).encode('utf-8')
+    body = []
+    for field, _ in COLUMNS:
+        column = columns[field]
+        if _SWAP:
+            column.byteswap()
+        body.append(column.tobytes())
+    payload = name + b''.join(body) + blob
+    return RECORD_HEADER.pack(RECORD_HEADER.size + len(payload), len(name), fetched_at, len(orders), len(blob)) + payload
+
+
+def decode_orders(buffer, offset: int) -> Tuple[str, float, List[Dict]]:
+    """Decode the record at offset into (url_name, fetched_at, orders)"""
+    _, name_len, fetched_at, count, strings_len = RECORD_HEADER.unpack_from(buffer, offset)
+    pos = offset + RECORD_HEADER.size
+    url_name = bytes(buffer[pos:pos + name_len]).decode('utf-8')
+    pos += name_len
+    columns = {}
+    for field, code in COLUMNS:
+        column = array(code)
+        size = column.itemsize * count
+        column.frombytes(buffer[pos:pos + size])
+        if _SWAP:
+            column.byteswap()
+        columns[field] = column
+        pos += size
+    strings = bytes(buffer[pos:pos + strings_len]).decode('utf-8').split('\0') if count else []
+    orders = []
+    for i in range(count):
+        rank = columns['mod_rank'][i]
+        order = {
+            'id': strings[3 * i],
+            'platinum': columns['platinum'][i],
+            'quantity': columns['quantity'][i],
+            'order_type': ORDER_TYPES[columns['order_type'][i]],
+            'visible': bool(columns['visible'][i]),
+            'creation_date': to_iso(columns['creation_date'][i]),
+            'last_update': to_iso(columns['last_update'][i]),
+            'user': {
+                'id': strings[3 * i + 1],
+                'ingame_name': strings[3 * i + 2],
+                'status': STATUSES[columns['status'][i]] if columns['status'][i] else None,
+            },
+        }
+        if rank >= 0:
+            order['mod_rank'] = rank
+        orders.append(order)
+    return url_name, fetched_at, orders
+
+
+class _Segment:
+    __slots__ = ('number', 'path', 'file', 'map', 'size')
+
+    def __init__(self, number: int, path: str):
+        self.number = number
+        self.path = path
+        self.file = open(path, 'a+b')
+        self.map = None
+        self.size = os.path.getsize(path)
+
+    def view(self):
+        """Memory map covering everything written so far (remapped after appends)"""
+        if self.map is None or len(self.map) < self.size:
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ)
+        return self.map
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+class SnapshotStore:
+    """
+    :param directory: Where segment files live (created on first use)
+    :param segment_max_bytes: Size at which the active segment is closed and a new one started
+    """
+    def __init__(self, directory: str, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.RLock()
+        self._segments: Dict[int, _Segment] = {}
+        self._index: Dict[str, Tuple[int, int, float, int]] = {}  # url_name -> (segment, offset, fetched_at, length)
+        self._opened = False
+
+    def _ensure_open(self):
+        if self._opened:
+            return
+        with self._lock:
+            if self._opened:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            numbers = sorted(int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(self.directory)) if m)
+            for number in numbers:
+                self._load_segment(number)
+            if not self._segments:
+                self._new_segment(1)
+            self._opened = True
+            print(f'[SNAPSHOT] Loaded index of {len(self._index)} order books from {self.directory}')
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f'segment-{number:06d}.wfs')
+
+    def _new_segment(self, number: int) -> _Segment:
+        with open(self._segment_path(number), 'wb') as f:
+            f.write(MAGIC)
+        segment = self._segments[number] = _Segment(number, self._segment_path(number))
+        return segment
+
+    def _load_segment(self, number: int):
+        segment = _Segment(number, self._segment_path(number))
+        if segment.size < len(MAGIC):
+            segment.close()
+            os.remove(segment.path)
+            return
+        self._segments[number] = segment
+        view = segment.view()
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{segment.path} is not a snapshot segment')
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= segment.size:
+            length, name_len, fetched_at, _, _ = RECORD_HEADER.unpack_from(view, offset)
+            if length < RECORD_HEADER.size or offset + length > segment.size:
+                break
+            url_name = bytes(view[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + name_len]).decode('utf-8')
+            self._index[url_name] = (number, offset, fetched_at, length)
+            offset += length
+        if offset < segment.size:
+            # Torn write from a crash; drop the partial record
+            print(f'[SNAPSHOT] Truncating {segment.path} at {offset} (partial record)')
+            segment.map.close()
+            segment.map = None
+            segment.file.truncate(offset)
+            segment.size = offset
+
+    def _active(self) -> _Segment:
+        return self._segments[max(self._segments)]
+
+    def put(self, url_name: str, orders: List[Dict], fetched_at: float):
+        self.put_record(url_name, encode_orders(url_name, orders, fetched_at), fetched_at)
+
+    def put_record(self, url_name: str, record: bytes, fetched_at: float):
+        """Store a record already built by encode_orders"""
+        self._ensure_open()
+        with self._lock:
+            segment = self._active()
+            if segment.size + len(record) > self.segment_max_bytes and segment.size > len(MAGIC):
+                segment = self._roll(len(record))
+            offset = segment.size
+            segment.file.write(record)
+            segment.file.flush()
+            segment.size += len(record)
+            self._index[url_name] = (segment.number, offset, fetched_at, len(record))
+
+    def get(self, url_name: str) -> Optional[Tuple[float, List[Dict]]]:
+        """(fetched_at, orders) of the latest stored book, or None"""
+        self._ensure_open()
+        with self._lock:
+            entry = self._index.get(url_name)
+            if entry is None:
+                return None
+            number, offset, _, _ = entry
+            _, fetched_at, orders = decode_orders(self._segments[number].view(), offset)
+        return fetched_at, orders
+
+    def get_record(self, url_name: str) -> Optional[bytes]:
+        """The latest stored record for url_name, still encoded (see decode_orders), or None"""
+        self._ensure_open()
+        with self._lock:
+            entry = self._index.get(url_name)
+            if entry is None:
+                return None
+            number, offset, _, length = entry
+            return bytes(self._segments[number].view()[offset:offset + length])
+
+    def fetched_at(self, url_name: str) -> Optional[float]:
+        self._ensure_open()
+        entry = self._index.get(url_name)
+        return entry[2] if entry else None
+
+    def keys(self) -> List[str]:
+        self._ensure_open()
+        with self._lock:
+            return list(self._index)
+
+    def __len__(self) -> int:
+        self._ensure_open()
+        return len(self._index)
+
+    def __contains__(self, url_name: str) -> bool:
+        self._ensure_open()
+        return url_name in self._index
+
+    def _live_bytes(self) -> int:
+        return sum(length for _, _, _, length in self._index.values())
+
+    def _total_bytes(self) -> int:
+        return sum(segment.size for segment in self._segments.values())
+
+    def _roll(self, record_bytes: int) -> _Segment:
+        """Start a new segment, compacting first if most stored bytes are superseded records"""
+        if self._live_bytes() * 2 < self._total_bytes():
+            self.compact()
+            if self._active().size + record_bytes <= self.segment_max_bytes:
+                return self._active()
+        return self._new_segment(max(self._segments) + 1)
+
+    def compact(self):
+        """Rewrite only the latest record of every item into a new segment and drop the old ones"""
+        self._ensure_open()
+        with self._lock:
+            old_segments = dict(self._segments)
+            target = self._new_segment(max(old_segments) + 1)
+            new_index = {}
+            for url_name, (number, offset, fetched_at, length) in sorted(self._index.items(), key=lambda kv: kv[1][:2]):
+                record = bytes(old_segments[number].view()[offset:offset + length])
+                new_index[url_name] = (target.number, target.size, fetched_at, length)
+                target.file.write(record)
+                target.size += length
+            target.file.flush()
+            os.fsync(target.file.fileno())
+            self._index = new_index
+            for number, segment in old_segments.items():
+                segment.close()
+                os.remove(segment.path)
+                del self._segments[number]
+
+    def stats(self) -> Dict:
+        self._ensure_open()
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'items': len(self._index),
+                'segments': len(self._segments),
+                'bytes': self._total_bytes(),
+                'live_bytes': self._live_bytes(),
+            }
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+            self._index.clear()
+            self._opened = False
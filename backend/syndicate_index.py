@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Precompiled lookup indexes over data/syndicate_items.json.
+
+The file is parsed once into inverted indexes (keyword -> syndicates,
+item type -> items, name prefix -> items, items sorted by standing cost)
+and rebuilt only when its mtime changes, so syndicate and item lookups
+are dictionary hits instead of substring loops over the whole file.
+"""
+import bisect
+import os
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from backend.syndicate_scan import SYNDICATE_ITEMS_PATH, load_syndicates, market_url_name
+
+# Mirrors FILTER_KEYWORDS in frontend-vite/src/SyndicateScreen.jsx
+TYPE_KEYWORDS = {
+    'mod': ['mod', 'mods', 'modification', 'modifications', 'augment', 'augments', 'augmentation', 'augmentations'],
+    'weapon': ['weapon', 'weapons', 'weap', 'weaps', 'gun', 'guns', 'wep', 'weps', 'wepon', 'wepons'],
+    'cosmetic': ['cosmetic', 'cosmetics', 'cosm', 'skin', 'skins', 'appearance', 'skinset', 'skinsets', 'drifter', 'drifters'],
+    'archwing': ['archwing', 'arch', 'wing', 'wings', 'archwings', 'archgun', 'archguns'],
+    'blueprint': ['blueprint', 'blueprints', 'bp', 'bps', 'recipe', 'recipes'],
+    'emote': ['emote', 'emotes', 'animation', 'animations', 'anim', 'anims'],
+    'armor': ['armor', 'armors', 'armour', 'armours'],
+    'syandana': ['syandana', 'syandanas', 'cape', 'capes', 'scarf', 'scarves'],
+    'sigil': ['sigil', 'sigils', 'emblem', 'emblems'],
+    'glyph': ['glyph', 'glyphs', 'profile', 'profiles'],
+    'key': ['key', 'keys', 'mission', 'missions'],
+    'consumable': ['consumable', 'consumables', 'consum', 'boost', 'boosts'],
+    'other': ['other', 'others', 'misc', 'miscellaneous'],
+}
+MIN_PREFIX = 2
+
+
+def _normalize(term: str) -> str:
+    return ' '.join(str(term).lower().replace('_', ' ').split())
+
+
+def _prefixes(text: str):
+    for i in range(MIN_PREFIX, len(text) + 1):
+        yield text[:i]
+
+
+class SyndicateIndex:
+    """Immutable indexes over one parsed syndicate_items.json"""
+
+    def __init__(self, data: Dict[str, Any], mtime: float = 0.0):
+        self.data = data
+        self.mtime = mtime
+        self.syndicates = {key: {'key': key, 'name': s.get('name', key), 'color': s.get('color')} for key, s in data.items()}
+        self.items: List[Dict[str, Any]] = []
+        keywords: Dict[str, set] = {}
+        keyword_prefixes: Dict[str, set] = {}
+        by_syndicate: Dict[str, set] = {}
+        by_type: Dict[str, set] = {}
+        by_prefix: Dict[str, set] = {}
+        for key, syndicate in data.items():
+            for keyword in [key, syndicate.get('name', '')] + list(syndicate.get('keywords', [])):
+                normalized = _normalize(keyword)
+                if not normalized:
+                    continue
+                keywords.setdefault(normalized, set()).add(key)
+                for prefix in _prefixes(normalized):
+                    keyword_prefixes.setdefault(prefix, set()).add(key)
+            for item in syndicate.get('items', []):
+                item_id = len(self.items)
+                name = _normalize(item['name'])
+                self.items.append({
+                    'syndicate': key,
+                    'name': item['name'],
+                    'url_name': market_url_name(item['name']),
+                    'type': item.get('type', 'other'),
+                    'standing_cost': item.get('standing_cost') or 0,
+                })
+                by_syndicate.setdefault(key, set()).add(item_id)
+                by_type.setdefault(self.items[-1]['type'], set()).add(item_id)
+                # Prefixes of the full name and of every word ("cha" finds "Steel Charge")
+                words = name.split(' ')
+                for start in range(len(words)):
+                    for prefix in _prefixes(' '.join(words[start:])):
+                        by_prefix.setdefault(prefix, set()).add(item_id)
+        self._keywords = {k: frozenset(v) for k, v in keywords.items()}
+        self._keyword_prefixes = {k: frozenset(v) for k, v in keyword_prefixes.items()}
+        self._by_syndicate = {k: frozenset(v) for k, v in by_syndicate.items()}
+        self._by_type = {k: frozenset(v) for k, v in by_type.items()}
+        self._by_prefix = {k: frozenset(v) for k, v in by_prefix.items()}
+        self._type_keywords = {keyword: item_type for item_type, words in TYPE_KEYWORDS.items() for keyword in words}
+        ordered = sorted(range(len(self.items)), key=lambda i: self.items[i]['standing_cost'])
+        self._by_cost_ids = ordered
+        self._by_cost_values = [self.items[i]['standing_cost'] for i in ordered]
+
+    def resolve_syndicates(self, term: str) -> FrozenSet[str]:
+        """Syndicate keys for a name/keyword ("suda", "Steel Meridian"); falls back to keyword prefixes"""
+        normalized = _normalize(term)
+        return self._keywords.get(normalized) or self._keyword_prefixes.get(normalized, frozenset())
+
+    def resolve_type(self, term: str) -> str:
+        """Item type for a filter word ("bp" -> "blueprint"); unknown words are used as the type itself"""
+        normalized = _normalize(term)
+        return self._type_keywords.get(normalized, normalized)
+
+    def standing_range(self, min_cost: Optional[int] = None, max_cost: Optional[int] = None) -> FrozenSet[int]:
+        lo = 0 if min_cost is None else bisect.bisect_left(self._by_cost_values, min_cost)
+        hi = len(self._by_cost_values) if max_cost is None else bisect.bisect_right(self._by_cost_values, max_cost)
+        return frozenset(self._by_cost_ids[lo:hi])
+
+    def query(self, syndicate: Optional[str] = None, item_type: Optional[str] = None, prefix: Optional[str] = None,
+              min_standing: Optional[int] = None, max_standing: Optional[int] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Items matching every given filter, in file order"""
+        candidates = []
+        if syndicate:
+            keys = self.resolve_syndicates(syndicate)
+            candidates.append(frozenset().union(*(self._by_syndicate.get(k, frozenset()) for k in keys)))
+        if item_type:
+            candidates.append(self._by_type.get(self.resolve_type(item_type), frozenset()))
+        if prefix:
+            candidates.append(self._by_prefix.get(_normalize(prefix), frozenset()))
+        if min_standing is not None or max_standing is not None:
+            candidates.append(self.standing_range(min_standing, max_standing))
+        if candidates:
+            candidates.sort(key=len)
+            ids = candidates[0].intersection(*candidates[1:])
+            ids = sorted(ids)
+        else:
+            ids = range(len(self.items))
+        if limit is not None:
+            ids = ids[:limit]
+        return [self.items[i] for i in ids]
+
+
+class ReloadingSyndicateIndex:
+    """Holds a SyndicateIndex for a file and rebuilds it when the file's mtime changes"""
+
+    def __init__(self, path: str = SYNDICATE_ITEMS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Optional[SyndicateIndex] = None
+        self._failed_mtime = None
+
+    def get(self) -> SyndicateIndex:
+        """
+        Current index. If an edited file fails to parse, the previous index keeps being served.
+        :raises ValueError: if the file has never parsed successfully
+        """
+        mtime = os.stat(self.path).st_mtime
+        index = self._index
+        if index is not None and (index.mtime == mtime or self._failed_mtime == mtime):
+            return index
+        with self._lock:
+            if self._index is None or (self._index.mtime != mtime and self._failed_mtime != mtime):
+                try:
+                    self._index = SyndicateIndex(load_syndicates(self.path), mtime)
+                    print(f'[SYNDICATE] Indexed {len(self._index.items)} items from {self.path}')
+                except ValueError as e:
+                    print(f'[SYNDICATE] Failed to parse {self.path}: {e}')
+                    if self._index is None:
+                        raise
+                    self._failed_mtime = mtime
+            return self._index
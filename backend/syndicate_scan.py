@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Server-side price scan for syndicate offerings (data/syndicate_items.json).
+
+A scan prices every item a syndicate (or all of them) sells and ranks the
+items by platinum per point of standing. Items offered by several
+syndicates (most augment mods) are fetched once, and books come from the
+shared order-book cache so overlapping scans reuse each other's fetches.
+"""
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+SYNDICATE_ITEMS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'syndicate_items.json')
+ALL_SYNDICATES = 'all'
+ONLINE_STATUSES = ('ingame', 'online')
+MAX_MOD_RANK = 3  # Syndicate augments max out at rank 3
+
+
+def load_syndicates(path: str = SYNDICATE_ITEMS_PATH) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def market_url_name(name: str) -> str:
+    """Warframe Market url_name for an item name ("Mesa's Waltz" -> "mesas_waltz")"""
+    slug = name.lower().replace('&', 'and').replace("'", '')
+    return re.sub(r'[^a-z0-9]+', '_', slug).strip('_')
+
+
+def scan_targets(syndicates: Dict[str, Any], syndicate: Union[str, Iterable[str]] = ALL_SYNDICATES) -> List[Dict[str, Any]]:
+    """
+    Distinct items to price for a syndicate key, several keys, or 'all', merged by url_name.
+    :raises KeyError: if a syndicate key is unknown
+    """
+    if syndicate == ALL_SYNDICATES:
+        keys = list(syndicates)
+    else:
+        keys = [syndicate] if isinstance(syndicate, str) else list(syndicate)
+    targets: Dict[str, Dict[str, Any]] = {}
+    for key in keys:
+        for item in syndicates[key].get('items', []):
+            url_name = market_url_name(item['name'])
+            target = targets.get(url_name)
+            if target is None:
+                targets[url_name] = {
+                    'name': item['name'],
+                    'url_name': url_name,
+                    'type': item.get('type', 'other'),
+                    'standing_cost': item.get('standing_cost') or 0,
+                    'syndicates': [key],
+                }
+            else:
+                target['syndicates'].append(key)
+                if item.get('standing_cost'):
+                    target['standing_cost'] = min(filter(None, (target['standing_cost'], item['standing_cost'])))
+    return list(targets.values())
+
+
+def select_orders(orders: List[Dict[str, Any]], item_type: str, rank: int = 0, online_only: bool = True) -> List[Dict[str, Any]]:
+    """Orders matching the scan mode: mod rank for mods, and online/in-game sellers if online_only"""
+    selected = []
+    for order in orders:
+        if online_only and (order.get('user') or {}).get('status') not in ONLINE_STATUSES:
+            continue
+        if item_type == 'mod' and order.get('mod_rank', 0) != rank:
+            continue
+        selected.append(order)
+    return selected
+
+
+def price_item(target: Dict[str, Any], orders: Optional[List[Dict[str, Any]]], rank: int = 0, online_only: bool = True) -> Dict[str, Any]:
+    """Price one scan target from its order book (None if the book could not be fetched)"""
+    result = dict(target)
+    result.update({'status': 'ok', 'price': None, 'buy_price': None, 'sell_orders': 0, 'platinum_per_standing': None})
+    if orders is None:
+        result['status'] = 'unavailable'
+        return result
+    selected = select_orders(orders, target['type'], rank, online_only)
+    sells = [o['platinum'] for o in selected if o.get('order_type') == 'sell' and o.get('platinum') is not None]
+    buys = [o['platinum'] for o in selected if o.get('order_type') == 'buy' and o.get('platinum') is not None]
+    result['sell_orders'] = len(sells)
+    result['buy_price'] = max(buys) if buys else None
+    if not sells:
+        result['status'] = 'no_orders'
+        return result
+    result['price'] = min(sells)
+    if target['standing_cost']:
+        result['platinum_per_standing'] = result['price'] / target['standing_cost']
+    return result
+
+
+def rank_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Best platinum per standing first; unpriced items last, by name"""
+    return sorted(results, key=lambda r: (r['platinum_per_standing'] is None, -(r['platinum_per_standing'] or 0), r['name']))
+
+
+def run_scan(targets: List[Dict[str, Any]], get_orders: Callable[[str], Optional[List[Dict[str, Any]]]],
+             on_result: Callable[[Dict[str, Any]], None], rank: int = 0, online_only: bool = True,
+             workers: int = 4, cancel_check: Optional[Callable[[], bool]] = None) -> bool:
+    """
+    Price every target, calling on_result as each item completes.
+    :param get_orders: Callable(url_name) -> orders or None (rate limiting and caching are its job)
+    :param workers: Concurrent fetches; the upstream rate limiter still applies
+    :return: False if the scan was cancelled
+    """
+    cancelled = threading.Event()
+
+    def work(target):
+        if cancelled.is_set() or (cancel_check and cancel_check()):
+            cancelled.set()
+            return None
+        try:
+            orders = get_orders(target['url_name'])
+        except Exception as e:
+            print(f'[SYNDICATE] Error fetching {target["url_name"]}: {e}')
+            orders = None
+        return price_item(target, orders, rank, online_only)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(work, target) for target in targets]
+        for future in as_completed(futures):
+            result = future.result()
+            if result is not None:
+                on_result(result)
+    return not cancelled.is_set()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Fast ISO-8601 -> epoch conversion for market timestamps.
+
+Every order carries creation_date/last_update in one fixed format
+(2024-01-02T03:04:05.000+00:00, occasionally with a Z suffix). Scans parse
+them once, at ingest, and keep epoch integers; age filters are then integer
+comparisons against one reference time per scan.
+
+That format is strict ISO-8601 in UTC, so it goes straight to the C
+datetime.fromisoformat; dateutil's generic parser, which the calculator
+used to call per item, tries many layouts and is ~100x slower (see
+benchmarks/bench_timestamps.py). A pure-Python slicing parser was measured
+too and loses to fromisoformat by 2x. Other offsets, naive and date-only
+values take a slower path that treats naive times as UTC.
+"""
+import datetime
+from typing import Optional
+
+_fromisoformat = datetime.datetime.fromisoformat
+_UTC = datetime.timezone.utc
+
+
+def _parse(value) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    value = str(value)
+    if value[-1] == 'Z' or value.endswith('+00:00'):
+        try:
+            return _fromisoformat(value)
+        except ValueError:
+            pass  # e.g. Z before Python 3.11; the slow path rewrites it
+    try:
+        moment = _fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=_UTC)
+
+
+def parse_epoch(value) -> Optional[int]:
+    """ISO-8601 timestamp -> whole epoch seconds (None if missing or unparsable)"""
+    moment = _parse(value)
+    return None if moment is None else int(moment.timestamp() // 1)
+
+
+def parse_epoch_ms(value) -> Optional[int]:
+    """ISO-8601 timestamp -> epoch milliseconds (None if missing or unparsable)"""
+    moment = _parse(value)
+    return None if moment is None else round(moment.timestamp() * 1000)
@@ -1,26 +1,92 @@
 import json
+import math
+import time
 from typing import List, Dict, Any
 
+from backend.analysis_memo import orders_digest
+from backend.order_record import OrderRecord
+from backend.timestamps import parse_epoch
+
 class TradingCalculator:
     """
     Encapsulates trading calculation and analysis logic for Warframe Prime items.
     Ported from frontend JS to Python for backend processing.
     """
-    def __init__(self, min_profit: int = 10, max_investment: int = 0, max_order_age: int = 30):
+    def __init__(self, min_profit: int = 10, max_investment: int = 0, max_order_age: int = 30, price_history=None,
+                 trend_window: float = 7 * 86400, item_statistics=None, memo=None):
+        """
+        :param price_history: Optional PriceHistory; opportunities then carry the item's recent
+                              ask trend and volatility (from locally recorded books, no upstream calls)
+        :param trend_window: Seconds of history the trend and volatility are computed over
+        :param item_statistics: Optional ItemStatistics; opportunities then carry trade volume,
+                                expected days to sell and a liquidity score used by rank_opportunities
+        :param memo: Optional AnalysisMemo shared across scans; unchanged books are not re-analyzed
+        """
         self.min_profit = min_profit
         self.max_investment = max_investment
         self.max_order_age = max_order_age
+        self.price_history = price_history
+        self.trend_window = trend_window
+        self.item_statistics = item_statistics
+        self.memo = memo
+
+    def history_stats(self, url_name: str):
+        """Trend/volatility fields for an opportunity, or {} without recorded history"""
+        if self.price_history is None or not url_name:
+            return {}
+        stats = self.price_history.stats(url_name, self.trend_window)
+        if not stats or not stats['points']:
+            return {}
+        return {
+            'askTrendPerDay': stats['trend_per_day'],
+            'volatility': stats['volatility'],
+            'meanSpread': stats['mean_spread'],
+            'historyPoints': stats['points'],
+        }
+
+    def liquidity_stats(self, url_name: str, orders: List[Dict[str, Any]], opportunity: Dict[str, Any]):
+        """
+        Volume fields for an opportunity, or {} without cached statistics.
+        Expected days to sell: sellers asking up to 10% above our price, plus us, over daily volume.
+        """
+        if self.item_statistics is None or not url_name:
+            return {}
+        stats = self.item_statistics.get(url_name)
+        if not stats:
+            return {}
+        daily_volume = stats['daily_volume']
+        sell_price = opportunity['sellPrice']
+        competing = sum(1 for o in orders if o.get('order_type') == 'sell' and o.get('platinum', 0) <= sell_price * 1.1)
+        days_to_sell = (competing + 1) / daily_volume if daily_volume > 0 else None
+        return {
+            'dailyVolume': round(daily_volume, 2),
+            'volume48h': stats['volume_48h'],
+            'median90d': stats['median_90d'] if stats['median_90d'] == stats['median_90d'] else None,
+            'expectedDaysToSell': round(days_to_sell, 2) if days_to_sell is not None else None,
+            # Profit per expected day on the market; anything selling within a day keeps its full profit
+            'liquidityScore': round(opportunity['netProfit'] / max(1.0, days_to_sell), 2) if days_to_sell is not None else 0.0,
+        }
 
-    def analyze_prime_items(self, all_items: List[Dict[str, Any]], orders_data: Dict[str, List[Dict[str, Any]]], cancel_check=None, max_order_age: int = 30) -> List[Dict[str, Any]]:
+    @staticmethod
+    def rank_opportunities(opportunities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Order by liquidity score (profit per expected day to sell, capped at one day) when statistics
+        are known; opportunities without statistics follow in their original order.
+        """
+        return sorted(opportunities, key=lambda o: ('liquidityScore' not in o, -(o.get('liquidityScore') or 0.0)))
+
+    def analyze_prime_items(self, all_items: List[Dict[str, Any]], orders_data: Dict[str, List[Dict[str, Any]]], cancel_check=None, max_order_age: int = 30, now=None) -> List[Dict[str, Any]]:
         """
         Analyze all prime items and return trading opportunities.
         :param all_items: List of all item dicts (from Warframe Market API)
         :param orders_data: Dict mapping item names to their orders (from Warframe Market API)
         :param cancel_check: Optional callable that returns True if analysis should be cancelled
         :param max_order_age: Maximum allowed age (in days) for the best WTB order
+        :param now: Reference epoch time every order age in the scan is measured against (default: now)
         :return: List of trading opportunity dicts
         """
         print('[DEBUG] ENTERED analyze_prime_items')
+        now = int(time.time()) if now is None else now
         opportunities = []
         print(f'[DEBUG] orders_data keys: {list(orders_data.keys())[:10]} ...')
         for item in all_items:
@@ -31,21 +97,47 @@ class TradingCalculator:
             print(f'[DEBUG] Analyzing {item_name} (ID: {item_id})')
             orders = orders_data.get(item_id, [])
             print(f'[DEBUG] {item_name} (ID: {item_id}): Retrieved {len(orders)} orders from orders_data')
-            opps = self.analyze_prime_item_orders(orders, item_name, item_id, max_order_age)
+            opps = self.analyze_prime_item_orders(orders, item_name, item_id, max_order_age, now)
+            if opps:
+                url_name = str(item.get('url_name') or '')
+                history = self.history_stats(url_name)
+                for opp in opps:
+                    opp.update(history)
+                    opp.update(self.liquidity_stats(url_name, orders, opp))
             opportunities.extend(opps)
         return opportunities
 
-    def analyze_prime_item_orders(self, orders: List[Dict[str, Any]], item_name: str, item_id: str, max_order_age: int = 30) -> List[Dict[str, Any]]:
+    def analyze_prime_item_orders(self, orders: List[Dict[str, Any]], item_name: str, item_id: str, max_order_age: int = 30, now=None) -> List[Dict[str, Any]]:
         """
         Analyze orders for a single prime item and return profitable opportunities.
         :param orders: List of order dicts for the item
         :param item_name: Name of the item
         :param item_id: ID of the item
         :param max_order_age: Maximum allowed age (in days) for the best WTB order
+        :param now: Reference epoch time for the age filter (default: now)
         :return: List of opportunity dicts
         """
-        import datetime
-        from dateutil import parser as date_parser
+        if self.memo is None:
+            return self.analyze_with_expiry(orders, item_name, item_id, max_order_age, now)[0]
+        key = self.memo_key(orders, item_name, item_id, max_order_age)
+        cached = self.memo.get(key)
+        if cached is None:
+            cached, expires_at = self.analyze_with_expiry(orders, item_name, item_id, max_order_age, now)
+            self.memo.put(key, cached, expires_at)
+        # Callers annotate opportunities in place; keep the memoized ones pristine
+        return [dict(opp) for opp in cached]
+
+    def memo_key(self, orders: List[Dict[str, Any]], item_name: str, item_id: str, max_order_age: int) -> tuple:
+        return (orders_digest(orders), item_id, item_name, self.min_profit, self.max_investment, max_order_age)
+
+    def remember(self, orders: List[Dict[str, Any]], item_name: str, item_id: str, max_order_age: int,
+                 opportunities: List[Dict[str, Any]], expires_at: float):
+        """Seed the memo with a result computed elsewhere (e.g. by an AnalysisPool worker)"""
+        if self.memo is not None:
+            self.memo.put(self.memo_key(orders, item_name, item_id, max_order_age), opportunities, expires_at)
+
+    def analyze_with_expiry(self, orders: List[Dict[str, Any]], item_name: str, item_id: str, max_order_age: int, now=None):
+        """(opportunities, epoch time at which the result may change because the best WTB ages out)"""
         # Warframe Market flipping: buy from highest WTB, sell at lowest WTS
         # Temporarily remove 'visible == True' filter
         sell_orders = [o for o in orders if o.get('order_type') == 'sell']
@@ -53,7 +145,7 @@ class TradingCalculator:
         print(f'[DEBUG] {item_name}: {len(sell_orders)} WTS, {len(buy_orders)} WTB orders')
         if not sell_orders or not buy_orders:
             print(f'[DEBUG] {item_name}: No valid sell or buy orders (skipped)')
-            return []
+            return [], math.inf
         lowest_sell = min(sell_orders, key=lambda o: o.get('platinum', float('inf')))
         highest_buy = max(buy_orders, key=lambda o: o.get('platinum', float('-inf')))
         print(f'[DEBUG] {item_name}: WTS {lowest_sell.get("platinum")}p, WTB {highest_buy.get("platinum")}p')
@@ -62,32 +154,30 @@ class TradingCalculator:
         adjusted_buy_price = highest_buy_price + 1
         adjusted_sell_price = lowest_sell_price - 1
         profit = adjusted_sell_price - adjusted_buy_price
-        # Order age filtering
-        now = datetime.datetime.now(datetime.timezone.utc)
-        last_seen_str = highest_buy.get('creation_date')
-        if last_seen_str:
-            try:
-                last_seen = date_parser.parse(last_seen_str)
-                days_since_update = (now - last_seen).total_seconds() / (60 * 60 * 24)
-                print(f'[DEBUG] {item_name}: WTB age {days_since_update:.1f} days')
-            except Exception as e:
-                print(f'[DEBUG] {item_name}: Error parsing last_seen: {e}')
-                days_since_update = float('inf')
-        else:
-            print(f'[DEBUG] {item_name}: No last_seen/last_update for best WTB')
-            days_since_update = float('inf')
-        if days_since_update > max_order_age:
-            print(f'[DEBUG] {item_name}: WTB too old ({days_since_update:.1f}d > {max_order_age}d, skipped)')
-            return []
+        # Order age filtering: records carry created_at from ingest, plain dicts are parsed here
+        now = int(time.time()) if now is None else now
+        last_seen = highest_buy.get('created_at')
+        if last_seen is None:
+            last_seen = parse_epoch(highest_buy.get('creation_date'))
+        if last_seen is None:
+            print(f'[DEBUG] {item_name}: No parsable creation_date for best WTB')
+            return [], math.inf
+        age = now - last_seen
+        print(f'[DEBUG] {item_name}: WTB age {age / 86400:.1f} days')
+        if age > max_order_age * 86400:
+            print(f'[DEBUG] {item_name}: WTB too old ({age / 86400:.1f}d > {max_order_age}d, skipped)')
+            return [], math.inf
+        # The verdict flips once the WTB is max_order_age old
+        expires_at = last_seen + max_order_age * 86400
         if adjusted_sell_price <= adjusted_buy_price:
             print(f'[DEBUG] {item_name}: No profit (sell {adjusted_sell_price} <= buy {adjusted_buy_price})')
-            return []
+            return [], math.inf
         if profit < self.min_profit:
             print(f'[DEBUG] {item_name}: Profit {profit} < min {self.min_profit}')
-            return []
+            return [], math.inf
         if self.max_investment != 0 and adjusted_buy_price > self.max_investment:
             print(f'[DEBUG] {item_name}: Buy price {adjusted_buy_price} > max {self.max_investment}')
-            return []
+            return [], math.inf
         print(f'[DEBUG] {item_name}: ✓ Opportunity! Buy {adjusted_buy_price}, Sell {adjusted_sell_price}, Profit {profit}')
         return [{
             'itemName': item_name,
@@ -96,5 +186,5 @@ class TradingCalculator:
             'sellPrice': adjusted_sell_price,
             'netProfit': profit,
             'totalInvestment': adjusted_buy_price,
-            '_wtbOrder': highest_buy,
-        }] 
\ No newline at end of file
+            '_wtbOrder': highest_buy.to_dict() if isinstance(highest_buy, OrderRecord) else highest_buy,
+        }], expires_at 
\ No newline at end of file
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+State of one trading job, with its own synchronization.
+
+A job is written by its batch worker and fetch threads and read by every
+progress poll. Nothing here takes a lock shared between jobs:
+
+- cancellation is a threading.Event, so fetch threads check it without
+  locking;
+- progress is a plain integer that readers (logs, ETAs) read without
+  locking;
+- results, fetch outcomes and snapshot hits sit behind the job's own lock,
+  held only to append or count;
+- readers get an immutable JobView. It is rebuilt (outside the lock) only
+  after the job changed and is shared by every poll until the next change,
+  so pollers never rank results themselves and a slow client writing the
+  response can never hold up the workers.
+"""
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from backend.deadline import Deadline
+from backend.trading_calculator import TradingCalculator
+
+QUEUED, RUNNING, DONE, CANCELLED, ERROR = 'queued', 'running', 'done', 'cancelled', 'error'
+FINISHED = (DONE, CANCELLED, ERROR)
+# Per-item fetch outcomes that produced a usable order book
+FETCH_OK = ('ok', 'snapshot', 'not_found', 'skipped')
+# Those that came from an upstream request
+FETCHED_UPSTREAM = ('ok', 'not_found')
+
+
+def fetch_status_summary(fetch_status: Dict[str, Dict]) -> Dict[str, int]:
+    """Count of a job's items per fetch outcome"""
+    counts = {}
+    for status in fetch_status.values():
+        counts[status['status']] = counts.get(status['status'], 0) + 1
+    return counts
+
+
+class JobView(NamedTuple):
+    """Immutable point-in-time state of a TradingJob, as reported by /api/trading-calc-progress"""
+    status: str
+    progress: int
+    total: int
+    results: Tuple[Dict[str, Any], ...]  # ranked
+    cancelled: bool
+    snapshot_hits: int
+    error: Optional[str]
+    fetch_status: Dict[str, int]
+    fetch_failures: Tuple[Dict[str, Any], ...]
+
+
+class TradingJob:
+    """
+    :param total: Items the job analyzes
+    :param params: The job's analysis parameters (defaults for re-analysis)
+    :param profile: Optional ScanProfile
+    :param snapshot: Optional JobSnapshot of the fetched orders
+    :param deadline: Optional Deadline bounding the job; cancel() cancels it
+    """
+    def __init__(self, job_id: str, total: int, params: Optional[Dict[str, Any]] = None, profile=None,
+                 snapshot=None, deadline: Optional[Deadline] = None, status: str = QUEUED):
+        self.job_id = job_id
+        self.total = total
+        self.params = params or {}
+        self.profile = profile
+        self.snapshot = snapshot
+        self.deadline = deadline
+        self.status = status
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = time.time() if status in FINISHED else None
+        self.progress = 0  # written by the batch worker only
+        self._cancelled = threading.Event()
+        self._results: List[Dict[str, Any]] = []
+        self._fetch_status: Dict[str, Dict[str, Any]] = {}
+        self._snapshot_hits = 0
+        self._version = 0  # bumped by every change a JobView shows
+        self._view: Optional[JobView] = None
+        self._view_version = -1
+        self._ranked: Tuple[Dict[str, Any], ...] = ()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Ask the job to stop; aborts its upstream fetches in flight"""
+        self._cancelled.set()
+        self._touch()
+        if self.deadline is not None:
+            self.deadline.cancel()
+
+    def should_stop(self) -> bool:
+        """True once the job is cancelled or its deadline has passed"""
+        return self._cancelled.is_set() or (self.deadline is not None and self.deadline.expired())
+
+    def set_status(self, status: str, error: Optional[str] = None, only_from: Optional[str] = None) -> bool:
+        """
+        :param only_from: Change the status only if it currently is this one
+        :return: Whether the status was changed
+        """
+        with self._lock:
+            if only_from is not None and self.status != only_from:
+                return False
+            self.status = status
+            if error is not None:
+                self.error = error
+            if status in FINISHED and self.finished_at is None:
+                self.finished_at = time.time()
+            self._version += 1
+        return True
+
+    def finished_before(self, cutoff: float) -> bool:
+        """True if the job finished (done, cancelled, error) before the cutoff timestamp"""
+        return self.finished_at is not None and self.finished_at < cutoff
+
+    def add_results(self, opportunities: List[Dict[str, Any]], items: int):
+        """Publish a finished batch: its opportunities and the number of items it covered"""
+        with self._lock:
+            self._results.extend(opportunities)
+            self.progress += items
+            self._version += 1
+
+    def add_snapshot_hit(self):
+        with self._lock:
+            self._snapshot_hits += 1
+            self._version += 1
+
+    def record_fetch(self, item_id: str, fetch: Dict[str, Any]):
+        """Record how an item's order book was obtained (or why not)"""
+        with self._lock:
+            self._fetch_status[item_id] = fetch
+            self._version += 1
+
+    def upstream_fetches(self) -> int:
+        """Items whose order book was fetched from upstream (not reused from a snapshot)"""
+        with self._lock:
+            return sum(1 for fetch in self._fetch_status.values() if fetch['status'] in FETCHED_UPSTREAM)
+
+    def _touch(self):
+        with self._lock:
+            self._version += 1
+
+    def view(self) -> JobView:
+        """The job's current state; cheap when nothing changed since the last call"""
+        with self._lock:
+            if self._view_version == self._version:
+                return self._view
+            version = self._version
+            results = self._results[len(self._ranked):]
+            ranked_before = self._ranked
+            fetch_status = dict(self._fetch_status)
+            snapshot_hits = self._snapshot_hits
+            status, error, progress = self.status, self.error, self.progress
+        # Rank and summarize outside the lock; results only ever grow, so re-rank only when they did
+        ranked = (tuple(TradingCalculator.rank_opportunities(list(ranked_before) + results))
+                  if results else ranked_before)
+        view = JobView(
+            status=status,
+            progress=progress,
+            total=self.total,
+            results=ranked,
+            cancelled=self.cancelled,
+            snapshot_hits=snapshot_hits,
+            error=error,
+            fetch_status=fetch_status_summary(fetch_status),
+            fetch_failures=tuple(dict(fetch, itemId=item_id) for item_id, fetch in fetch_status.items()
+                                 if fetch['status'] not in FETCH_OK),
+        )
+        with self._lock:
+            if version >= self._view_version:
+                self._view, self._view_version, self._ranked = view, version, ranked
+        return view
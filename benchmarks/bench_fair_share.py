@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Interactive latency under scan load: FIFO rate limiting vs fair-share lanes.
+
+Two simulated scans keep FETCH_THREADS threads each asking for rate-limit
+slots non-stop while an interactive client sends one request every
+INTERACTIVE_INTERVAL seconds and a writer one every WRITE_INTERVAL. The
+limiter is a sliding window of LIMIT slots per PERIOD, like the proxy's.
+
+* ``fifo``: everyone queues in one flow, in arrival order (the old limiter).
+* ``fair_share``: the FairShareScheduler with its default lanes and weights.
+
+Reports p50/p95/max waits of interactive requests and writes, and each
+scan's slots per second (which should be even between the two scans).
+
+    python -m benchmarks.bench_fair_share
+    python -m benchmarks.bench_fair_share --seconds 10 --output fair_share.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+
+from backend.deadline import Cancelled, Deadline
+from backend.fair_share import INTERACTIVE, JOB, WRITE, FairShareScheduler
+
+LIMIT = 10  # slots per PERIOD
+PERIOD = 0.2  # seconds
+FETCH_THREADS = 8
+INTERACTIVE_INTERVAL = 0.1
+WRITE_INTERVAL = 0.5
+DEFAULT_SECONDS = 5.0
+QUICK_SECONDS = 1.0
+
+
+class SlidingWindow:
+    def __init__(self, limit=LIMIT, period=PERIOD):
+        self.limit = limit
+        self.period = period
+        self.stamps = []
+        self.lock = threading.Lock()
+
+    def _prune(self):
+        now = time.monotonic()
+        while self.stamps and now - self.stamps[0] > self.period:
+            self.stamps.pop(0)
+        return now
+
+    def free_slots(self):
+        with self.lock:
+            self._prune()
+            return self.limit - len(self.stamps)
+
+    def take_slot(self):
+        with self.lock:
+            now = self._prune()
+            if len(self.stamps) < self.limit:
+                self.stamps.append(now)
+                return True
+            return False
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summary(waits):
+    return {
+        'requests': len(waits),
+        'p50_ms': round(statistics.median(waits) * 1000, 1) if waits else None,
+        'p95_ms': round(_percentile(waits, 0.95) * 1000, 1) if waits else None,
+        'max_ms': round(max(waits) * 1000, 1) if waits else None,
+    }
+
+
+def run_variant(name, seconds):
+    window = SlidingWindow()
+    scheduler = FairShareScheduler(window.free_slots, window.take_slot)
+    fair = name == 'fair_share'
+    stop = threading.Event()
+    deadline = Deadline(seconds + 5)
+    scan_slots = {'scan-a': 0, 'scan-b': 0}
+    waits = {INTERACTIVE: [], WRITE: []}
+    lock = threading.Lock()
+
+    def scan_fetcher(job):
+        while not stop.is_set():
+            try:
+                scheduler.acquire(JOB, job if fair else 'all', deadline)
+            except Cancelled:
+                return
+            with lock:
+                scan_slots[job] += 1
+
+    def client(lane, interval):
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                scheduler.acquire(lane if fair else JOB, None if fair else 'all', deadline)
+            except Cancelled:
+                return
+            waits[lane].append(time.perf_counter() - started)
+            stop.wait(interval)
+
+    threads = [threading.Thread(target=scan_fetcher, args=(job,), daemon=True)
+               for job in scan_slots for _ in range(FETCH_THREADS)]
+    threads.append(threading.Thread(target=client, args=(INTERACTIVE, INTERACTIVE_INTERVAL), daemon=True))
+    threads.append(threading.Thread(target=client, args=(WRITE, WRITE_INTERVAL), daemon=True))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    deadline.cancel()  # releases threads still waiting for a slot
+    for thread in threads:
+        thread.join(timeout=2)
+    return {
+        'interactive': _summary(waits[INTERACTIVE]),
+        'write': _summary(waits[WRITE]),
+        'scan_slots_per_second': {job: round(count / seconds, 1) for job, count in scan_slots.items()},
+    }
+
+
+def run(seconds):
+    return {
+        'benchmark': 'fair_share',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'seconds': seconds,
+        'limit_per_second': LIMIT / PERIOD,
+        'variants': {name: run_variant(name, seconds) for name in ('fifo', 'fair_share')},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Interactive latency under scan load: FIFO vs fair-share lanes')
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help='Duration of each variant')
+    parser.add_argument('--quick', action='store_true', help=f'{QUICK_SECONDS}s per variant (smoke test)')
+    parser.add_argument('--output', help='Also write the result to a JSON file')
+    args = parser.parse_args(argv)
+
+    result = run(QUICK_SECONDS if args.quick else args.seconds)
+    for name, variant in result['variants'].items():
+        for lane in ('interactive', 'write'):
+            lane_result = variant[lane]
+            print(f"{name:10} {lane:11} p50 {lane_result['p50_ms']}ms p95 {lane_result['p95_ms']}ms "
+                  f"max {lane_result['max_ms']}ms ({lane_result['requests']} requests)")
+        print(f"{name:10} scans       {variant['scan_slots_per_second']} slots/s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
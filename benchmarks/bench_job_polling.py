@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Progress-poll contention: one global job lock vs per-job state and snapshots.
+
+A simulated trading job has FETCHERS threads recording per-item fetch
+outcomes and a batch worker publishing results, while --pollers threads
+poll its progress as fast as they can. Each poll serializes the progress
+body and then "writes it to a slow client" (sleeps WRITE_DELAY).
+
+* ``global_lock``: the old handler. It holds the one trading_jobs_lock
+  while it ranks the results, serializes and writes, and every fetcher
+  takes the same lock to record an outcome.
+* ``per_job``: TradingJob. Fetchers take only the job's own lock. Polls
+  read an immutable JobView, which is rebuilt only after the job changed,
+  and serialize and write it without holding any lock.
+
+Reports how long fetchers were blocked recording an outcome (p50/p99/max),
+outcomes recorded per second and polls served per second.
+
+    python -m benchmarks.bench_job_polling
+    python -m benchmarks.bench_job_polling --pollers 128 --seconds 5 --output polling.json
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+
+from backend.trading_calculator import TradingCalculator
+from backend.trading_job import FETCH_OK, TradingJob, fetch_status_summary
+
+FETCHERS = 8
+ITEMS = 3000
+RESULTS_PER_BATCH = 10
+BATCH_INTERVAL = 0.02  # seconds between published batches
+WRITE_DELAY = 0.002  # seconds a slow client takes to receive a poll response
+DEFAULT_POLLERS = 32
+DEFAULT_SECONDS = 3.0
+QUICK_SECONDS = 0.5
+
+
+def _opportunities(rng, count):
+    return [{'itemName': f'item-{rng.random():.6f}', 'netProfit': rng.randint(1, 100),
+             'liquidityScore': rng.random()} for _ in range(count)]
+
+
+class GlobalLockJob:
+    """The old job dict behind the shared trading_jobs_lock"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.job = {'status': 'running', 'progress': 0, 'total': ITEMS, 'results': [], 'cancelled': False,
+                    'fetch_status': {}}
+
+    def record_fetch(self, item_id, fetch):
+        with self.lock:
+            self.job['fetch_status'][item_id] = fetch
+
+    def add_results(self, opportunities, items):
+        with self.lock:
+            self.job['results'].extend(opportunities)
+            self.job['progress'] += items
+
+    def poll(self):
+        with self.lock:
+            job = self.job
+            body = json.dumps({
+                'status': job['status'], 'progress': job['progress'], 'total': job['total'],
+                'results': TradingCalculator.rank_opportunities(job['results']),
+                'cancelled': job['cancelled'],
+                'fetch_status': fetch_status_summary(job['fetch_status']),
+                'fetch_failures': [dict(status, itemId=item_id) for item_id, status in job['fetch_status'].items()
+                                   if status['status'] not in FETCH_OK],
+            })
+            time.sleep(WRITE_DELAY)
+        return body
+
+
+class PerJob:
+    def __init__(self):
+        self.job = TradingJob('bench', ITEMS, status='running')
+        self.record_fetch = self.job.record_fetch
+        self.add_results = self.job.add_results
+
+    def poll(self):
+        body = json.dumps(self.job.view()._asdict())
+        time.sleep(WRITE_DELAY)
+        return body
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_variant(name, pollers, seconds):
+    job = GlobalLockJob() if name == 'global_lock' else PerJob()
+    stop = threading.Event()
+    blocked = [[] for _ in range(FETCHERS)]
+    polls = [0] * pollers
+
+    def fetcher(index):
+        rng = random.Random(index)
+        item = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            job.record_fetch(f'{index}-{item}', {'status': 'ok' if rng.random() < 0.95 else 'timeout'})
+            blocked[index].append(time.perf_counter() - started)
+            item += 1
+            time.sleep(0.0005)  # the fetch itself
+
+    def batch_worker():
+        rng = random.Random(0)
+        while not stop.wait(BATCH_INTERVAL):
+            job.add_results(_opportunities(rng, RESULTS_PER_BATCH), FETCHERS)
+
+    def poller(index):
+        while not stop.is_set():
+            job.poll()
+            polls[index] += 1
+
+    threads = [threading.Thread(target=fetcher, args=(i,)) for i in range(FETCHERS)]
+    threads.append(threading.Thread(target=batch_worker))
+    threads += [threading.Thread(target=poller, args=(i,)) for i in range(pollers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    waits = [wait for per_fetcher in blocked for wait in per_fetcher]
+    return {
+        'record_blocked_p50_us': round(statistics.median(waits) * 1e6, 1),
+        'record_blocked_p99_us': round(_percentile(waits, 0.99) * 1e6, 1),
+        'record_blocked_max_ms': round(max(waits) * 1000, 2),
+        'records_per_second': round(len(waits) / seconds),
+        'polls_per_second': round(sum(polls) / seconds),
+    }
+
+
+def run(pollers, seconds):
+    return {
+        'benchmark': 'job_polling',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'pollers': pollers,
+        'seconds': seconds,
+        'variants': {name: run_variant(name, pollers, seconds) for name in ('global_lock', 'per_job')},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Progress-poll contention: global job lock vs per-job snapshots')
+    parser.add_argument('--pollers', type=int, default=DEFAULT_POLLERS)
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help='Duration of each variant')
+    parser.add_argument('--quick', action='store_true', help=f'{QUICK_SECONDS}s per variant (smoke test)')
+    parser.add_argument('--output', help='Also write the result to a JSON file')
+    args = parser.parse_args(argv)
+
+    result = run(args.pollers, QUICK_SECONDS if args.quick else args.seconds)
+    for name, variant in result['variants'].items():
+        print(f"{name:12} record blocked p50 {variant['record_blocked_p50_us']}us "
+              f"p99 {variant['record_blocked_p99_us']}us max {variant['record_blocked_max_ms']}ms, "
+              f"{variant['records_per_second']} records/s, {variant['polls_per_second']} polls/s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
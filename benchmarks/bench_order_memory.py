@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Memory held by a trading job: upstream order dicts vs OrderRecords.
+
+Builds a full Prime scan's worth of order-book responses with the market
+stub, decodes them the way the proxy does, and measures (tracemalloc)
+what a job retains once the responses are dropped:
+
+* ``dicts``: in-game orders kept as decoded upstream dicts, opportunities
+  carrying the full best-WTB dict (the pipeline before OrderRecord).
+* ``records``: in-game orders converted to OrderRecords at ingest,
+  opportunities carrying a compact best-WTB dict.
+
+    python -m benchmarks.bench_order_memory
+    python -m benchmarks.bench_order_memory --items 2000 --orders-per-item 80
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.market_stub import StubConfig, build_catalogue, build_orders
+from backend.order_record import OrderRecord
+from backend.trading_calculator import TradingCalculator
+
+FULL_SCAN_ITEMS = 600
+QUICK_ITEMS = 60
+
+
+def response_bodies(item_count, orders_per_item, seed=1234):
+    """Catalogue plus one encoded /orders response per item, as received from upstream"""
+    config = StubConfig(item_count=item_count, orders_per_item=orders_per_item, seed=seed)
+    items = build_catalogue(config)
+    bodies = {item['id']: json.dumps({'payload': {'orders': build_orders(config, item['url_name'])}}).encode()
+              for item in items}
+    return items, bodies
+
+
+def ingest(bodies, compact):
+    orders_data = {}
+    for item_id, body in bodies.items():
+        orders = json.loads(body)['payload']['orders']
+        ingame = [o for o in orders if o.get('user', {}).get('status') == 'ingame']
+        orders_data[item_id] = [OrderRecord.from_order(o) for o in ingame] if compact else ingame
+    return orders_data
+
+
+def measure_job(items, bodies, compact):
+    """(retained bytes, seconds, order count, opportunity count) of one simulated job"""
+    calc = TradingCalculator(min_profit=0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            orders_data = ingest(bodies, compact)
+            results = calc.analyze_prime_items(items, orders_data, max_order_age=365)
+        seconds = time.perf_counter() - started
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    orders = sum(len(v) for v in orders_data.values())
+    return max(0, after - before), seconds, orders, len(results)
+
+
+def run(item_count, orders_per_item):
+    items, bodies = response_bodies(item_count, orders_per_item)
+    variants = {}
+    for name, compact in (('dicts', False), ('records', True)):
+        retained, seconds, orders, opportunities = measure_job(items, bodies, compact)
+        variants[name] = {
+            'retained_kib': round(retained / 1024, 1),
+            'bytes_per_order': round(retained / orders, 1) if orders else None,
+            'seconds': round(seconds, 4),
+            'orders': orders,
+            'opportunities': opportunities,
+        }
+    dicts, records = variants['dicts']['retained_kib'], variants['records']['retained_kib']
+    return {
+        'benchmark': 'order_memory',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'items': item_count,
+        'orders_per_item': orders_per_item,
+        'variants': variants,
+        'reduction_percent': round((1 - records / dicts) * 100, 1) if dicts else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Job memory: upstream order dicts vs OrderRecords')
+    parser.add_argument('--items', type=int, default=FULL_SCAN_ITEMS, help='Items in the scan (default: a full Prime scan)')
+    parser.add_argument('--orders-per-item', type=int, default=40)
+    parser.add_argument('--quick', action='store_true', help=f'{QUICK_ITEMS} items only (smoke test)')
+    parser.add_argument('--output', help='Also write the result to a JSON file')
+    args = parser.parse_args(argv)
+
+    result = run(QUICK_ITEMS if args.quick else args.items, args.orders_per_item)
+    for name, variant in result['variants'].items():
+        print(f"{name:8} {variant['retained_kib']:>10.1f} KiB retained {variant['bytes_per_order']:>8} B/order "
+              f"{variant['orders']:>7} orders {variant['seconds']:>8.3f}s")
+    print(f"reduction {result['reduction_percent']}%")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Trading-scan CPU work in fetch threads vs an AnalysisPool.
+
+Decodes, filters and analyzes a full Prime scan's worth of order-book
+responses (built with the market stub) the way fetch_item_orders does:
+
+* ``threads``: in a ThreadPoolExecutor of the scan's size, all sharing the GIL,
+  putting each decoded book into an OrderBookCache whose listener samples
+  price history.
+* ``processes-N``: in an AnalysisPool of N worker processes, for N = 1, 2, 4, ...
+  up to the CPU count. The timing includes the parent's share: rebuilding
+  the in-game OrderRecords, caching the encoded book (put_record) and
+  recording the price sample. ``parent_seconds`` is that share alone and
+  ``parent_seconds_decoding`` what it would be if the parent decoded every
+  book before caching it.
+
+Reports items/s and the speedup over ``threads``. Pool start-up is not
+timed (the proxy keeps its pool for its whole lifetime).
+
+    python -m benchmarks.bench_process_pool
+    python -m benchmarks.bench_process_pool --items 2000 --max-processes 8
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_order_memory import response_bodies
+from backend.order_book_cache import OrderBookCache
+from backend.order_record import OrderRecord
+from backend.price_history import PriceHistory
+from backend.scan_workers import AnalysisPool, records_from_tuples
+from backend.snapshot_store import RECORD_HEADER, decode_orders
+from backend.trading_calculator import TradingCalculator
+
+FULL_SCAN_ITEMS = 600
+QUICK_ITEMS = 40
+THREADS = 8
+
+
+def scan_jobs(items, bodies):
+    return [(bodies[item['id']], item['item_name'], item['id'], 0, 0, 365, None, item['url_name']) for item in items]
+
+
+def new_cache():
+    history = PriceHistory()
+    cache = OrderBookCache(lambda url_name: None)
+    return cache, history
+
+
+def analyze_in_thread(cache, body, item_name, item_id, min_profit, max_investment, max_order_age, now, url_name):
+    """What fetch_item_orders does with a response body without a pool"""
+    orders = json.loads(body).get('payload', {}).get('orders', [])
+    ingame = [OrderRecord.from_order(o) for o in orders if (o.get('user') or {}).get('status') == 'ingame']
+    calc = TradingCalculator(min_profit, max_investment, max_order_age)
+    opportunities, _ = calc.analyze_with_expiry(ingame, item_name, item_id, max_order_age, now)
+    cache.put(url_name, orders, time.time())
+    return opportunities
+
+
+def run_threads(jobs, threads=THREADS):
+    cache, history = new_cache()
+    cache.add_listener(history.record_book)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(threads) as executor:
+            return list(executor.map(lambda job: analyze_in_thread(cache, *job), jobs))
+
+
+def store_results(jobs, results, decode=False):
+    """The parent's share of a pooled scan (see fetch_item_orders); decode=True decodes each book first"""
+    cache, history = new_cache()
+    for job, result in zip(jobs, results):
+        url_name = job[-1]
+        records_from_tuples(result.orders)
+        fetched_at = RECORD_HEADER.unpack_from(result.record)[2]
+        if decode:
+            cache.put(url_name, decode_orders(result.record, 0)[2], fetched_at, persist=False)
+        else:
+            cache.put_record(url_name, result.record, fetched_at)
+        history.record(url_name, fetched_at, *result.sample)
+
+
+def process_counts(max_processes):
+    counts, n = [], 1
+    while n < max_processes:
+        counts.append(n)
+        n *= 2
+    return counts + [max_processes]
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def run(item_count, orders_per_item, max_processes):
+    items, bodies = response_bodies(item_count, orders_per_item)
+    jobs = scan_jobs(items, bodies)
+    baseline, seconds = timed(run_threads, jobs)
+    opportunities = sum(len(r) for r in baseline)
+    variants = {'threads': {'seconds': round(seconds, 4), 'items_per_second': round(len(jobs) / seconds, 1),
+                            'speedup': 1.0, 'opportunities': opportunities}}
+    for processes in process_counts(max_processes):
+        pool = AnalysisPool(processes)
+        try:
+            pool.map(jobs[:processes])  # spawn and import in every worker before timing
+            results, pool_seconds = timed(pool.map, jobs)
+        finally:
+            pool.shutdown()
+        _, parent_seconds = timed(store_results, jobs, results)
+        _, decoding_seconds = timed(store_results, jobs, results, True)
+        pool_seconds += parent_seconds
+        variants[f'processes-{processes}'] = {
+            'seconds': round(pool_seconds, 4),
+            'items_per_second': round(len(jobs) / pool_seconds, 1),
+            'speedup': round(seconds / pool_seconds, 2),
+            'opportunities': sum(len(r.opportunities) for r in results),
+            'parent_seconds': round(parent_seconds, 4),
+            'parent_seconds_decoding': round(decoding_seconds, 4),
+        }
+    return {
+        'benchmark': 'process_pool',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        'items': item_count,
+        'orders_per_item': orders_per_item,
+        'threads': THREADS,
+        'variants': variants,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scan decode/filter/analysis: fetch threads vs worker processes')
+    parser.add_argument('--items', type=int, default=FULL_SCAN_ITEMS, help='Items in the scan (default: a full Prime scan)')
+    parser.add_argument('--orders-per-item', type=int, default=40)
+    parser.add_argument('--max-processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--quick', action='store_true', help=f'{QUICK_ITEMS} items and at most 2 processes (smoke test)')
+    parser.add_argument('--output', help='Also write the result to a JSON file')
+    args = parser.parse_args(argv)
+
+    max_processes = min(args.max_processes, 2) if args.quick else args.max_processes
+    result = run(QUICK_ITEMS if args.quick else args.items, args.orders_per_item, max(1, max_processes))
+    print(f"{result['items']} items, {result['cpu_count']} CPUs")
+    for name, variant in result['variants'].items():
+        parent = (f" (parent {variant['parent_seconds']:.3f}s, {variant['parent_seconds_decoding']:.3f}s if decoding)"
+                  if 'parent_seconds' in variant else '')
+        print(f"{name:14} {variant['items_per_second']:>10.1f} items/s {variant['seconds']:>8.3f}s "
+              f"x{variant['speedup']:<6} {variant['opportunities']:>6} opportunities{parent}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Market timestamp parsing: timestamps.parse_epoch vs dateutil and datetime.
+
+Generates timestamps in the market's format (mostly ``.000+00:00``, some
+``Z``) and times converting them to epoch seconds with:
+
+* ``dateutil``: dateutil.parser.parse, what the calculator used per item.
+* ``dateutil_isoparse``: dateutil.parser.isoparse.
+* ``fromisoformat``: datetime.fromisoformat after a Z -> +00:00 rewrite.
+* ``parse_epoch``: backend.timestamps.parse_epoch.
+
+It also times the age filter itself: parsing against a fresh now per order
+(the old calculator) vs integer comparisons of ingest-time epochs against
+one reference time. dateutil variants are skipped when it is not installed.
+
+    python -m benchmarks.bench_timestamps
+    python -m benchmarks.bench_timestamps --count 1000000
+"""
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+
+from backend.timestamps import parse_epoch
+
+DEFAULT_COUNT = 100_000
+QUICK_COUNT = 5_000
+
+
+def market_timestamps(count, seed=1234):
+    rng = random.Random(seed)
+    now = int(time.time())
+    out = []
+    for _ in range(count):
+        moment = datetime.datetime.fromtimestamp(now - rng.randrange(0, 400 * 86400), datetime.timezone.utc)
+        stamp = moment.strftime('%Y-%m-%dT%H:%M:%S.') + f'{rng.randrange(1000):03d}'
+        out.append(stamp + ('Z' if rng.random() < 0.1 else '+00:00'))
+    return out
+
+
+def parsers():
+    variants = {}
+    try:
+        from dateutil import parser as date_parser
+    except ImportError:
+        date_parser = None
+    if date_parser is not None:
+        variants['dateutil'] = lambda value: int(date_parser.parse(value).timestamp())
+        variants['dateutil_isoparse'] = lambda value: int(date_parser.isoparse(value).timestamp())
+    variants['fromisoformat'] = lambda value: int(datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+    variants['parse_epoch'] = parse_epoch
+    return variants
+
+
+def age_filter_seconds(stamps, max_age_days=30):
+    """(per-order parse + now, ingest-time epochs + one reference time) over stamps, in seconds"""
+    started = time.perf_counter()
+    old = 0
+    for value in stamps:
+        age = datetime.datetime.now(datetime.timezone.utc) - datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        old += age.total_seconds() / 86400 <= max_age_days
+    old_seconds = time.perf_counter() - started
+    epochs = [parse_epoch(value) for value in stamps]  # at ingest, not timed
+    started = time.perf_counter()
+    now, limit = int(time.time()), max_age_days * 86400
+    new = sum(1 for created in epochs if now - created <= limit)
+    return old_seconds, time.perf_counter() - started, old, new
+
+
+def run(count):
+    stamps = market_timestamps(count)
+    variants, reference = {}, None
+    for name, parse in parsers().items():
+        started = time.perf_counter()
+        parsed = [parse(value) for value in stamps]
+        seconds = time.perf_counter() - started
+        if reference is None:
+            reference = parsed
+        variants[name] = {
+            'seconds': round(seconds, 4),
+            'ns_per_timestamp': round(seconds / count * 1e9, 1),
+            'matches': parsed == reference,
+        }
+    baseline = variants[next(iter(variants))]['seconds']
+    for variant in variants.values():
+        variant['speedup'] = round(baseline / variant['seconds'], 2) if variant['seconds'] else None
+    old_seconds, new_seconds, old_kept, new_kept = age_filter_seconds(stamps)
+    return {
+        'benchmark': 'timestamps',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'count': count,
+        'baseline': next(iter(variants)),
+        'variants': variants,
+        'age_filter': {
+            'parse_per_order_seconds': round(old_seconds, 4),
+            'epoch_compare_seconds': round(new_seconds, 4),
+            'kept': new_kept,
+            'matches': abs(old_kept - new_kept) <= 1,  # the two reference times differ by milliseconds
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Market timestamp parsing: parse_epoch vs dateutil')
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT)
+    parser.add_argument('--quick', action='store_true', help=f'{QUICK_COUNT} timestamps only (smoke test)')
+    parser.add_argument('--output', help='Also write the result to a JSON file')
+    args = parser.parse_args(argv)
+
+    result = run(QUICK_COUNT if args.quick else args.count)
+    for name, variant in result['variants'].items():
+        print(f"{name:18} {variant['ns_per_timestamp']:>9.1f} ns/timestamp x{variant['speedup']:<7} "
+              f"{'ok' if variant['matches'] else 'MISMATCH'}")
+    age = result['age_filter']
+    print(f"age filter: {age['parse_per_order_seconds']:.4f}s parsing per order, "
+          f"{age['epoch_compare_seconds']:.4f}s comparing epochs")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0 if all(v['matches'] for v in result['variants'].values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
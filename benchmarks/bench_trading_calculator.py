@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for TradingCalculator.
+
+Two scaling curves over synthetic order books built by the market stub:
+
+* ``item_orders``: ``analyze_prime_item_orders`` on one item with 10 to
+  10,000 orders in its book.
+* ``prime_items``: ``analyze_prime_items`` over 100 to 5,000 items with a
+  fixed book size per item.
+
+Each case reports time per item, peak and retained memory from
+tracemalloc, and each curve reports its log-log scaling exponent (1.0 =
+linear). A timing sample repeats the call until it covers at least
+MIN_SAMPLE_SECONDS, and the fastest of --repeats samples is kept, so
+cases of ~100 us are not at the mercy of timer resolution and scheduler
+noise. The calculator's debug output is sent to os.devnull while
+measuring, so string formatting is counted but terminal I/O is not.
+
+Each run is compared with a checked-in baseline
+(benchmarks/baselines/trading_calculator.json), and cases that are more
+than --max-regression percent slower or larger are flagged. Baselines
+are machine-specific, so the comparison is advisory unless
+--fail-on-regression is given. Re-record the baseline whenever the
+calculator changes:
+
+    python -m benchmarks.bench_trading_calculator
+    python -m benchmarks.bench_trading_calculator --update-baseline
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.market_stub import StubConfig, build_catalogue, build_orders
+from backend.trading_calculator import TradingCalculator
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baselines', 'trading_calculator.json')
+
+ORDER_BOOK_SIZES = (10, 100, 1000, 10000)
+ITEM_COUNTS = (100, 500, 1000, 5000)
+QUICK_ORDER_BOOK_SIZES = (10, 100)
+QUICK_ITEM_COUNTS = (20, 50)
+MIN_SAMPLE_SECONDS = 0.02
+
+# metric -> True if higher is better
+TRACKED_METRICS = {
+    'us_per_item': False,
+    'peak_kib': False,
+}
+# metric -> absolute change that is never flagged (a few stray KiB swing the peak of tiny cases)
+NOISE_FLOOR = {
+    'peak_kib': 4.0,
+}
+
+
+def synthetic_books(item_count, orders_per_item, seed=1234):
+    """Catalogue and orders_data (keyed by item id) with one distinct book per item"""
+    config = StubConfig(item_count=item_count, orders_per_item=orders_per_item, seed=seed)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    items = build_catalogue(config)
+    orders_data = {item['id']: build_orders(config, item['url_name'], now=now) for item in items}
+    return items, orders_data
+
+
+def measure(fn, repeats):
+    """Fastest wall time per fn() call over repeats samples of at least MIN_SAMPLE_SECONDS, then one tracemalloc pass"""
+    times = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        fn()  # warm-up (imports, caches), also sizes the samples
+        number = max(1, math.ceil(MIN_SAMPLE_SECONDS / max(time.perf_counter() - start, 1e-6)))
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            times.append((time.perf_counter() - start) / number)
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            result = fn()
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    del result
+    return min(times), max(0, peak - before), max(0, after - before)
+
+
+def case_result(name, items, orders_per_item, seconds, peak_bytes, retained_bytes):
+    return {
+        'case': name,
+        'items': items,
+        'orders_per_item': orders_per_item,
+        'seconds': round(seconds, 6),
+        'us_per_item': round(seconds / items * 1e6, 3),
+        'us_per_order': round(seconds / (items * orders_per_item) * 1e6, 4),
+        'peak_kib': round(peak_bytes / 1024, 2),
+        'retained_kib': round(retained_bytes / 1024, 2),
+    }
+
+
+def scaling_exponent(points):
+    """Log-log slope between the smallest and largest (size, seconds) points"""
+    (x0, y0), (x1, y1) = points[0], points[-1]
+    if x0 == x1 or y0 <= 0 or y1 <= 0:
+        return None
+    return round(math.log(y1 / y0) / math.log(x1 / x0), 3)
+
+
+def bench_item_orders(sizes, repeats):
+    calculator = TradingCalculator(min_profit=0)
+    cases = []
+    for size in sizes:
+        items, orders_data = synthetic_books(1, size)
+        item = items[0]
+        orders = orders_data[item['id']]
+        seconds, peak, retained = measure(
+            lambda: calculator.analyze_prime_item_orders(orders, item['item_name'], item['id'], 30), repeats)
+        cases.append(case_result(f'item_orders/{size}', 1, size, seconds, peak, retained))
+    return {
+        'cases': cases,
+        'scaling_exponent': scaling_exponent([(c['orders_per_item'], c['seconds']) for c in cases]),
+    }
+
+
+def bench_prime_items(counts, orders_per_item, repeats):
+    calculator = TradingCalculator(min_profit=0)
+    cases = []
+    for count in counts:
+        items, orders_data = synthetic_books(count, orders_per_item)
+        seconds, peak, retained = measure(
+            lambda: calculator.analyze_prime_items(items, orders_data, max_order_age=30), repeats)
+        cases.append(case_result(f'prime_items/{count}x{orders_per_item}', count, orders_per_item, seconds, peak, retained))
+        del items, orders_data
+    return {
+        'cases': cases,
+        'scaling_exponent': scaling_exponent([(c['items'], c['seconds']) for c in cases]),
+    }
+
+
+def run(order_book_sizes, item_counts, orders_per_item, repeats):
+    return {
+        'benchmark': 'trading_calculator',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'repeats': repeats,
+        'curves': {
+            'item_orders': bench_item_orders(order_book_sizes, repeats),
+            'prime_items': bench_prime_items(item_counts, orders_per_item, repeats),
+        },
+    }
+
+
+def cases_by_name(result):
+    return {case['case']: case for curve in result.get('curves', {}).values() for case in curve['cases']}
+
+
+def compare(current, baseline, max_regression):
+    """Print per-case change vs the baseline; return the list of regressions"""
+    regressions = []
+    old_cases = cases_by_name(baseline)
+    print(f"{'case':32} {'metric':12} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, case in cases_by_name(current).items():
+        old_case = old_cases.get(name)
+        if not old_case:
+            continue
+        for metric, higher_is_better in TRACKED_METRICS.items():
+            old, new = old_case.get(metric), case.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            regression = -change if higher_is_better else change
+            regressed = regression > max_regression and abs(new - old) > NOISE_FLOOR.get(metric, 0.0)
+            flag = '  REGRESSION' if regressed else ''
+            print(f'{name:32} {metric:12} {old:>12} {new:>12} {change:>+8.1f}%{flag}')
+            if regressed:
+                regressions.append(f'{name}.{metric}')
+    return regressions
+
+
+def print_curves(result):
+    for curve_name, curve in result['curves'].items():
+        print(f"{curve_name} (scaling exponent {curve['scaling_exponent']})")
+        for case in curve['cases']:
+            print(f"  {case['case']:30} {case['us_per_item']:>12.3f} us/item {case['us_per_order']:>10.4f} us/order "
+                  f"{case['peak_kib']:>10.2f} KiB peak")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='TradingCalculator microbenchmarks')
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--orders-per-item', type=int, default=40, help='Book size for the prime_items curve')
+    parser.add_argument('--quick', action='store_true', help='Small sizes only (smoke test)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='Overwrite the baseline with this run')
+    parser.add_argument('--max-regression', type=float, default=25.0, help='Allowed regression in percent')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='Exit 1 on regressions (only meaningful against a baseline from this machine)')
+    parser.add_argument('--output', help='Also write this run to a JSON file')
+    args = parser.parse_args(argv)
+
+    sizes = QUICK_ORDER_BOOK_SIZES if args.quick else ORDER_BOOK_SIZES
+    counts = QUICK_ITEM_COUNTS if args.quick else ITEM_COUNTS
+    result = run(sizes, counts, args.orders_per_item, args.repeats)
+    print_curves(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressions over {args.max_regression}%: {', '.join(regressions)}")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
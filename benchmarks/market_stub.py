@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Warframe Market v1 API for benchmarks and tests.
+
+Serves a deterministic item catalogue and order books with configurable
+latency, 429 injection and payload size. Point the proxy at it with
+WARFRAME_MARKET_API_URL=http://127.0.0.1:<port>/v1.
+"""
+import datetime
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FRAMES = ['Ash', 'Banshee', 'Ember', 'Excalibur', 'Frost', 'Loki', 'Mag', 'Nova', 'Nyx', 'Oberon',
+          'Rhino', 'Saryn', 'Trinity', 'Valkyr', 'Vauban', 'Volt', 'Zephyr', 'Limbo', 'Mirage', 'Nekros']
+FRAME_PARTS = ['Set', 'Blueprint', 'Neuroptics', 'Chassis', 'Systems']
+WEAPONS = ['Soma', 'Boltor', 'Braton', 'Lex', 'Orthos', 'Paris', 'Fang', 'Galatine', 'Latron', 'Vectis',
+           'Akstiletto', 'Burston', 'Dual Kamas', 'Nikana', 'Rubico', 'Tigris', 'Scindo', 'Sybaris']
+WEAPON_PARTS = ['Set', 'Blueprint', 'Barrel', 'Receiver', 'Stock']
+NON_PRIME = ['Serration', 'Split Chamber', 'Vitality', 'Redirection', 'Point Strike', 'Hornet Strike',
+             'Pressure Point', 'Blood Rush', 'Condition Overload', 'Continuity']
+STATUSES = ('ingame', 'online', 'offline')
+
+
+class StubConfig:
+    """
+    Behaviour of the stub server.
+    :param item_count: Number of catalogue items (roughly 90% Prime)
+    :param orders_per_item: Orders in each order book (controls payload size)
+    :param latency: 'fixed', 'uniform' or 'lognormal'
+    :param latency_ms: Fixed/median latency in milliseconds
+    :param latency_jitter: Spread: +/- fraction for 'uniform', sigma for 'lognormal'
+    :param rate_limit_probability: Chance [0, 1] that a request is answered with 429
+    :param ingame_ratio: Fraction of orders whose user is 'ingame'
+    :param seed: Seed for deterministic catalogue, books and latency
+    """
+    def __init__(self, item_count=600, orders_per_item=40, latency='lognormal', latency_ms=80.0,
+                 latency_jitter=0.5, rate_limit_probability=0.0, ingame_ratio=0.4, seed=1234):
+        self.item_count = item_count
+        self.orders_per_item = orders_per_item
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_jitter = latency_jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.ingame_ratio = ingame_ratio
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def build_catalogue(config):
+    """Deterministic list of item dicts shaped like the /items payload"""
+    names = []
+    for frame in FRAMES:
+        names.extend(f'{frame} Prime {part}' for part in FRAME_PARTS)
+    for weapon in WEAPONS:
+        names.extend(f'{weapon} Prime {part}' for part in WEAPON_PARTS)
+    generation = 2
+    while len(names) < config.item_count:
+        names.extend(f'Stub{generation} Prime {part}' for part in WEAPON_PARTS)
+        generation += 1
+    prime_count = int(config.item_count * 0.9)
+    selected = names[:prime_count] + [f'{mod} {i}' if i else mod
+                                      for i in range((config.item_count - prime_count) // len(NON_PRIME) + 1)
+                                      for mod in NON_PRIME][:config.item_count - prime_count]
+    items = []
+    for name in selected:
+        url_name = _slug(name)
+        items.append({
+            'id': '%024x' % zlib.crc32(url_name.encode()),
+            'item_name': name,
+            'url_name': url_name,
+            'thumb': f'items/images/en/thumbs/{url_name}.png',
+        })
+    return items
+
+
+def build_orders(config, url_name, now=None):
+    """Deterministic order book for an item"""
+    rng = random.Random(zlib.crc32(url_name.encode()) ^ config.seed)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    base_price = rng.randint(5, 300)
+    orders = []
+    for i in range(config.orders_per_item):
+        order_type = 'sell' if i % 2 == 0 else 'buy'
+        if order_type == 'sell':
+            platinum = base_price + rng.randint(0, max(2, base_price // 2))
+        else:
+            platinum = max(1, base_price - rng.randint(0, max(2, base_price // 2)))
+        created = now - datetime.timedelta(hours=rng.randint(0, 24 * 60))
+        status = 'ingame' if rng.random() < config.ingame_ratio else rng.choice(STATUSES[1:])
+        orders.append({
+            'id': '%024x' % rng.getrandbits(96),
+            'platinum': platinum,
+            'quantity': rng.randint(1, 5),
+            'order_type': order_type,
+            'platform': 'pc',
+            'region': 'en',
+            'visible': True,
+            'creation_date': created.strftime('%Y-%m-%dT%H:%M:%S.000+00:00'),
+            'last_update': created.strftime('%Y-%m-%dT%H:%M:%S.000+00:00'),
+            'user': {
+                'id': '%024x' % rng.getrandbits(96),
+                'ingame_name': f'Trader{rng.randint(1, 99999)}',
+                'status': status,
+                'reputation': rng.randint(0, 500),
+                'region': 'en',
+                'avatar': None,
+                'last_seen': created.strftime('%Y-%m-%dT%H:%M:%S.000+00:00'),
+            },
+        })
+    return orders
+
+
+def build_statistics(config, url_name):
+    """Minimal /statistics payload: 48h and 90d closed-trade buckets"""
+    rng = random.Random(zlib.crc32(url_name.encode()) ^ (config.seed + 1))
+    now = datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    base = rng.randint(5, 300)
+
+    def bucket(when):
+        prices = sorted(max(1, base + rng.randint(-base // 3, base // 3)) for _ in range(5))
+        return {
+            'datetime': when.strftime('%Y-%m-%dT%H:%M:%S.000+00:00'),
+            'volume': rng.randint(0, 40),
+            'min_price': prices[0], 'max_price': prices[-1],
+            'open_price': prices[1], 'closed_price': prices[3],
+            'avg_price': sum(prices) / len(prices), 'median': prices[2],
+            'moving_avg': sum(prices) / len(prices),
+        }
+    hours = [bucket(now - datetime.timedelta(hours=h)) for h in range(48, 0, -1)]
+    days = [bucket(now - datetime.timedelta(days=d)) for d in range(90, 0, -1)]
+    return {'statistics_closed': {'48hours': hours, '90days': days}, 'statistics_live': {'48hours': [], '90days': []}}
+
+
+class StubState:
+    """Catalogue, pre-serialised payloads, user orders and request counters"""
+
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.rng_lock = threading.Lock()
+        self.items = build_catalogue(config)
+        self.items_by_key = {}
+        for item in self.items:
+            self.items_by_key[item['url_name']] = item
+            self.items_by_key[item['id']] = item
+        self.items_body = json.dumps({'payload': {'items': self.items}}).encode()
+        self._orders_bodies = {}
+        self._bodies_lock = threading.Lock()
+        self.user_orders = {}
+        self.user_lock = threading.Lock()
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+
+    def count(self, key):
+        with self.counts_lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def latency(self):
+        config = self.config
+        with self.rng_lock:
+            if config.latency == 'fixed':
+                ms = config.latency_ms
+            elif config.latency == 'uniform':
+                spread = config.latency_ms * config.latency_jitter
+                ms = self.rng.uniform(config.latency_ms - spread, config.latency_ms + spread)
+            else:
+                ms = self.rng.lognormvariate(0, config.latency_jitter) * config.latency_ms
+        return max(0.0, ms) / 1000.0
+
+    def should_rate_limit(self):
+        if self.config.rate_limit_probability <= 0:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < self.config.rate_limit_probability
+
+    def orders_body(self, url_name):
+        body = self._orders_bodies.get(url_name)
+        if body is None:
+            item = self.items_by_key.get(url_name)
+            payload = {'payload': {'orders': build_orders(self.config, url_name)}}
+            if item:
+                payload['include'] = {'item': {'id': item['id'], 'items_in_set': [dict(item, en={'item_name': item['item_name']})]}}
+            body = json.dumps(payload).encode()
+            with self._bodies_lock:
+                self._orders_bodies[url_name] = body
+        return body
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, delayed ACKs would add ~40ms to every response
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def _begin(self, route):
+        """Apply latency and 429 injection; returns False if the request was rate limited"""
+        self.state.count(route)
+        time.sleep(self.state.latency())
+        if self.state.should_rate_limit():
+            self.state.count('429')
+            self._send_json(429, {'error': 'Too Many Requests'})
+            return False
+        return True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if path == '/stub/stats':
+            with self.state.counts_lock:
+                counts = dict(self.state.counts)
+            self._send_json(200, {'counts': counts, 'config': self.state.config.to_dict()})
+            return
+        if path.startswith('/v1'):
+            path = path[3:]
+        parts = [p for p in path.split('/') if p]
+        if parts == ['items']:
+            if self._begin('items'):
+                self._send_json(200, self.state.items_body)
+        elif parts[:2] == ['items', 'search']:
+            if self._begin('item_search'):
+                query = parse_qs(parsed.query).get('q', [''])[0].lower()
+                matches = [i for i in self.state.items if query in i['url_name'] or query in i['item_name'].lower() or query == i['id']]
+                self._send_json(200, {'payload': {'items': matches[:20]}})
+        elif len(parts) == 3 and parts[0] == 'items' and parts[2] == 'orders':
+            if self._begin('item_orders'):
+                self._send_json(200, self.state.orders_body(parts[1]))
+        elif len(parts) == 3 and parts[0] == 'items' and parts[2] == 'statistics':
+            if self._begin('item_statistics'):
+                self._send_json(200, {'payload': build_statistics(self.state.config, parts[1])})
+        elif len(parts) == 2 and parts[0] == 'items':
+            if self._begin('item'):
+                item = self.state.items_by_key.get(parts[1])
+                if item:
+                    self._send_json(200, {'payload': {'item': item}})
+                else:
+                    self._send_json(404, {'error': 'Item not found'})
+        elif parts == ['auth']:
+            if self._begin('auth'):
+                self._send_json(200, {'payload': {}}, {'Set-Cookie': 'JWT=stub-jwt; Path=/; HttpOnly'})
+        elif len(parts) == 3 and parts[0] == 'profile' and parts[2] == 'orders':
+            if self._begin('profile_orders'):
+                with self.state.user_lock:
+                    orders = list(self.state.user_orders.values())
+                buy = [o for o in orders if o['order_type'] == 'buy']
+                sell = [o for o in orders if o['order_type'] == 'sell']
+                self._send_json(200, {'payload': {'buy_orders': buy, 'sell_orders': sell}})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        body = self._read_body()
+        path = urlparse(self.path).path
+        if path.startswith('/v1'):
+            path = path[3:]
+        if path == '/auth/signin':
+            if self._begin('auth'):
+                try:
+                    email = json.loads(body or b'{}').get('email', 'stub')
+                except ValueError:
+                    self._send_json(400, {'error': 'Invalid JSON'})
+                    return
+                user = {'ingame_name': email.split('@')[0], 'slug': email.split('@')[0]}
+                self._send_json(200, {'payload': {'user': user}}, {'Set-Cookie': 'JWT=stub-jwt; Path=/; HttpOnly'})
+        elif path == '/profile/orders':
+            if self._begin('profile_orders'):
+                try:
+                    data = json.loads(body or b'{}')
+                except ValueError:
+                    self._send_json(400, {'error': 'Invalid JSON'})
+                    return
+                item = self.state.items_by_key.get(data.get('item', ''))
+                if not item:
+                    self._send_json(400, {'error': {'item': ['app.form.invalid']}})
+                    return
+                order = {
+                    'id': uuid.uuid4().hex[:24],
+                    'order_type': data.get('order_type', 'buy'),
+                    'platinum': data.get('platinum', 0),
+                    'quantity': data.get('quantity', 1),
+                    'visible': data.get('visible', True),
+                    'creation_date': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000+00:00'),
+                    'item': {'id': item['id'], 'url_name': item['url_name'], 'en': {'item_name': item['item_name']}},
+                }
+                with self.state.user_lock:
+                    self.state.user_orders[order['id']] = order
+                self._send_json(200, {'payload': {'order': order}})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        if path.startswith('/v1'):
+            path = path[3:]
+        parts = [p for p in path.split('/') if p]
+        if len(parts) == 3 and parts[:2] == ['profile', 'orders']:
+            if self._begin('profile_orders'):
+                with self.state.user_lock:
+                    removed = self.state.user_orders.pop(parts[2], None)
+                if removed:
+                    self._send_json(200, {'payload': {'order_id': parts[2]}})
+                else:
+                    self._send_json(404, {'error': 'Order not found'})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+
+class StubMarketServer:
+    """Runs the stub on a background thread"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or StubConfig()
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = StubState(self.config)
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}/v1'
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def add_stub_arguments(parser):
+    parser.add_argument('--items', type=int, default=600, help='Catalogue size')
+    parser.add_argument('--orders-per-item', type=int, default=40, help='Orders per order book')
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--latency-jitter', type=float, default=0.5)
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0)
+    parser.add_argument('--ingame-ratio', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=1234)
+
+
+def config_from_args(args):
+    return StubConfig(
+        item_count=args.items,
+        orders_per_item=args.orders_per_item,
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_jitter=args.latency_jitter,
+        rate_limit_probability=args.rate_limit_probability,
+        ingame_ratio=args.ingame_ratio,
+        seed=args.seed,
+    )
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Local Warframe Market v1 API stub')
+    parser.add_argument('--port', type=int, default=9000)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    server = StubMarketServer(config_from_args(args), port=args.port)
+    print(f'Stub Warframe Market API on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
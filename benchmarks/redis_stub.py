@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a Redis server, for tests and benchmarks.
+
+Speaks RESP2 and implements the commands backend.cache_backend uses:
+PING, AUTH, SELECT, GET, MGET, GETRANGE, SET (EX/PX/NX/XX), DEL, EXISTS,
+DBSIZE and FLUSHDB, with key expiry. Counts commands by name. Point the
+proxy at it with PROXY_CACHE_URL=redis://127.0.0.1:<port>.
+"""
+import math
+import socketserver
+import threading
+import time
+
+
+class StubRedisState:
+    def __init__(self, password=None):
+        self.password = password
+        self.lock = threading.Lock()
+        self.dbs = {}  # db -> {key: (expires_at, value)}
+        self.counts = {}
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def live(self, db, key, now):
+        entries = self.dbs.setdefault(db, {})
+        entry = entries.get(key)
+        if entry is not None and entry[0] <= now:
+            del entries[key]
+            return None
+        return entry
+
+
+class _Error(Exception):
+    pass
+
+
+class StubRedisHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.db = 0
+        self.authenticated = self.server.state.password is None
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()  # inline command (e.g. from telnet / redis-cli -p)
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _encode(self, reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, _Error):
+            return b'-%s\r\n' % str(reply).encode()
+        if isinstance(reply, str):
+            return b'+%s\r\n' % reply.encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(self._encode(item) for item in reply)
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (OSError, ValueError):
+                return
+            if not args:
+                return
+            name = args[0].decode().upper()
+            self.server.state.count(name)
+            try:
+                reply = self.dispatch(name, args[1:])
+            except _Error as e:
+                reply = e
+            except (ValueError, IndexError):
+                reply = _Error('ERR syntax error')
+            try:
+                self.wfile.write(self._encode(reply))
+                self.wfile.flush()
+            except OSError:
+                return
+
+    def dispatch(self, name, args):
+        state = self.server.state
+        if name == 'AUTH':
+            if args[-1].decode() != state.password:
+                raise _Error('WRONGPASS invalid username-password pair')
+            self.authenticated = True
+            return 'OK'
+        if not self.authenticated:
+            raise _Error('NOAUTH Authentication required.')
+        if name == 'PING':
+            return 'PONG'
+        if name == 'SELECT':
+            self.db = int(args[0])
+            return 'OK'
+        now = time.time()
+        with state.lock:
+            entries = state.dbs.setdefault(self.db, {})
+            if name == 'GET':
+                entry = state.live(self.db, args[0], now)
+                return entry[1] if entry else None
+            if name == 'MGET':
+                return [entry[1] if entry else None for entry in (state.live(self.db, key, now) for key in args)]
+            if name == 'GETRANGE':
+                entry = state.live(self.db, args[0], now)
+                value = entry[1] if entry else b''
+                start, end = int(args[1]), int(args[2])
+                end = len(value) + end if end < 0 else end
+                return value[start:end + 1]
+            if name == 'SET':
+                key, value, options = args[0], args[1], [a.decode().upper() for a in args[2:]]
+                expires_at = math.inf
+                for i, option in enumerate(options):
+                    if option == 'PX':
+                        expires_at = now + int(options[i + 1]) / 1000
+                    elif option == 'EX':
+                        expires_at = now + int(options[i + 1])
+                exists = state.live(self.db, key, now) is not None
+                if ('NX' in options and exists) or ('XX' in options and not exists):
+                    return None
+                entries[key] = (expires_at, value)
+                return 'OK'
+            if name == 'DEL':
+                return sum(entries.pop(key, None) is not None for key in args)
+            if name == 'EXISTS':
+                return sum(state.live(self.db, key, now) is not None for key in args)
+            if name == 'DBSIZE':
+                return sum(state.live(self.db, key, now) is not None for key in list(entries))
+            if name == 'FLUSHDB':
+                entries.clear()
+                return 'OK'
+        raise _Error(f"ERR unknown command '{name}'")
+
+
+class StubRedisServer:
+    """Runs the stand-in on a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, password=None):
+        self.server = socketserver.ThreadingTCPServer((host, port), StubRedisHandler, bind_and_activate=False)
+        self.server.allow_reuse_address = True
+        self.server.daemon_threads = True
+        self.server.server_bind()
+        self.server.server_activate()
+        self.server.state = StubRedisState(password)
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def url(self):
+        password = self.state.password
+        return f'redis://{":" + password + "@" if password else ""}127.0.0.1:{self.port}'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Local stand-in for a Redis server')
+    parser.add_argument('--port', type=int, default=6379)
+    parser.add_argument('--password')
+    args = parser.parse_args()
+    stub = StubRedisServer(port=args.port, password=args.password)
+    print(f'Stub Redis on {stub.url}')
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
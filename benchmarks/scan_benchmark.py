@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+End-to-end load driver: runs the proxy (`python -m backend.proxy_server`,
+i.e. run_server) against the local market stub and measures full
+/api/trading-calc scans and generic proxy traffic.
+
+Results are written as JSON; pass --compare to diff against an earlier run
+and fail when a metric regresses by more than --max-regression percent.
+
+    python -m benchmarks.scan_benchmark --items 200 --rps 50 --output bench.json
+    python -m benchmarks.scan_benchmark --compare bench.json
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.market_stub import StubMarketServer, add_stub_arguments, config_from_args
+from backend.scan_profile import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+# metric path -> True if higher is better
+TRACKED_METRICS = {
+    ('trading_scan', 'items_per_second'): True,
+    ('trading_scan', 'poll_p99_ms'): False,
+    ('snapshot_scan', 'wall_seconds'): False,
+    ('proxy_traffic', 'requests_per_second'): True,
+    ('proxy_traffic', 'p50_ms'): False,
+    ('proxy_traffic', 'p99_ms'): False,
+    ('process', 'peak_rss_mb'): False,
+    ('process', 'cpu_seconds'): False,
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'Proxy did not start listening on port {port}')
+
+
+def http_json(url, payload=None, timeout=60):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data)
+    if data is not None:
+        req.add_header('Content-Type', 'application/json')
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        body = response.read()
+    return json.loads(body), time.perf_counter() - start
+
+
+def latency_summary(samples):
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def run_trading_scan(proxy, batch_size, poll_interval, timeout, max_snapshot_age=None):
+    catalogue, catalogue_seconds = http_json(f'{proxy}/api/items')
+    items = catalogue.get('payload', {}).get('items', [])
+    started = time.perf_counter()
+    job, _ = http_json(f'{proxy}/api/trading-calc', {
+        'all_items': items,
+        'min_profit': 10,
+        'max_investment': 0,
+        'max_order_age': 30,
+        'batch_size': batch_size,
+        'max_snapshot_age': max_snapshot_age,
+    })
+    job_id = job['job_id']
+    polls = []
+    progress = {}
+    while time.perf_counter() - started < timeout:
+        progress, seconds = http_json(f'{proxy}/api/trading-calc-progress?job_id={job_id}')
+        polls.append(seconds)
+        if progress.get('status') in ('done', 'cancelled'):
+            break
+        time.sleep(poll_interval)
+    elapsed = time.perf_counter() - started
+    poll_stats = latency_summary(polls)
+    return {
+        'status': progress.get('status', 'timeout'),
+        'items': progress.get('total', 0),
+        'opportunities': len(progress.get('results', [])),
+        'catalogue_ms': round(catalogue_seconds * 1000, 3),
+        'wall_seconds': round(elapsed, 3),
+        'items_per_second': round(progress.get('progress', 0) / elapsed, 3) if elapsed else 0.0,
+        'poll_p50_ms': poll_stats['p50_ms'],
+        'poll_p99_ms': poll_stats['p99_ms'],
+        'snapshot_hits': progress.get('snapshot_hits', 0),
+        'profile': progress.get('profile'),
+    }, items
+
+
+def run_proxy_traffic(proxy, items, requests, concurrency):
+    urls = [f"{proxy}/api/items/{items[i % len(items)]['url_name']}/orders" for i in range(requests)]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def fetch(url):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                response.read()
+            ok = True
+        except Exception:
+            ok = False
+        seconds = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(seconds)
+            else:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - started
+    result = latency_summary(latencies)
+    result.update({
+        'errors': errors[0],
+        'concurrency': concurrency,
+        'wall_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+    })
+    return result
+
+
+def child_process_usage():
+    """Peak RSS (MB) and CPU seconds of reaped child processes"""
+    if resource is None:
+        return {'peak_rss_mb': None, 'cpu_seconds': None}
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else usage.ru_maxrss / 1024
+    return {'peak_rss_mb': round(rss_mb, 2), 'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3)}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline, max_regression):
+    """Print per-metric change vs the baseline; return the list of regressions"""
+    regressions = []
+    print(f"{'metric':45} {'baseline':>12} {'current':>12} {'change':>9}")
+    for (section, key), higher_is_better in TRACKED_METRICS.items():
+        old = baseline.get(section, {}).get(key)
+        new = current.get(section, {}).get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        regression = -change if higher_is_better else change
+        flag = '  REGRESSION' if regression > max_regression else ''
+        print(f'{section + "." + key:45} {old:>12} {new:>12} {change:>+8.1f}%{flag}')
+        if regression > max_regression:
+            regressions.append(f'{section}.{key}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end proxy benchmark against the local market stub')
+    add_stub_arguments(parser)
+    parser.add_argument('--rps', type=int, default=50, help='Proxy REQUESTS_PER_SECOND for the run')
+    parser.add_argument('--batch-size', type=int, default=5)
+    parser.add_argument('--poll-interval', type=float, default=0.25)
+    parser.add_argument('--scan-timeout', type=float, default=900)
+    parser.add_argument('--proxy-requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--output', help='Result JSON path (default: benchmarks/results/scan-<time>.json)')
+    parser.add_argument('--compare', help='Earlier result JSON to compare against')
+    parser.add_argument('--max-regression', type=float, default=15.0, help='Allowed regression in percent')
+    args = parser.parse_args(argv)
+
+    stub_config = config_from_args(args)
+    commit = git_commit()
+    usage_before = child_process_usage()
+    port = free_port()
+    snapshot_dir = tempfile.TemporaryDirectory(prefix='wfm-snapshots-')
+    env = dict(os.environ, WARFRAME_MARKET_API_URL='', PROXY_REQUESTS_PER_SECOND=str(args.rps), MARKET_WATCHER='0',
+               ORDER_BOOK_SNAPSHOT_DIR=snapshot_dir.name)
+    with snapshot_dir, StubMarketServer(stub_config) as stub:
+        env['WARFRAME_MARKET_API_URL'] = stub.url
+        proxy_proc = subprocess.Popen(
+            [sys.executable, '-m', 'backend.proxy_server', '--port', str(port)],
+            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            proxy = f'http://127.0.0.1:{port}'
+            print(f'Proxy pid {proxy_proc.pid} on {proxy}, stub on {stub.url}')
+            scan, items = run_trading_scan(proxy, args.batch_size, args.poll_interval, args.scan_timeout)
+            print(f"trading_scan: {scan['items']} items in {scan['wall_seconds']}s ({scan['items_per_second']} items/s)")
+            # Same scan again, answered from the order books the first scan left in the snapshot
+            snapshot_scan, _ = run_trading_scan(proxy, args.batch_size, min(args.poll_interval, 0.05), args.scan_timeout,
+                                                max_snapshot_age=3600)
+            print(f"snapshot_scan: {snapshot_scan['snapshot_hits']}/{snapshot_scan['items']} from snapshot in {snapshot_scan['wall_seconds']}s")
+            traffic = run_proxy_traffic(proxy, items, args.proxy_requests, args.concurrency)
+            print(f"proxy_traffic: {traffic['requests_per_second']} req/s, p50 {traffic['p50_ms']}ms, p99 {traffic['p99_ms']}ms")
+        finally:
+            proxy_proc.send_signal(signal.SIGINT)
+            try:
+                proxy_proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proxy_proc.kill()
+                proxy_proc.wait()
+        stub_counts = dict(stub.state.counts)
+    process_usage = child_process_usage()
+    if process_usage['cpu_seconds'] is not None:
+        process_usage['cpu_seconds'] = round(process_usage['cpu_seconds'] - usage_before['cpu_seconds'], 3)
+
+    result = {
+        'benchmark': 'scan_benchmark',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': commit,
+        'config': {'stub': stub_config.to_dict(), 'rps': args.rps, 'batch_size': args.batch_size,
+                   'proxy_requests': args.proxy_requests, 'concurrency': args.concurrency},
+        'trading_scan': scan,
+        'snapshot_scan': snapshot_scan,
+        'proxy_traffic': traffic,
+        'process': process_usage,
+        'stub_requests': stub_counts,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"scan-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"process: peak RSS {result['process']['peak_rss_mb']} MB, CPU {result['process']['cpu_seconds']}s")
+    print(f'Results written to {output}')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressions over {args.max_regression}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -93,7 +93,8 @@ const TradingCalculator = () => {
         setOpportunities(data.results);
         setProgress(data.total ? Math.round((data.progress / data.total) * 100) : 0);
         setProgressText(`Analyzed ${data.progress} / ${data.total} items`);
-        if (data.status === 'done' || data.status === 'cancelled') {
+        if (data.status === 'done' || data.status === 'cancelled' || data.status === 'error') {
+          if (data.status === 'error') setError(data.error || 'Trading analysis failed');
           setShowProgress(false);
           setAnalysisInProgress(false);
           pollingRef.current.polling = false;
@@ -19,4 +19,4 @@ export async function fetchApi(path, options = {}) {
   } catch (err) {
     throw new Error(err.message || 'Network error');
   }
-} 
\ No newline at end of file
+}
@@ -0,0 +1,62 @@
+"""Helpers and fixtures for tests that drive ProxyHandler over HTTP"""
+import contextlib
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.market_stub import StubConfig, StubMarketServer
+from backend import proxy_server
+from backend.analysis_memo import AnalysisMemo
+from backend.market_client import MarketClient
+from backend.order_book_cache import OrderBookCache
+
+
+def serve(handler=proxy_server.ProxyHandler):
+    """Run handler on a free port in a background thread; returns (httpd, base URL)"""
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f'http://127.0.0.1:{httpd.server_address[1]}'
+
+
+def close(httpd):
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post_json(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode())
+    with urllib.request.urlopen(req, timeout=5) as response:
+        return json.loads(response.read())
+
+
+@contextlib.contextmanager
+def proxy_upstream(market_url):
+    """Point proxy_server at market_url with empty order-book, analysis and job stores"""
+    with patch.object(proxy_server, 'market_client', MarketClient(market_url)), \
+            patch.object(proxy_server, 'API_BASE_URL', market_url), \
+            patch.object(proxy_server, 'order_book_cache', OrderBookCache(proxy_server.fetch_order_book)), \
+            patch.object(proxy_server, 'analysis_memo', AnalysisMemo()), \
+            patch.object(proxy_server, 'trading_jobs', {}), \
+            patch.object(proxy_server, 'syndicate_jobs', {}), \
+            patch.object(proxy_server, 'syndicate_deadlines', {}):
+        yield
+
+
+@pytest.fixture
+def proxy_with_stub():
+    """
+    proxy_with_stub(**stub_config) starts a market stub and a proxy pointed at it (see proxy_upstream);
+    returns (proxy URL, stub). Both are stopped when the test ends.
+    """
+    with contextlib.ExitStack() as stack:
+        def start(**config):
+            stub = stack.enter_context(StubMarketServer(StubConfig(**config)))
+            stack.enter_context(proxy_upstream(stub.url))
+            httpd, proxy = serve()
+            stack.callback(close, httpd)
+            return proxy, stub
+        yield start
@@ -0,0 +1,117 @@
+import datetime
+import json
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+from benchmarks.market_stub import StubConfig, StubMarketServer
+from backend import proxy_server
+from backend.analysis_memo import AnalysisMemo, orders_digest
+from backend.market_client import MarketClient
+from backend.order_book_cache import OrderBookCache
+from backend.order_record import OrderRecord
+from backend.trading_calculator import TradingCalculator
+
+
+def _book(buy_age_seconds=3600, sell=60, buy=20):
+    created = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=buy_age_seconds)
+    return [{'id': 's', 'order_type': 'sell', 'platinum': sell},
+            {'id': 'b', 'order_type': 'buy', 'platinum': buy, 'creation_date': created.isoformat()}]
+
+
+def test_lru_eviction_and_expiry():
+    memo = AnalysisMemo(max_entries=2)
+    memo.put('a', 1)
+    memo.put('b', 2)
+    assert memo.get('a') == 1
+    memo.put('c', 3)  # evicts b, the least recently used
+    assert memo.get('b') is None and memo.get('a') == 1
+    memo.put('d', 4, expires_at=100.0)
+    assert memo.get('d', now=99.0) == 4
+    assert memo.get('d', now=100.0) is None
+    assert memo.stats() == {'entries': 1, 'hits': 3, 'misses': 2, 'expired': 1}
+
+
+def test_digest_tracks_analysis_fields_only():
+    book = _book()
+    assert orders_digest(book) == orders_digest([dict(o, user={'status': 'ingame'}) for o in book])
+    assert orders_digest(book) != orders_digest(_book(sell=61))
+
+
+def test_identical_books_are_analyzed_once():
+    memo = AnalysisMemo()
+    calc = TradingCalculator(min_profit=0, memo=memo)
+    book = _book()
+    with patch.object(calc, 'analyze_with_expiry', wraps=calc.analyze_with_expiry) as analyze:
+        first = calc.analyze_prime_item_orders(book, 'A', 'a', 30)
+        first[0]['annotation'] = 1
+        second = calc.analyze_prime_item_orders([dict(o) for o in book], 'A', 'a', 30)
+        assert analyze.call_count == 1
+        assert second == [{k: v for k, v in first[0].items() if k != 'annotation'}]
+        calc.analyze_prime_item_orders(book, 'A', 'a', 7)  # different max_order_age
+        TradingCalculator(min_profit=50, memo=memo).analyze_prime_item_orders(book, 'A', 'a', 30)
+        calc.analyze_prime_item_orders(_book(sell=70), 'A', 'a', 30)
+    assert memo.stats()['hits'] == 1 and len(memo) == 4
+
+
+def test_result_expires_when_best_wtb_crosses_age_limit():
+    memo = AnalysisMemo()
+    calc = TradingCalculator(min_profit=0, memo=memo)
+    book = _book(buy_age_seconds=86400 - 0.5)  # ages are whole seconds
+    assert calc.analyze_prime_item_orders(book, 'A', 'a', 1)
+    time.sleep(1.6)
+    assert calc.analyze_prime_item_orders(book, 'A', 'a', 1) == []
+    assert memo.stats()['expired'] == 1
+    # An order that is already too old never becomes valid again, so its verdict is kept
+    calc.analyze_prime_item_orders(book, 'A', 'a', 1)
+    assert memo.stats()['hits'] == 1
+
+
+def test_rescan_skips_parsing_and_analysis_of_unchanged_books():
+    def scan(proxy, items):
+        req = urllib.request.Request(f'{proxy}/api/trading-calc', data=json.dumps({
+            'all_items': items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 4}).encode())
+        with urllib.request.urlopen(req, timeout=5) as response:
+            job_id = json.loads(response.read())['job_id']
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}', timeout=5) as response:
+                progress = json.loads(response.read())
+            if progress['status'] == 'done':
+                return progress
+            time.sleep(0.05)
+        raise AssertionError('scan did not finish')
+
+    with StubMarketServer(StubConfig(item_count=8, orders_per_item=20, latency='fixed', latency_ms=1, ingame_ratio=1.0)) as stub:
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        proxy = f'http://127.0.0.1:{httpd.server_address[1]}'
+        analysis, parsed = AnalysisMemo(), AnalysisMemo(name='parsed_book')
+        books = OrderBookCache(proxy_server.fetch_order_book)
+        try:
+            with patch.object(proxy_server, 'market_client', MarketClient(stub.url)), \
+                 patch.object(proxy_server, 'order_book_cache', books), \
+                 patch.object(proxy_server, 'analysis_memo', analysis), \
+                 patch.object(proxy_server, 'parsed_book_memo', parsed):
+                first = scan(proxy, stub.state.items)
+                assert analysis.stats()['hits'] == 0 and parsed.stats()['hits'] == 0
+                first_fetched = {url_name: entry[0] for url_name, entry in books._entries.items()}
+                second = scan(proxy, stub.state.items)
+                assert stub.state.counts['item_orders'] == 14
+                assert parsed.stats()['hits'] == 7
+                assert analysis.stats()['hits'] == 7
+                assert sorted(o['itemId'] for o in second['results']) == sorted(o['itemId'] for o in first['results'])
+                # Parsed entries keep only the in-game records; the full books stay in (and are renewed in) the cache
+                for _, (url_name, fetched_at, records) in parsed._entries.values():
+                    assert all(isinstance(r, OrderRecord) for r in records)
+                    assert books._entries[url_name][0] == fetched_at > first_fetched[url_name]
+                # Books evicted from the cache are parsed again
+                books.clear()
+                third = scan(proxy, stub.state.items)
+                assert len(books) == 7 and analysis.stats()['hits'] == 14
+                assert sorted(o['itemId'] for o in third['results']) == sorted(o['itemId'] for o in first['results'])
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
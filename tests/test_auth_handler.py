@@ -23,7 +23,7 @@ def test_dummy_login():
     mock_response_signin.status = 200
     mock_response_signin.headers = mock_headers
     mock_response_signin.__enter__.return_value = mock_response_signin  # Ensure context manager works
-    with patch('urllib.request.urlopen', side_effect=[mock_response_auth, mock_response_signin]):
+    with patch('backend.deadline.urlopen', side_effect=[mock_response_auth, mock_response_signin]):
         result = auth_handler.handle_login_request('dummyuser', 'dummypass')
         assert result['success'] is True
         assert 'csrf_token' in result
@@ -52,7 +52,7 @@ def test_handle_login_request_success():
     mock_headers.get_all.return_value = ['JWT=abc; Path=/;']
     response_json = b'{"success": true}'
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=response_json)
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user', 'pass')
         assert result['success']
 
@@ -63,7 +63,7 @@ def test_handle_login_request_failure():
     mock_headers.get_all.return_value = []
     response_json = b'{"success": false}'
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=response_json)
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user', 'wrongpass')
         assert not result['success']
 
@@ -73,7 +73,7 @@ def test_bad_json():
     mock_headers = MagicMock()
     mock_headers.get_all.return_value = ['JWT=abc; Path=/;']
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=b'{"success": true,')
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user', 'pass')
         assert not result['success']
         assert 'Login error:' in result['message']
@@ -83,7 +83,7 @@ def test_missing_fields():
     mock_headers = MagicMock()
     mock_headers.get_all.return_value = ['JWT=abc; Path=/;']
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=b'{"success": true, "payload": {"user": {"ingame_name": "testuser"}}}')
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user', 'pass')
         assert result['success'] is True
         assert 'csrf_token' in result
@@ -91,7 +91,7 @@ def test_missing_fields():
 
 def test_network_errors():
     # Mock a network error during the request
-    with patch('urllib.request.urlopen', side_effect=Exception("Network error")):
+    with patch('backend.deadline.urlopen', side_effect=Exception("Network error")):
         result = auth_handler.handle_login_request('user', 'pass')
         assert not result['success']
         assert "Network error" in result['message']
@@ -101,7 +101,7 @@ def test_bad_jwt():
     mock_headers = MagicMock()
     mock_headers.get_all.return_value = ['JWT=bad_jwt; Path=/;']
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=b'{"success": true, "payload": {"user": {"ingame_name": "testuser"}}}')
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user', 'pass')
         assert result['success'] is True  # The function accepts any JWT token
     
@@ -138,7 +138,7 @@ def test_malformed_response():
     mock_headers = MagicMock()
     mock_headers.get_all.return_value = ['JWT=abc; Path=/;']
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=b'{"success": true, "payload": ')
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user', 'pass')
         assert not result['success']
         assert 'Login error:' in result['message']
@@ -148,7 +148,7 @@ def test_http_errors():
     mock_headers = MagicMock()
     mock_headers.get_all.return_value = []
     mock_response = MockHTTPResponse(status=404, headers=mock_headers, data=b'{"error": {"message": "Not Found"}}')
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user', 'pass')
         assert not result['success']
         assert "Not Found" in result['message']
@@ -211,7 +211,7 @@ def test_login_success_with_username():
     response_data = b'{"success": true, "payload": {"user": {"ingame_name": "testuser"}}}'
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=response_data)
     
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user@example.com', 'password')
         assert result['success'] is True
         assert result['csrf_token'] == 'abc123'
@@ -225,7 +225,7 @@ def test_login_success_with_slug():
     response_data = b'{"success": true, "payload": {"user": {"slug": "testuser"}}}'
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=response_data)
     
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user@example.com', 'password')
         assert result['success'] is True
         assert result['csrf_token'] == 'abc123'
@@ -239,7 +239,7 @@ def test_login_no_jwt_token():
     response_data = b'{"success": true, "payload": {"user": {"ingame_name": "testuser"}}}'
     mock_response = MockHTTPResponse(status=200, headers=mock_headers, data=response_data)
     
-    with patch('urllib.request.urlopen', return_value=mock_response):
+    with patch('backend.deadline.urlopen', return_value=mock_response):
         result = auth_handler.handle_login_request('user@example.com', 'password')
         assert not result['success']
         assert 'No JWT token found' in result['message']
\ No newline at end of file
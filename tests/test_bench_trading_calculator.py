@@ -0,0 +1,38 @@
+import json
+from benchmarks import bench_trading_calculator as bench
+
+
+def test_quick_run_writes_baseline_and_passes_against_itself(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    assert bench.main(['--quick', '--repeats', '1', '--baseline', str(baseline), '--update-baseline']) == 0
+    result = json.loads(baseline.read_text())
+    cases = bench.cases_by_name(result)
+    assert set(cases) == {'item_orders/10', 'item_orders/100', 'prime_items/20x40', 'prime_items/50x40'}
+    assert all(case['us_per_item'] > 0 for case in cases.values())
+    assert bench.compare(result, result, 25.0) == []
+
+
+def test_compare_flags_slower_and_hungrier_cases():
+    baseline = {'curves': {'c': {'cases': [{'case': 'x', 'us_per_item': 100.0, 'peak_kib': 10.0}]}}}
+    current = {'curves': {'c': {'cases': [{'case': 'x', 'us_per_item': 130.0, 'peak_kib': 10.5}]}}}
+    assert bench.compare(current, baseline, 25.0) == ['x.us_per_item']
+    assert bench.compare(current, baseline, 50.0) == []
+    # Small absolute swings in peak memory are noise, not regressions
+    current['curves']['c']['cases'][0].update(us_per_item=100.0, peak_kib=13.0)
+    assert bench.compare(current, baseline, 25.0) == []
+
+
+def test_regressions_fail_the_run_only_when_asked(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    assert bench.main(['--quick', '--repeats', '1', '--baseline', str(baseline), '--update-baseline']) == 0
+    result = json.loads(baseline.read_text())
+    for case in bench.cases_by_name(result).values():
+        case['us_per_item'] /= 10
+    baseline.write_text(json.dumps(result))
+    assert bench.main(['--quick', '--repeats', '1', '--baseline', str(baseline)]) == 0
+    assert bench.main(['--quick', '--repeats', '1', '--baseline', str(baseline), '--fail-on-regression']) == 1
+
+
+def test_scaling_exponent():
+    assert bench.scaling_exponent([(10, 1.0), (1000, 100.0)]) == 1.0
+    assert bench.scaling_exponent([(10, 1.0), (1000, 1.0)]) == 0.0
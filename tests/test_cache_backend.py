@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.market_stub import StubConfig, StubMarketServer, build_orders
+from benchmarks.redis_stub import StubRedisServer
+from backend import cache_backend, proxy_server
+from backend.cache_backend import (BackendBookStore, CacheBackendError, CatalogueStore, MemoryBackend, RateLimitTokens,
+                                   RedisBackend, ResponseCache)
+from backend.item_search import ItemCatalogue
+from backend.market_client import MarketClient
+from backend.order_book_cache import OrderBookCache
+from backend.snapshot_store import decode_orders
+
+
+@pytest.fixture
+def redis():
+    with StubRedisServer(password='secret') as server:
+        yield server
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request, redis):
+    backend = MemoryBackend() if request.param == 'memory' else cache_backend.from_url(redis.url + '/3')
+    yield backend
+    backend.close()
+
+
+def test_backends_store_bytes_with_expiry_and_add_if_absent(backend):
+    assert backend.get('missing') is None and backend.get_range('missing', 0, 3) is None
+    backend.set('book', b'\x00\x01payload')
+    assert backend.get('book') == b'\x00\x01payload' and backend.get_range('book', 2, 4) == b'pay'
+    assert backend.get_many(['book', 'missing']) == [b'\x00\x01payload', None]
+    assert backend.add('token', b'1', ttl=0.1) is True and backend.add('token', b'2', ttl=0.1) is False
+    backend.set('short', b'x', ttl=0.1)
+    time.sleep(0.15)
+    assert backend.get('short') is None and backend.add('token', b'3', ttl=0.1) is True
+    backend.delete('book')
+    assert backend.get('book') is None
+
+
+def test_rate_limit_tokens_are_shared_by_every_node(redis):
+    nodes = [RedisBackend(port=redis.port, password='secret') for _ in range(3)]
+    limits = [RateLimitTokens(node, limit=5, period=0.4) for node in nodes]
+    assert [limits[i % 3].take_slot() for i in range(6)] == [True] * 5 + [False]
+    assert all(limit.free_slots() == 0 for limit in limits)
+    time.sleep(0.45)
+    assert limits[2].free_slots() == 5 and limits[2].try_take(headroom=4) and not limits[1].try_take(headroom=4)
+
+    # Concurrent takers on three nodes never exceed 5 per 0.4s between them
+    time.sleep(0.45)
+    taken = []
+
+    def taker(limit):
+        until = time.time() + 1.0
+        while time.time() < until:
+            if limit.take_slot():
+                taken.append(time.time())
+            time.sleep(0.002)
+
+    threads = [threading.Thread(target=taker, args=(limit,)) for limit in limits for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 10 <= len(taken) <= 5 * 4
+
+
+def test_order_books_and_catalogue_are_shared_between_nodes(redis):
+    orders = build_orders(StubConfig(orders_per_item=30), 'ash_prime_set')
+    node_a = OrderBookCache(lambda url_name: orders)
+    node_a.attach_store(BackendBookStore(cache_backend.from_url(redis.url)))
+    assert node_a.get('ash_prime_set') == orders
+
+    node_b = OrderBookCache(lambda url_name: pytest.fail(f'node b fetched {url_name}'))
+    node_b.attach_store(BackendBookStore(cache_backend.from_url(redis.url)))
+    shared = node_b.get('ash_prime_set')
+    # Only the fields scans use are kept (see snapshot_store)
+    assert [(o['id'], o['platinum'], o['user']['status']) for o in shared] == \
+           [(o['id'], o['platinum'], o['user']['status']) for o in orders]
+    assert redis.state.counts['GETRANGE'] >= 1  # freshness checks read only the record header
+    record = redis.state.dbs[0][b'wfm:book:ash_prime_set'][1]
+    assert decode_orders(record, 0)[0] == 'ash_prime_set' and len(record) < len(json.dumps(orders)) / 2
+
+    items = [{'id': f'id{i}', 'url_name': f'item_{i}', 'item_name': f'Item {i} Prime'} for i in range(50)]
+    catalogue_a = ItemCatalogue(lambda: items, ttl=60)
+    catalogue_a.attach_store(CatalogueStore(cache_backend.from_url(redis.url)))
+    assert len(catalogue_a.get()) == 50
+    catalogue_b = ItemCatalogue(lambda: pytest.fail('node b fetched the catalogue'), ttl=60)
+    catalogue_b.attach_store(CatalogueStore(cache_backend.from_url(redis.url)))
+    assert catalogue_b.get().get('item_7')['item_name'] == 'Item 7 Prime'
+
+
+def test_proxied_get_responses_are_cached_for_anonymous_clients(redis):
+    shared = cache_backend.from_url(redis.url)
+    with StubMarketServer(StubConfig(item_count=6, latency='fixed', latency_ms=1)) as stub, \
+            patch.object(proxy_server, 'market_client', MarketClient(stub.url)), \
+            patch.object(proxy_server, 'API_BASE_URL', stub.url), \
+            patch.object(proxy_server, 'get_auth_headers', lambda: {}), \
+            patch.object(proxy_server, 'response_cache', ResponseCache(shared, ttl=60)):
+        httpd = proxy_server.ThreadingHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        proxy = f'http://127.0.0.1:{httpd.server_address[1]}'
+        try:
+            bodies = []
+            for _ in range(3):
+                with urllib.request.urlopen(f'{proxy}/api/items', timeout=5) as response:
+                    bodies.append(response.read())
+            assert bodies[0] == bodies[1] == bodies[2] == stub.state.items_body
+            assert stub.state.counts['items'] == 1
+            req = urllib.request.Request(f'{proxy}/api/items', headers={'Authorization': 'JWT x'})
+            with urllib.request.urlopen(req, timeout=5) as response:
+                assert response.read() == stub.state.items_body
+            assert stub.state.counts['items'] == 2
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+
+def test_unreachable_backend_degrades_to_misses_and_the_local_rate_limit(redis):
+    port = redis.port
+    redis.stop()
+    dead = RedisBackend(port=port, timeout=0.5)
+    with pytest.raises(CacheBackendError):
+        dead.get('anything')
+    assert BackendBookStore(dead).get('ash_prime_set') is None
+    assert BackendBookStore(dead).fetched_at('ash_prime_set') is None
+    with patch.object(proxy_server, 'shared_rate_window', RateLimitTokens(dead, 5)), \
+            patch.object(proxy_server, 'request_timestamps', []), patch.object(proxy_server, 'RATE_LIMIT', 3):
+        assert proxy_server.free_rate_limit_slots() == 3
+        assert proxy_server.take_rate_limit_slot() is True
+        assert proxy_server.free_rate_limit_slots() == 2
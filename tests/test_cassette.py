@@ -0,0 +1,77 @@
+import os
+import pytest
+from backend.cassette import Cassette, CassetteMiss, RECORD, REPLAY
+from backend.market_client import MarketClient
+from benchmarks.market_stub import StubMarketServer, StubConfig
+
+
+def test_record_and_replay_roundtrip(tmp_path):
+    path = str(tmp_path / 'orders.cas')
+    with Cassette(path, RECORD) as cassette:
+        cassette.record('GET /items', 200, {'Content-Type': 'application/json'}, b'{"payload": {}}', {'ttfb': 0.25})
+        cassette.record('GET /items/a/orders', 200, {}, b'first', {})
+        cassette.record('GET /items/a/orders', 429, {}, b'second', {})
+    with Cassette(path, REPLAY, speed=0) as cassette:
+        assert len(cassette) == 3
+        timings = {}
+        entry = cassette.replay('GET /items', timings)
+        assert entry.body == b'{"payload": {}}'
+        assert entry.headers['Content-Type'] == 'application/json'
+        assert timings['ttfb'] == pytest.approx(0.25)
+        # Repeated keys replay in recording order, then repeat the last response
+        assert cassette.replay('GET /items/a/orders').body == b'first'
+        assert cassette.replay('GET /items/a/orders').status == 429
+        assert cassette.replay('GET /items/a/orders').body == b'second'
+        cassette.rewind()
+        assert cassette.replay('GET /items/a/orders').body == b'first'
+        with pytest.raises(CassetteMiss):
+            cassette.replay('GET /items/missing/orders')
+
+
+def test_replay_recovers_unclosed_recording(tmp_path):
+    path = str(tmp_path / 'crashed.cas')
+    cassette = Cassette(path, RECORD)
+    cassette.record('GET /items', 200, {}, b'catalogue', {})
+    # Simulate a crash: the index/footer is never written
+    cassette._file.close()
+    cassette._file = None
+    with Cassette(path, REPLAY, speed=0) as replay:
+        assert replay.replay('GET /items').body == b'catalogue'
+
+
+def test_record_mode_appends_to_existing_archive(tmp_path):
+    path = str(tmp_path / 'append.cas')
+    with Cassette(path, RECORD) as cassette:
+        cassette.record('GET /a', 200, {}, b'a', {})
+    with Cassette(path, RECORD) as cassette:
+        cassette.record('GET /b', 200, {}, b'b', {})
+    with Cassette(path, REPLAY, speed=0) as cassette:
+        assert sorted(cassette.keys()) == ['GET /a', 'GET /b']
+
+
+def test_rejects_non_cassette_file(tmp_path):
+    path = tmp_path / 'bogus.cas'
+    path.write_bytes(b'not a cassette')
+    with pytest.raises(ValueError):
+        Cassette(str(path), REPLAY)
+
+
+def test_market_client_records_then_replays_offline(tmp_path):
+    path = str(tmp_path / 'stub.cas')
+    with StubMarketServer(StubConfig(item_count=5, latency='fixed', latency_ms=0)) as stub:
+        url_name = stub.state.items[0]['url_name']
+        with Cassette(path, RECORD) as cassette:
+            client = MarketClient(stub.url, cassette=cassette)
+            live = client.get(f'/items/{url_name}/orders?include=item')
+            client.get('/items')
+            client.close()
+    # The stub is gone; replay must not touch the network
+    with Cassette(path, REPLAY, speed=0) as cassette:
+        client = MarketClient('http://127.0.0.1:9/v1', cassette=cassette)
+        timings = {}
+        replayed = client.get(f'/items/{url_name}/orders?include=item', timings=timings)
+        assert replayed.body == live.body
+        assert replayed.status == 200
+        assert replayed.header('content-type') == 'application/json'
+        assert 'ttfb' in timings
+    assert os.path.getsize(path) < len(live.body)
@@ -0,0 +1,185 @@
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from backend import deadline as deadlines
+from backend import metrics
+from backend import proxy_server
+from backend.deadline import Cancelled, Deadline, DeadlineExceeded, is_timeout
+from backend.market_client import MarketClient
+from tests.conftest import post_json, serve
+
+
+def test_deadline_checks_caps_and_cancels():
+    deadline = Deadline(0.5)
+    assert 0 < deadline.timeout(10) <= 0.5 and deadline.timeout(0.1) == 0.1
+    aborted = []
+    with deadline.abort_with(lambda: aborted.append(1)):
+        threading.Timer(0.05, deadline.cancel).start()
+        started = time.monotonic()
+        with pytest.raises(Cancelled):
+            deadline.sleep(5)
+        assert time.monotonic() - started < 0.4
+    assert aborted == [1]
+    with deadline.abort_with(lambda: aborted.append(2)):
+        pass  # already cancelled: aborts at once
+    assert aborted == [1, 2]
+    with pytest.raises(DeadlineExceeded):
+        Deadline(0).check()
+    assert is_timeout(DeadlineExceeded()) and is_timeout(urllib.error.URLError(socket.timeout()))
+    assert deadlines.current() is deadlines.UNBOUNDED
+    with deadlines.use(deadline):
+        assert deadlines.current() is deadline
+    assert deadlines.current() is deadlines.UNBOUNDED
+
+
+@pytest.fixture
+def stalled_upstream():
+    """Accepts connections and never answers"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(16)
+    accepted = []
+    stop = threading.Event()
+
+    def accept():
+        listener.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                accepted.append(listener.accept()[0])
+            except OSError:
+                pass
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{listener.getsockname()[1]}/v1'
+    stop.set()
+    thread.join()
+    for conn in accepted:
+        conn.close()
+    listener.close()
+
+
+def test_market_client_times_out_and_aborts_in_flight(stalled_upstream):
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        MarketClient(stalled_upstream, read_timeout=0.2).get('/items')
+    assert time.monotonic() - started < 2
+    deadline = Deadline()
+    threading.Timer(0.2, deadline.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(Cancelled):
+        MarketClient(stalled_upstream, read_timeout=30).get('/items', deadline=deadline)
+    assert time.monotonic() - started < 2
+    with pytest.raises(DeadlineExceeded):
+        MarketClient(stalled_upstream, read_timeout=30).get('/items', deadline=Deadline(0.2))
+
+
+@pytest.fixture
+def full_backlog():
+    """A listener whose accept queue is full, so new connects hang until they time out"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(0)
+    queued = socket.create_connection(listener.getsockname())
+    yield f'http://127.0.0.1:{listener.getsockname()[1]}/v1'
+    queued.close()
+    listener.close()
+
+
+def test_urlopen_calls_get_a_connect_timeout(full_backlog, stalled_upstream):
+    req = urllib.request.Request(f'{full_backlog}/profile/orders', data=b'{}', method='POST')
+    with patch.object(deadlines, 'CONNECT_TIMEOUT', 0.2):
+        started = time.monotonic()
+        with pytest.raises(urllib.error.URLError) as error:
+            with metrics.timed_urlopen(req):
+                pass
+        assert is_timeout(error.value) and time.monotonic() - started < 2
+        # The connect timeout does not cap the wait for the response
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            with metrics.timed_urlopen(f'{stalled_upstream}/auth/signin', timeout=0.5) as response:
+                response.read()
+        assert 0.5 <= time.monotonic() - started < 2
+
+
+def test_urlopen_calls_are_aborted_when_the_deadline_is_cancelled(stalled_upstream):
+    deadline = Deadline()
+    threading.Timer(0.2, deadline.cancel).start()
+    started = time.monotonic()
+    with deadlines.use(deadline), pytest.raises(Cancelled):
+        with metrics.timed_urlopen(urllib.request.Request(f'{stalled_upstream}/profile/orders/x', method='DELETE')):
+            pass
+    assert time.monotonic() - started < 2
+    with pytest.raises(Cancelled):
+        with metrics.timed_urlopen(f'{stalled_upstream}/profile/orders', deadline=deadline):
+            pass
+
+
+def test_proxied_request_to_stalled_upstream_is_a_504(stalled_upstream):
+    httpd, proxy = serve()
+    try:
+        with patch.object(proxy_server, 'market_client', MarketClient(stalled_upstream, read_timeout=0.2)):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f'{proxy}/api/items', timeout=5)
+            assert error.value.code == 504
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_cancel_aborts_fetches_in_flight(proxy_with_stub):
+    # Each upstream request takes 5s; cancelling must not wait for them
+    proxy, stub = proxy_with_stub(item_count=6, latency='fixed', latency_ms=5000, ingame_ratio=1.0)
+    job_id = post_json(f'{proxy}/api/trading-calc', {
+        'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 6})['job_id']
+    time.sleep(0.3)
+    started = time.monotonic()
+    post_json(f'{proxy}/api/cancel-analysis', {})
+    while time.monotonic() - started < 4:
+        with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}') as response:
+            progress = json.loads(response.read())
+        if progress['status'] == 'cancelled':
+            break
+        time.sleep(0.05)
+    assert progress['status'] == 'cancelled' and progress['cancelled']
+    assert time.monotonic() - started < 2
+
+
+def test_cancel_aborts_syndicate_scan_fetches_in_flight(proxy_with_stub):
+    proxy, stub = proxy_with_stub(item_count=6, latency='fixed', latency_ms=5000, ingame_ratio=1.0)
+    job_id = post_json(f'{proxy}/api/syndicate-scan', {'syndicate': 'suda'})['job_id']
+    while not stub.state.counts.get('item_orders'):
+        time.sleep(0.05)
+    started = time.monotonic()
+    post_json(f'{proxy}/api/cancel-analysis', {})
+    while time.monotonic() - started < 4:
+        with urllib.request.urlopen(f'{proxy}/api/syndicate-scan-progress?job_id={job_id}') as response:
+            progress = json.loads(response.read())
+        if progress['status'] != 'running':
+            break
+        time.sleep(0.05)
+    assert progress['status'] == 'cancelled' and progress['cancelled']
+    assert time.monotonic() - started < 2
+    assert proxy_server.syndicate_deadlines == {}
+
+
+def test_job_deadline_stops_the_scan(proxy_with_stub):
+    proxy, stub = proxy_with_stub(item_count=6, latency='fixed', latency_ms=5000, ingame_ratio=1.0)
+    with patch.object(proxy_server, 'TRADING_JOB_DEADLINE', 0.5):
+        job_id = post_json(f'{proxy}/api/trading-calc', {
+            'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 3})['job_id']
+        started = time.monotonic()
+        while time.monotonic() - started < 4:
+            with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}') as response:
+                progress = json.loads(response.read())
+            if progress['status'] != 'running':
+                break
+            time.sleep(0.05)
+        assert progress['status'] == 'cancelled' and not progress['cancelled']
+        assert 'deadline' in progress['error']
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from backend.deadline import Deadline, DeadlineExceeded
+from backend import fair_share
+from backend.fair_share import INTERACTIVE, JOB, WRITE, FairShareScheduler
+
+
+class FakeLimiter:
+    """Rate limiter whose free slots the test hands out one at a time"""
+    def __init__(self):
+        self.free = 0
+        self.lock = threading.Lock()
+
+    def free_slots(self):
+        with self.lock:
+            return self.free
+
+    def take_slot(self):
+        with self.lock:
+            if self.free > 0:
+                self.free -= 1
+                return True
+            return False
+
+
+def _queue(scheduler, granted, lane, flow=None):
+    before = sum(scheduler.waiting().values())
+
+    def run():
+        scheduler.acquire(lane, flow, Deadline(5))
+        granted.append((lane, flow))
+    threading.Thread(target=run, daemon=True).start()
+    _wait_for(lambda: sum(scheduler.waiting().values()) == before + 1)
+
+
+def _wait_for(condition, timeout=2.0):
+    started = time.monotonic()
+    while not condition():
+        assert time.monotonic() - started < timeout
+        time.sleep(0.005)
+
+
+def _release(limiter, granted, slots=1):
+    count = len(granted)
+    with limiter.lock:
+        limiter.free = slots
+    _wait_for(lambda: len(granted) == count + 1)
+
+
+def test_interactive_and_jobs_share_by_weight_and_jobs_take_turns():
+    limiter = FakeLimiter()
+    scheduler = FairShareScheduler(limiter.free_slots, limiter.take_slot, interactive_weight=2, reserved=0)
+    granted = []
+    for lane, flow in [(JOB, 'a'), (JOB, 'a'), (JOB, 'b'), (JOB, 'b'),
+                       (INTERACTIVE, None), (INTERACTIVE, None), (INTERACTIVE, None)]:
+        _queue(scheduler, granted, lane, flow)
+    for _ in range(7):
+        _release(limiter, granted)
+    assert granted == [(INTERACTIVE, None), (JOB, 'a'), (INTERACTIVE, None), (INTERACTIVE, None),
+                       (JOB, 'b'), (JOB, 'a'), (JOB, 'b')]
+    assert scheduler.status()['granted'] == {WRITE: 0, INTERACTIVE: 3, JOB: 4}
+    assert scheduler.status()['job_flows'] == 0
+
+
+def test_writes_go_first_and_scans_leave_the_reserve():
+    limiter = FakeLimiter()
+    scheduler = FairShareScheduler(limiter.free_slots, limiter.take_slot, interactive_weight=1, reserved=1)
+    granted = []
+    _queue(scheduler, granted, JOB, 'a')
+    _queue(scheduler, granted, INTERACTIVE)
+    _queue(scheduler, granted, WRITE)
+    _release(limiter, granted)
+    _release(limiter, granted)
+    assert granted == [(WRITE, None), (INTERACTIVE, None)]
+    with limiter.lock:
+        limiter.free = 1
+    time.sleep(0.15)
+    assert len(granted) == 2  # the last free slot is reserved
+    _release(limiter, granted, slots=2)
+    assert granted[-1] == (JOB, 'a')
+
+
+def test_giving_up_leaves_the_queue():
+    limiter = FakeLimiter()
+    scheduler = FairShareScheduler(limiter.free_slots, limiter.take_slot)
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire(JOB, 'a', Deadline(0.1))
+    assert scheduler.waiting() == {WRITE: 0, INTERACTIVE: 0, JOB: 0}
+    limiter.free = 1
+    scheduler.acquire(INTERACTIVE, deadline=Deadline(1))
+    assert limiter.free == 0
+
+
+def test_lane_installed_for_the_thread():
+    assert fair_share.current() == (INTERACTIVE, None)
+    with fair_share.use(JOB, 'scan'):
+        assert fair_share.current() == (JOB, 'scan')
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(fair_share.current()))
+        thread.start()
+        thread.join()
+        assert seen == [(INTERACTIVE, None)]
+    assert fair_share.current() == (INTERACTIVE, None)
+    with pytest.raises(ValueError):
+        with fair_share.use('bulk'):
+            pass
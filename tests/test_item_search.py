@@ -0,0 +1,89 @@
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+from backend import proxy_server
+from backend.item_search import ItemCatalogue, ItemSearchIndex
+
+ITEMS = [
+    {'id': 'id-ash-set', 'item_name': 'Ash Prime Set', 'url_name': 'ash_prime_set'},
+    {'id': 'id-ash-bp', 'item_name': 'Ash Prime Blueprint', 'url_name': 'ash_prime_blueprint'},
+    {'id': 'id-vauban', 'item_name': 'Vauban Prime Set', 'url_name': 'vauban_prime_set'},
+    {'id': 'id-serration', 'item_name': 'Serration', 'url_name': 'serration'},
+    {'id': 'id-amp-serration', 'item_name': 'Amalgam Serration', 'url_name': 'amalgam_serration'},
+]
+
+
+def _names(results):
+    return [r['item_name'] for r in results]
+
+
+def test_prefix_ranks_exact_then_name_then_word_matches():
+    index = ItemSearchIndex(ITEMS)
+    assert _names(index.prefix('ash p')) == ['Ash Prime Set', 'Ash Prime Blueprint']
+    results = index.prefix('serration')
+    assert _names(results) == ['Serration', 'Amalgam Serration']
+    assert [r['match'] for r in results] == ['exact', 'word']
+    assert _names(index.prefix('prime s')) == ['Ash Prime Set', 'Vauban Prime Set']
+    assert _names(index.prefix('vauban_prime')) == ['Vauban Prime Set']
+
+
+def test_fuzzy_matches_typos():
+    index = ItemSearchIndex(ITEMS)
+    assert index.prefix('vauben prme') == []
+    results = index.search('vauben prme set')
+    assert results[0]['item_name'] == 'Vauban Prime Set'
+    assert results[0]['match'] == 'fuzzy' and 0 < results[0]['score'] < 1
+    assert index.search('zzzzqqqq') == []
+
+
+def test_exact_lookup_by_id_or_url_name():
+    index = ItemSearchIndex(ITEMS)
+    assert index.get('id-vauban')['url_name'] == 'vauban_prime_set'
+    assert index.get('serration')['id'] == 'id-serration'
+    assert index.get('missing') is None
+
+
+def test_catalogue_loads_once_and_keeps_stale_index_on_failed_refresh():
+    fetch = MagicMock(return_value=ITEMS)
+    catalogue = ItemCatalogue(fetch, ttl=3600)
+    assert catalogue.peek() is None
+    first = catalogue.get()
+    assert catalogue.get() is first
+    assert fetch.call_count == 1
+    catalogue.ttl = 0
+    fetch.return_value = None
+    assert catalogue.get() is first
+
+
+def test_debug_item_details_resolves_locally_without_upstream_calls():
+    handler = MagicMock()
+    catalogue = ItemCatalogue(MagicMock(), ttl=3600)
+    catalogue.load(ITEMS)
+    with patch.object(proxy_server, 'item_catalogue', catalogue), patch('backend.deadline.urlopen') as mock_urlopen:
+        assert proxy_server.ProxyHandler.debug_item_details(handler, 'id-ash-bp')['item_name'] == 'Ash Prime Blueprint'
+        assert proxy_server.ProxyHandler.debug_item_details(handler, 'ash_prime_set')['id'] == 'id-ash-set'
+        assert proxy_server.ProxyHandler.debug_item_details(handler, 'not-an-item-xyz') is None
+        mock_urlopen.assert_not_called()
+
+
+def test_search_endpoint():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{httpd.server_address[1]}'
+    try:
+        with patch.object(proxy_server, 'item_catalogue', ItemCatalogue(lambda: ITEMS)):
+            with urllib.request.urlopen(f'{base}/api/search?q=ash%20pr&limit=1', timeout=5) as response:
+                body = json.loads(response.read())
+        assert body['catalogue_size'] == len(ITEMS)
+        assert _names(body['results']) == ['Ash Prime Set']
+        with patch.object(proxy_server, 'item_catalogue', ItemCatalogue(lambda: None)):
+            try:
+                urllib.request.urlopen(f'{base}/api/search?q=ash', timeout=5)
+                assert False, 'expected 503'
+            except urllib.error.HTTPError as e:
+                assert e.code == 503
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,110 @@
+import datetime
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.market_stub import StubConfig, StubMarketServer, build_statistics
+from backend import proxy_server
+from backend.item_statistics import ItemStatistics, summarize_statistics, weighted_median
+from backend.market_client import MarketClient
+from backend.trading_calculator import TradingCalculator
+
+
+def _payload(hourly_volume, daily_volume, median=50):
+    row = lambda volume: {'volume': volume, 'median': median, 'avg_price': median}
+    return {'statistics_closed': {'48hours': [row(hourly_volume)] * 48, '90days': [row(daily_volume)] * 90}}
+
+
+def _statistics(payloads, budget=lambda: True, tracked=None):
+    fetched = []
+
+    def fetch(url_name):
+        fetched.append(url_name)
+        return payloads.get(url_name)
+    stats = ItemStatistics(fetch, lambda: list(tracked if tracked is not None else payloads), budget)
+    return stats, fetched
+
+
+def test_weighted_median():
+    assert weighted_median([10, 20, 30], [1, 1, 10]) == 30
+    assert weighted_median([10, 20, 30], [0, 0, 0]) == 20
+    assert weighted_median([], []) is None
+
+
+def test_summarize_stub_payload_and_skip_ranked_mod_rows():
+    payload = build_statistics(StubConfig(), 'ash_prime_set')
+    summary = summarize_statistics(payload)
+    assert summary['volume_48h'] == sum(r['volume'] for r in payload['statistics_closed']['48hours'])
+    assert summary['volume_90d'] == sum(r['volume'] for r in payload['statistics_closed']['90days'])
+    assert 0 < summary['active_days'] <= 90
+    ranked = _payload(1, 2)
+    ranked['statistics_closed']['90days'] = ranked['statistics_closed']['90days'] + [
+        {'volume': 1000, 'median': 900, 'mod_rank': 10}]
+    assert summarize_statistics(ranked)['volume_90d'] == 180
+    assert summarize_statistics({})['volume_48h'] == 0
+
+
+def test_daily_volume_and_percentile_across_items():
+    stats, _ = _statistics({})
+    stats.put('slow', summarize_statistics(_payload(0, 1)))
+    stats.put('fast', summarize_statistics(_payload(2, 40)))
+    slow, fast = stats.get('slow'), stats.get('fast')
+    assert slow['daily_volume'] == pytest.approx(0.5)
+    assert fast['daily_volume'] == pytest.approx(24 + 20)
+    assert (slow['volume_percentile'], fast['volume_percentile']) == (0.5, 1.0)
+    assert stats.get('missing') is None
+    assert stats.get('slow', max_age=-1) is None
+
+
+def test_requested_items_are_refreshed_first_within_budget():
+    payloads = {name: _payload(1, 1) for name in ('a', 'b', 'c')}
+    budget = iter([True, True, False])
+    stats, fetched = _statistics(payloads, budget=lambda: next(budget))
+    stats.want(['c'])
+    assert stats.due() == ['c', 'a', 'b']
+    assert stats.refresh(stats.due()) == 2
+    assert fetched == ['c', 'a']
+    assert stats.due() == ['b']
+    stats.want(['a'])  # fresh: not queued again
+    assert stats.due() == ['b']
+
+
+def test_failed_items_back_off():
+    stats, fetched = _statistics({'a': None, 'b': _payload(1, 1)})
+    stats.want(['a'])
+    stats.refresh(stats.due())
+    assert fetched == ['a', 'b']
+    assert stats.status()['failures'] == 1
+    assert stats.due() == []
+
+
+def _opportunity_orders(sellers):
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    sells = [{'order_type': 'sell', 'platinum': 60 + i} for i in range(sellers)]
+    return sells + [{'order_type': 'buy', 'platinum': 20, 'creation_date': now}]
+
+
+def test_calculator_ranks_liquid_items_first():
+    stats, _ = _statistics({})
+    stats.put('illiquid_prime', summarize_statistics(_payload(0, 2)))
+    stats.put('liquid_prime', summarize_statistics(_payload(3, 90)))
+    items = [{'item_name': 'Illiquid Prime', 'id': 'i', 'url_name': 'illiquid_prime'},
+             {'item_name': 'Liquid Prime', 'id': 'l', 'url_name': 'liquid_prime'},
+             {'item_name': 'Unknown Prime', 'id': 'u', 'url_name': 'unknown_prime'}]
+    orders = {'i': _opportunity_orders(4), 'l': _opportunity_orders(4), 'u': _opportunity_orders(1)}
+    orders['i'][0]['platinum'] = 80  # 1p more profit, but only about one trade a day
+    opps = TradingCalculator(min_profit=0, item_statistics=stats).analyze_prime_items(items, orders, max_order_age=365)
+    by_id = {o['itemId']: o for o in opps}
+    assert by_id['i']['netProfit'] > by_id['l']['netProfit']
+    assert by_id['i']['expectedDaysToSell'] > 1 > by_id['l']['expectedDaysToSell']
+    assert 'liquidityScore' not in by_id['u']
+    assert [o['itemId'] for o in TradingCalculator.rank_opportunities(opps)] == ['l', 'i', 'u']
+
+
+def test_request_item_statistics_against_stub():
+    with StubMarketServer(StubConfig(item_count=4, latency='fixed', latency_ms=1)) as stub, \
+         patch.object(proxy_server, 'market_client', MarketClient(stub.url)):
+        url_name = stub.state.items[0]['url_name']
+        summary = summarize_statistics(proxy_server.request_item_statistics(url_name))
+        assert summary['volume_90d'] > 0
+        assert stub.state.counts['item_statistics'] == 1
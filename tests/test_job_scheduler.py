@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from backend import proxy_server
+from backend.job_scheduler import DEFAULT_SECONDS_PER_ITEM, JobScheduler, QueueFull
+from tests.conftest import post_json
+
+
+def _blocking_job(release, started, name):
+    def run():
+        started.append(name)
+        release.wait(5)
+    return run
+
+
+def test_runs_up_to_the_cap_and_starts_queued_jobs_in_order():
+    scheduler = JobScheduler(max_running=2, max_queued=2)
+    releases = {name: threading.Event() for name in 'abcd'}
+    started = []
+    positions = [scheduler.submit(name, _blocking_job(releases[name], started, name), items=10) for name in 'abcd']
+    assert positions == [0, 0, 1, 2]
+    time.sleep(0.05)
+    assert started == ['a', 'b'] and scheduler.position('c') == 1 and scheduler.position('d') == 2
+    with pytest.raises(QueueFull) as error:
+        scheduler.submit('e', lambda: None, items=10)
+    assert error.value.retry_after >= 1
+    releases['b'].set()
+    time.sleep(0.1)
+    assert started == ['a', 'b', 'c'] and scheduler.position('c') is None and scheduler.position('d') == 1
+    for release in releases.values():
+        release.set()
+    time.sleep(0.1)
+    assert started == ['a', 'b', 'c', 'd'] and scheduler.status()['running'] == 0
+
+
+def test_eta_follows_the_jobs_ahead():
+    scheduler = JobScheduler(max_running=1, max_queued=3)
+    scheduler.seconds_per_item = 1.0
+    release = threading.Event()
+    done = [0]
+    scheduler.submit('a', lambda: release.wait(5), items=10, progress=lambda: done[0])
+    scheduler.submit('b', lambda: None, items=4)
+    scheduler.submit('c', lambda: None, items=4)
+    assert scheduler.eta('a') == 10 and scheduler.eta('b') == 10 and scheduler.eta('c') == 14
+    done[0] = 6
+    assert scheduler.eta('a') == 4 and scheduler.eta('c') == 8
+    assert scheduler.cancel('b') and not scheduler.cancel('b') and not scheduler.cancel('a')
+    assert scheduler.eta('c') == 4 and scheduler.position('c') == 1 and scheduler.eta('b') is None
+    release.set()
+
+
+def test_only_completed_jobs_that_fetched_upstream_update_the_estimate():
+    scheduler = JobScheduler(max_running=1, max_queued=3)
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError('boom')
+
+    def wait_idle():
+        while scheduler.status()['running']:
+            time.sleep(0.01)
+
+    scheduler.submit('failed', failing, items=1, on_error=errors.append)
+    wait_idle()
+    scheduler.submit('cancelled', lambda: time.sleep(0.1), items=1)  # stopped early: returns None
+    wait_idle()
+    scheduler.submit('cached', lambda: time.sleep(0.1) or 0, items=1)  # completed without upstream fetches
+    wait_idle()
+    assert [str(e) for e in errors] == ['boom'] and scheduler.seconds_per_item == DEFAULT_SECONDS_PER_ITEM
+    scheduler.submit('fetched', lambda: time.sleep(0.5) or 1, items=1)
+    wait_idle()
+    assert scheduler.seconds_per_item > DEFAULT_SECONDS_PER_ITEM
+
+
+def test_trading_jobs_beyond_the_cap_queue_then_get_503(proxy_with_stub):
+    # Each upstream request takes 2s, so the first job is still running while the others are submitted
+    proxy, stub = proxy_with_stub(item_count=4, latency='fixed', latency_ms=2000, ingame_ratio=1.0)
+    with patch.object(proxy_server, 'job_scheduler', JobScheduler(max_running=1, max_queued=1)):
+        payload = {'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 4}
+        first = post_json(f'{proxy}/api/trading-calc', payload)
+        second = post_json(f'{proxy}/api/trading-calc', payload)
+        assert first['queue_position'] is None
+        assert second['queue_position'] == 1 and second['eta_seconds'] > 0
+        with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={second["job_id"]}') as response:
+            progress = json.loads(response.read())
+        assert progress['status'] == 'queued' and progress['queue_position'] == 1
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post_json(f'{proxy}/api/trading-calc', payload)
+        assert error.value.code == 503 and int(error.value.headers['Retry-After']) >= 1
+        assert len(proxy_server.trading_jobs) == 2
+        post_json(f'{proxy}/api/cancel-analysis', {})
+        with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={second["job_id"]}') as response:
+            progress = json.loads(response.read())
+        assert progress['status'] == 'cancelled' and progress['queue_position'] is None
+
+
+def test_a_scan_that_raises_reports_an_error(proxy_with_stub):
+    proxy, stub = proxy_with_stub(item_count=4, latency='fixed', latency_ms=1, ingame_ratio=1.0)
+    with patch.object(proxy_server, 'job_scheduler', JobScheduler()), \
+         patch.object(proxy_server.TradingCalculator, 'analyze_prime_items', side_effect=RuntimeError('boom')):
+        job_id = post_json(f'{proxy}/api/trading-calc', {
+            'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 4})['job_id']
+        started = time.monotonic()
+        while time.monotonic() - started < 5:
+            with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}') as response:
+                progress = json.loads(response.read())
+            if progress['status'] != 'running':
+                break
+            time.sleep(0.05)
+        assert progress['status'] == 'error' and 'boom' in progress['error']
+        assert proxy_server.job_scheduler.seconds_per_item == DEFAULT_SECONDS_PER_ITEM
@@ -0,0 +1,72 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmarks.market_stub import StubConfig, build_orders
+from backend.job_snapshot import JobSnapshot, expand_sweep, parse_params, MAX_SWEEP
+from backend.trading_calculator import TradingCalculator
+from tests.conftest import post_json
+
+DEFAULTS = {'min_profit': 10, 'max_investment': 0, 'max_order_age': 30}
+
+
+def test_parse_params_and_sweeps():
+    assert parse_params({'min_profit': 5}, DEFAULTS) == dict(DEFAULTS, min_profit=5)
+    for bad in ({'min_profit': -1}, {'max_order_age': '30'}, {'max_investment': True}):
+        with pytest.raises(ValueError):
+            parse_params(bad, DEFAULTS)
+    grid = expand_sweep({'min_profit': [5, 10], 'max_order_age': [7, 30, 90]})
+    assert len(grid) == 6 and {'min_profit': 10, 'max_order_age': 90} in grid
+    assert expand_sweep([{'min_profit': 1}]) == [{'min_profit': 1}]
+    for bad in ({'spread': [1]}, [], 'x', [{'min_profit': 1}] * (MAX_SWEEP + 1)):
+        with pytest.raises(ValueError):
+            expand_sweep(bad)
+
+
+def test_snapshot_analysis_matches_full_orders():
+    items = [{'id': f'i{n}', 'item_name': f'Item {n} Prime', 'url_name': f'item_{n}_prime'} for n in range(20)]
+    books = {item['id']: build_orders(StubConfig(orders_per_item=30), item['url_name']) for item in items}
+    snapshot = JobSnapshot(items)
+    for item_id, orders in books.items():
+        snapshot.add(item_id, orders)
+    calc = TradingCalculator(min_profit=1)
+    strip = lambda opps: [{k: v for k, v in o.items() if k != '_wtbOrder'} for o in opps]
+    assert strip(snapshot.analyze(calc, 365)) == strip(calc.analyze_prime_items(items, books, max_order_age=365))
+    partial = JobSnapshot(items)
+    partial.add('i0', books['i0'])
+    assert {o['itemId'] for o in partial.analyze(calc, 365)} <= {'i0'}
+
+
+def test_reanalyze_endpoint_reuses_fetched_orders(proxy_with_stub):
+    proxy, stub = proxy_with_stub(item_count=12, orders_per_item=30, latency='fixed', latency_ms=1, ingame_ratio=1.0)
+    job_id = post_json(f'{proxy}/api/trading-calc', {
+        'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 6})['job_id']
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}') as response:
+            progress = json.loads(response.read())
+        if progress['status'] == 'done':
+            break
+        time.sleep(0.05)
+    fetches = stub.state.counts['item_orders']
+
+    same = post_json(f'{proxy}/api/trading-reanalyze', {'job_id': job_id})
+    assert same['complete'] and same['items'] == fetches
+    assert same['params'] == {'min_profit': 1, 'max_investment': 0, 'max_order_age': 365}
+    assert sorted(o['itemId'] for o in same['results']) == sorted(o['itemId'] for o in progress['results'])
+
+    sweep = post_json(f'{proxy}/api/trading-reanalyze', {'job_id': job_id, 'sweep': {'min_profit': [1, 20, 10 ** 6]}})
+    counts = [run['count'] for run in sweep['sweep']]
+    assert counts[0] == same['count'] and counts == sorted(counts, reverse=True) and counts[-1] == 0
+    assert all(o['netProfit'] >= 20 for o in sweep['sweep'][1]['results'])
+    assert stub.state.counts['item_orders'] == fetches
+
+    for payload, status in (({}, 400), ({'job_id': 'nope'}, 404),
+                            ({'job_id': job_id, 'min_profit': -5}, 400),
+                            ({'job_id': job_id, 'sweep': 'all'}, 400)):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post_json(f'{proxy}/api/trading-reanalyze', payload)
+        assert error.value.code == status
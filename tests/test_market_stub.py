@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+import urllib.request
+import urllib.error
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+import pytest
+from benchmarks.market_stub import StubMarketServer, StubConfig, build_catalogue, build_orders
+from benchmarks.scan_benchmark import compare
+from backend import proxy_server
+from backend.market_client import MarketClient
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_catalogue_is_deterministic_and_mostly_prime():
+    config = StubConfig(item_count=100)
+    items = build_catalogue(config)
+    assert len(items) == 100
+    assert items == build_catalogue(config)
+    assert sum('Prime' in i['item_name'] for i in items) == 90
+    assert len({i['url_name'] for i in items}) == 100
+
+
+def test_order_book_size_and_shape():
+    config = StubConfig(orders_per_item=12)
+    orders = build_orders(config, 'ash_prime_set')
+    assert len(orders) == 12
+    assert {o['order_type'] for o in orders} == {'buy', 'sell'}
+    assert all('status' in o['user'] for o in orders)
+
+
+def test_stub_serves_items_and_orders():
+    with StubMarketServer(StubConfig(item_count=20, orders_per_item=6, latency='fixed', latency_ms=0)) as stub:
+        status, items = _get(f'{stub.url}/items')
+        assert status == 200
+        url_name = items['payload']['items'][0]['url_name']
+        status, orders = _get(f'{stub.url}/items/{url_name}/orders?include=item')
+        assert len(orders['payload']['orders']) == 6
+        assert stub.state.counts['item_orders'] == 1
+
+
+def test_stub_injects_rate_limits():
+    with StubMarketServer(StubConfig(item_count=5, latency='fixed', latency_ms=0, rate_limit_probability=1.0)) as stub:
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            _get(f'{stub.url}/items')
+        assert excinfo.value.code == 429
+        assert stub.state.counts['429'] == 1
+
+
+def test_stub_profile_order_lifecycle():
+    with StubMarketServer(StubConfig(item_count=5, latency='fixed', latency_ms=0)) as stub:
+        item_id = stub.state.items[0]['id']
+        req = urllib.request.Request(f'{stub.url}/profile/orders', data=json.dumps({'item': item_id, 'order_type': 'buy', 'platinum': 10}).encode())
+        with urllib.request.urlopen(req, timeout=5) as response:
+            order_id = json.loads(response.read())['payload']['order']['id']
+        _, orders = _get(f'{stub.url}/profile/someone/orders')
+        assert [o['id'] for o in orders['payload']['buy_orders']] == [order_id]
+        req = urllib.request.Request(f'{stub.url}/profile/orders/{order_id}', method='DELETE')
+        with urllib.request.urlopen(req, timeout=5) as response:
+            assert response.status == 200
+
+
+def test_trading_scan_end_to_end_against_stub():
+    with StubMarketServer(StubConfig(item_count=8, orders_per_item=20, latency='fixed', latency_ms=1, ingame_ratio=1.0)) as stub:
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        proxy = f'http://127.0.0.1:{httpd.server_address[1]}'
+        try:
+            with patch.object(proxy_server, 'API_BASE_URL', stub.url), \
+                 patch.object(proxy_server, 'market_client', MarketClient(stub.url)):
+                _, catalogue = _get(f'{proxy}/api/items')
+                items = catalogue['payload']['items']
+                req = urllib.request.Request(f'{proxy}/api/trading-calc', data=json.dumps({
+                    'all_items': items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 4,
+                }).encode())
+                with urllib.request.urlopen(req, timeout=5) as response:
+                    job_id = json.loads(response.read())['job_id']
+                deadline = time.time() + 20
+                while time.time() < deadline:
+                    _, progress = _get(f'{proxy}/api/trading-calc-progress?job_id={job_id}')
+                    if progress['status'] == 'done':
+                        break
+                    time.sleep(0.1)
+                assert progress['status'] == 'done'
+                assert progress['progress'] == progress['total'] == 7
+                assert progress['profile']['items']['count'] == 7
+                assert stub.state.counts['item_orders'] == 7
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+
+def test_compare_flags_regressions():
+    baseline = {'trading_scan': {'items_per_second': 10.0}, 'proxy_traffic': {'p99_ms': 100.0}}
+    current = {'trading_scan': {'items_per_second': 8.0}, 'proxy_traffic': {'p99_ms': 105.0}}
+    assert compare(current, baseline, 15.0) == ['trading_scan.items_per_second']
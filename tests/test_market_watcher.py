@@ -0,0 +1,117 @@
+import json
+import time
+import urllib.request
+from unittest.mock import patch
+from backend import proxy_server
+from backend.market_watcher import MarketWatcher, book_signature
+from backend.order_book_cache import OrderBookCache
+
+
+def _book(ask, bid, extra=0):
+    return [{'order_type': 'sell', 'platinum': ask}, {'order_type': 'buy', 'platinum': bid}] + \
+        [{'order_type': 'sell', 'platinum': ask + 5}] * extra
+
+
+def _watcher(books, budget=lambda: True, **kwargs):
+    cache = OrderBookCache(lambda url_name: None, ttl=60)
+    fetched = []
+
+    def fetch(url_name):
+        fetched.append(url_name)
+        return books[url_name]()
+    watcher = MarketWatcher(cache, fetch, lambda: list(books), budget, min_interval=10, max_interval=1000, **kwargs)
+    watcher.set_items(list(books))
+    return watcher, cache, fetched
+
+
+def _force_due(watcher):
+    for state in watcher._states.values():
+        state.next_due = 0
+    watcher.set_items(list(watcher._states))
+
+
+def test_book_signature():
+    assert book_signature(_book(20, 12, extra=2)) == (20, 12, 4)
+    assert book_signature([]) == (None, None, 0)
+
+
+def test_refreshes_into_cache_and_adapts_intervals():
+    prices = {'volatile': iter(range(100, 200)), 'quiet': None}
+    books = {'volatile': lambda: _book(next(prices['volatile']), 5), 'quiet': lambda: _book(30, 20)}
+    watcher, cache, fetched = _watcher(books)
+    for _ in range(4):
+        _force_due(watcher)
+        while watcher.refresh_one():
+            pass
+    assert cache.peek('volatile') is not None and cache.peek('quiet') is not None
+    assert fetched.count('volatile') == fetched.count('quiet') == 4
+    states = watcher._states
+    assert states['volatile'].interval == 10
+    assert states['quiet'].interval > 30
+    assert states['volatile'].changes == 3 and states['quiet'].changes == 0
+
+
+def test_high_volume_books_stay_on_a_short_interval():
+    watcher, _, _ = _watcher({'busy': lambda: _book(30, 20, extra=150)})
+    for _ in range(10):
+        _force_due(watcher)
+        watcher.refresh_one()
+    assert watcher._states['busy'].interval <= 1000 / 4
+
+
+def test_only_fetches_with_spare_budget():
+    watcher, cache, fetched = _watcher({'a': lambda: _book(10, 5)}, budget=lambda: False)
+    assert watcher.refresh_one() is False
+    assert fetched == [] and len(cache) == 0
+    watcher.try_acquire = lambda: True
+    assert watcher.refresh_one() is True
+    assert watcher.refresh_one() is False  # not due again yet
+
+
+def test_background_thread_runs_and_reports_status():
+    watcher, cache, _ = _watcher({'a': lambda: _book(10, 5), 'b': lambda: _book(11, 6)})
+    watcher.start()
+    try:
+        deadline = time.time() + 5
+        while len(cache) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+    status = watcher.status()
+    assert status['tracked'] == 2 and status['cached'] == 2 and status['fresh'] == 2
+    assert status['fetches'] == 2 and status['running'] is False
+
+
+def test_spare_slot_leaves_headroom_for_interactive_requests():
+    with patch.object(proxy_server, 'request_timestamps', []), patch.object(proxy_server, 'RATE_LIMIT', 3):
+        assert proxy_server.try_acquire_rate_limit_slot(headroom=1) is True
+        assert proxy_server.try_acquire_rate_limit_slot(headroom=1) is True
+        assert proxy_server.try_acquire_rate_limit_slot(headroom=1) is False
+
+
+def test_trading_scan_reuses_snapshot(proxy_with_stub):
+    def scan(proxy, items, **extra):
+        req = urllib.request.Request(f'{proxy}/api/trading-calc', data=json.dumps(dict({
+            'all_items': items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 4}, **extra)).encode())
+        with urllib.request.urlopen(req, timeout=5) as response:
+            job_id = json.loads(response.read())['job_id']
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}', timeout=5) as response:
+                progress = json.loads(response.read())
+            if progress['status'] == 'done':
+                return progress
+            time.sleep(0.05)
+        raise AssertionError('scan did not finish')
+
+    proxy, stub = proxy_with_stub(item_count=8, orders_per_item=20, latency='fixed', latency_ms=1, ingame_ratio=1.0)
+    items = stub.state.items
+    live = scan(proxy, items)
+    assert live['snapshot_hits'] == 0
+    assert stub.state.counts['item_orders'] == 7
+    cached = scan(proxy, items, max_snapshot_age=600)
+    assert cached['snapshot_hits'] == 7
+    assert stub.state.counts['item_orders'] == 7
+    assert len(cached['results']) == len(live['results'])
+    scan(proxy, items, max_snapshot_age=0)
+    assert stub.state.counts['item_orders'] == 14
@@ -0,0 +1,119 @@
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from backend import metrics
+from backend import proxy_server
+
+
+def test_counter_labels_and_render():
+    registry = metrics.MetricsRegistry()
+    counter = registry.counter('test_requests_total', 'Test requests', ('route', 'status'))
+    counter.labels('/a', 200).inc()
+    counter.labels('/a', 200).inc(2)
+    counter.labels('/b', 500).inc()
+    text = registry.render()
+    assert '# TYPE test_requests_total counter' in text
+    assert 'test_requests_total{route="/a",status="200"} 3' in text
+    assert 'test_requests_total{route="/b",status="500"} 1' in text
+
+
+def test_counter_wrong_label_count():
+    counter = metrics.Counter('test_bad_labels_total', 'Bad labels', ('route',))
+    with pytest.raises(ValueError):
+        counter.labels('/a', 'extra')
+
+
+def test_counter_concurrent_increments():
+    counter = metrics.Counter('test_concurrent_total', 'Concurrent increments')
+
+    def worker():
+        for _ in range(1000):
+            counter.inc()
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.get() == 8000
+
+
+def test_histogram_cumulative_buckets():
+    registry = metrics.MetricsRegistry()
+    hist = registry.histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    hist.observe(0.05)
+    hist.observe(0.5)
+    hist.observe(5)
+    text = registry.render()
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count 3' in text
+    assert 'test_latency_seconds_sum 5.55' in text
+
+
+def test_gauge_function():
+    gauge = metrics.Gauge('test_gauge', 'Gauge')
+    gauge.set_function(lambda: 42)
+    assert gauge.get() == 42
+
+
+def test_duplicate_registration_rejected():
+    registry = metrics.MetricsRegistry()
+    registry.counter('dup_total', 'dup')
+    with pytest.raises(ValueError):
+        registry.counter('dup_total', 'dup')
+
+
+def test_cache_hit_ratio():
+    metrics.record_cache_lookup('test_cache', True)
+    metrics.record_cache_lookup('test_cache', True)
+    metrics.record_cache_lookup('test_cache', False)
+    assert metrics.CACHE_HIT_RATIO.labels('test_cache').get() == pytest.approx(2 / 3)
+
+
+@pytest.mark.parametrize('url,family', [
+    ('https://api.warframe.market/v1/items', 'items'),
+    ('https://api.warframe.market/v1/items/ash_prime_set/orders?include=item', 'item_orders'),
+    ('https://api.warframe.market/v1/items/ash_prime_set/statistics', 'item_statistics'),
+    ('https://api.warframe.market/v1/items/search?q=ash', 'item_search'),
+    ('https://api.warframe.market/v1/items/abc123', 'item'),
+    ('https://api.warframe.market/v1/profile/orders/abc', 'profile_orders'),
+    ('https://api.warframe.market/v1/profile/someone/orders', 'profile_orders'),
+    ('https://api.warframe.market/v1/auth/signin', 'auth'),
+    ('https://api.warframe.market/v1/riven/items', 'other'),
+])
+def test_upstream_family(url, family):
+    assert metrics.upstream_family(url) == family
+
+
+def test_timed_urlopen_records_http_error():
+    from urllib.error import HTTPError
+    before = metrics.UPSTREAM_REQUESTS.labels('item_orders', 429).get()
+    error = HTTPError('https://api.warframe.market/v1/items/x/orders', 429, 'Too Many Requests', {}, None)
+    with patch('backend.deadline.urlopen', side_effect=error):
+        with pytest.raises(HTTPError):
+            with metrics.timed_urlopen('https://api.warframe.market/v1/items/x/orders'):
+                pass
+    assert metrics.UPSTREAM_REQUESTS.labels('item_orders', 429).get() == before + 1
+
+
+def test_set_rate_limited_counts_429():
+    before = metrics.RATE_LIMITED.get()
+    proxy_server.set_rate_limited()
+    proxy_server.clear_rate_limited()
+    assert metrics.RATE_LIMITED.get() == before + 1
+
+
+def test_route_label():
+    assert proxy_server.route_label('/api/trading-calc-progress?job_id=x') == '/api/trading-calc-progress'
+    assert proxy_server.route_label('/api/items/ash_prime_set/orders') == '/api/*'
+    assert proxy_server.route_label('/index.html') == 'static'
+
+
+def test_metrics_endpoint():
+    handler = MagicMock()
+    proxy_server.ProxyHandler.handle_metrics_endpoint(handler)
+    handler.send_response.assert_called_with(200)
+    body = handler.wfile.write.call_args[0][0].decode()
+    assert 'proxy_active_threads' in body
+    assert 'proxy_rate_limiter_queue_depth' in body
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from benchmarks import bench_order_memory as bench
+from benchmarks.market_stub import StubConfig, build_orders
+from backend.analysis_memo import orders_digest
+from backend.order_record import OrderRecord
+from backend.trading_calculator import TradingCalculator
+
+
+def test_record_reads_like_the_upstream_dict():
+    order = build_orders(StubConfig(), 'ash_prime_set')[0]
+    record = OrderRecord.from_order(order)
+    for field in ('id', 'order_type', 'platinum', 'quantity', 'creation_date'):
+        assert record.get(field) == record[field] == order[field]
+    assert record.get('user')['status'] == order['user']['status']
+    assert record.get('mod_rank', 0) == 0 and record.get('missing') is None
+    with pytest.raises(KeyError):
+        record['missing']
+    assert OrderRecord.from_order(record) is record
+    assert json.loads(json.dumps(record.to_dict()))['user']['ingame_name'] == order['user']['ingame_name']
+    assert not hasattr(record, '__dict__')
+
+
+def test_calculator_and_digest_agree_on_records_and_dicts():
+    orders = [o for o in build_orders(StubConfig(orders_per_item=60), 'ash_prime_set') if o['user']['status'] == 'ingame']
+    records = [OrderRecord.from_order(o) for o in orders]
+    calc = TradingCalculator(min_profit=0)
+    from_dicts = calc.analyze_prime_item_orders(orders, 'Ash Prime Set', 'a', 365)
+    from_records = calc.analyze_prime_item_orders(records, 'Ash Prime Set', 'a', 365)
+    assert from_records and {k: v for k, v in from_records[0].items() if k != '_wtbOrder'} == \
+        {k: v for k, v in from_dicts[0].items() if k != '_wtbOrder'}
+    assert from_records[0]['_wtbOrder']['creation_date'] == from_dicts[0]['_wtbOrder']['creation_date']
+    assert isinstance(from_records[0]['_wtbOrder'], dict)
+    assert orders_digest(records) == orders_digest(orders)
+
+
+def test_memory_benchmark_reports_a_reduction(tmp_path):
+    output = tmp_path / 'memory.json'
+    assert bench.main(['--quick', '--output', str(output)]) == 0
+    result = json.loads(output.read_text())
+    dicts, records = result['variants']['dicts'], result['variants']['records']
+    assert dicts['orders'] == records['orders'] > 0
+    assert dicts['opportunities'] == records['opportunities']
+    assert result['reduction_percent'] > 50
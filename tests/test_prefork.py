@@ -0,0 +1,193 @@
+import contextlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.market_stub import StubConfig, StubMarketServer
+from backend import prefork
+from backend.order_book_cache import OrderBookCache
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _take_slots(address, authkey, seconds, taken):
+    window = prefork.connect(address, authkey).rate_window()
+    count = 0
+    until = time.time() + seconds
+    while time.time() < until:
+        if window.take_slot():
+            count += 1
+        time.sleep(0.001)
+    taken.put(count)
+
+
+def test_rate_window_is_shared_by_all_processes():
+    authkey = os.urandom(16)
+    coordinator = prefork.start_coordinator(authkey, rate_limit=5, rate_period=0.5)
+    try:
+        context = multiprocessing.get_context('fork')
+        taken = context.Queue()
+        processes = [context.Process(target=_take_slots, args=(coordinator.address, authkey, 1.5, taken))
+                     for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+        total = sum(taken.get(timeout=5) for _ in processes)
+        # Three windows (plus one straddling the end) of 5 slots, however the processes race
+        assert 10 <= total <= 5 * 4
+    finally:
+        coordinator.shutdown()
+
+
+def test_books_fetched_by_one_worker_are_reused_by_another(tmp_path):
+    authkey = os.urandom(16)
+    coordinator = prefork.start_coordinator(authkey, rate_limit=5, snapshot_dir=str(tmp_path))
+    try:
+        orders = [{'id': 'o1', 'platinum': 12, 'quantity': 1, 'order_type': 'sell', 'visible': True,
+                   'creation_date': None, 'last_update': None,
+                   'user': {'id': 'u1', 'ingame_name': 'Tenno', 'status': 'ingame'}}]
+        fetched = []
+        first = OrderBookCache(lambda url_name: fetched.append(url_name) or orders)
+        first.attach_store(prefork.SharedBookStore(prefork.connect(coordinator.address, authkey).books()))
+        assert first.get('ash_prime_set') == orders and fetched == ['ash_prime_set']
+
+        def no_fetch(url_name):
+            raise AssertionError(f'fetched {url_name}')
+
+        second = OrderBookCache(no_fetch)
+        second.attach_store(prefork.SharedBookStore(prefork.connect(coordinator.address, authkey).books()))
+        assert second.get('ash_prime_set') == orders
+        assert second.peek('ash_prime_set', max_age=600) == orders
+        assert second.store.stats()['items'] == 1
+    finally:
+        coordinator.books().close()
+        coordinator.shutdown()
+    # The coordinator persisted the book for the next run
+    assert prefork.BookRecords(str(tmp_path)).get('ash_prime_set') is not None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(url, data=None):
+    req = urllib.request.Request(url, data=data)
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return response.headers[prefork.WORKER_HEADER], json.loads(response.read())
+
+
+@contextlib.contextmanager
+def _workers(stub, *args, **env):
+    """Run the proxy with 2 pre-forked workers against stub; yields its base URL"""
+    port = _free_port()
+    env = dict(os.environ, WARFRAME_MARKET_API_URL=stub.url, PYTHONUNBUFFERED='1', **env)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'backend.proxy_server', '--workers', '2', '--port', str(port), '--snapshot-dir', '',
+         *args], cwd=REPO, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    proxy = f'http://127.0.0.1:{port}'
+    try:
+        started = time.time()
+        while True:
+            try:
+                urllib.request.urlopen(f'{proxy}/metrics', timeout=1).close()
+                break
+            except OSError:
+                assert time.time() - started < 20, 'workers did not start'
+                time.sleep(0.1)
+        yield proxy
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(20)
+
+
+def test_workers_share_one_port_jobs_and_books():
+    with StubMarketServer(StubConfig(item_count=8, orders_per_item=20, latency='fixed', latency_ms=1,
+                                     ingame_ratio=1.0)) as stub:
+        with _workers(stub, '--no-watch') as proxy:
+            def scan(**extra):
+                _, body = _get(f'{proxy}/api/trading-calc', json.dumps(dict({
+                    'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365}, **extra)).encode())
+                job_id = body['job_id']
+                answered_by = set()
+                deadline = time.time() + 30
+                while time.time() < deadline:
+                    worker, progress = _get(f'{proxy}/api/trading-calc-progress?job_id={job_id}')
+                    answered_by.add(worker)
+                    if progress['status'] == 'done' and len(answered_by) == 2:
+                        return job_id, progress
+                    time.sleep(0.02)
+                raise AssertionError(f'scan did not finish (answered by {answered_by})')
+
+            job_id, live = scan()
+            primes = sum('prime' in item['item_name'].lower() for item in stub.state.items)
+            assert job_id.startswith('w') and live['progress'] == live['total'] == primes
+            assert live['snapshot_hits'] == 0 and stub.state.counts['item_orders'] == primes
+            # Whichever worker runs it, the second scan reuses the books the first one fetched
+            _, cached = scan(max_snapshot_age=600)
+            assert cached['snapshot_hits'] == primes and stub.state.counts['item_orders'] == primes
+            for _ in range(4):
+                _, reanalyzed = _get(f'{proxy}/api/trading-reanalyze', json.dumps({'job_id': job_id}).encode())
+                assert reanalyzed['items'] == primes and reanalyzed['complete'] is True
+
+
+def _from_every_worker(url, attempts=50):
+    """{worker index: response body} once both workers have answered url"""
+    answers = {}
+    for _ in range(attempts):
+        try:
+            worker, body = _get(url)
+        except urllib.error.HTTPError as e:
+            worker, body = e.headers[prefork.WORKER_HEADER], {'status': e.code}
+        answers[worker] = body
+        if len(answers) == 2:
+            return answers
+    raise AssertionError(f'{url} was only answered by {set(answers)}')
+
+
+def test_price_history_and_item_statistics_are_shared_by_workers():
+    with StubMarketServer(StubConfig(item_count=8, orders_per_item=20, latency='fixed', latency_ms=1,
+                                     ingame_ratio=1.0)) as stub:
+        # Worker 0 watches the market: it fetches every Prime book once and refreshes the statistics
+        with _workers(stub, ORDER_BOOK_CACHE_TTL='3600') as proxy:
+            primes = [item['url_name'] for item in stub.state.items if 'prime' in item['item_name'].lower()]
+            deadline = time.time() + 30
+            while stub.state.counts.get('item_orders', 0) < len(primes) or \
+                    stub.state.counts.get('item_statistics', 0) < len(primes):
+                assert time.time() < deadline, f'worker 0 did not refresh the market ({stub.state.counts})'
+                time.sleep(0.1)
+            time.sleep(0.5)  # let the last book and summary land in the coordinator
+
+            statuses = _from_every_worker(f'{proxy}/api/market-watcher')
+            assert [s['statistics']['fresh'] for s in statuses.values()] == [len(primes)] * 2
+            end = time.time() + 60
+            for url_name in primes:
+                histories = _from_every_worker(f'{proxy}/api/price-history?item={url_name}&start=0&end={end}')
+                first, second = histories.values()
+                assert first == second and len(first['points']['t']) == 1
+
+            # A scan run by either worker ranks with the shared statistics
+            ran_on = {}
+            while len(ran_on) < 2:
+                _, body = _get(f'{proxy}/api/trading-calc', json.dumps({
+                    'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365,
+                    'max_snapshot_age': 3600}).encode())
+                job_id = body['job_id']
+                while True:
+                    _, progress = _get(f'{proxy}/api/trading-calc-progress?job_id={job_id}')
+                    if progress['status'] == 'done':
+                        break
+                    assert time.time() < deadline + 30, 'scan did not finish'
+                    time.sleep(0.05)
+                ran_on[prefork.Worker.owner_of(job_id)] = progress
+            for progress in ran_on.values():
+                assert progress['results'] and all('dailyVolume' in o for o in progress['results'])
@@ -0,0 +1,193 @@
+import datetime
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from backend import price_history, proxy_server
+from backend.order_book_cache import OrderBookCache
+from backend.price_history import PriceHistory, book_sample, TIERS
+from backend.trading_calculator import TradingCalculator
+
+T0 = 1700006400.0  # aligned to a day boundary
+
+
+def _order(order_type, platinum, status='ingame'):
+    return {'order_type': order_type, 'platinum': platinum, 'user': {'status': status}}
+
+
+def test_book_sample_uses_ingame_orders_only():
+    orders = [_order('sell', 30), _order('sell', 25), _order('sell', 10, 'offline'),
+              _order('buy', 18), _order('buy', 40, 'online')]
+    assert book_sample(orders) == (25.0, 18.0, 2, 1)
+    ask, bid, sells, buys = book_sample([_order('buy', 5)])
+    assert ask != ask and bid == 5.0 and (sells, buys) == (0, 1)
+
+
+def test_samples_roll_up_into_coarser_tiers():
+    history = PriceHistory()
+    # one sample a minute for 3 hours, ask climbing 1p every minute
+    for minute in range(180):
+        history.record('a', T0 + minute * 60, 100 + minute, 90, 4, 2)
+    five = history.query('a', T0, T0 + 3 * 3600, resolution='5m')['points']
+    assert five['t'][:2] == [T0, T0 + 300]
+    assert five['ask'][0] == 102.0  # mean of 100..104
+    assert five['samples'][0] == 5
+    assert five['spread'][0] == 12.0
+    hourly = history.query('a', T0, T0 + 3 * 3600, resolution='1h')['points']
+    assert hourly['t'] == [T0, T0 + 3600, T0 + 7200]  # last one is the open bucket
+    assert hourly['samples'] == [60, 60, 60]
+    last = T0 + 179 * 60
+    raw = history.query('a', last - 2 * 3600, last, resolution='raw')['points']
+    assert raw['samples'] == [1] * 121 and raw['ask'][-1] == 279.0
+
+
+def test_retention_bounds_memory():
+    history = PriceHistory()
+    for i in range(20000):
+        history.record('a', T0 + i * 60, 100, 90, 1, 1)
+    raw_retention = TIERS[0][2]
+    raw = history.query('a', 0, T0 + 10 ** 7, resolution='raw')['points']['t']
+    assert len(raw) <= raw_retention / 60 * 1.2
+    # 18 bytes per point across the 4 tiers
+    assert history.memory_bytes() < 18 * (200 + 700 + 400 + 20)
+
+
+def test_auto_resolution_picks_finest_covering_tier():
+    history = PriceHistory()
+    for i in range(4 * 24 * 12):
+        history.record('a', T0 + i * 300, 100, 90, 1, 1)
+    end = T0 + 4 * 86400
+    assert history.query('a', end - 3600, end)['resolution'] == 'raw'
+    assert history.query('a', end - 86400, end)['resolution'] == '5m'
+    assert history.query('a', end - 3 * 86400, end)['resolution'] == '1h'
+    with pytest.raises(ValueError):
+        history.query('a', resolution='1w')
+    assert history.query('missing') is None
+
+
+def test_stats_report_trend_and_volatility():
+    history = PriceHistory()
+    for hour in range(48):
+        history.record('rising', T0 + hour * 3600, 100 + hour, 80, 3, 3)
+        history.record('flat', T0 + hour * 3600, 100, 80, 3, 3)
+    now = T0 + 48 * 3600
+    rising = history.stats('rising', 2 * 86400, now=now)
+    assert rising['trend_per_day'] == pytest.approx(24.0, abs=0.5)
+    assert rising['volatility'] > 0
+    flat = history.stats('flat', 2 * 86400, now=now)
+    assert flat['trend_per_day'] == 0 and flat['volatility'] == 0 and flat['mean_spread'] == 20
+
+
+def test_save_and_load_round_trip(tmp_path):
+    history = PriceHistory()
+    for i in range(500):
+        history.record('a', T0 + i * 60, 100 + i % 7, 90, 3, 1)
+    path = str(tmp_path / 'history' / 'price_history.bin')
+    history.save(path)
+    loaded = PriceHistory()
+    loaded.load(path)
+    for resolution, _, _ in TIERS:
+        # open buckets included
+        expected = history.query('a', T0, T0 + 500 * 60, resolution)['points']
+        assert loaded.query('a', T0, T0 + 500 * 60, resolution)['points'] == expected
+    loaded.record('a', T0 + 501 * 60, 100, 90, 3, 1)
+    loaded.record('a', T0, 1, 1, 1, 1)  # older than recorded history: ignored
+    assert loaded.query('a', T0, T0 + 60, 'raw')['points']['ask'] == history.query('a', T0, T0 + 60, 'raw')['points']['ask']
+
+
+def test_open_rollup_buckets_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'price_history.bin')
+    history = PriceHistory()
+    # 20 hours at 100p, a restart, then 4 hours at 200p: one sample every 10 minutes
+    for i in range(121):
+        history.record('a', T0 + i * 600, 100, 90, 3, 1)
+    history.save(path)
+    history = PriceHistory()
+    history.load(path)
+    for i in range(121, 145):  # the last sample opens the next day, closing this one
+        history.record('a', T0 + i * 600, 200, 90, 3, 1)
+    day = history.query('a', T0, T0 + 86400, resolution='1d')['points']
+    assert day['t'][0] == T0 and day['samples'][0] == 144
+    assert day['ask'][0] == round((121 * 100 + 23 * 200) / 144, 2)
+    hour = history.query('a', T0 + 20 * 3600, T0 + 20 * 3600, resolution='1h')['points']
+    assert hour['samples'] == [6] and hour['ask'] == [round((100 + 5 * 200) / 6, 2)]
+
+
+def test_v1_files_without_open_buckets_still_load(tmp_path):
+    path = str(tmp_path / 'price_history.bin')
+    history = PriceHistory()
+    for i in range(30):
+        history.record('a', T0 + i * 60, 100, 90, 3, 1)
+    history.save(path)
+    # Drop the open-bucket records to get the layout the first file format used
+    with open(path, 'rb') as f:
+        data = f.read()
+    v1, offset = [price_history.FILE_MAGIC_V1], len(price_history.FILE_MAGIC)
+    name_len, tier_count = price_history.ITEM_HEADER.unpack_from(data, offset)
+    v1.append(data[offset:offset + price_history.ITEM_HEADER.size + name_len])
+    offset += price_history.ITEM_HEADER.size + name_len
+    for _ in range(tier_count):
+        _, count = price_history.TIER_HEADER.unpack_from(data, offset)
+        end = offset + price_history.TIER_HEADER.size + count * 18
+        v1.append(data[offset:end])
+        offset = end + price_history.BUCKET.size
+    with open(path, 'wb') as f:
+        f.write(b''.join(v1))
+    loaded = PriceHistory()
+    loaded.load(path)
+    assert loaded.query('a', T0, T0 + 1800, 'raw') == history.query('a', T0, T0 + 1800, 'raw')
+
+
+def test_cache_listener_records_fresh_books_only():
+    history = PriceHistory()
+    cache = OrderBookCache(lambda url_name: [_order('sell', 20), _order('buy', 12)])
+    cache.add_listener(history.record_book)
+    cache.get('a')
+    cache.put('b', [_order('sell', 5)], T0, persist=False)  # reloaded from the snapshot store
+    assert history.items() == ['a']
+    assert history.query('a', 0)['points']['ask'] == [20.0]
+
+
+def test_calculator_annotates_opportunities_with_trend():
+    history = PriceHistory()
+    for hour in range(24):
+        history.record('a_prime_set', T0 + hour * 3600, 50 + hour, 20, 5, 5)
+    calc = TradingCalculator(min_profit=0, price_history=history, trend_window=86400)
+    orders = [_order('sell', 74), dict(_order('buy', 20), creation_date=datetime.datetime.now(datetime.timezone.utc).isoformat())]
+    with patch('backend.price_history.time.time', return_value=T0 + 24 * 3600):
+        opps = calc.analyze_prime_items([{'item_name': 'A', 'id': 'x', 'url_name': 'a_prime_set'}], {'x': orders},
+                                        max_order_age=10 ** 6)
+    assert opps[0]['askTrendPerDay'] == pytest.approx(24.0, abs=0.5)
+    assert opps[0]['historyPoints'] == 24
+    plain = TradingCalculator(min_profit=0).analyze_prime_items([{'item_name': 'A', 'id': 'x', 'url_name': 'a_prime_set'}],
+                                                                {'x': orders}, max_order_age=10 ** 6)
+    assert 'askTrendPerDay' not in plain[0]
+
+
+def test_price_history_endpoint():
+    history = PriceHistory()
+    history.record('a', T0, 30, 20, 2, 1)
+    history.record('a', T0 + 60, 32, float('nan'), 2, 0)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{httpd.server_address[1]}/api/price-history'
+    try:
+        with patch.object(proxy_server, 'price_history', history):
+            with urllib.request.urlopen(f'{base}?item=a&start={T0}&end={T0 + 60}&resolution=raw') as response:
+                body = json.loads(response.read())
+            assert body['points']['ask'] == [30.0, 32.0]
+            assert body['points']['bid'] == [20.0, None]
+            assert body['points']['spread'] == [10.0, None]
+            assert 'trend_per_day' in body['stats']
+            for query, status in (('', 400), ('?item=a&resolution=1w', 400), ('?item=a&start=x', 400),
+                                  ('?item=missing', 404)):
+                with pytest.raises(urllib.error.HTTPError) as error:
+                    urllib.request.urlopen(base + query)
+                assert error.value.code == status
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
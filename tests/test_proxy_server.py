@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from backend import proxy_server
+from backend.trading_job import TradingJob
 import json
+import time
 
 # Test the handle_trading_calc_endpoint logic in isolation
 
@@ -32,7 +34,7 @@ def test_handle_trading_calc_endpoint_basic():
                 # Should set up a job in trading_jobs
                 assert 'test-job-id' in proxy_server.trading_jobs
                 job = proxy_server.trading_jobs['test-job-id']
-                assert job['status'] in ('running', 'done')
+                assert job.status in ('running', 'done')
 
 def test_auth_login_endpoint():
     # Mock the auth_handler.handle_login_request function instead of urllib.request.urlopen
@@ -145,7 +147,7 @@ def test_trading_delete_order_endpoint():
     with patch('backend.proxy_server.get_auth_status', return_value={'logged_in': True}):
         # Mock urllib.request.Request and urlopen for the DELETE request
         with patch('urllib.request.Request') as mock_request:
-            with patch('urllib.request.urlopen') as mock_urlopen:
+            with patch('backend.deadline.urlopen') as mock_urlopen:
                 mock_response = MagicMock()
                 mock_response.status = 200
                 mock_urlopen.return_value.__enter__.return_value = mock_response
@@ -164,7 +166,7 @@ def test_trading_delete_all_wtb_orders_endpoint():
     with patch('backend.proxy_server.get_auth_status', return_value={'logged_in': True, 'username': 'test_user'}):
         # Mock urllib.request.Request and urlopen for the fetch and delete requests
         with patch('urllib.request.Request') as mock_request:
-            with patch('urllib.request.urlopen') as mock_urlopen:
+            with patch('backend.deadline.urlopen') as mock_urlopen:
                 # Mock the fetch response (user's orders)
                 fetch_response = MagicMock()
                 fetch_response.status = 200
@@ -345,7 +347,7 @@ def test_debug_item_details_method():
     
     # Mock urllib.request.Request and urlopen
     with patch('urllib.request.Request') as mock_request:
-        with patch('urllib.request.urlopen') as mock_urlopen:
+        with patch('backend.deadline.urlopen') as mock_urlopen:
             # Mock successful item details response
             item_response = MagicMock()
             item_response.status = 200
@@ -382,7 +384,7 @@ def test_debug_item_details_method_not_found():
     
     # Mock urllib.request.Request and urlopen
     with patch('urllib.request.Request') as mock_request:
-        with patch('urllib.request.urlopen') as mock_urlopen:
+        with patch('backend.deadline.urlopen') as mock_urlopen:
             # Mock 404 response for item details
             from urllib.error import HTTPError
             mock_urlopen.side_effect = HTTPError(
@@ -410,12 +412,12 @@ def test_api_cancel_analysis_endpoint():
     }).encode('utf-8')
     
     # Set up a test job
-    proxy_server.trading_jobs['test-job-id'] = {'status': 'running', 'cancelled': False}
+    proxy_server.trading_jobs['test-job-id'] = TradingJob('test-job-id', 1, status='running')
     
     proxy_server.ProxyHandler.handle_cancel_analysis_endpoint(handler, post_data)
     
     # Verify job was marked as cancelled
-    assert proxy_server.trading_jobs['test-job-id']['cancelled'] is True
+    assert proxy_server.trading_jobs['test-job-id'].cancelled is True
     
     # Clean up
     del proxy_server.trading_jobs['test-job-id']
@@ -475,4 +477,37 @@ def test_concurrent_job_cancellation():
     assert proxy_server.trading_jobs[job_id]['status'] == 'cancelled'
     
     # Clean up
-    del proxy_server.trading_jobs[job_id] 
\ No newline at end of file
+    del proxy_server.trading_jobs[job_id]
+
+
+def test_finished_jobs_are_evicted_after_the_retention_period():
+    def poll(handle, path):
+        handler = MagicMock()
+        handler.path = path
+        handle(handler)
+        return handler.send_response.call_args[0][0]
+
+    now = time.time()
+    old, recent, running = (TradingJob(job_id, 1, status='running') for job_id in ('old', 'recent', 'running'))
+    old.set_status('done')
+    old.finished_at = now - 7200
+    recent.set_status('cancelled')
+    scans = {'old-scan': {'status': 'done', 'results': [], 'finished_at': now - 7200},
+             'running-scan': {'status': 'running', 'results': []}}
+    with patch.object(proxy_server, 'trading_jobs', {'old': old, 'recent': recent, 'running': running}), \
+            patch.object(proxy_server, 'syndicate_jobs', scans), \
+            patch.object(proxy_server, 'FINISHED_JOB_RETENTION', 3600):
+        progress = proxy_server.ProxyHandler.handle_trading_calc_progress
+        assert poll(progress, '/api/trading-calc-progress?job_id=old') == 404
+        assert poll(progress, '/api/trading-calc-progress?job_id=recent') == 200
+        assert poll(progress, '/api/trading-calc-progress?job_id=running') == 200
+        assert set(proxy_server.trading_jobs) == {'recent', 'running'}
+        scan_progress = proxy_server.ProxyHandler.handle_syndicate_scan_progress
+        assert poll(scan_progress, '/api/syndicate-scan-progress?job_id=old-scan') == 404
+        assert poll(scan_progress, '/api/syndicate-scan-progress?job_id=running-scan') == 200
+        # A job finishing late is kept for the full period from when it finished
+        running.set_status('done')
+        proxy_server.evict_finished_jobs(now=now + 3000)
+        assert set(proxy_server.trading_jobs) == {'recent', 'running'}
+        proxy_server.evict_finished_jobs(now=now + 3700)
+        assert not proxy_server.trading_jobs
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.market_stub import StubConfig, build_orders
+from backend import proxy_server
+from backend.deadline import Cancelled
+from backend.market_client import MarketResponse
+from backend.resilience import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, Resilience, RetryBudget,
+                                backoff_delay)
+from tests.conftest import close, post_json, proxy_upstream, serve
+
+
+class NoJitter:
+    def uniform(self, low, high):
+        return 0.0
+
+
+def _response(status):
+    return MarketResponse(status, {}, b'{}', '/items')
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(retry, base=0.25, cap=1.0) for retry in range(8) for _ in range(20)]
+    assert all(0 <= d <= 1.0 for d in delays) and len(set(delays)) > 100
+    assert max(backoff_delay(0, base=0.25) for _ in range(50)) <= 0.25
+
+
+def test_breaker_opens_fails_fast_and_recovers_through_one_probe():
+    now = [0.0]
+    breaker = CircuitBreaker('item_orders', threshold=3, reset_timeout=10, clock=lambda: now[0])
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 10
+    now[0] = 10
+    breaker.before_call()  # the probe
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opened_at == 10
+    now[0] = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_call_retries_transient_failures_within_budget():
+    resilience = Resilience(attempts=3, threshold=100, rng=NoJitter())
+    replies = iter([_response(503), ConnectionResetError('reset'), _response(200)])
+
+    def send():
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+    info = {}
+    assert resilience.call('items', send, info=info).status == 200 and info['attempts'] == 3
+    # 429 and 404 are final; retry=False sends once
+    for status in (429, 404):
+        calls = []
+        assert resilience.call('items', lambda: calls.append(1) or _response(status)).status == status
+        assert len(calls) == 1
+    calls = []
+    assert resilience.call('items', lambda: calls.append(1) or _response(500), retry=False).status == 500
+    assert len(calls) == 1
+    # An exhausted budget stops retrying
+    poor = Resilience(attempts=5, threshold=100, budget=RetryBudget(ratio=0, capacity=1), rng=NoJitter())
+    calls = []
+    assert poor.call('items', lambda: calls.append(1) or _response(502)).status == 502
+    assert len(calls) == 2
+
+
+def test_cancellation_is_not_a_failure():
+    resilience = Resilience(threshold=1, rng=NoJitter())
+
+    def cancelled():
+        raise Cancelled()
+    with pytest.raises(Cancelled):
+        resilience.call('items', cancelled)
+    assert resilience.breaker('items').state == CLOSED
+    with pytest.raises(OSError):
+        resilience.call('items', lambda: (_ for _ in ()).throw(OSError('down')), retry=False)
+    with pytest.raises(CircuitOpen):
+        resilience.call('items', lambda: _response(200))
+    assert resilience.status()['circuits']['items']['state'] == OPEN
+
+
+class FlakyUpstream(BaseHTTPRequestHandler):
+    """Order books that fail on the first request (flaky_) or always (broken_)"""
+    seen = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url_name = self.path.split('/')[3]
+        with self.lock:
+            self.seen[url_name] = self.seen.get(url_name, 0) + 1
+            count = self.seen[url_name]
+        if url_name.startswith('broken_') or (url_name.startswith('flaky_') and count == 1):
+            body, status = b'{"error": "upstream"}', 500
+        else:
+            body, status = json.dumps({'payload': {'orders': build_orders(StubConfig(ingame_ratio=1.0), url_name)}}).encode(), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_trading_job_retries_and_reports_fetch_status():
+    FlakyUpstream.seen = {}
+    items = [{'id': f'i{n}', 'item_name': f'Item {n} Prime', 'url_name': f'{kind}_{n}_prime'}
+             for n, kind in enumerate(['ok', 'flaky', 'broken', 'ok'])]
+    upstream, upstream_url = serve(FlakyUpstream)
+    httpd, proxy = serve()
+    try:
+        with proxy_upstream(upstream_url + '/v1'), \
+             patch.object(proxy_server, 'upstream_resilience', Resilience(threshold=100, rng=NoJitter())):
+            job_id = post_json(f'{proxy}/api/trading-calc',
+                               {'all_items': items, 'min_profit': 1, 'max_order_age': 365})['job_id']
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}') as response:
+                    progress = json.loads(response.read())
+                if progress['status'] == 'done':
+                    break
+                time.sleep(0.05)
+            assert progress['fetch_status'] == {'ok': 3, 'http_error': 1}
+            [failure] = progress['fetch_failures']
+            assert failure['itemId'] == 'i2' and failure['attempts'] == 3 and failure['http_status'] == 500
+            assert FlakyUpstream.seen['flaky_1_prime'] == 2
+            reanalyzed = post_json(f'{proxy}/api/trading-reanalyze', {'job_id': job_id})
+            assert reanalyzed['items'] == 3  # the failed item is not analyzed as an empty book
+    finally:
+        close(httpd)
+        close(upstream)
+
+
+def test_open_circuit_answers_503_with_retry_after():
+    FlakyUpstream.seen = {}
+    upstream, upstream_url = serve(FlakyUpstream)
+    httpd, proxy = serve()
+    try:
+        with proxy_upstream(upstream_url + '/v1'), \
+             patch.object(proxy_server, 'upstream_resilience', Resilience(attempts=1, threshold=1, reset_timeout=30)):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f'{proxy}/api/items/broken_x/orders', timeout=5)
+            assert error.value.code == 500
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f'{proxy}/api/items/ok_x/orders', timeout=5)
+            assert error.value.code == 503 and int(error.value.headers['Retry-After']) == 30
+            assert 'ok_x' not in FlakyUpstream.seen
+    finally:
+        close(httpd)
+        close(upstream)
@@ -0,0 +1,88 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import MagicMock
+from backend.scan_profile import ScanProfile, percentile, PHASES
+from backend.market_client import MarketClient
+from backend import proxy_server
+from backend.trading_job import TradingJob
+
+
+def test_percentile_nearest_rank():
+    values = sorted(float(v) for v in range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_profile_snapshot_breakdown():
+    profile = ScanProfile()
+    profile.add('rate_limit_wait', 3.0)
+    profile.add_timings({'connect': 0.1, 'ttfb': 0.5, 'body_read': 0.4, 'unknown': 9})
+    profile.add('json_parse', 0.2)
+    for seconds in (1.0, 2.0, 3.0):
+        profile.add_item(seconds)
+    profile.finish()
+    snap = profile.snapshot()
+    assert set(snap['phases']) == set(PHASES)
+    assert snap['phases']['rate_limit_wait']['total_seconds'] == 3.0
+    assert snap['items']['count'] == 3
+    assert snap['items']['p50'] == 2.0
+    assert snap['items']['p99'] == 3.0
+    assert snap['bound_by'] == 'rate_limiter'
+    json.dumps(snap)
+
+
+def test_profile_phase_context_manager():
+    profile = ScanProfile()
+    with profile.phase('analysis'):
+        pass
+    assert profile.snapshot()['phases']['analysis']['per_call']['count'] == 1
+
+
+def test_progress_endpoint_returns_profile():
+    handler = MagicMock()
+    handler.path = '/api/trading-calc-progress?job_id=profile-job'
+    proxy_server.trading_jobs['profile-job'] = TradingJob('profile-job', 1, profile=ScanProfile(), status='done')
+    try:
+        proxy_server.ProxyHandler.handle_trading_calc_progress(handler)
+        body = json.loads(handler.wfile.write.call_args[0][0])
+        assert 'phases' in body['profile']
+    finally:
+        del proxy_server.trading_jobs['profile-job']
+
+
+class _OrdersHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'payload': {'orders': [], 'path': self.path}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_market_client_timings_and_keepalive():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _OrdersHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = MarketClient(f'http://127.0.0.1:{server.server_address[1]}/v1')
+        timings = {}
+        response = client.get('/items/ash_prime_set/orders?include=item', timings=timings)
+        assert response.status == 200
+        assert json.loads(response.body)['payload']['path'] == '/v1/items/ash_prime_set/orders?include=item'
+        assert {'connect', 'ttfb', 'body_read'} <= set(timings)
+        # Second request reuses the pooled connection, so no connect time
+        timings = {}
+        client.get('/items', timings=timings)
+        assert timings['connect'] == 0.0
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
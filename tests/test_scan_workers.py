@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks import bench_process_pool as bench
+from benchmarks.market_stub import StubConfig, StubMarketServer, build_orders
+from backend import proxy_server
+from backend.analysis_memo import AnalysisMemo
+from backend.market_client import MarketClient
+from backend.order_book_cache import OrderBookCache
+from backend.order_record import OrderRecord
+from backend.price_history import PriceHistory, book_sample
+from backend.scan_workers import AnalysisPool, analyze_response, records_from_tuples
+from backend.snapshot_store import decode_orders
+from backend.trading_calculator import TradingCalculator
+
+
+def _body(url_name, orders_per_item=40):
+    return json.dumps({'payload': {'orders': build_orders(StubConfig(orders_per_item=orders_per_item), url_name)}}).encode()
+
+
+def test_worker_result_matches_in_process_analysis():
+    body = _body('ash_prime_set')
+    result = analyze_response(body, 'Ash Prime Set', 'a', 0, 0, 365)
+    orders = json.loads(body)['payload']['orders']
+    ingame = [OrderRecord.from_order(o) for o in orders if o['user']['status'] == 'ingame']
+    records = records_from_tuples(result.orders)
+    assert records == ingame
+    expected, expires_at = TradingCalculator(0, 0, 365).analyze_with_expiry(ingame, 'Ash Prime Set', 'a', 365)
+    assert result.opportunities == expected and result.expires_at == expires_at
+    assert result.record is None and result.sample is None
+    named = analyze_response(body, 'Ash Prime Set', 'a', 0, 0, 365, url_name='ash_prime_set')
+    url_name, _, book = decode_orders(named.record, 0)
+    assert url_name == 'ash_prime_set' and [o['id'] for o in book] == [o['id'] for o in orders]
+    assert named.sample == book_sample(orders)
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = AnalysisPool(2)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_returns_the_same_results(pool):
+    jobs = [(_body(name), name, name, 0, 0, 365) for name in ('ash_prime_set', 'nova_prime_set', 'saryn_prime_set')]
+    assert pool.map(jobs) == [analyze_response(*job) for job in jobs]
+    assert pool.analyze(*jobs[0]) == analyze_response(*jobs[0])
+    assert pool.map([]) == []
+
+
+def test_trading_scan_through_the_pool_matches_threads(pool):
+    def scan(proxy, items):
+        req = urllib.request.Request(f'{proxy}/api/trading-calc', data=json.dumps(
+            {'all_items': items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 5}).encode())
+        with urllib.request.urlopen(req, timeout=5) as response:
+            job_id = json.loads(response.read())['job_id']
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            with urllib.request.urlopen(f'{proxy}/api/trading-calc-progress?job_id={job_id}') as response:
+                progress = json.loads(response.read())
+            if progress['status'] == 'done':
+                return progress
+            time.sleep(0.05)
+        raise AssertionError('scan did not finish')
+
+    # Trends depend on how many samples price history already holds when each item is analyzed
+    skip = {'_wtbOrder', 'askTrendPerDay', 'volatility', 'meanSpread', 'historyPoints'}
+    strip = lambda results: sorted(json.dumps({k: v for k, v in o.items() if k not in skip}, sort_keys=True)
+                                   for o in results)
+    with StubMarketServer(StubConfig(item_count=10, orders_per_item=30, latency='fixed', latency_ms=1, ingame_ratio=1.0)) as stub:
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        proxy = f'http://127.0.0.1:{httpd.server_address[1]}'
+        try:
+            runs, caches, histories = [], [], []
+            for analysis_pool in (None, pool):
+                caches.append(OrderBookCache(proxy_server.fetch_order_book))
+                caches[-1].add_listener(proxy_server.record_price_sample)
+                histories.append(PriceHistory())
+                with patch.object(proxy_server, 'market_client', MarketClient(stub.url)), \
+                     patch.object(proxy_server, 'order_book_cache', caches[-1]), \
+                     patch.object(proxy_server, 'analysis_memo', AnalysisMemo()), \
+                     patch.object(proxy_server, 'parsed_book_memo', AnalysisMemo(name='parsed_book')), \
+                     patch.object(proxy_server, 'price_history', histories[-1]), \
+                     patch.object(proxy_server, 'analysis_pool', analysis_pool):
+                    runs.append(scan(proxy, stub.state.items))
+            threaded, pooled = runs
+            assert threaded['results'] and strip(pooled['results']) == strip(threaded['results'])
+            assert pooled['profile']['phases']['process_pool']['per_call']['count'] > 0
+            # Books analyzed in the pool are cached (still encoded) and sampled like the ones parsed in-process
+            threaded_books, pooled_books = caches
+            assert len(pooled_books) == len(threaded_books) > 0
+            assert all(isinstance(entry[1], bytes) for entry in pooled_books._entries.values())
+            assert sorted(histories[1].items()) == sorted(histories[0].items())
+            for url_name in threaded_books._entries:
+                threaded_points, pooled_points = (h.query(url_name)['points'] for h in histories)
+                assert {k: v for k, v in pooled_points.items() if k != 't'} == \
+                    {k: v for k, v in threaded_points.items() if k != 't'}
+                assert ([(o['id'], o['platinum']) for o in pooled_books.peek(url_name)] ==
+                        [(o['id'], o['platinum']) for o in threaded_books.peek(url_name)])
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+
+def test_benchmark_reports_each_process_count(tmp_path):
+    output = tmp_path / 'pool.json'
+    assert bench.main(['--quick', '--max-processes', '2', '--output', str(output)]) == 0
+    result = json.loads(output.read_text())
+    assert set(result['variants']) == {'threads', 'processes-1', 'processes-2'}
+    assert len({v['opportunities'] for v in result['variants'].values()}) == 1
+    assert bench.process_counts(6) == [1, 2, 4, 6]
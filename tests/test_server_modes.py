@@ -0,0 +1,162 @@
+"""The same requests against both server modes (ThreadingHTTPServer and AsyncHTTPServer) must behave alike"""
+import http.client
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmarks.market_stub import StubConfig, StubMarketServer
+from backend import proxy_server
+from backend.async_server import AsyncHTTPServer
+from tests.conftest import proxy_upstream
+
+
+@pytest.fixture(params=sorted(proxy_server.SERVER_CLASSES))
+def proxy(request):
+    httpd = proxy_server.SERVER_CLASSES[request.param](('127.0.0.1', 0), proxy_server.ProxyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubMarketServer(StubConfig(item_count=4, orders_per_item=20, ingame_ratio=1.0)) as server:
+        with proxy_upstream(server.url):
+            yield server
+
+
+def _request(url, data=None, method=None, headers=None):
+    req = urllib.request.Request(url, data=data, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_cors_preflight_and_unknown_routes(proxy):
+    status, headers, _ = _request(f'{proxy}/api/trading-calc', method='OPTIONS')
+    assert status == 200 and headers['Access-Control-Allow-Origin'] == '*'
+    assert 'POST' in headers['Access-Control-Allow-Methods']
+    status, _, body = _request(f'{proxy}/no/such/route', data=b'{}')
+    assert status == 404 and json.loads(body) == {'error': 'Endpoint not found'}
+    status, _, body = _request(f'{proxy}/no-such-file.txt')
+    assert status == 404 and body == b'File not found'
+
+
+def test_static_files_and_metrics(proxy):
+    status, headers, body = _request(f'{proxy}/data/syndicate_items.json')
+    with open('data/syndicate_items.json', 'rb') as f:
+        assert status == 200 and body == f.read()
+    assert int(headers['Content-Length']) == len(body)
+    status, headers, body = _request(f'{proxy}/metrics')
+    assert status == 200 and b'proxy_http_requests_total' in body
+
+
+def test_proxied_get_and_progress_errors(proxy, stub):
+    status, _, body = _request(f'{proxy}/api/items')
+    assert status == 200 and len(json.loads(body)['payload']['items']) == 4
+    status, _, body = _request(f'{proxy}/api/trading-calc-progress')
+    assert status == 400 and json.loads(body) == {'error': 'Missing job_id'}
+    status, _, body = _request(f'{proxy}/api/trading-calc-progress?job_id=nope')
+    assert status == 404
+
+
+def test_trading_job_runs_to_completion(proxy, stub):
+    status, _, body = _request(f'{proxy}/api/trading-calc', data=json.dumps({
+        'all_items': stub.state.items, 'min_profit': 1, 'max_order_age': 365, 'batch_size': 2}).encode())
+    assert status == 200
+    job_id = json.loads(body)['job_id']
+    started = time.monotonic()
+    while time.monotonic() - started < 10:
+        status, _, body = _request(f'{proxy}/api/trading-calc-progress?job_id={job_id}')
+        progress = json.loads(body)
+        if progress['status'] == 'done':
+            break
+        time.sleep(0.05)
+    primes = sum('prime' in item['item_name'].lower() for item in stub.state.items)
+    assert progress['status'] == 'done' and progress['progress'] == progress['total'] == primes > 0
+    assert progress['fetch_status'] == {'ok': primes}
+
+
+def test_post_bodies_arrive_whole(proxy):
+    # Large enough to span several socket reads; the reanalyze endpoint parses it and answers 404
+    payload = json.dumps({'job_id': 'missing', 'padding': 'x' * 200_000}).encode()
+    status, _, body = _request(f'{proxy}/api/trading-reanalyze', data=payload)
+    assert status == 404 and json.loads(body) == {'error': 'Job not found'}
+    status, _, body = _request(f'{proxy}/api/trading-reanalyze', data=b'{not json')
+    assert status == 400
+
+
+def test_slow_clients_do_not_block_others(proxy):
+    # A client that sends half a request head and stalls must not hold up the next one
+    host, port = proxy.rsplit(':', 1)
+    stalled = socket.create_connection((host[len('http://'):], int(port)))
+    stalled.sendall(b'GET /metrics HTTP/1.1\r\nHost: x\r\n')
+    try:
+        started = time.monotonic()
+        status, _, _ = _request(f'{proxy}/metrics')
+        assert status == 200 and time.monotonic() - started < 2
+    finally:
+        stalled.close()
+
+
+def test_async_mode_holds_many_idle_connections_without_threads():
+    httpd = AsyncHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler, max_workers=4)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    idle = []
+    try:
+        threads_before = threading.active_count()
+        for _ in range(500):
+            idle.append(socket.create_connection(('127.0.0.1', httpd.server_address[1])))
+        started = time.monotonic()
+        while httpd.connections < 500 and time.monotonic() - started < 5:
+            time.sleep(0.01)
+        assert httpd.connections == 500
+        conn = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=5)
+        conn.request('GET', '/metrics')
+        assert conn.getresponse().status == 200
+        conn.close()
+        assert threading.active_count() <= threads_before + 4
+    finally:
+        for sock in idle:
+            sock.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_async_mode_serves_local_routes_while_upstream_calls_fill_their_pool():
+    with StubMarketServer(StubConfig(item_count=4, latency='fixed', latency_ms=1500)) as server, \
+            proxy_upstream(server.url):
+        httpd = AsyncHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler, max_workers=2, upstream_workers=2)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        proxy = f'http://127.0.0.1:{httpd.server_address[1]}'
+        slow = []
+        threads = [threading.Thread(target=lambda i=i: slow.append(_request(f'{proxy}/api/items?n={i}')[0]))
+                   for i in range(4)]
+        try:
+            for thread in threads:
+                thread.start()
+            started = time.monotonic()
+            while server.state.counts.get('items', 0) < 2 and time.monotonic() - started < 5:
+                time.sleep(0.01)
+            assert server.state.counts['items'] == 2
+            # Both upstream threads are waiting on the stub and two more proxied calls are queued behind them
+            started = time.monotonic()
+            assert _request(f'{proxy}/api/trading-calc-progress?job_id=nope')[0] == 404
+            assert _request(f'{proxy}/metrics')[0] == 200
+            assert time.monotonic() - started < 1
+            for thread in threads:
+                thread.join()
+            assert slow == [200] * 4
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
@@ -0,0 +1,116 @@
+import os
+import time
+from benchmarks.market_stub import StubConfig, build_orders
+from backend.order_book_cache import OrderBookCache
+from backend.snapshot_store import SnapshotStore, RECORD_HEADER, encode_orders, to_epoch, to_iso
+from backend.trading_calculator import TradingCalculator
+
+
+def _book(url_name='ash_prime_set', count=30):
+    return build_orders(StubConfig(orders_per_item=count), url_name)
+
+
+def test_round_trip_keeps_fields_scans_use(tmp_path):
+    orders = _book()
+    orders[0]['mod_rank'] = 3
+    store = SnapshotStore(str(tmp_path))
+    store.put('ash_prime_set', orders, 1700000000.5)
+    fetched_at, decoded = store.get('ash_prime_set')
+    assert fetched_at == 1700000000.5
+    assert len(decoded) == len(orders)
+    for original, copy in zip(orders, decoded):
+        for field in ('id', 'platinum', 'quantity', 'order_type', 'visible', 'creation_date', 'last_update'):
+            assert copy[field] == original[field]
+        for field in ('id', 'ingame_name', 'status'):
+            assert copy['user'][field] == original['user'][field]
+    assert decoded[0]['mod_rank'] == 3 and 'mod_rank' not in decoded[1]
+    store.close()
+
+
+def test_calculator_results_match_on_decoded_books(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    orders = _book(count=60)
+    store.put('ash_prime_set', orders, time.time())
+    calc = TradingCalculator(min_profit=0)
+    live = calc.analyze_prime_item_orders(orders, 'Ash Prime Set', 'id', 365)
+    stored = calc.analyze_prime_item_orders(store.get('ash_prime_set')[1], 'Ash Prime Set', 'id', 365)
+    assert [{k: v for k, v in o.items() if k != '_wtbOrder'} for o in live] == \
+           [{k: v for k, v in o.items() if k != '_wtbOrder'} for o in stored]
+    store.close()
+
+
+def test_latest_record_wins_and_index_survives_reopen(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.put('a', _book('a', 4), 100.0)
+    store.put('b', _book('b', 4), 100.0)
+    store.put('a', _book('a', 8), 200.0)
+    store.close()
+    reopened = SnapshotStore(str(tmp_path))
+    assert sorted(reopened.keys()) == ['a', 'b']
+    assert reopened.fetched_at('a') == 200.0
+    assert len(reopened.get('a')[1]) == 8
+    reopened.close()
+
+
+def test_partial_record_is_truncated_on_open(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.put('a', _book('a', 4), 100.0)
+    store.close()
+    segment = os.path.join(str(tmp_path), 'segment-000001.wfs')
+    good_size = os.path.getsize(segment)
+    with open(segment, 'ab') as f:
+        f.write(RECORD_HEADER.pack(10_000, 1, 1.0, 5, 0) + b'x' * 20)
+    reopened = SnapshotStore(str(tmp_path))
+    assert reopened.keys() == ['a']
+    assert os.path.getsize(segment) == good_size
+    reopened.put('b', _book('b', 2), 100.0)
+    assert len(reopened.get('b')[1]) == 2
+    reopened.close()
+
+
+def test_rolls_segments_and_compacts_superseded_records(tmp_path):
+    store = SnapshotStore(str(tmp_path), segment_max_bytes=20_000)
+    for round_number in range(20):
+        for url_name in ('a', 'b', 'c'):
+            store.put(url_name, _book(url_name, 10), float(round_number))
+    stats = store.stats()
+    assert stats['items'] == 3
+    assert stats['bytes'] < 3 * 20_000
+    assert all(store.fetched_at(k) == 19.0 for k in ('a', 'b', 'c'))
+    store.close()
+    reopened = SnapshotStore(str(tmp_path))
+    assert sorted(reopened.keys()) == ['a', 'b', 'c'] and len(reopened.get('c')[1]) == 10
+    reopened.close()
+
+
+def test_cache_persists_puts_and_warm_starts_from_store(tmp_path):
+    cache = OrderBookCache(lambda url_name: None, store=SnapshotStore(str(tmp_path)))
+    cache.put('ash_prime_set', _book())
+    cache.store.close()
+
+    fetches = []
+    warm = OrderBookCache(lambda url_name: fetches.append(url_name), ttl=60, store=SnapshotStore(str(tmp_path)))
+    assert warm.age('ash_prime_set') < 60
+    assert len(warm.peek('ash_prime_set')) == 30
+    assert len(warm.get('ash_prime_set')) == 30
+    assert fetches == []
+    warm.store.close()
+
+
+def test_cache_keeps_put_records_encoded_until_read(tmp_path):
+    cache = OrderBookCache(lambda url_name: None, store=SnapshotStore(str(tmp_path)))
+    heard = []
+    cache.add_listener(lambda *args: heard.append(args))
+    record = encode_orders('ash_prime_set', _book(), time.time())
+    cache.put_record('ash_prime_set', record, RECORD_HEADER.unpack_from(record)[2])
+    assert cache._entries['ash_prime_set'][1] is record and heard == []
+    assert cache.store.get_record('ash_prime_set') == record
+    assert [o['id'] for o in cache.peek('ash_prime_set')] == [o['id'] for o in _book()]
+    assert isinstance(cache._entries['ash_prime_set'][1], list)
+    cache.store.close()
+
+
+def test_timestamp_conversion():
+    assert to_iso(to_epoch('2024-03-01T12:34:56.789+00:00')) == '2024-03-01T12:34:56.789+00:00'
+    assert to_iso(to_epoch('2024-03-01T12:34:56Z')) == '2024-03-01T12:34:56.000+00:00'
+    assert to_iso(to_epoch(None)) is None
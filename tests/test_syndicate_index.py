@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pytest
+from backend import proxy_server
+from backend.syndicate_index import SyndicateIndex, ReloadingSyndicateIndex
+from backend.syndicate_scan import load_syndicates
+
+SAMPLE = {
+    'steel_meridian': {
+        'name': 'Steel Meridian', 'color': '#ff6b6b', 'keywords': ['steel meridian', 'sm'],
+        'items': [
+            {'name': 'Steel Charge', 'type': 'mod', 'standing_cost': 25000},
+            {'name': 'Vaykor Hek', 'type': 'weapon', 'standing_cost': 125000},
+            {'name': 'Exilus Weapon Adapter Blueprint', 'type': 'blueprint', 'standing_cost': 75000},
+        ],
+    },
+    'cephalon_suda': {
+        'name': 'Cephalon Suda', 'color': '#45b7d1', 'keywords': ['suda'],
+        'items': [
+            {'name': 'Entropy Spike', 'type': 'mod', 'standing_cost': 25000},
+            {'name': "Mesa's Waltz", 'type': 'mod', 'standing_cost': 50000},
+        ],
+    },
+}
+
+
+def _names(items):
+    return [i['name'] for i in items]
+
+
+def test_resolves_syndicate_keywords_and_prefixes():
+    index = SyndicateIndex(SAMPLE)
+    assert index.resolve_syndicates('SM') == {'steel_meridian'}
+    assert index.resolve_syndicates('Cephalon Suda') == {'cephalon_suda'}
+    assert index.resolve_syndicates('ceph') == {'cephalon_suda'}
+    assert index.resolve_syndicates('nobody') == frozenset()
+
+
+def test_query_intersects_filters():
+    index = SyndicateIndex(SAMPLE)
+    assert _names(index.query(syndicate='suda')) == ['Entropy Spike', "Mesa's Waltz"]
+    assert _names(index.query(item_type='bp')) == ['Exilus Weapon Adapter Blueprint']
+    assert _names(index.query(item_type='augments', max_standing=25000)) == ['Steel Charge', 'Entropy Spike']
+    assert _names(index.query(prefix='cha')) == ['Steel Charge']
+    assert _names(index.query(prefix='mesas')) == []
+    assert _names(index.query(prefix="mesa's w")) == ["Mesa's Waltz"]
+    assert _names(index.query(min_standing=75000, max_standing=125000)) == ['Vaykor Hek', 'Exilus Weapon Adapter Blueprint']
+    assert len(index.query(limit=2)) == 2
+    assert index.query(syndicate='sm', item_type='mod')[0]['url_name'] == 'steel_charge'
+
+
+def test_indexes_the_shipped_catalogue():
+    data = load_syndicates()
+    index = SyndicateIndex(data)
+    assert len(index.items) == sum(len(s['items']) for s in data.values())
+    assert len(index.query(syndicate='red veil')) == len(data['red_veil']['items'])
+
+
+def test_reloads_when_file_changes_and_keeps_last_good_index(tmp_path):
+    path = tmp_path / 'syndicates.json'
+    path.write_text(json.dumps(SAMPLE))
+    holder = ReloadingSyndicateIndex(str(path))
+    first = holder.get()
+    assert holder.get() is first
+    changed = dict(SAMPLE, red_veil={'name': 'Red Veil', 'keywords': ['rv'], 'items': []})
+    path.write_text(json.dumps(changed))
+    os.utime(path, (first.mtime + 10, first.mtime + 10))
+    second = holder.get()
+    assert second is not first and second.resolve_syndicates('rv') == {'red_veil'}
+    path.write_text('{not json')
+    os.utime(path, (first.mtime + 20, first.mtime + 20))
+    assert holder.get() is second
+
+
+def test_first_load_of_malformed_file_raises(tmp_path):
+    path = tmp_path / 'bad.json'
+    path.write_text('{not json')
+    with pytest.raises(ValueError):
+        ReloadingSyndicateIndex(str(path)).get()
+
+
+def test_syndicate_items_endpoint_returns_matching_slice():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), proxy_server.ProxyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{httpd.server_address[1]}/api/syndicate-items?syndicate=suda&type=mods&max_standing=25000'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = json.loads(response.read())
+        assert [s['key'] for s in body['syndicates']] == ['cephalon_suda']
+        assert body['count'] == len(body['items']) > 0
+        assert all(i['syndicate'] == 'cephalon_suda' and i['type'] == 'mod' and i['standing_cost'] <= 25000 for i in body['items'])
+        for limit in ('-1', 'ten'):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f'{url}&limit={limit}', timeout=5)
+            assert error.value.code == 400
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
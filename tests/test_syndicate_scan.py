@@ -0,0 +1,206 @@
+import json
+import threading
+import time
+import urllib.request
+from unittest.mock import patch
+from backend import fair_share, proxy_server, syndicate_scan
+from backend.fair_share import FairShareScheduler
+from backend.order_book_cache import OrderBookCache
+from tests.conftest import close, post_json, serve
+
+
+def _order(order_type, platinum, status='ingame', mod_rank=None):
+    order = {'order_type': order_type, 'platinum': platinum, 'user': {'status': status}}
+    if mod_rank is not None:
+        order['mod_rank'] = mod_rank
+    return order
+
+
+def test_market_url_name():
+    assert syndicate_scan.market_url_name("Mesa's Waltz") == 'mesas_waltz'
+    assert syndicate_scan.market_url_name('Calm & Frenzy') == 'calm_and_frenzy'
+    assert syndicate_scan.market_url_name('Vaykor Hek') == 'vaykor_hek'
+
+
+def test_scan_targets_merge_items_offered_by_several_syndicates():
+    syndicates = syndicate_scan.load_syndicates()
+    every = syndicate_scan.scan_targets(syndicates)
+    listed = sum(len(s['items']) for s in syndicates.values())
+    assert len(every) < listed
+    assert len({t['url_name'] for t in every}) == len(every)
+    assert any(len(t['syndicates']) > 1 for t in every)
+    one = syndicate_scan.scan_targets(syndicates, 'steel_meridian')
+    assert all(t['syndicates'] == ['steel_meridian'] for t in one)
+
+
+def test_price_item_respects_rank_and_online_mode():
+    target = {'name': 'Mod', 'url_name': 'mod', 'type': 'mod', 'standing_cost': 25000, 'syndicates': ['red_veil']}
+    orders = [
+        _order('sell', 20, mod_rank=0), _order('sell', 15, 'offline', mod_rank=0),
+        _order('sell', 40, mod_rank=3), _order('buy', 12, mod_rank=0),
+    ]
+    rank0 = syndicate_scan.price_item(target, orders, rank=0, online_only=True)
+    assert rank0['price'] == 20 and rank0['buy_price'] == 12 and rank0['sell_orders'] == 1
+    assert rank0['platinum_per_standing'] == 20 / 25000
+    assert syndicate_scan.price_item(target, orders, rank=0, online_only=False)['price'] == 15
+    assert syndicate_scan.price_item(target, orders, rank=3)['price'] == 40
+    assert syndicate_scan.price_item(target, [], rank=0)['status'] == 'no_orders'
+    assert syndicate_scan.price_item(target, None)['status'] == 'unavailable'
+
+
+def test_rank_results_orders_by_platinum_per_standing():
+    results = [
+        {'name': 'b', 'platinum_per_standing': None},
+        {'name': 'a', 'platinum_per_standing': 0.001},
+        {'name': 'c', 'platinum_per_standing': 0.002},
+    ]
+    assert [r['name'] for r in syndicate_scan.rank_results(results)] == ['c', 'a', 'b']
+
+
+def test_order_book_cache_coalesces_concurrent_fetches():
+    calls = []
+    gate = threading.Event()
+
+    def fetch(url_name):
+        calls.append(url_name)
+        gate.wait(2)
+        return [_order('sell', 10)]
+
+    cache = OrderBookCache(fetch, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('ash_prime_set'))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == ['ash_prime_set']
+    assert len(results) == 5 and all(r == results[0] for r in results)
+    assert cache.get('ash_prime_set') == results[0]
+    assert calls == ['ash_prime_set']
+    assert cache.get('ash_prime_set', max_age=0) is not None
+    assert len(calls) == 2
+
+
+def test_order_book_cache_does_not_keep_failures():
+    cache = OrderBookCache(lambda url_name: None)
+    assert cache.get('x') is None
+    assert len(cache) == 0
+
+
+def test_syndicate_scan_endpoint_streams_ranked_results():
+    fetched = []
+
+    def fetch(url_name):
+        fetched.append(url_name)
+        return [_order('sell', 10 + len(url_name), mod_rank=0)]
+
+    httpd, proxy = serve()
+    try:
+        with patch.object(proxy_server, 'order_book_cache', OrderBookCache(fetch)):
+            started = post_json(f'{proxy}/api/syndicate-scan', {'syndicate': 'all'})
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                with urllib.request.urlopen(f"{proxy}/api/syndicate-scan-progress?job_id={started['job_id']}", timeout=5) as response:
+                    progress = json.loads(response.read())
+                if progress['status'] == 'done':
+                    break
+                time.sleep(0.05)
+        assert progress['status'] == 'done'
+        assert progress['progress'] == progress['total'] == started['total']
+        assert len(fetched) == len(set(fetched)) == started['total']
+        ranked = [r['platinum_per_standing'] for r in progress['results'] if r['platinum_per_standing'] is not None]
+        assert ranked == sorted(ranked, reverse=True)
+
+        req = urllib.request.Request(f'{proxy}/api/syndicate-scan', data=json.dumps({'syndicate': 'nobody'}).encode())
+        try:
+            urllib.request.urlopen(req, timeout=5)
+            assert False, 'expected 404'
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+    finally:
+        close(httpd)
+
+
+def test_syndicate_scan_rejects_malformed_bodies():
+    httpd, proxy = serve()
+    try:
+        for body in (b'{"rank": null}', b'{"rank": [1]}', b'{"rank": "high"}', b'[1, 2]', b'"all"', b'{not json'):
+            req = urllib.request.Request(f'{proxy}/api/syndicate-scan', data=body)
+            try:
+                urllib.request.urlopen(req, timeout=5)
+                assert False, f'expected 400 for {body!r}'
+            except urllib.error.HTTPError as e:
+                assert e.code == 400 and json.loads(e.read()) == {'error': 'Invalid JSON data'}
+    finally:
+        close(httpd)
+
+
+def test_failed_syndicate_scan_is_marked_as_an_error():
+    def fail(*args, **kwargs):
+        raise RuntimeError('price_item blew up')
+
+    httpd, proxy = serve()
+    try:
+        with patch.object(syndicate_scan, 'run_scan', fail), patch.object(proxy_server, 'syndicate_jobs', {}):
+            job_id = post_json(f'{proxy}/api/syndicate-scan', {'syndicate': 'all'})['job_id']
+            deadline = time.time() + 5
+            while time.time() < deadline:
+                with urllib.request.urlopen(f'{proxy}/api/syndicate-scan-progress?job_id={job_id}', timeout=5) as response:
+                    progress = json.loads(response.read())
+                if progress['status'] != 'running':
+                    break
+                time.sleep(0.05)
+            assert progress['status'] == 'error' and 'price_item blew up' in progress['error']
+            assert progress['finished_at'] <= time.time()
+            with patch.object(proxy_server, 'FINISHED_JOB_RETENTION', 0):
+                proxy_server.evict_finished_jobs(time.time() + 1)
+            assert job_id not in proxy_server.syndicate_jobs
+    finally:
+        close(httpd)
+
+
+def test_syndicate_scan_fetches_run_under_a_scan_deadline():
+    seen = []
+
+    def fetch(url_name):
+        seen.append(proxy_server.deadlines.current())
+        return [_order('sell', 10, mod_rank=0)]
+
+    httpd, proxy = serve()
+    try:
+        with patch.object(proxy_server, 'order_book_cache', OrderBookCache(fetch)):
+            started = post_json(f'{proxy}/api/syndicate-scan', {'syndicate': 'all'})
+            deadline = time.time() + 10
+            while time.time() < deadline and len(seen) < started['total']:
+                time.sleep(0.05)
+        assert len(seen) == started['total'] and len(set(map(id, seen))) == 1
+        assert seen[0] is not proxy_server.deadlines.UNBOUNDED
+        assert 0 < seen[0].remaining() <= proxy_server.TRADING_JOB_DEADLINE
+    finally:
+        close(httpd)
+
+
+def test_syndicate_scan_fetches_do_not_delay_interactive_requests(proxy_with_stub):
+    lanes = FairShareScheduler(proxy_server.free_rate_limit_slots, proxy_server.take_rate_limit_slot)
+    proxy, stub = proxy_with_stub(item_count=6, latency='fixed', latency_ms=1)
+    with patch.object(proxy_server, 'get_auth_headers', lambda: {}), \
+            patch.object(proxy_server, 'RATE_LIMIT', 2), patch.object(proxy_server, 'request_timestamps', []), \
+            patch.object(proxy_server, 'upstream_lanes', lanes), \
+            patch.object(proxy_server, 'TRADING_JOB_DEADLINE', 3):
+        job_id = post_json(f'{proxy}/api/syndicate-scan', {'syndicate': 'all'})['job_id']
+        deadline = time.time() + 2
+        while lanes.waiting()[fair_share.JOB] < 4:
+            assert time.time() < deadline, 'scan fetches never queued in the job lane'
+            time.sleep(0.01)
+        assert lanes.waiting()[fair_share.INTERACTIVE] == 0 and lanes.status()['job_flows'] == 1
+        # Ahead of the scan's queued fetches in one FIFO, this would wait several 2-slot windows
+        started = time.monotonic()
+        with urllib.request.urlopen(f'{proxy}/api/items', timeout=5) as response:
+            assert response.read() == stub.state.items_body
+        assert time.monotonic() - started < 1.2
+        deadline = time.time() + 10
+        while proxy_server.syndicate_jobs[job_id]['status'] == 'running':
+            assert time.time() < deadline
+            time.sleep(0.05)
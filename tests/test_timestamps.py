@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from dateutil import parser as date_parser
+
+from benchmarks import bench_timestamps as bench
+from backend.order_record import OrderRecord
+from backend.timestamps import parse_epoch, parse_epoch_ms
+from backend.trading_calculator import TradingCalculator
+
+
+def test_market_format_matches_dateutil():
+    for value in bench.market_timestamps(500):
+        assert parse_epoch(value) == int(date_parser.parse(value).timestamp())
+    assert parse_epoch_ms('2024-03-01T12:34:56.789+00:00') == 1709296496789
+    assert parse_epoch('2024-03-01T12:34:56Z') == 1709296496
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2024-03-01T14:34:56.5+02:00', 1709296496500),  # other offsets
+    ('2024-03-01T12:34:56', 1709296496000),          # naive is UTC
+    ('2024-03-01', 1709251200000),
+    ('1969-12-31T23:59:59.500Z', -500),
+    ('2024-02-30T00:00:00Z', None),
+    ('yesterday', None),
+    ('', None),
+    (None, None),
+])
+def test_other_inputs(value, expected):
+    assert parse_epoch_ms(value) == expected
+    assert parse_epoch(value) == (None if expected is None else expected // 1000)
+
+
+def _book(created):
+    return [OrderRecord('s', 'sell', 60, 1, created), OrderRecord('b', 'buy', 20, 1, created)]
+
+
+def test_age_filter_uses_ingest_epochs_and_one_reference_time():
+    book = _book('2024-03-01T00:00:00.000+00:00')
+    assert book[1].created_at == 1709251200
+    calc = TradingCalculator(min_profit=0)
+    day = 86400
+    assert calc.analyze_prime_item_orders(book, 'A', 'a', 30, now=1709251200 + 30 * day)
+    assert calc.analyze_prime_item_orders(book, 'A', 'a', 30, now=1709251200 + 30 * day + 1) == []
+    opps, expires_at = calc.analyze_with_expiry([o.to_dict() for o in book], 'A', 'a', 30, now=1709251200)
+    assert opps and expires_at == 1709251200 + 30 * day
+    assert calc.analyze_prime_item_orders(_book('not a date'), 'A', 'a', 30) == []
+    items = [{'id': 'a', 'item_name': 'A'}, {'id': 'b', 'item_name': 'B'}]
+    scan = calc.analyze_prime_items(items, {'a': book, 'b': _book('2024-02-20T00:00:00Z')}, max_order_age=15,
+                                    now=1709251200 + 15 * day)
+    assert [o['itemId'] for o in scan] == ['a']
+
+
+def test_benchmark_agrees_with_dateutil(tmp_path):
+    output = tmp_path / 'timestamps.json'
+    assert bench.main(['--quick', '--output', str(output)]) == 0
+    result = json.loads(output.read_text())
+    assert result['baseline'] == 'dateutil' and result['variants']['parse_epoch']['matches']
+    assert result['age_filter']['matches']
@@ -0,0 +1,68 @@
+import threading
+
+from backend.deadline import Deadline
+from backend.trading_calculator import TradingCalculator
+from backend.trading_job import CANCELLED, DONE, QUEUED, RUNNING, TradingJob
+
+
+def _opportunity(name, score=None):
+    opportunity = {'itemName': name, 'netProfit': 1}
+    if score is not None:
+        opportunity['liquidityScore'] = score
+    return opportunity
+
+
+def test_view_is_cached_until_the_job_changes_and_ranks_incrementally():
+    job = TradingJob('job', total=4)
+    first = job.view()
+    assert first.status == QUEUED and first.results == () and job.view() is first
+    batches = [[_opportunity('a'), _opportunity('b', 2.0)], [_opportunity('c', 5.0), _opportunity('d')]]
+    job.add_results(batches[0], 2)
+    middle = job.view()
+    assert middle is not first and middle.progress == 2 and job.view() is middle
+    job.add_results(batches[1], 2)
+    assert list(job.view().results) == TradingCalculator.rank_opportunities(batches[0] + batches[1])
+    job.record_fetch('1', {'status': 'ok'})
+    job.record_fetch('2', {'status': 'timeout', 'error': 'timed out'})
+    job.add_snapshot_hit()
+    view = job.view()
+    assert view.fetch_status == {'ok': 1, 'timeout': 1} and view.snapshot_hits == 1
+    assert view.fetch_failures == ({'status': 'timeout', 'error': 'timed out', 'itemId': '2'},)
+
+
+def test_cancel_sets_the_event_and_cancels_the_deadline():
+    deadline = Deadline(60)
+    job = TradingJob('job', total=1, deadline=deadline, status=RUNNING)
+    assert not job.should_stop()
+    job.cancel()
+    assert job.cancelled and job.should_stop() and deadline.cancelled and job.view().cancelled
+    assert not job.set_status(RUNNING, only_from=QUEUED)
+    assert job.set_status(CANCELLED, 'stopped') and job.view().error == 'stopped'
+    assert TradingJob('expired', total=1, deadline=Deadline(0)).should_stop()
+
+
+def test_concurrent_writers_and_readers_see_consistent_views():
+    job = TradingJob('job', total=800, status=RUNNING)
+
+    def fetcher(offset):
+        for i in range(100):
+            job.record_fetch(str(offset + i), {'status': 'ok'})
+
+    def poller(views):
+        for _ in range(200):
+            views.append(job.view())
+
+    views = []
+    threads = [threading.Thread(target=fetcher, args=(i * 100,)) for i in range(8)]
+    threads += [threading.Thread(target=poller, args=(views,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for batch in range(8):
+        job.add_results([_opportunity(f'{batch}-{i}', float(i)) for i in range(5)], 100)
+    job.set_status(DONE)
+    for thread in threads:
+        thread.join()
+    assert all(len(view.results) == view.progress // 20 for view in views)
+    final = job.view()
+    assert final.status == DONE and final.progress == 800 and final.fetch_status == {'ok': 800}
+    assert len(final.results) == 40